@@ -4,7 +4,7 @@
 STATIC_FILE_SETTINGS = {
     'CACHE_CONTROL_MAX_AGE': 31536000,  # 1 ano
     'MEDIA_CACHE_CONTROL_MAX_AGE': 3600,  # 1 hora
-    'ENABLE_COMPRESSION': True,
+    'ENABLE_COMPRESSION': True,  # Em app/settings.py: COMPRESSION_SETTINGS (smart_caa.compression)
     'ENABLE_ETAGS': True,
 }
 
@@ -25,11 +25,14 @@ SECURE_HEADERS = {
     'Referrer-Policy': 'strict-origin-when-cross-origin',
 }
 
-# Configurações de CDN (para futuro uso)
+# Configurações de CDN (lidas por smart_caa.media_urls; em app/settings.py
+# vêm de CDN_ENABLED e CDN_BASE_URL)
 CDN_SETTINGS = {
     'ENABLED': False,
     'BASE_URL': '',
-    'CACHE_CONTROL': 'public, max-age=31536000',
+    'HASHED_NAMES': True,
+    'CACHE_CONTROL': 'public, max-age=31536000, immutable',
+    'UNHASHED_CACHE_CONTROL': 'public, max-age=3600',
 }
 
 # Configurações de backup de arquivos
@@ -39,6 +39,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'smart_caa.middleware.RequestMetricsMiddleware',  # Primeiro, para medir os demais
+    'smart_caa.middleware.QueryInspectorMiddleware',  # Só em DEBUG ou com QUERY_INSPECTOR=True
+    'smart_caa.middleware.ResponseCompressionMiddleware',  # Antes de qualquer um que leia o corpo
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -144,10 +147,28 @@ if 'pythonanywhere' in platform.node().lower() or not DEBUG:
         'X-Content-Type-Options': 'nosniff',
         'X-Frame-Options': 'SAMEORIGIN',
     }
+
+    # Cache compartilhado entre os workers: revogação de tokens, limite de
+    # requisições e relatórios dependem de todos os processos enxergarem as
+    # mesmas chaves. O padrão usa arquivos (todos os workers do servidor);
+    # com mais de um servidor, use Redis/Memcached via CACHE_BACKEND.
+    CACHES = {
+        'default': {
+            'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache'),
+            'LOCATION': config('CACHE_LOCATION', default=os.path.join(BASE_DIR, 'cache', 'django')),
+        }
+    }
 else:
     # Configurações de desenvolvimento
     MEDIA_SERVE_VIA_DJANGO = False
 
+    # Um único processo (runserver): o cache em memória basta
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -210,6 +231,202 @@ LOGGING = {
 DEFAULT_PAGE_SIZE = 20
 MAX_PAGE_SIZE = 100
 
+# Configurações de telemetria de uso dos pictogramas
+PICTOGRAM_USAGE_SETTINGS = {
+    'MAX_BATCH_SIZE': 5000,  # Máximo de eventos aceitos por requisição
+    'INSERT_BATCH_SIZE': 1000,  # Tamanho de cada INSERT em lote
+}
+
+# Configurações do ranking de pictogramas por paciente (order=ranked)
+# Após alterar a meia-vida, execute: python manage.py rebuild_pictogram_ranking
+PICTOGRAM_RANKING_SETTINGS = {
+    'HALF_LIFE_DAYS': 14,  # Tempo para um toque perder metade do peso
+}
+
+# Configurações da predição do próximo pictograma (pictograms/predict/)
+PICTOGRAM_PREDICTION_SETTINGS = {
+    'ORDER': 2,  # Pictogramas anteriores considerados no contexto
+    'SESSION_GAP_SECONDS': 120,  # Pausa que encerra uma frase
+    'GLOBAL_WEIGHT': 0.3,  # Peso do modelo com o histórico de todos os pacientes
+    'MAX_CACHED_PATIENTS': 1000,  # Modelos de pacientes mantidos em memória por processo
+    'MODEL_TTL_SECONDS': 300,  # Intervalo para buscar no banco os eventos novos (em segundo plano)
+    'REBUILD_SECONDS': 3600,  # Intervalo para refazer os modelos com os eventos mais recentes
+}
+
+# Configurações da síntese de voz dos pictogramas (pictograms/<id>/speech/)
+# Requer eSpeak NG instalado no servidor (apt install espeak-ng)
+# Para gerar o cache em lote: python manage.py synthesize_pictogram_audio
+SPEECH_SETTINGS = {
+    'ENGINE': 'smart_caa.services.speech.EspeakEngine',  # Subclasse de SpeechEngine
+    'VOICE': 'pt-br',
+    'VOICES': ['pt-br', 'pt'],
+    'RATE': 150,  # Palavras por minuto
+    'CACHE_DIR': os.path.join(MEDIA_ROOT, 'tts'),
+}
+
+# Configurações da exportação da prancha: pacote offline (board/export/)
+# e folha impressa em PDF (board/pdf/)
+# Fora de MEDIA_ROOT para que os arquivos não fiquem acessíveis pela URL de mídia
+BOARD_EXPORT_SETTINGS = {
+    'CACHE_DIR': os.path.join(BASE_DIR, 'cache', 'boards'),
+    'CHUNK_SIZE': 64 * 1024,  # Bytes lidos e enviados por vez
+    'PDF_IMAGE_DPI': 150,  # Resolução das imagens na folha impressa
+    'PDF_JPEG_QUALITY': 85,
+    'PDF_MAX_COLUMNS': 10,
+}
+
+# Configurações da importação em lote de pictogramas
+# Uso: python manage.py import_pictograms catalogo.zip --user admin --report relatorio.json
+PICTOGRAM_IMPORT_SETTINGS = {
+    'WORKERS': 8,  # Threads que validam e gravam os arquivos
+    'CHUNK_SIZE': 500,  # Pictogramas gravados por transação
+    'MAX_IMAGE_SIZE': 5 * 1024 * 1024,  # 5MB
+    'MAX_AUDIO_SIZE': 10 * 1024 * 1024,  # 10MB
+}
+
+# Configurações das exportações em CSV/JSONL (histories/export/, anamnesis/export/, patients/export/)
+EXPORT_SETTINGS = {
+    'CHUNK_SIZE': 2000,  # Linhas buscadas do banco por vez
+    'ROWS_PER_WRITE': 500,  # Linhas agrupadas em cada bloco enviado
+}
+
+# Configurações do conjunto de pictogramas padrão (vinculados a novos pacientes)
+DEFAULT_PICTOGRAM_SETTINGS = {
+    'CACHE_TIMEOUT': 3600,  # Segundos que a lista de IDs fica no cache compartilhado
+    'PROPAGATION_CHUNK_SIZE': 500,  # Pacientes por transação ao propagar padrões
+}
+
+# Configurações do pool de hash de senhas (login, troca de senha e cadastros)
+PASSWORD_HASHING_SETTINGS = {
+    'WORKERS': min(4, os.cpu_count() or 1),  # Processos do pool (1 = hash na própria thread)
+    'START_METHOD': 'spawn',
+    'MIN_BATCH': 2,  # Lotes menores que isso são calculados sem o pool
+    'MAX_PENDING': 2 * min(4, os.cpu_count() or 1),  # Hashes simultâneos antes de enfileirar
+    'QUEUE_TIMEOUT': 5,  # Segundos esperando vaga antes de responder 503
+    'SLOW_QUEUE_SECONDS': 0.5,  # Espera na fila registrada como aviso no log
+    # Parâmetros dos hashers (medidos com: python manage.py benchmark_password_hashers)
+    'PBKDF2_ITERATIONS': None,  # None = padrão do Django
+    'SCRYPT_WORK_FACTOR': 2 ** 15,
+    'SCRYPT_BLOCK_SIZE': 8,
+    'SCRYPT_PARALLELISM': 3,
+    'ARGON2_TIME_COST': 2,
+    'ARGON2_MEMORY_COST': 19 * 1024,  # KiB
+    'ARGON2_PARALLELISM': 1,
+}
+
+# Hasher usado para novas senhas: pbkdf2, scrypt ou argon2 (requer argon2-cffi).
+# Os demais continuam aceitos e a senha é regravada no próximo login.
+PASSWORD_HASHER = config('PASSWORD_HASHER', default='pbkdf2')
+
+_PASSWORD_HASHERS = {
+    'pbkdf2': 'smart_caa.hashers.PBKDF2PasswordHasher',
+    'scrypt': 'smart_caa.hashers.ScryptPasswordHasher',
+    'argon2': 'smart_caa.hashers.Argon2PasswordHasher',
+}
+
+PASSWORD_HASHERS = [
+    _PASSWORD_HASHERS[PASSWORD_HASHER],
+    *(path for name, path in _PASSWORD_HASHERS.items() if name != PASSWORD_HASHER),
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+
+# Login pelo pool de hash de senhas
+AUTHENTICATION_BACKENDS = ['authentication.backends.PooledModelBackend']
+
+# Autenticação JWT sem consulta ao banco nas leituras (usuário montado pelas claims do token)
+STATELESS_AUTH_SETTINGS = {
+    'ENABLED': True,
+    'METHODS': ('GET', 'HEAD', 'OPTIONS'),
+}
+
+# Limite de requisições (token bucket) dos endpoints abertos de login, senha e cadastro.
+# RATE: fichas repostas por período; BURST: tamanho do balde; KEY: ip, user ou field:<campo>
+THROTTLE_SETTINGS = {
+    'ENABLED': config('THROTTLE_ENABLED', default=True, cast=bool),
+    'CACHE_ALIAS': 'default',  # Deve ser compartilhado entre os processos em produção
+    'SCOPES': {
+        'login': {'RATE': '20/min', 'BURST': 10, 'KEY': 'ip'},
+        'login_account': {'RATE': '10/min', 'BURST': 5, 'KEY': 'field:username'},
+        'password_reset': {'RATE': '5/hour', 'BURST': 3, 'KEY': 'ip'},
+        'password_reset_account': {'RATE': '3/hour', 'BURST': 2, 'KEY': 'field:email'},
+        'change_password': {'RATE': '10/min', 'BURST': 5, 'KEY': 'ip'},
+        'change_password_account': {'RATE': '5/min', 'BURST': 5, 'KEY': 'field:username'},
+        'registration': {'RATE': '30/hour', 'BURST': 10, 'KEY': 'ip'},  # Só anônimos
+    },
+}
+
+# Métricas por rota (tempo, banco, serializers, tamanho) exportadas em /metrics
+METRICS_SETTINGS = {
+    'ENABLED': config('METRICS_ENABLED', default=True, cast=bool),
+    'AUTH_TOKEN': config('METRICS_TOKEN', default=''),  # Bearer exigido em /metrics; vazio: só equipe ou DEBUG
+    'INSTRUMENT_SERIALIZERS': True,
+}
+
+# Log de consultas lentas e detector de N+1 (logger smart_caa.queries).
+# Para revisar uma captura: python manage.py replay_requests logs/requests.jsonl
+QUERY_INSPECTOR_SETTINGS = {
+    'ENABLED': config('QUERY_INSPECTOR', default=DEBUG, cast=bool),
+    'SLOW_QUERY_MS': config('SLOW_QUERY_MS', default=100, cast=int),
+    'N_PLUS_ONE_THRESHOLD': 5,
+    'STACK_DEPTH': 6,
+    # Ex.: logs/requests.jsonl. Senhas e tokens são removidos, mas o arquivo
+    # guarda dados pessoais dos corpos (CPF, e-mail, anamneses)
+    'CAPTURE_FILE': config('QUERY_CAPTURE_FILE', default=''),
+}
+
+# Mídia por CDN: com ENABLED, as URLs de mídia dos serializers usam BASE_URL
+# no lugar de <host>/media/ (ver smart_caa/media_urls.py). Os uploads levam o
+# hash do conteúdo no nome (smart_caa/storage.py) e são servidos como
+# immutable por um ano; arquivos antigos: python manage.py hash_media_files
+CDN_SETTINGS = {
+    'ENABLED': config('CDN_ENABLED', default=False, cast=bool),
+    'BASE_URL': config('CDN_BASE_URL', default=''),
+    'HASHED_NAMES': config('MEDIA_HASHED_NAMES', default=True, cast=bool),
+    'CACHE_CONTROL': 'public, max-age=31536000, immutable',
+    'UNHASHED_CACHE_CONTROL': 'public, max-age=3600',
+}
+
+# Compressão gzip/brotli (brotli com o pacote Brotli instalado) dos JSON da
+# API e dos estáticos pré-comprimidos por python manage.py compress_static
+# (rodar depois do collectstatic). Ver smart_caa/compression.py
+COMPRESSION_SETTINGS = {
+    'ENABLED': config('COMPRESSION_ENABLED', default=True, cast=bool),
+    'MIN_SIZE': config('COMPRESSION_MIN_SIZE', default=1024, cast=int),
+}
+
+# Miniaturas dos anexos (preview_url), geradas em segundo plano após o upload.
+# PDFs precisam do pdftoppm (Poppler) ou do mutool (MuPDF) no servidor.
+# Anexos antigos: python manage.py generate_attachment_previews
+ATTACHMENT_PREVIEW_SETTINGS = {
+    'ENABLED': config('ATTACHMENT_PREVIEWS', default=True, cast=bool),
+    'SIZE': 320,
+}
+
+STORAGES = {
+    'default': {'BACKEND': 'smart_caa.storage.HashedMediaStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+# Listas de pictogramas do paciente e disponíveis serializadas por projeção
+# com values() (mesmo JSON). Comparação: python manage.py benchmark_serializers
+SERIALIZATION_SETTINGS = {
+    'FAST_READ_PATH': config('FAST_READ_PATH', default=True, cast=bool),
+}
+
+# Revogação de tokens (logout e refresh rotacionado) sem o app token_blacklist.
+# Limpeza periódica: python manage.py purge_revoked_tokens
+TOKEN_REVOCATION_SETTINGS = {
+    'STORE': 'database',  # 'database' (tabela + cache) ou 'cache'
+    'PURGE_BATCH_SIZE': 5000,
+}
+
+# Limites do cadastro em lote (person/onboarding/)
+ONBOARDING_SETTINGS = {
+    'MAX_PEOPLE': 500,
+    'MAX_RELATIONSHIPS': 1000,
+}
+
 # Configurações de Data e Formato
 USE_L10N = True
 DATE_FORMAT = 'd/m/Y'
@@ -225,13 +442,17 @@ SESSION_EXPIRE_AT_BROWSER_CLOSE = False
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authentication.authentication.StatelessJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',  # Permite acesso sem autenticação para testes
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
+    # Proxies reversos na frente da aplicação. Com 0 o IP dos throttles é o
+    # REMOTE_ADDR; sem o valor, o DRF usaria o X-Forwarded-For inteiro, que o
+    # cliente escolhe (e assim zeraria os limites a cada requisição)
+    'NUM_PROXIES': config('NUM_PROXIES', default=0, cast=int),
 }
 
 # DRF Spectacular Configuration
@@ -336,7 +557,11 @@ SIMPLE_JWT = {
     
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
-    'TOKEN_USER_CLASS': 'rest_framework_simplejwt.models.TokenUser',
+    'TOKEN_USER_CLASS': 'authentication.authentication.ClaimsUser',
+    'TOKEN_OBTAIN_SERIALIZER': 'authentication.serializers.AuthenticationTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'authentication.serializers.AuthenticationTokenRefreshSerializer',
+    'TOKEN_VERIFY_SERIALIZER': 'authentication.serializers.AuthenticationTokenVerifySerializer',
+    'TOKEN_BLACKLIST_SERIALIZER': 'authentication.serializers.LogoutSerializer',
     
     'JTI_CLAIM': 'jti',
     
@@ -9,6 +9,12 @@ from django.views.decorators.http import last_modified
 from django.views.decorators.vary import vary_on_headers
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
+from django.utils.cache import patch_vary_headers
+
+from smart_caa.compression import get_compression_settings, precompressed_variant
+from smart_caa.media_urls import get_cdn_settings
+from smart_caa.services.media_scan import last_report, scan_media
+from smart_caa.storage import is_hashed_name
 
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -16,9 +22,11 @@ class SecureMediaView(View):
     """
     View para servir arquivos de mídia com controle de segurança
     Otimizada para PythonAnywhere
+
+    Arquivos com o hash do conteúdo no nome (smart_caa.storage) nunca mudam
+    e vão como immutable por um ano; os demais, com cache de uma hora.
     """
     
-    @method_decorator(cache_control(max_age=3600, public=True))
     @method_decorator(vary_on_headers('User-Agent'))
     def get(self, request, path):
         """
@@ -69,7 +77,10 @@ class SecureMediaView(View):
             with open(file_path, 'rb') as f:
                 response = HttpResponse(f.read(), content_type=content_type)
                 response['Content-Length'] = os.path.getsize(file_path)
-                response['Cache-Control'] = 'public, max-age=3600'
+                cdn = get_cdn_settings()
+                response['Cache-Control'] = (
+                    cdn['CACHE_CONTROL'] if is_hashed_name(path) else cdn['UNHASHED_CACHE_CONTROL']
+                )
                 response['X-Content-Type-Options'] = 'nosniff'
                 
                 # Headers específicos para imagens
@@ -125,12 +136,20 @@ class SecureStaticView(View):
             if not content_type:
                 content_type = 'application/octet-stream'
             
+            # Versão .br/.gz gerada pelo compress_static, se o cliente aceitar
+            encoding = None
+            if get_compression_settings()['ENABLED']:
+                file_path, encoding = precompressed_variant(file_path, request.META.get('HTTP_ACCEPT_ENCODING'))
+            
             # Ler o arquivo e retornar resposta
             with open(file_path, 'rb') as f:
                 response = HttpResponse(f.read(), content_type=content_type)
                 response['Content-Length'] = os.path.getsize(file_path)
                 response['Cache-Control'] = 'public, max-age=86400'
                 response['X-Content-Type-Options'] = 'nosniff'
+                if encoding:
+                    response['Content-Encoding'] = encoding
+                patch_vary_headers(response, ('Accept-Encoding',))
                 return response
                 
         except Exception as e:
@@ -144,41 +163,21 @@ class SecureStaticView(View):
 @csrf_exempt
 def debug_media_files(request):
     """
-    View de debug para listar arquivos de mídia disponíveis
+    View de debug com a conferência dos arquivos de mídia (ver
+    smart_caa/services/media_scan.py). Usa o último relatório gravado;
+    ?refresh=1 executa uma nova conferência.
     """
-    import os
-    from django.conf import settings
-    
     if not settings.DEBUG and not request.user.is_superuser:
         return JsonResponse({'error': 'Acesso negado'}, status=403)
     
-    media_root = settings.MEDIA_ROOT
-    files = []
-    
     try:
-        for root, dirs, filenames in os.walk(media_root):
-            for filename in filenames:
-                file_path = os.path.join(root, filename)
-                rel_path = os.path.relpath(file_path, media_root)
-                url = settings.MEDIA_URL + rel_path.replace('\\', '/')
-                
-                files.append({
-                    'filename': filename,
-                    'path': rel_path.replace('\\', '/'),
-                    'url': url,
-                    'full_path': file_path,
-                    'exists': os.path.exists(file_path),
-                    'size': os.path.getsize(file_path) if os.path.exists(file_path) else 0
-                })
+        report = None if request.GET.get('refresh') else last_report()
+        if report is None:
+            report = scan_media()
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
     
-    return JsonResponse({
-        'media_root': media_root,
-        'media_url': settings.MEDIA_URL,
-        'files': files,
-        'total_files': len(files)
-    })
+    return JsonResponse({'media_url': settings.MEDIA_URL, **report})
 
 
 @csrf_exempt
@@ -0,0 +1,75 @@
+from django.conf import settings
+from django.utils.functional import cached_property
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+
+from .revocation import is_token_revoked
+
+
+def get_stateless_auth_settings():
+    """
+    Retorna as configurações da autenticação JWT sem consulta ao banco
+    """
+    defaults = {
+        'ENABLED': True,
+        'METHODS': ('GET', 'HEAD', 'OPTIONS'),  # Métodos atendidos só com as claims do token
+    }
+    defaults.update(getattr(settings, 'STATELESS_AUTH_SETTINGS', {}))
+    return defaults
+
+
+class ClaimsUser(TokenUser):
+    """
+    Usuário montado a partir das claims do token de acesso (ver
+    AuthenticationTokenObtainPairSerializer.get_token), sem consulta ao banco
+    """
+
+    is_active = True
+
+    @cached_property
+    def person_id(self):
+        return self.token.get('person_id')
+
+    @cached_property
+    def is_patient(self):
+        return self.token.get('is_patient', False)
+
+    @cached_property
+    def is_caregiver(self):
+        return self.token.get('is_caregiver', False)
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication que não carrega o User em requisições de leitura.
+
+    Nos métodos de STATELESS_AUTH_SETTINGS['METHODS'], request.user é um
+    ClaimsUser com os dados do token. Nas escritas o User continua vindo do
+    banco, pois as views o gravam em created_by/inactivated_by. Em ambos os
+    casos, tokens revogados (troca de senha, usuário desativado) são
+    recusados pelo cache de revogação, que só vai ao banco quando ainda não
+    conhece o usuário.
+    """
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        if is_token_revoked(validated_token):
+            raise AuthenticationFailed('Token revogado. Faça login novamente.', code='token_revoked')
+
+        stateless_settings = get_stateless_auth_settings()
+        # Tokens emitidos antes das claims extras continuam indo ao banco
+        if (
+            stateless_settings['ENABLED']
+            and request.method in stateless_settings['METHODS']
+            and 'is_patient' in validated_token
+        ):
+            return ClaimsUser(validated_token), validated_token
+        return self.get_user(validated_token), validated_token
@@ -0,0 +1,37 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from smart_caa import password_hashing
+
+
+UserModel = get_user_model()
+
+
+class PooledModelBackend(ModelBackend):
+    """
+    ModelBackend com a verificação da senha no pool de hash de senhas.
+
+    Usado pelo TokenObtainPairView (via authenticate) e pelo login do admin.
+    Sem vaga no pool, a requisição recebe 503 (PasswordHashingBusy).
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Mesmo custo de um usuário existente, para não revelar quais existem
+            password_hashing.make_password(password)
+            return None
+
+        def setter(raw_password):
+            # Hash com hasher ou parâmetros antigos: regrava com os atuais
+            user.password = password_hashing.make_password(raw_password)
+            user.save(update_fields=['password'])
+
+        if password_hashing.check_password(password, user.password, setter) and self.user_can_authenticate(user):
+            return user
+        return None
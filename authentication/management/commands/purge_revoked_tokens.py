@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from authentication.models import RevokedToken
+from authentication.revocation import purge_expired_tokens
+
+
+class Command(BaseCommand):
+    help = (
+        'Remove os tokens revogados já expirados. Rode periodicamente (cron) para que a '
+        'tabela guarde só os tokens que ainda poderiam ser usados.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Registros removidos por DELETE')
+
+    def handle(self, *args, **options):
+        removed = purge_expired_tokens(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{removed} tokens expirados removidos; {RevokedToken.objects.count()} ainda revogados.'
+        ))
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.3 on 2026-10-19 02:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevokedToken',
+            fields=[
+                ('jti', models.CharField(help_text='Identificador único do token (claim jti)', max_length=255, primary_key=True, serialize=False, verbose_name='JTI')),
+                ('expires_at', models.DateTimeField(db_index=True, help_text='Expiração do token; após ela o registro pode ser removido', verbose_name='Expira em')),
+            ],
+            options={
+                'verbose_name': 'Token Revogado',
+                'verbose_name_plural': 'Tokens Revogados',
+            },
+        ),
+    ]
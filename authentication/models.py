@@ -0,0 +1,31 @@
+from django.db import models
+
+
+class RevokedToken(models.Model):
+    """
+    JTI de um token revogado (logout ou refresh já rotacionado).
+
+    Substitui as tabelas outstanding/blacklisted do token_blacklist do
+    simplejwt: só os tokens revogados são gravados, cada um até a própria
+    expiração; depois disso o comando purge_revoked_tokens os remove.
+    """
+
+    jti = models.CharField(
+        max_length=255,
+        primary_key=True,
+        verbose_name="JTI",
+        help_text="Identificador único do token (claim jti)"
+    )
+
+    expires_at = models.DateTimeField(
+        db_index=True,
+        verbose_name="Expira em",
+        help_text="Expiração do token; após ela o registro pode ser removido"
+    )
+
+    class Meta:
+        verbose_name = "Token Revogado"
+        verbose_name_plural = "Tokens Revogados"
+
+    def __str__(self):
+        return f"{self.jti} (até {self.expires_at})"
@@ -0,0 +1,154 @@
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import RevokedToken
+
+
+USER_FINGERPRINT_KEY = 'authentication:token-fingerprint:{user_id}'
+REVOKED_JTI_KEY = 'authentication:revoked-jti:{jti}'
+
+# Claim do token com a impressão digital do usuário (ver token_fingerprint)
+FINGERPRINT_CLAIM = 'fp'
+DELETED_USER = 'deleted'
+
+
+def get_token_revocation_settings():
+    """
+    Retorna as configurações da revogação de tokens com valores padrão
+    """
+    defaults = {
+        # 'database': tabela RevokedToken com o cache na frente (sobrevive a
+        # reinícios do cache); 'cache': só o cache, sem gravar no banco
+        'STORE': 'database',
+        'PURGE_BATCH_SIZE': 5000,  # Registros expirados removidos por DELETE
+    }
+    defaults.update(getattr(settings, 'TOKEN_REVOCATION_SETTINGS', {}))
+    return defaults
+
+
+def token_fingerprint(user):
+    """
+    Impressão digital do estado do usuário que invalida os tokens: o hash da
+    senha e o is_active. Vai no token (claim FINGERPRINT_CLAIM) e muda a cada
+    troca de senha ou desativação, sem depender do relógio.
+    """
+    return salted_hmac(
+        'authentication.token-fingerprint', f'{user.password}:{user.is_active}'
+    ).hexdigest()[:16]
+
+
+def revoke_user_tokens(user, deleted=False):
+    """
+    Guarda no cache a impressão digital atual do usuário; tokens emitidos
+    com outra (senha anterior, usuário ainda ativo) passam a ser recusados,
+    sem consultar o banco a cada requisição. Se a impressão não mudou,
+    nenhum token é afetado. `deleted` recusa todos os tokens do usuário.
+
+    Fica no cache até o fim da validade do refresh mais longo. Com mais de
+    um processo, CACHES deve ser compartilhado (ver app/settings.py): um
+    processo com outro cache já guardou a impressão antiga. Se a impressão
+    não estiver no cache, is_token_revoked a recalcula pelo banco.
+    """
+    timeout = int(api_settings.REFRESH_TOKEN_LIFETIME.total_seconds())
+    fingerprint = DELETED_USER if deleted else token_fingerprint(user)
+    cache.set(USER_FINGERPRINT_KEY.format(user_id=user.pk), fingerprint, timeout=timeout)
+
+
+def _current_fingerprint(user_id):
+    """
+    Impressão digital lida do banco, guardada no cache para as próximas
+    requisições do usuário
+    """
+    user = get_user_model().objects.filter(pk=user_id).only('password', 'is_active').first()
+    fingerprint = DELETED_USER if user is None else token_fingerprint(user)
+    cache.set(
+        USER_FINGERPRINT_KEY.format(user_id=user_id), fingerprint,
+        timeout=int(api_settings.REFRESH_TOKEN_LIFETIME.total_seconds()),
+    )
+    return fingerprint
+
+
+def revoke_token(token):
+    """
+    Revoga um token pelo jti até a expiração dele.
+
+    Retorna False se o token já estava revogado. A gravação é atômica (chave
+    primária no banco, cache.add só no cache): entre duas rotações
+    simultâneas do mesmo refresh, só uma recebe True.
+    """
+    jti = token[api_settings.JTI_CLAIM]
+    expires = token['exp']
+    key = REVOKED_JTI_KEY.format(jti=jti)
+    timeout = max(1, expires - int(time.time()))
+
+    if get_token_revocation_settings()['STORE'] != 'database':
+        return cache.add(key, True, timeout=timeout)
+
+    try:
+        with transaction.atomic():
+            RevokedToken.objects.create(jti=jti, expires_at=datetime.fromtimestamp(expires, tz=dt_timezone.utc))
+        revoked = True
+    except IntegrityError:
+        revoked = False
+    cache.set(key, True, timeout=timeout)
+    return revoked
+
+
+def is_token_revoked(token):
+    """
+    Verifica a impressão digital do usuário e o jti com uma única leitura do
+    cache.
+
+    O que não estiver no cache (cache reiniciado, ou ainda vazio neste
+    processo) é lido do banco e guardado, inclusive a resposta negativa do
+    jti, até a expiração do token: cache frio nunca significa "não
+    revogado", e cada token consulta o banco no máximo uma vez.
+    """
+    user_id = token.get(api_settings.USER_ID_CLAIM)
+    jti = token.get(api_settings.JTI_CLAIM)
+    user_key = USER_FINGERPRINT_KEY.format(user_id=user_id)
+    jti_key = REVOKED_JTI_KEY.format(jti=jti)
+    found = cache.get_many([user_key, jti_key])
+
+    if user_id is not None:
+        fingerprint = found.get(user_key)
+        if fingerprint is None:
+            fingerprint = _current_fingerprint(user_id)
+        # Tokens sem a claim (anteriores a ela) também caem na troca de senha
+        if token.get(FINGERPRINT_CLAIM) != fingerprint:
+            return True
+    if jti is None:
+        return False
+    if jti_key in found:
+        return bool(found[jti_key])
+    if get_token_revocation_settings()['STORE'] != 'database':
+        return False
+    # add, e não set: se revoke_token gravar True entre a consulta e esta
+    # linha, a resposta negativa não o sobrescreve (e revoke_token sempre
+    # sobrescreve a negativa)
+    revoked = RevokedToken.objects.filter(jti=jti).exists()
+    cache.add(jti_key, revoked, timeout=max(1, token['exp'] - int(time.time())))
+    return revoked
+
+
+def purge_expired_tokens(batch_size=None):
+    """
+    Remove da tabela os tokens revogados já expirados, em lotes.
+    Retorna a quantidade removida.
+    """
+    batch_size = batch_size or get_token_revocation_settings()['PURGE_BATCH_SIZE']
+    now = timezone.now()
+    removed = 0
+    while True:
+        jtis = list(RevokedToken.objects.filter(expires_at__lt=now).values_list('jti', flat=True)[:batch_size])
+        if not jtis:
+            return removed
+        removed += RevokedToken.objects.filter(jti__in=jtis).delete()[0]
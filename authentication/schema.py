@@ -0,0 +1,6 @@
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+
+
+class StatelessJWTScheme(SimpleJWTScheme):
+    """Mesmo esquema Bearer do simplejwt na documentação da API"""
+    target_class = 'authentication.authentication.StatelessJWTAuthentication'
@@ -1,5 +1,71 @@
 from django.contrib.auth.password_validation import validate_password
 from rest_framework import serializers
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer, TokenVerifySerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken, UntypedToken
+
+from smart_caa.models import Person
+from smart_caa.password_hashing import check_password
+
+from .revocation import FINGERPRINT_CLAIM, is_token_revoked, revoke_token, token_fingerprint
+
+
+class AuthenticationTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Inclui no token as claims usadas pelas views, para que as leituras não
+    precisem carregar o usuário (ver StatelessJWTAuthentication). As claims
+    passam do refresh para os tokens de acesso gerados a partir dele.
+    """
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        person = Person.objects.filter(user=user).values('id', 'is_patient', 'is_caregiver').first() or {}
+        token['username'] = user.get_username()
+        token['is_staff'] = user.is_staff
+        token['is_superuser'] = user.is_superuser
+        token['person_id'] = person.get('id')
+        token['is_patient'] = person.get('is_patient', False)
+        token['is_caregiver'] = person.get('is_caregiver', False)
+        token[FINGERPRINT_CLAIM] = token_fingerprint(user)
+        return token
+
+
+class AuthenticationTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        rotate = api_settings.ROTATE_REFRESH_TOKENS and api_settings.BLACKLIST_AFTER_ROTATION
+        # Recusa antes da rotação, que geraria um novo refresh a partir deste
+        if is_token_revoked(refresh):
+            raise InvalidToken('Token revogado. Faça login novamente.')
+        # Na rotação o refresh usado é revogado; se outra requisição já o
+        # revogou, este é um reuso e é recusado
+        if rotate and not revoke_token(refresh):
+            raise InvalidToken('Token já utilizado. Faça login novamente.')
+        return super().validate(attrs)
+
+
+class AuthenticationTokenVerifySerializer(TokenVerifySerializer):
+    def validate(self, attrs):
+        if is_token_revoked(UntypedToken(attrs['token'])):
+            raise serializers.ValidationError('Token revogado.')
+        return {}
+
+
+class LogoutSerializer(serializers.Serializer):
+    refresh = serializers.CharField(write_only=True)
+    access = serializers.CharField(
+        write_only=True,
+        required=False,
+        help_text="Token de acesso atual, revogado junto com o refresh"
+    )
+
+    def validate(self, attrs):
+        revoke_token(RefreshToken(attrs['refresh']))
+        if attrs.get('access'):
+            revoke_token(AccessToken(attrs['access']))
+        return {}
 
 
 class ForgotPasswordSerializer(serializers.Serializer):
@@ -21,7 +87,7 @@ class ChangePasswordSerializer(serializers.Serializer):
         if not user:
             raise serializers.ValidationError({'username': 'Usuario nao encontrado.'})
 
-        if not user.check_password(current_password):
+        if not check_password(current_password, user.password):
             raise serializers.ValidationError({'current_password': 'Senha atual invalida.'})
 
         if current_password == new_password:
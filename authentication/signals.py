@@ -0,0 +1,18 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .revocation import revoke_user_tokens
+
+
+@receiver(post_save, sender=get_user_model())
+def revoke_tokens_of_changed_user(sender, instance, **kwargs):
+    # As leituras não consultam o usuário: trocar a senha (por qualquer
+    # caminho, inclusive o admin) ou desativá-lo precisa revogar os tokens.
+    # Sem mudança na senha ou no is_active, a impressão é a mesma.
+    revoke_user_tokens(instance)
+
+
+@receiver(post_delete, sender=get_user_model())
+def revoke_tokens_of_deleted_user(sender, instance, **kwargs):
+    revoke_user_tokens(instance, deleted=True)
@@ -1,7 +1,9 @@
 from django.urls import path
 from .views import (
+    AuthenticationLogoutView,
     AuthenticationTokenObtainPairView,
     AuthenticationTokenRefreshView,
+    AuthenticationTokenVerifyView,
     ChangePasswordView,
     ForgotPasswordView,
 )
@@ -9,8 +11,8 @@ from .views import (
 urlpatterns = [
     path('authentication/token', AuthenticationTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('authentication/refresh/', AuthenticationTokenRefreshView.as_view(), name='token_refresh'),
-    path('authentication/verify/', AuthenticationTokenObtainPairView.as_view(), name='token_verify'),
-    path('authentication/logout/', AuthenticationTokenObtainPairView.as_view(), name='token_logout'),
+    path('authentication/verify/', AuthenticationTokenVerifyView.as_view(), name='token_verify'),
+    path('authentication/logout/', AuthenticationLogoutView.as_view(), name='token_logout'),
     path('authentication/forgot-password/', ForgotPasswordView.as_view(), name='forgot_password'),
     path('authentication/change-password/', ChangePasswordView.as_view(), name='change_password'),
 ]
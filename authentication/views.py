@@ -7,18 +7,29 @@ from smtplib import SMTPException
 from django.template.loader import render_to_string
 from django.utils import timezone
 from drf_spectacular.utils import extend_schema
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from rest_framework_simplejwt.views import TokenBlacklistView, TokenObtainPairView, TokenRefreshView, TokenVerifyView
 from rest_framework import status
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from smart_caa.password_hashing import make_password
+from smart_caa.throttling import (
+    ChangePasswordAccountThrottle,
+    ChangePasswordThrottle,
+    LoginAccountThrottle,
+    LoginThrottle,
+    PasswordResetAccountThrottle,
+    PasswordResetThrottle,
+)
+
+from .revocation import revoke_user_tokens
 from .serializers import ChangePasswordSerializer, ForgotPasswordSerializer
 
 
 @extend_schema(tags=['Authentication'])
 class AuthenticationTokenObtainPairView(TokenObtainPairView):
-    pass
+    throttle_classes = (LoginThrottle, LoginAccountThrottle)
 
 
 @extend_schema(tags=['Authentication'])
@@ -26,9 +37,24 @@ class AuthenticationTokenRefreshView(TokenRefreshView):
     pass
 
 
+@extend_schema(tags=['Authentication'])
+class AuthenticationTokenVerifyView(TokenVerifyView):
+    pass
+
+
+@extend_schema(
+    tags=['Authentication'],
+    summary='Logout',
+    description='Revoga o refresh informado (e o token de acesso, se enviado) até a expiração deles.',
+)
+class AuthenticationLogoutView(TokenBlacklistView):
+    pass
+
+
 @extend_schema(tags=['Authentication'])
 class ForgotPasswordView(APIView):
     permission_classes = (AllowAny,)
+    throttle_classes = (PasswordResetThrottle, PasswordResetAccountThrottle)
 
     @extend_schema(
         summary='Solicitar redefinicao de senha',
@@ -85,8 +111,9 @@ class ForgotPasswordView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
-        user.set_password(generated_password)
+        user.password = make_password(generated_password)
         user.save(update_fields=['password'])
+        revoke_user_tokens(user)
 
         return Response(success_response, status=status.HTTP_200_OK)
 
@@ -94,6 +121,7 @@ class ForgotPasswordView(APIView):
 @extend_schema(tags=['Authentication'])
 class ChangePasswordView(APIView):
     permission_classes = (AllowAny,)
+    throttle_classes = (ChangePasswordThrottle, ChangePasswordAccountThrottle)
 
     @extend_schema(
         summary='Alterar senha',
@@ -112,7 +140,8 @@ class ChangePasswordView(APIView):
         user = serializer.validated_data['user']
         new_password = serializer.validated_data['new_password']
 
-        user.set_password(new_password)
+        user.password = make_password(new_password)
         user.save(update_fields=['password'])
+        revoke_user_tokens(user)
 
         return Response({'detail': 'Senha alterada com sucesso.'}, status=status.HTTP_200_OK)
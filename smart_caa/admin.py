@@ -1,6 +1,40 @@
-from django.contrib import admin
-from .models import Anamnesis, EverydayCategory, Pictogram, Person, PatientCaregiverRelationship, PatientPictogram, History
+from django.contrib import admin, messages
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+from .models import Anamnesis, EverydayCategory, Pictogram, Person, PatientCaregiverRelationship, PatientPictogram, History, PictogramUsageDaily
 from .models.attachment import Attachment
+from .services.default_pictograms import propagate_default_pictograms
+from .services.media_scan import last_report, scan_media
+
+
+class MediaScanReportMixin:
+    """
+    Página "Conferir mídia" na lista do modelo: mostra o último relatório
+    do scan_media (gravado em arquivo) e permite executar uma nova conferência
+    """
+    change_list_template = 'admin/smart_caa/media_scan_change_list.html'
+
+    def get_urls(self):
+        info = self.model._meta.app_label, self.model._meta.model_name
+        return [
+            path('media-scan/', self.admin_site.admin_view(self.media_scan_view), name='%s_%s_media_scan' % info),
+        ] + super().get_urls()
+
+    def media_scan_view(self, request):
+        if not request.user.is_superuser:
+            return redirect('admin:index')
+        if request.method == 'POST':
+            report = scan_media(verify_hashes=bool(request.POST.get('verify_hashes')))
+            self.message_user(request, f'Conferência concluída em {report["seconds"]}s.', messages.SUCCESS)
+            return redirect(request.path)
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Conferência dos arquivos de mídia',
+            'opts': self.model._meta,
+            'report': last_report(),
+        }
+        return TemplateResponse(request, 'admin/smart_caa/media_scan.html', context)
 
 
 class PictogramInline(admin.TabularInline):
@@ -26,12 +60,13 @@ class EverydayCategoryAdmin(admin.ModelAdmin):
 
 
 @admin.register(Pictogram)
-class PictogramAdmin(admin.ModelAdmin):
+class PictogramAdmin(MediaScanReportMixin, admin.ModelAdmin):
     list_display = ['name', 'category', 'is_default', 'is_active', 'private', 'created_by', 'created_at']
     search_fields = ['name', 'description', 'category__name', 'created_by__username']
     list_filter = ['is_default', 'is_active', 'private', 'category', 'created_at', 'created_by']
     readonly_fields = ['created_by', 'created_at', 'updated_at']
     ordering = ['category', 'name']
+    actions = ['propagate_to_patients']
     
     fieldsets = (
         ('Informações Básicas', {
@@ -54,6 +89,20 @@ class PictogramAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         """Otimiza as consultas incluindo a categoria relacionada"""
         return super().get_queryset(request).select_related('category', 'created_by')
+    
+    @admin.action(description='Vincular pictogramas padrão selecionados a todos os pacientes')
+    def propagate_to_patients(self, request, queryset):
+        """Vincula os padrões ativos selecionados aos pacientes que ainda não os têm"""
+        ids = list(queryset.filter(is_default=True, is_active=True).values_list('id', flat=True))
+        if not ids:
+            self.message_user(request, 'Nenhum pictograma padrão ativo foi selecionado.', messages.WARNING)
+            return
+        created = propagate_default_pictograms(ids, created_by_id=request.user.id)
+        self.message_user(
+            request,
+            f'{created} vínculo(s) criado(s) para {len(ids)} pictograma(s) padrão.',
+            messages.SUCCESS
+        )
 
 
 @admin.register(Person)
@@ -287,9 +336,21 @@ class HistoryAdmin(admin.ModelAdmin):
 
 
 @admin.register(Attachment)
-class AttachmentAdmin(admin.ModelAdmin):
+class AttachmentAdmin(MediaScanReportMixin, admin.ModelAdmin):
     list_display = ['name', 'patient', 'history', 'file', 'created_at']
     search_fields = ['name', 'patient__name', 'history__description']
     list_filter = ['created_at', 'patient', 'history']
     readonly_fields = ['created_at', 'updated_at']
     ordering = ['-created_at']
+
+
+@admin.register(PictogramUsageDaily)
+class PictogramUsageDailyAdmin(admin.ModelAdmin):
+    list_display = ['patient', 'pictogram', 'date', 'count']
+    search_fields = ['patient__name', 'patient__cpf', 'pictogram__name']
+    list_filter = ['date']
+    raw_id_fields = ['patient', 'pictogram']
+    ordering = ['-date', '-count']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('patient', 'pictogram')
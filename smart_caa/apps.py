@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class SmartCaaConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'smart_caa'
+
+    def ready(self):
+        from django.core import checks
+
+        from . import signals  # noqa: F401
+        from .metrics import get_metrics_settings, instrument_serializers
+        from .throttling import check_shared_cache
+
+        checks.register(check_shared_cache, checks.Tags.caches, deploy=True)
+
+        metrics_settings = get_metrics_settings()
+        if metrics_settings['ENABLED'] and metrics_settings['INSTRUMENT_SERIALIZERS']:
+            instrument_serializers()
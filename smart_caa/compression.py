@@ -0,0 +1,163 @@
+"""
+Compressão gzip/brotli negociada pelo Accept-Encoding.
+
+- Estáticos: o comando compress_static grava, ao lado de cada arquivo
+  compressível de STATIC_ROOT, as versões .gz e .br com a compressão máxima;
+  o SecureStaticView serve a melhor delas aceita pelo cliente.
+- Respostas da API: o ResponseCompressionMiddleware comprime os JSON acima
+  de MIN_SIZE, e os streams (exportações) bloco a bloco, sem juntar tudo
+  em memória.
+
+O brotli é opcional (pacote Brotli); sem ele, só gzip.
+"""
+import gzip
+import os
+import zlib
+
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:  # Sem o pacote Brotli: apenas gzip
+    brotli = None
+
+
+def get_compression_settings():
+    """
+    Retorna as configurações de compressão com valores padrão
+    """
+    defaults = {
+        'ENABLED': True,
+        'MIN_SIZE': 1024,  # Bytes; respostas menores vão sem compressão
+        'CONTENT_TYPES': ['application/json', 'text/csv', 'application/x-ndjson'],
+        'GZIP_LEVEL': 6,  # Respostas dinâmicas: equilíbrio entre CPU e tamanho
+        'BROTLI_QUALITY': 5,
+        'STATIC_EXTENSIONS': ['.css', '.js', '.json', '.svg', '.html', '.txt', '.xml', '.map', '.ico', '.ttf', '.otf'],
+        'STATIC_MIN_SIZE': 256,
+    }
+    defaults.update(getattr(settings, 'COMPRESSION_SETTINGS', {}))
+    return defaults
+
+
+# Content-Encoding -> extensão do arquivo pré-comprimido, na ordem de preferência
+STATIC_ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def available_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def parse_accept_encoding(header):
+    """
+    'gzip, br;q=0.9, *;q=0' -> {'gzip': 1.0, 'br': 0.9, '*': 0.0}
+    """
+    accepted = {}
+    for item in (header or '').split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+def negotiate(header, encodings):
+    """
+    Melhor codificação de `encodings` (em ordem de preferência do servidor)
+    aceita pelo cliente, ou None para enviar sem compressão
+    """
+    accepted = parse_accept_encoding(header)
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(content, encoding, level=None):
+    compression = get_compression_settings()
+    if encoding == 'br':
+        return brotli.compress(content, quality=compression['BROTLI_QUALITY'] if level is None else level)
+    # mtime=0: mesma entrada, mesmos bytes (ETag e caches estáveis)
+    return gzip.compress(content, compresslevel=compression['GZIP_LEVEL'] if level is None else level, mtime=0)
+
+
+def compress_stream(chunks, encoding):
+    """
+    Comprime um iterável de blocos de bytes, emitindo a saída conforme o
+    compressor a libera
+    """
+    compression = get_compression_settings()
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=compression['BROTLI_QUALITY'])
+        process, finish = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(compression['GZIP_LEVEL'], zlib.DEFLATED, 31)  # 31: formato gzip
+        process, finish = compressor.compress, compressor.flush
+    for chunk in chunks:
+        data = process(chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+def precompress_file(path, force=False):
+    """
+    Grava path.gz (e path.br, com brotli) com a compressão máxima quando
+    ficam menores que o original. Retorna as extensões gravadas.
+    """
+    with open(path, 'rb') as source:
+        content = source.read()
+    mtime = os.path.getmtime(path)
+    written = []
+    for encoding, extension in STATIC_ENCODINGS:
+        if encoding not in available_encodings():
+            continue
+        target = path + extension
+        if not force and os.path.exists(target) and os.path.getmtime(target) >= mtime:
+            continue
+        compressed = compress(content, encoding, level=11 if encoding == 'br' else 9)
+        if len(compressed) >= len(content):
+            if os.path.exists(target):
+                os.remove(target)
+            continue
+        temporary = target + '.tmp'
+        with open(temporary, 'wb') as output:
+            output.write(compressed)
+        os.replace(temporary, target)
+        written.append(extension)
+    return written
+
+
+def precompressed_variant(path, accept_encoding):
+    """
+    (caminho, Content-Encoding) da versão pré-comprimida de `path` a servir,
+    ou (path, None). Ignora versões mais antigas que o original.
+    """
+    available = {}
+    mtime = None
+    for encoding, extension in STATIC_ENCODINGS:
+        candidate = path + extension
+        try:
+            candidate_mtime = os.path.getmtime(candidate)
+        except OSError:
+            continue
+        if mtime is None:
+            mtime = os.path.getmtime(path)
+        if candidate_mtime >= mtime:
+            available[encoding] = candidate
+    if not available:
+        return path, None
+    encoding = negotiate(accept_encoding, [encoding for encoding, _ in STATIC_ENCODINGS if encoding in available])
+    if encoding is None:
+        return path, None
+    return available[encoding], encoding
@@ -0,0 +1,54 @@
+"""
+Hashers de senha com parâmetros configuráveis.
+
+Usam os mesmos nomes de algoritmo dos hashers do Django, então os hashes já
+gravados continuam válidos; quando os parâmetros mudam em
+PASSWORD_HASHING_SETTINGS, o hash é regravado no próximo login (must_update).
+Os parâmetros podem ser passados ao construtor, que é como os processos do
+pool de hash (password_hashing.py) recriam o hasher sem ler as settings.
+Para escolher os valores, ver o comando benchmark_password_hashers.
+"""
+from django.contrib.auth import hashers
+
+from .password_hashing import get_password_hashing_settings
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    def __init__(self, iterations=None):
+        if iterations is None:
+            iterations = get_password_hashing_settings()['PBKDF2_ITERATIONS']
+        if iterations is not None:
+            self.iterations = iterations
+
+    def get_parameters(self):
+        return {'iterations': self.iterations}
+
+
+class ScryptPasswordHasher(hashers.ScryptPasswordHasher):
+    # Limite de memória do hashlib.scrypt (o padrão, 32 MiB, não comporta
+    # work_factor acima de 2**14 com block_size 8)
+    maxmem = 256 * 1024 * 1024
+
+    def __init__(self, work_factor=None, block_size=None, parallelism=None):
+        hashing_settings = get_password_hashing_settings()
+        self.work_factor = work_factor or hashing_settings['SCRYPT_WORK_FACTOR']
+        self.block_size = block_size or hashing_settings['SCRYPT_BLOCK_SIZE']
+        self.parallelism = parallelism or hashing_settings['SCRYPT_PARALLELISM']
+
+    def get_parameters(self):
+        return {'work_factor': self.work_factor, 'block_size': self.block_size, 'parallelism': self.parallelism}
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """
+    Requer o pacote opcional argon2-cffi (pip install argon2-cffi)
+    """
+
+    def __init__(self, time_cost=None, memory_cost=None, parallelism=None):
+        hashing_settings = get_password_hashing_settings()
+        self.time_cost = time_cost or hashing_settings['ARGON2_TIME_COST']
+        self.memory_cost = memory_cost or hashing_settings['ARGON2_MEMORY_COST']
+        self.parallelism = parallelism or hashing_settings['ARGON2_PARALLELISM']
+
+    def get_parameters(self):
+        return {'time_cost': self.time_cost, 'memory_cost': self.memory_cost, 'parallelism': self.parallelism}
@@ -0,0 +1,211 @@
+"""
+Cenários de carga a partir das coleções .http de tests/requests (formato do
+REST Client do VS Code / JetBrains) e das capturas JSONL gravadas pelo
+QueryInspectorMiddleware (QUERY_CAPTURE_FILE).
+
+Usado pelo comando load_test, que executa os cenários dentro do processo
+(django.test.Client, uma instância por thread) ou contra um servidor local,
+e resume vazão e percentis de latência por rota.
+"""
+import json
+import re
+from urllib.parse import urlsplit
+
+from django.contrib.auth import get_user_model
+from django.urls import Resolver404, resolve
+
+
+VARIABLE = re.compile(r'{{\s*([^}]+?)\s*}}')
+REQUEST_LINE = re.compile(r'^(GET|POST|PUT|PATCH|DELETE|HEAD|OPTIONS)\s+(\S+)(?:\s+HTTP/[\d.]+)?$')
+FILE_VARIABLE = re.compile(r'^@([\w-]+)\s*=\s*(.*)$')
+
+
+class UnresolvedVariable(Exception):
+    pass
+
+
+def parse_http_file(path):
+    """
+    Lê um arquivo .http. Retorna (variáveis do arquivo, requisições), com as
+    requisições no formato {name, title, method, url, headers, body, source}
+    e os valores ainda com as referências {{...}}.
+    """
+    with open(path, encoding='utf-8') as http_file:
+        lines = http_file.read().splitlines()
+
+    variables = {}
+    requests = []
+    current = None
+    title = None
+    name = None
+    in_body = False
+
+    def finish():
+        if current is not None:
+            body = '\n'.join(current['body']).strip()
+            current['body'] = body or None
+            requests.append(current)
+
+    for number, line in enumerate(lines, start=1):
+        stripped = line.strip()
+        if stripped.startswith('###'):
+            finish()
+            current, in_body, name = None, False, None
+            title = stripped.lstrip('#').strip() or title
+            continue
+        if current is None:
+            if not stripped or stripped.startswith('//'):
+                continue
+            if stripped.startswith('#'):
+                named = re.match(r'^#\s*@name\s+(\S+)', stripped)
+                if named:
+                    name = named.group(1)
+                continue
+            variable = FILE_VARIABLE.match(stripped)
+            if variable:
+                variables[variable.group(1)] = variable.group(2).strip()
+                continue
+            request_line = REQUEST_LINE.match(stripped)
+            if request_line:
+                current = {
+                    'name': name,
+                    'title': title,
+                    'method': request_line.group(1),
+                    'url': request_line.group(2),
+                    'headers': {},
+                    'body': [],
+                    'source': f'{path}:{number}',
+                }
+            continue
+        if in_body:
+            current['body'].append(line)
+        elif not stripped:
+            in_body = True
+        elif not stripped.startswith('#'):
+            header, _, value = stripped.partition(':')
+            current['headers'][header.strip()] = value.strip()
+    finish()
+    return variables, requests
+
+
+def parse_capture_file(path):
+    """
+    Lê uma captura JSONL do QueryInspectorMiddleware no mesmo formato de
+    parse_http_file. O usuário gravado vai em `user_id`.
+    """
+    requests = []
+    with open(path, encoding='utf-8') as capture:
+        for number, line in enumerate(capture, start=1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            url = entry['path'] + (f"?{entry['query']}" if entry.get('query') else '')
+            body = entry.get('body')
+            requests.append({
+                'name': None,
+                'title': None,
+                'method': entry.get('method', 'GET'),
+                'url': url,
+                'headers': {'Content-Type': 'application/json'},
+                'body': json.dumps(body) if body is not None else None,
+                'user_id': entry.get('user_id'),
+                'source': f'{path}:{number}',
+            })
+    return {}, requests
+
+
+def _lookup(reference, variables, responses):
+    if reference in variables:
+        return substitute(variables[reference], variables, responses)
+    # {{login.response.body.access}}: campo da resposta de uma requisição nomeada
+    parts = reference.split('.')
+    if len(parts) >= 3 and parts[1:3] == ['response', 'body'] and parts[0] in responses:
+        value = responses[parts[0]]
+        for key in parts[3:]:
+            if isinstance(value, list) and key.isdigit() and int(key) < len(value):
+                value = value[int(key)]
+            elif isinstance(value, dict) and key in value:
+                value = value[key]
+            else:
+                raise UnresolvedVariable(reference)
+        return value if isinstance(value, str) else json.dumps(value)
+    raise UnresolvedVariable(reference)
+
+
+def substitute(text, variables, responses):
+    if text is None or '{{' not in text:
+        return text
+    return VARIABLE.sub(lambda match: str(_lookup(match.group(1), variables, responses)), text)
+
+
+def route_of(method, path):
+    """
+    Nome da rota para o relatório ('GET patient-detail'); caminhos fora do
+    urlconf ficam agrupados como '<unmatched>'
+    """
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return f'{method} <unmatched>'
+    return f'{method} {match.view_name or match.route}'
+
+
+def split_url(url):
+    """
+    'http://localhost:8000/api/patients/?cpf=1' -> '/api/patients/?cpf=1'
+    """
+    parts = urlsplit(url)
+    path = parts.path or '/'
+    return path + (f'?{parts.query}' if parts.query else '')
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(samples, elapsed):
+    """
+    samples: rota -> [(status, segundos), ...]. Retorna rota -> {requests,
+    errors, statuses, rps, p50_ms, p95_ms, p99_ms, max_ms}.
+    """
+    summary = {}
+    for route, results in samples.items():
+        latencies = sorted(seconds for _, seconds in results)
+        statuses = {}
+        for status, _ in results:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        summary[route] = {
+            'requests': len(results),
+            'errors': sum(1 for status, _ in results if status is None or status >= 400),
+            'statuses': statuses,
+            'rps': round(len(results) / elapsed, 1) if elapsed else None,
+            'p50_ms': round(percentile(latencies, 0.5) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+            'max_ms': round(latencies[-1] * 1000, 2),
+        }
+    return summary
+
+
+def seed_database(username, patients=50, pictograms=200, links=60):
+    """
+    Cria dados para os cenários com o gerador de generate_fixture_data e o
+    usuário usado nas requisições. Retorna as variáveis usadas nas coleções
+    .http ({{patientId}}, {{caregiverId}}).
+    """
+    from .services.fixture_data import FixtureDataGenerator
+
+    user, _ = get_user_model().objects.get_or_create(username=username, defaults={'is_staff': True})
+    report = FixtureDataGenerator(
+        patients=patients,
+        pictograms=pictograms,
+        defaults=min(links, pictograms),
+        links=links,
+        user=user,
+    ).run()
+    variables = {}
+    if report['first_patient_id']:
+        variables['patientId'] = str(report['first_patient_id'])
+    if report['first_caregiver_id']:
+        variables['caregiverId'] = str(report['first_caregiver_id'])
+    return variables
@@ -0,0 +1,91 @@
+import importlib.util
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from smart_caa import password_hashing
+
+
+HASHERS = {
+    'pbkdf2': 'smart_caa.hashers.PBKDF2PasswordHasher',
+    'scrypt': 'smart_caa.hashers.ScryptPasswordHasher',
+    'argon2': 'smart_caa.hashers.Argon2PasswordHasher',
+}
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede os hashers de senha pelo pool de hash (latência p50/p99 por operação e '
+        'operações por segundo) com requisições simultâneas, usando os parâmetros de '
+        'PASSWORD_HASHING_SETTINGS. Ajuda a escolher PASSWORD_HASHER e seus custos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=40, help='Operações por hasher')
+        parser.add_argument('--concurrency', type=int, default=8, help='Requisições simultâneas')
+        parser.add_argument(
+            '--hashers',
+            nargs='+',
+            choices=sorted(HASHERS),
+            default=sorted(HASHERS),
+            help='Hashers medidos'
+        )
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Mede a verificação (login) em vez da criação do hash'
+        )
+        parser.add_argument('--target-ms', type=float, default=None, help='p99 máximo aceitável, em ms')
+
+    def handle(self, *args, **options):
+        for name in options['hashers']:
+            if name == 'argon2' and importlib.util.find_spec('argon2') is None:
+                self.stdout.write(self.style.WARNING('argon2: ignorado (pip install argon2-cffi)'))
+                continue
+            with override_settings(PASSWORD_HASHERS=[HASHERS[name]]):
+                result = self._run(options['count'], options['concurrency'], options['verify'])
+            self._report(name, *result, options['target_ms'])
+        password_hashing.pool.shutdown()
+
+    def _run(self, count, concurrency, verify):
+        encoded = password_hashing.make_password('SenhaForte@123')  # Também aquece o pool
+
+        def operation(number):
+            started = time.perf_counter()
+            try:
+                if verify:
+                    password_hashing.check_password('SenhaForte@123', encoded)
+                else:
+                    password_hashing.make_password(f'SenhaForte@{number}')
+            except password_hashing.PasswordHashingBusy:
+                return None  # Seria um 503 na API
+            return time.perf_counter() - started
+
+        with ThreadPoolExecutor(max_workers=concurrency) as threads:
+            started = time.perf_counter()
+            results = list(threads.map(operation, range(count)))
+            elapsed = time.perf_counter() - started
+        latencies = [seconds for seconds in results if seconds is not None]
+        return len(latencies), elapsed, latencies, count - len(latencies)
+
+    def _report(self, name, count, elapsed, latencies, rejected, target):
+        if not latencies:
+            self.stdout.write(self.style.ERROR(f'{name}: todas as {rejected} operações recusadas (pool cheio)'))
+            return
+        p50 = _percentile(latencies, 0.5) * 1000
+        p99 = _percentile(latencies, 0.99) * 1000
+        line = f'{name}: p50 {p50:.0f}ms, p99 {p99:.0f}ms, {count / elapsed:.1f} op/s'
+        if rejected:
+            line += f', {rejected} recusadas (503)'
+        if target is not None and p99 > target:
+            self.stdout.write(self.style.ERROR(f'{line} (acima de {target:.0f}ms)'))
+        else:
+            self.stdout.write(self.style.SUCCESS(line))
+
@@ -0,0 +1,93 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from smart_caa.models import EverydayCategory, Pictogram
+from smart_caa.serializers import PatientSerializer
+
+
+def _make_cpf(seed):
+    """
+    Gera um CPF válido (somente números) a partir de um número sequencial
+    """
+    digits = [int(d) for d in f'{seed % 10 ** 9:09d}']
+    for length in (9, 10):
+        total = sum(d * (length + 1 - i) for i, d in enumerate(digits))
+        digit = 11 - total % 11
+        digits.append(0 if digit >= 10 else digit)
+    return ''.join(map(str, digits))
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede o cadastro de pacientes (cadastros por segundo e consultas por cadastro) '
+        'pelo mesmo serializer da API. Tudo roda em uma transação desfeita ao final.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=200, help='Quantidade de cadastros')
+        parser.add_argument('--defaults', type=int, default=50, help='Pictogramas padrão criados para o teste')
+        parser.add_argument(
+            '--real-hashing',
+            action='store_true',
+            help='Usa o hasher de senhas configurado (por padrão usa MD5 para medir só o banco)'
+        )
+
+    def handle(self, *args, **options):
+        count = options['count']
+        hashers = None if options['real_hashing'] else ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+        try:
+            with transaction.atomic(), override_settings(**({'PASSWORD_HASHERS': hashers} if hashers else {})):
+                self._create_defaults(options['defaults'])
+                elapsed, queries = self._run(count)
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+        self.stdout.write(f'Cadastros: {count}')
+        self.stdout.write(f'Tempo total: {elapsed:.3f}s')
+        self.stdout.write(f'Consultas por cadastro: {queries / count:.1f}')
+        self.stdout.write(self.style.SUCCESS(f'Cadastros por segundo: {count / elapsed:.1f}'))
+
+    def _create_defaults(self, total):
+        if not total:
+            return
+        category = EverydayCategory.objects.create(name=f'benchmark-{time.time_ns()}')
+        Pictogram.objects.bulk_create([
+            Pictogram(
+                name=f'Padrão {number}',
+                category=category,
+                image='pictograms/images/benchmark.png',
+                is_default=True,
+            )
+            for number in range(total)
+        ])
+
+    def _run(self, count):
+        base = time.time_ns() % 10 ** 6 * 1000
+        payloads = [
+            {
+                'name': f'Paciente Benchmark {number}',
+                'cpf': _make_cpf(base + number),
+                'email': f'benchmark.{base + number}@example.com',
+                'phone': f'55{base + number:011d}',
+                'password': 'SenhaForte@123',
+            }
+            for number in range(count)
+        ]
+
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            for payload in payloads:
+                serializer = PatientSerializer(data=payload, context={'request': None})
+                serializer.is_valid(raise_exception=True)
+                serializer.save()
+            elapsed = time.perf_counter() - started
+        return elapsed, len(captured.captured_queries)
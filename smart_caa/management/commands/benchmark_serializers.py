@@ -0,0 +1,159 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from smart_caa.models import Attachment, History, PatientPictogram, Person, Pictogram
+from smart_caa.serializers import (
+    AttachmentSerializer,
+    HistorySerializer,
+    PatientPictogramProjection,
+    PatientPictogramSerializer,
+    PictogramForPatientProjection,
+    PictogramForPatientSerializer,
+    PictogramSerializer,
+)
+from smart_caa.services.fixture_data import FixtureDataGenerator
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _patient_pictograms(patient):
+    return PatientPictogram.objects.filter(patient=patient, is_active=True).select_related(
+        'pictogram', 'pictogram__category', 'created_by'
+    ).order_by('pictogram__name', '-created_at')
+
+
+def _available_pictograms(patient):
+    return Pictogram.objects.filter(is_active=True, private=False).exclude(
+        id__in=PatientPictogram.objects.filter(patient=patient, is_active=True).values_list('pictogram_id', flat=True)
+    ).select_related('category')
+
+
+def _pictograms(patient):
+    return Pictogram.objects.select_related('category', 'created_by')
+
+
+def _histories(patient):
+    return History.objects.filter(is_active=True).select_related('patient', 'caregiver', 'created_by').annotate(
+        attachment_count=Count('attachments', filter=Q(attachments__is_active=True), distinct=True)
+    ).order_by('-created_at', 'patient__name', 'caregiver__name')
+
+
+def _attachments(patient):
+    return Attachment.objects.all()
+
+
+# nome -> (serializer, queryset a partir do paciente de teste, projeção ou None)
+BENCHMARKS = {
+    'patient_pictograms': (PatientPictogramSerializer, _patient_pictograms, PatientPictogramProjection),
+    'available_pictograms': (PictogramForPatientSerializer, _available_pictograms, PictogramForPatientProjection),
+    'pictograms': (PictogramSerializer, _pictograms, None),
+    'histories': (HistorySerializer, _histories, None),
+    'attachments': (AttachmentSerializer, _attachments, None),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede a serialização das listas da API (linhas por segundo no serializer e na geração do JSON) '
+        'com dados sintéticos, e compara com a projeção rápida onde houver, conferindo que o JSON é '
+        'idêntico byte a byte. Tudo roda em uma transação desfeita ao final.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=500, help='Linhas por lista')
+        parser.add_argument('--repeat', type=int, default=5, help='Repetições (vale a mediana)')
+        parser.add_argument(
+            '--serializers',
+            nargs='+',
+            choices=sorted(BENCHMARKS),
+            default=list(BENCHMARKS),
+            help='Listas medidas'
+        )
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        request = Request(RequestFactory().get('/api/', SERVER_NAME='testserver'))
+        context = {'request': request}
+        mismatches = []
+
+        try:
+            with transaction.atomic():
+                patient = self._create_data(rows)
+                for name in options['serializers']:
+                    serializer_class, queryset_for, projection_class = BENCHMARKS[name]
+                    queryset = queryset_for(patient)[:rows]
+
+                    def drf():
+                        return serializer_class(queryset.all(), many=True, context=context).data
+
+                    drf_result = self._measure(drf, repeat)
+                    self._report(name, serializer_class.__name__, drf_result)
+                    if projection_class is not None:
+                        def projected():
+                            return projection_class(context).serialize(queryset.all())
+
+                        fast_result = self._measure(projected, repeat)
+                        self._report(name, projection_class.__name__, fast_result, baseline=drf_result)
+                        if fast_result['json'] != drf_result['json']:
+                            mismatches.append(name)
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+        if mismatches:
+            raise CommandError(f'JSON diferente do serializer em: {", ".join(mismatches)}')
+
+    def _create_data(self, rows):
+        generator = FixtureDataGenerator(
+            patients=1, caregivers=3, pictograms=rows * 2, defaults=rows, links=rows, histories=rows,
+            attachments=1, anamnesis=0, chunk_size=5000,
+        )
+        report = generator.run()
+        # Metade dos pictogramas com áudio, para medir as duas URLs
+        pictogram_ids = list(Pictogram.objects.order_by('-pk').values_list('pk', flat=True)[:rows * 2:2])
+        Pictogram.objects.filter(pk__in=pictogram_ids).update(audio='pictograms/audio/benchmark.mp3')
+        return Person.objects.get(pk=report['first_patient_id'])
+
+    def _measure(self, serialize, repeat):
+        serialize_times, render_times = [], []
+        renderer = JSONRenderer()
+        for _ in range(max(repeat, 1)):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                data = serialize()
+                serialized = time.perf_counter()
+                content = renderer.render(data)
+                finished = time.perf_counter()
+            serialize_times.append(serialized - started)
+            render_times.append(finished - serialized)
+        return {
+            'rows': len(data),
+            'queries': len(queries),
+            'serialize': sorted(serialize_times)[len(serialize_times) // 2],
+            'render': sorted(render_times)[len(render_times) // 2],
+            'json': content,
+        }
+
+    def _report(self, name, label, result, baseline=None):
+        rows = result['rows'] or 1
+        line = (
+            f'{name} ({label}): {result["rows"]} linhas, {result["queries"]} consultas, '
+            f'serializer {result["serialize"] * 1000:.1f}ms ({rows / result["serialize"]:.0f} linhas/s), '
+            f'JSON {result["render"] * 1000:.1f}ms, {len(result["json"])} bytes'
+        )
+        if baseline is None:
+            self.stdout.write(line)
+            return
+        speedup = baseline['serialize'] / result['serialize']
+        identical = 'idêntico' if result['json'] == baseline['json'] else 'DIFERENTE'
+        style = self.style.SUCCESS if identical == 'idêntico' else self.style.ERROR
+        self.stdout.write(style(f'  {line}, {speedup:.1f}x mais rápido, JSON {identical}'))
@@ -0,0 +1,47 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from smart_caa.compression import STATIC_ENCODINGS, available_encodings, get_compression_settings, precompress_file
+
+
+class Command(BaseCommand):
+    help = (
+        'Grava as versões .gz e .br (com o pacote Brotli) dos arquivos compressíveis de STATIC_ROOT, '
+        'servidas pelo SecureStaticView conforme o Accept-Encoding. Rodar depois do collectstatic.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Recomprime mesmo os arquivos já atualizados')
+
+    def handle(self, *args, **options):
+        static_root = settings.STATIC_ROOT
+        if not static_root or not os.path.isdir(static_root):
+            raise CommandError('STATIC_ROOT não existe; rode o collectstatic antes.')
+
+        compression = get_compression_settings()
+        extensions = tuple(extension.lower() for extension in compression['STATIC_EXTENSIONS'])
+        compressed_extensions = tuple(extension for _, extension in STATIC_ENCODINGS)
+        files = written = original_bytes = compressed_bytes = 0
+
+        for directory, _, names in os.walk(static_root):
+            for name in names:
+                if not name.lower().endswith(extensions) or name.endswith(compressed_extensions):
+                    continue
+                path = os.path.join(directory, name)
+                size = os.path.getsize(path)
+                if size < compression['STATIC_MIN_SIZE']:
+                    continue
+                files += 1
+                written += len(precompress_file(path, force=options['force']))
+                gzipped = path + '.gz'
+                if os.path.exists(gzipped):
+                    original_bytes += size
+                    compressed_bytes += os.path.getsize(gzipped)
+
+        ratio = f', gzip com {compressed_bytes / original_bytes:.0%} do tamanho' if original_bytes else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{files} arquivos compressíveis, {written} versões gravadas '
+            f'({", ".join(available_encodings())}){ratio}.'
+        ))
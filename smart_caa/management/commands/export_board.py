@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from smart_caa.models import Person
+from smart_caa.services.board import get_board_zip
+from smart_caa.services.board_pdf import ORIENTATIONS, PAGE_SIZES, BoardLayout, get_board_pdf
+
+
+class Command(BaseCommand):
+    help = (
+        'Exporta a prancha de um paciente como pacote offline (ZIP com imagens, '
+        'áudios e manifest.json) ou, com --pdf, como folha para impressão. '
+        'Reaproveita o cache quando a prancha não mudou.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('patient', type=int, help='ID do paciente')
+        parser.add_argument('--output', help='Arquivo de saída (padrão: prancha-<id>.zip ou .pdf)')
+        parser.add_argument('--pdf', action='store_true', help='Gera a folha para impressão em PDF')
+        parser.add_argument('--columns', type=int, default=4, help='Colunas da grade no PDF')
+        parser.add_argument('--page-size', choices=list(PAGE_SIZES), default='A4')
+        parser.add_argument('--orientation', choices=list(ORIENTATIONS), default='portrait')
+
+    def handle(self, *args, **options):
+        patient = Person.objects.filter(pk=options['patient'], is_patient=True).only('id', 'name').first()
+        if patient is None:
+            raise CommandError(f'Paciente {options["patient"]} não encontrado.')
+
+        if options['pdf']:
+            try:
+                layout = BoardLayout(options['columns'], options['page_size'], options['orientation'])
+            except ValueError as e:
+                raise CommandError(str(e))
+            output = options['output'] or f'prancha-{patient.id}.pdf'
+            version, chunks = get_board_pdf(patient, layout)
+        else:
+            output = options['output'] or f'prancha-{patient.id}.zip'
+            version, chunks = get_board_zip(patient)
+        size = 0
+        with open(output, 'wb') as target:
+            for chunk in chunks:
+                target.write(chunk)
+                size += len(chunk)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Prancha de {patient.name} (versão {version}) exportada para {output} ({size} bytes).'
+        ))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+
+from smart_caa.models.attachment import Attachment
+from smart_caa.services.attachment_preview import generate_preview, get_pdf_renderer
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera as pré-visualizações dos anexos sem miniatura ou com o arquivo trocado desde a última '
+        '(anexos enviados antes do recurso, ou quando a geração em segundo plano falhou).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--patient', type=int, help='Apenas os anexos do paciente informado (ID)')
+        parser.add_argument('--force', action='store_true', help='Refaz também as pré-visualizações atualizadas')
+
+    def handle(self, *args, **options):
+        attachments = Attachment.objects.exclude(file='')
+        if options['patient']:
+            attachments = attachments.filter(patient_id=options['patient'])
+        if not options['force']:
+            attachments = attachments.filter(
+                Q(preview__isnull=True) | Q(preview='') | ~Q(preview_source=F('file'))
+            )
+
+        renderer = get_pdf_renderer()
+        if renderer is None:
+            self.stderr.write('Nenhum renderizador de PDF (pdftoppm ou mutool) encontrado: PDFs ficam sem pré-visualização.')
+
+        generated = skipped = 0
+        for attachment_id in attachments.order_by('pk').values_list('pk', flat=True).iterator():
+            if generate_preview(attachment_id, force=options['force']):
+                generated += 1
+            else:
+                skipped += 1
+        self.stdout.write(self.style.SUCCESS(f'{generated} pré-visualizações geradas, {skipped} anexos sem pré-visualização.'))
@@ -0,0 +1,72 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from smart_caa.services.fixture_data import FixtureDataGenerator
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera dados sintéticos em volume para testes de escala: pessoas (pacientes e cuidadores), '
+        'pictogramas, vínculos paciente-pictograma, relacionamentos, históricos, anexos e anamneses, '
+        'com bulk_create em lotes. As quantidades por paciente são médias de distribuições '
+        'assimétricas. Use apenas em bancos locais ou de homologação.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--patients', type=int, default=1000, help='Pacientes')
+        parser.add_argument('--caregivers', type=int, help='Cuidadores (padrão: 1 para cada 5 pacientes)')
+        parser.add_argument('--pictograms', type=int, default=2000, help='Pictogramas')
+        parser.add_argument('--categories', type=int, default=20, help='Categorias de pictogramas')
+        parser.add_argument('--defaults', type=int, default=40, help='Pictogramas padrão (em todas as pranchas)')
+        parser.add_argument('--links', type=int, default=100, help='Média de pictogramas por paciente')
+        parser.add_argument('--histories', type=float, default=5, help='Média de históricos por paciente')
+        parser.add_argument('--attachments', type=float, default=0.3, help='Fração dos históricos com anexo')
+        parser.add_argument('--anamnesis', type=float, default=0.8, help='Fração dos pacientes com anamnese')
+        parser.add_argument('--chunk-size', type=int, default=10000, help='Linhas gravadas por transação')
+        parser.add_argument('--user', help='Usuário registrado como criador (username)')
+        parser.add_argument('--seed', type=int, default=42, help='Semente do gerador aleatório')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(f'Usuário "{options["user"]}" não encontrado.')
+        if options['links'] > options['pictograms']:
+            raise CommandError('--links não pode ser maior que --pictograms.')
+
+        generator = FixtureDataGenerator(
+            patients=options['patients'],
+            caregivers=options['caregivers'],
+            pictograms=options['pictograms'],
+            categories=options['categories'],
+            defaults=options['defaults'],
+            links=options['links'],
+            histories=options['histories'],
+            attachments=options['attachments'],
+            anamnesis=options['anamnesis'],
+            chunk_size=options['chunk_size'],
+            user=user,
+            seed=options['seed'],
+        )
+        started = time.perf_counter()
+        last = {'table': None, 'at': started}
+
+        def progress(table, created):
+            now = time.perf_counter()
+            if table != last['table'] or now - last['at'] >= 5:
+                self.stdout.write(f'{table}: {created} linhas ({now - started:.0f}s)')
+                last.update(table=table, at=now)
+
+        report = generator.run(progress=progress)
+        elapsed = time.perf_counter() - started
+
+        rows = 0
+        for table in ('categories', 'pictograms', 'patients', 'caregivers', 'patient_pictograms',
+                      'relationships', 'histories', 'attachments', 'anamneses'):
+            if table in report:
+                rows += report[table]
+                self.stdout.write(f'  {table}: {report[table]}')
+        self.stdout.write(self.style.SUCCESS(f'{rows} linhas em {elapsed:.1f}s ({rows / elapsed:.0f} linhas/s).'))
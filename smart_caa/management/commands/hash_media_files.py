@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand
+
+from smart_caa.models import Attachment, Pictogram
+from smart_caa.storage import HashedMediaStorage, is_hashed_name
+
+
+# modelo -> campos de arquivo servidos pelas URLs de mídia
+FILE_FIELDS = (
+    (Pictogram, ('image', 'audio')),
+    (Attachment, ('file',)),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Regrava os arquivos de mídia anteriores ao HashedMediaStorage com o hash do conteúdo '
+        'no nome e atualiza os registros, para que passem a ser servidos como immutable.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Apenas lista o que seria renomeado')
+        parser.add_argument('--keep-old', action='store_true', help='Mantém os arquivos com o nome antigo')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        verbosity = options['verbosity']
+        renamed, old_files, missing, updated = {}, [], [], 0
+
+        for model, fields in FILE_FIELDS:
+            for field_name in fields:
+                field = model._meta.get_field(field_name)
+                storage = field.storage
+                if not isinstance(storage, HashedMediaStorage) and not dry_run:
+                    self.stderr.write(f'{model.__name__}.{field_name}: o storage não é o HashedMediaStorage, ignorado.')
+                    continue
+                rows = model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+                for pk, name in rows.values_list('pk', field_name).iterator():
+                    if is_hashed_name(name):
+                        continue
+                    new_name = renamed.get(name)
+                    if new_name is None:
+                        if not storage.exists(name):
+                            missing.append(name)
+                            continue
+                        if dry_run:
+                            new_name = renamed[name] = '<nome com hash>'
+                        else:
+                            with storage.open(name, 'rb') as content:
+                                new_name = renamed[name] = storage.save(name, content, max_length=field.max_length)
+                            old_files.append((storage, name))
+                    if not dry_run:
+                        # Só atualiza se o registro não mudou de arquivo nesse meio tempo
+                        updated += model.objects.filter(pk=pk, **{field_name: name}).update(**{field_name: new_name})
+                    if verbosity >= 2:
+                        self.stdout.write(f'{model.__name__}.{field_name} #{pk}: {name} -> {new_name}')
+
+        if not options['keep_old']:
+            for storage, name in old_files:
+                storage.delete(name)
+
+        for name in missing:
+            self.stderr.write(f'Arquivo não encontrado: {name}')
+        summary = f'{len(renamed)} arquivos, {updated} registros atualizados, {len(missing)} não encontrados.'
+        self.stdout.write(self.style.SUCCESS(('[simulação] ' if dry_run else '') + summary))
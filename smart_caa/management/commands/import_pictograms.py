@@ -0,0 +1,67 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from smart_caa.services.pictogram_import import PictogramImporter, PictogramImportError
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa pictogramas em lote a partir de um ZIP com imagens, áudios e um arquivo de metadados '
+        '(pictograms.csv ou pictograms.json com as colunas name, category, image, audio, description, '
+        'private e is_default). Pictogramas já existentes são pulados, então a importação pode ser '
+        'executada novamente para continuar de onde parou.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archive', help='Arquivo ZIP com as imagens e os áudios')
+        parser.add_argument('--metadata', help='CSV ou JSON de metadados fora do ZIP')
+        parser.add_argument('--user', help='Usuário registrado como criador (username)')
+        parser.add_argument('--workers', type=int, help='Threads para validar e gravar os arquivos')
+        parser.add_argument('--chunk-size', type=int, help='Pictogramas gravados por transação')
+        parser.add_argument('--report', help='Grava o relatório completo (com erros por linha) em JSON')
+        parser.add_argument('--dry-run', action='store_true', help='Apenas valida, sem gravar nada')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(f'Usuário "{options["user"]}" não encontrado.')
+
+        importer = PictogramImporter(
+            options['archive'],
+            metadata=options['metadata'],
+            user=user,
+            workers=options['workers'],
+            chunk_size=options['chunk_size'],
+            dry_run=options['dry_run'],
+        )
+
+        def progress(done, total):
+            self.stdout.write(f'{done}/{total} pictogramas processados...')
+
+        try:
+            report = importer.run(progress=progress)
+        except PictogramImportError as e:
+            raise CommandError(str(e))
+
+        if options['report']:
+            with open(options['report'], 'w', encoding='utf-8') as target:
+                json.dump(report, target, ensure_ascii=False, indent=2)
+
+        for error in report['errors'][:20]:
+            self.stderr.write(f'Linha {error["row"]} ({error["name"] or "sem nome"}): {error["error"]}')
+        if len(report['errors']) > 20:
+            self.stderr.write(f'... e mais {len(report["errors"]) - 20} erros (use --report para a lista completa).')
+
+        prefix = '[simulação] ' if options['dry_run'] else ''
+        self.stdout.write(
+            f'{prefix}{report["total"]} linhas: {report["created"]} criados, {report["skipped"]} já existentes, '
+            f'{len(report["errors"])} com erro, {report["categories_created"]} categorias novas.'
+        )
+        if report['errors']:
+            self.stdout.write(self.style.WARNING('Importação concluída com erros.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Importação concluída.'))
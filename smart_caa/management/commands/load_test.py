@@ -0,0 +1,273 @@
+import glob
+import itertools
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.test.utils import override_settings
+
+from authentication.serializers import AuthenticationTokenObtainPairSerializer
+from smart_caa.load_testing import (
+    UnresolvedVariable,
+    parse_capture_file,
+    parse_http_file,
+    route_of,
+    seed_database,
+    split_url,
+    substitute,
+    summarize,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Teste de carga a partir das coleções .http de tests/requests e de capturas JSONL '
+        '(QUERY_CAPTURE_FILE). Executa no próprio processo ou contra um servidor (--base-url) '
+        'com requisições simultâneas e mostra vazão e percentis de latência por rota. '
+        'Com --output/--baseline, compara com uma execução anterior.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'files',
+            nargs='*',
+            help='Arquivos .http ou .jsonl (padrão: tests/requests/*.http)'
+        )
+        parser.add_argument('--base-url', help='Servidor testado (ex.: http://localhost:8000); sem ele, roda no processo')
+        parser.add_argument('--concurrency', type=int, default=4, help='Requisições simultâneas')
+        parser.add_argument('--iterations', type=int, default=20, help='Execuções medidas de cada requisição')
+        parser.add_argument(
+            '--methods',
+            nargs='+',
+            default=['GET'],
+            help='Métodos executados (padrão: só GET; POST/PUT/DELETE alteram o banco)'
+        )
+        parser.add_argument('--user', default='loadtest', help='Usuário autenticado nas requisições')
+        parser.add_argument('--var', action='append', default=[], help='Variável dos arquivos .http (nome=valor)')
+        parser.add_argument('--seed', action='store_true', help='Cria dados de carga antes de executar')
+        parser.add_argument('--patients', type=int, default=50, help='Pacientes criados com --seed')
+        parser.add_argument('--pictograms', type=int, default=200, help='Pictogramas criados com --seed')
+        parser.add_argument('--links', type=int, default=60, help='Pictogramas vinculados a cada paciente com --seed')
+        parser.add_argument('--output', help='Grava o resultado em JSON')
+        parser.add_argument('--baseline', help='Resultado JSON anterior para comparar')
+
+    def handle(self, *args, **options):
+        files = options['files'] or sorted(glob.glob(os.path.join(settings.BASE_DIR, 'tests', 'requests', '*.http')))
+        if not files:
+            raise CommandError('Nenhum arquivo de requisições encontrado.')
+        methods = {method.upper() for method in options['methods']}
+
+        variables = {}
+        if options['seed']:
+            variables.update(seed_database(
+                options['user'],
+                patients=options['patients'],
+                pictograms=options['pictograms'],
+                links=options['links'],
+            ))
+            self.stdout.write(f'Dados de carga criados: {variables}')
+        for assignment in options['var']:
+            name, _, value = assignment.partition('=')
+            variables[name] = value
+
+        user = get_user_model().objects.filter(username=options['user']).first()
+        responses = {}
+        if user is not None:
+            # O login das coleções é trocado por um token emitido direto
+            refresh = AuthenticationTokenObtainPairSerializer.get_token(user)
+            responses['login'] = {'access': str(refresh.access_token), 'refresh': str(refresh)}
+        else:
+            self.stdout.write(self.style.WARNING(
+                f'Usuário "{options["user"]}" não existe: requisições sem autenticação (use --seed).'
+            ))
+
+        self.base_url = options['base_url'].rstrip('/') if options['base_url'] else None
+        self.local = threading.local()
+        throttle_settings = {**getattr(settings, 'THROTTLE_SETTINGS', {}), 'ENABLED': False}
+        inspector_settings = {**getattr(settings, 'QUERY_INSPECTOR_SETTINGS', {}), 'ENABLED': False, 'CAPTURE_FILE': ''}
+        with override_settings(THROTTLE_SETTINGS=throttle_settings, QUERY_INSPECTOR_SETTINGS=inspector_settings):
+            jobs, skipped = self._warm_up(files, methods, variables, responses, user)
+            if not jobs:
+                raise CommandError('Nenhuma requisição executável nos arquivos informados.')
+            samples, elapsed = self._run(jobs, options['iterations'], options['concurrency'])
+
+        summary = summarize(samples, elapsed)
+        self._report(summary, skipped, elapsed, options)
+
+    def _warm_up(self, files, methods, variables, responses, user):
+        """
+        Executa cada requisição uma vez, na ordem dos arquivos, sem medir:
+        resolve as variáveis (inclusive respostas de requisições nomeadas)
+        e aquece caches e conexões
+        """
+        jobs = []
+        skipped = []
+        for path in files:
+            if path.endswith('.jsonl'):
+                file_variables, requests = parse_capture_file(path)
+            else:
+                file_variables, requests = parse_http_file(path)
+            scope = {**file_variables, **variables}
+            for request in requests:
+                if request['name'] == 'login' or request['method'] not in methods:
+                    continue
+                # As coleções nem sempre trazem o Authorization (e cada arquivo
+                # nomeia o token de um jeito): tudo usa o token do --user, menos
+                # as requisições anônimas de uma captura
+                authenticated = request.get('user_id', True) is not None
+                try:
+                    job = {
+                        'method': request['method'],
+                        'path': split_url(substitute(request['url'], scope, responses)),
+                        'headers': {
+                            header: substitute(value, scope, responses)
+                            for header, value in request['headers'].items()
+                            if header != 'Authorization'
+                        },
+                        'body': substitute(request['body'], scope, responses),
+                    }
+                except UnresolvedVariable as e:
+                    skipped.append(f'{request["source"]}: variável {{{{{e}}}}} sem valor')
+                    continue
+                if authenticated and user is not None:
+                    job['headers']['Authorization'] = f'Bearer {responses["login"]["access"]}'
+                job['route'] = route_of(job['method'], job['path'].split('?')[0])
+                status, body = self._execute(job)
+                if request['name'] and body is not None:
+                    responses[request['name']] = body
+                jobs.append(job)
+        return jobs, skipped
+
+    def _execute(self, job):
+        """
+        Executa uma requisição. Retorna (status, corpo JSON ou None); status
+        None quando o servidor não respondeu.
+        """
+        data = job['body'].encode() if job['body'] else b''
+        if self.base_url is None:
+            client = getattr(self.local, 'client', None)
+            if client is None:
+                client = self.local.client = Client()
+            headers = {name: value for name, value in job['headers'].items() if name.lower() != 'content-type'}
+            content_type = job['headers'].get('Content-Type', 'application/json')
+            response = client.generic(job['method'], job['path'], data, content_type=content_type, headers=headers)
+            status = response.status_code
+            payload = b''.join(response.streaming_content) if response.streaming else response.content
+            content_type = response.get('Content-Type', '')
+        else:
+            request = urllib.request.Request(
+                self.base_url + job['path'], data=data or None, headers=job['headers'], method=job['method']
+            )
+            try:
+                with urllib.request.urlopen(request, timeout=30) as response:
+                    status, payload = response.status, response.read()
+                    content_type = response.headers.get('Content-Type', '')
+            except urllib.error.HTTPError as e:
+                status, payload, content_type = e.code, e.read(), e.headers.get('Content-Type', '')
+            except (urllib.error.URLError, OSError):
+                return None, None
+        if 'json' not in content_type:
+            return status, None
+        try:
+            return status, json.loads(payload)
+        except ValueError:
+            return status, None
+
+    def _run(self, jobs, iterations, concurrency):
+        queue = itertools.chain.from_iterable(itertools.repeat(jobs, iterations))
+        lock = threading.Lock()
+        samples = {}
+
+        def worker(in_thread=True):
+            results = []
+            try:
+                while True:
+                    with lock:
+                        job = next(queue, None)
+                    if job is None:
+                        break
+                    started = time.perf_counter()
+                    status, _ = self._execute(job)
+                    results.append((job['route'], status, time.perf_counter() - started))
+            finally:
+                if in_thread and self.base_url is None:
+                    connections.close_all()
+                with lock:
+                    for route, status, seconds in results:
+                        samples.setdefault(route, []).append((status, seconds))
+
+        started = time.perf_counter()
+        if concurrency <= 1:
+            # Na thread atual, que usa a mesma conexão (e transação) do comando
+            worker(in_thread=False)
+            return samples, time.perf_counter() - started
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return samples, time.perf_counter() - started
+
+    def _report(self, summary, skipped, elapsed, options):
+        total = sum(route['requests'] for route in summary.values())
+        errors = sum(route['errors'] for route in summary.values())
+        target = self.base_url or 'no processo'
+        self.stdout.write(
+            f'{total} requisições em {elapsed:.2f}s ({total / elapsed:.1f} req/s), '
+            f'{options["concurrency"]} simultâneas, {target}'
+        )
+
+        baseline = {}
+        if options['baseline']:
+            try:
+                with open(options['baseline'], encoding='utf-8') as previous:
+                    baseline = json.load(previous)['routes']
+            except (OSError, ValueError, KeyError) as e:
+                raise CommandError(f'Não foi possível ler {options["baseline"]}: {e}')
+
+        for name, route in sorted(summary.items()):
+            line = (
+                f'{name}: {route["requests"]} req, {route["rps"]} req/s, p50 {route["p50_ms"]:.1f}ms, '
+                f'p95 {route["p95_ms"]:.1f}ms, p99 {route["p99_ms"]:.1f}ms, máx. {route["max_ms"]:.1f}ms'
+            )
+            previous = baseline.get(name)
+            if previous:
+                line += (
+                    f' (p50 {_change(previous["p50_ms"], route["p50_ms"])}, '
+                    f'p99 {_change(previous["p99_ms"], route["p99_ms"])})'
+                )
+            if route['errors']:
+                statuses = ', '.join(f'{status}: {count}' for status, count in sorted(route['statuses'].items()))
+                self.stdout.write(self.style.WARNING(f'{line} [{statuses}]'))
+            else:
+                self.stdout.write(line)
+
+        if errors:
+            self.stdout.write(self.style.WARNING(f'{errors} respostas com erro (4xx/5xx ou sem resposta)'))
+        for reason in skipped:
+            self.stdout.write(f'Ignorada: {reason}')
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump({
+                    'target': target,
+                    'concurrency': options['concurrency'],
+                    'iterations': options['iterations'],
+                    'elapsed': round(elapsed, 3),
+                    'routes': summary,
+                }, output, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f'Resultado gravado em {options["output"]}'))
+
+
+def _change(before, after):
+    if not before:
+        return 'n/d'
+    return f'{(after - before) / before * 100:+.0f}%'
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from smart_caa.models import PatientPictogram, PictogramUsageEvent
+from smart_caa.services.pictogram_ranking import update_pictogram_ranking
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula o ranking de uso dos pictogramas a partir dos eventos de telemetria. '
+        'Necessário após alterar HALF_LIFE_DAYS ou para dados anteriores ao ranking. '
+        'Tudo roda em uma única transação: em caso de erro o ranking anterior é mantido.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--patient', type=int, help='Recalcula apenas o paciente informado (ID)')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Eventos lidos e aplicados por vez')
+
+    def handle(self, *args, **options):
+        events = PictogramUsageEvent.objects.all()
+        links = PatientPictogram.objects.all()
+        if options['patient']:
+            events = events.filter(patient_id=options['patient'])
+            links = links.filter(patient_id=options['patient'])
+
+        with transaction.atomic():
+            reset = links.update(rank_score=None, daypart_rank_scores={}, last_used_at=None)
+            self.stdout.write(f'{reset} vínculos zerados.')
+
+            chunk_size = options['chunk_size']
+            processed = 0
+            batch = []
+            current_patient = None
+            rows = events.order_by('patient_id', 'occurred_at', 'sequence').values_list(
+                'patient_id', 'pictogram_id', 'occurred_at'
+            ).iterator(chunk_size=chunk_size)
+
+            for patient_id, pictogram_id, occurred_at in rows:
+                if batch and (patient_id != current_patient or len(batch) >= chunk_size):
+                    processed += self._flush(current_patient, batch)
+                    batch = []
+                current_patient = patient_id
+                batch.append({'pictogram_id': pictogram_id, 'occurred_at': occurred_at})
+
+            if batch:
+                processed += self._flush(current_patient, batch)
+
+        self.stdout.write(self.style.SUCCESS(f'Ranking recalculado a partir de {processed} eventos.'))
+
+    def _flush(self, patient_id, batch):
+        update_pictogram_ranking(patient_id, batch)
+        return len(batch)
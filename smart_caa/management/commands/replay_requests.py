@@ -0,0 +1,133 @@
+import json
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.test.utils import override_settings
+
+from authentication.serializers import AuthenticationTokenObtainPairSerializer
+from smart_caa.query_inspector import get_query_inspector_settings, listeners
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Reexecuta requisições gravadas em JSONL (QUERY_INSPECTOR_SETTINGS["CAPTURE_FILE"]) '
+        'com o detector de consultas ligado e resume as rotas com consultas lentas e N+1. '
+        'Por padrão tudo roda em uma transação desfeita ao final.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('capture', help='Arquivo JSONL com method, path, query, body e user_id por linha')
+        parser.add_argument('--user', type=int, help='Usuário (ID) para as linhas sem user_id')
+        parser.add_argument('--commit', action='store_true', help='Mantém as alterações feitas pelas requisições')
+        parser.add_argument('--top', type=int, default=10, help='Rotas listadas no resumo')
+
+    def handle(self, *args, **options):
+        entries = self._read(options['capture'])
+        self.routes = defaultdict(lambda: {
+            'requests': 0, 'queries': 0, 'max_queries': 0, 'db_seconds': 0.0, 'slow': 0, 'n_plus_one': {},
+        })
+        self.tokens = {}
+        inspector_settings = {**get_query_inspector_settings(), 'ENABLED': True, 'CAPTURE_FILE': ''}
+        throttle_settings = {**getattr(settings, 'THROTTLE_SETTINGS', {}), 'ENABLED': False}
+
+        listeners.append(self._collect)
+        try:
+            with override_settings(QUERY_INSPECTOR_SETTINGS=inspector_settings, THROTTLE_SETTINGS=throttle_settings):
+                if options['commit']:
+                    self._replay(entries, options['user'])
+                else:
+                    try:
+                        with transaction.atomic():
+                            self._replay(entries, options['user'])
+                            raise _Rollback()
+                    except _Rollback:
+                        pass
+        finally:
+            listeners.remove(self._collect)
+
+        self._summary(len(entries), options['top'])
+
+    def _read(self, path):
+        entries = []
+        try:
+            with open(path, encoding='utf-8') as capture:
+                for number, line in enumerate(capture, start=1):
+                    if not line.strip():
+                        continue
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        raise CommandError(f'Linha {number} não é um JSON válido.')
+        except OSError as e:
+            raise CommandError(f'Não foi possível ler {path}: {e}')
+        if not entries:
+            raise CommandError(f'Nenhuma requisição em {path}.')
+        return entries
+
+    def _authorization(self, user_id):
+        if user_id is None:
+            return {}
+        if user_id not in self.tokens:
+            user = get_user_model().objects.filter(pk=user_id).first()
+            if user is None:
+                self.tokens[user_id] = {}
+            else:
+                token = AuthenticationTokenObtainPairSerializer.get_token(user).access_token
+                self.tokens[user_id] = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+        return self.tokens[user_id]
+
+    def _replay(self, entries, default_user):
+        client = Client()
+        for entry in entries:
+            path = entry['path'] + (f"?{entry['query']}" if entry.get('query') else '')
+            body = entry.get('body')
+            client.generic(
+                entry.get('method', 'GET'),
+                path,
+                json.dumps(body) if body is not None else '',
+                content_type='application/json',
+                **self._authorization(entry.get('user_id') or default_user),
+            )
+
+    def _collect(self, request, view, response, inspector):
+        route = self.routes[f'{request.method} {view}']
+        route['requests'] += 1
+        route['queries'] += inspector.queries
+        route['max_queries'] = max(route['max_queries'], inspector.queries)
+        route['db_seconds'] += inspector.db_seconds
+        route['slow'] += len(inspector.slow)
+        for finding in inspector.n_plus_one():
+            known = route['n_plus_one'].get(finding['sql'])
+            if known is None or finding['count'] > known['count']:
+                route['n_plus_one'][finding['sql']] = finding
+
+    def _summary(self, total, top):
+        self.stdout.write(f'Requisições reexecutadas: {total}')
+        offenders = sorted(
+            self.routes.items(),
+            key=lambda item: (len(item[1]['n_plus_one']), item[1]['slow'], item[1]['max_queries']),
+            reverse=True,
+        )[:top]
+        for name, route in offenders:
+            average = route['queries'] / route['requests']
+            line = (
+                f'{name}: {route["requests"]} req, {average:.1f} consultas/req (máx. {route["max_queries"]}), '
+                f'{route["db_seconds"] * 1000 / route["requests"]:.1f}ms de banco/req, '
+                f'{route["slow"]} lentas, {len(route["n_plus_one"])} N+1'
+            )
+            style = self.style.WARNING if route['n_plus_one'] or route['slow'] else self.style.SUCCESS
+            self.stdout.write(style(line))
+            for finding in route['n_plus_one'].values():
+                self.stdout.write(f'  {finding["count"]}x {finding["sql"][:160]}')
+                if finding['serializer']:
+                    self.stdout.write(f'    serializer: {finding["serializer"]}')
+                if finding['stack']:
+                    self.stdout.write(f'    em: {finding["stack"][0]}')
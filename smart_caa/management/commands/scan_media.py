@@ -0,0 +1,47 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from smart_caa.services.media_scan import scan_media
+
+
+class Command(BaseCommand):
+    help = (
+        'Confere os arquivos de MEDIA_ROOT com Pictogram.image/audio e Attachment.file/preview: arquivos órfãos, '
+        'arquivos ausentes e arquivos vazios. O relatório fica gravado para o admin.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify-hashes',
+            action='store_true',
+            help='Relê os arquivos com hash no nome e confere o conteúdo (lento)'
+        )
+        parser.add_argument('--json', action='store_true', help='Imprime o relatório completo em JSON')
+
+    def handle(self, *args, **options):
+        report = scan_media(verify_hashes=options['verify_hashes'])
+        if options['json']:
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+            return
+
+        verbosity = options['verbosity']
+        for item in report['missing']:
+            self.stdout.write(self.style.ERROR(f'Ausente: {item["path"]} ({", ".join(item["records"])})'))
+        for item in report['empty']:
+            self.stdout.write(self.style.WARNING(f'Vazio: {item["path"]} ({", ".join(item["records"])})'))
+        for item in report['hash_mismatches']:
+            self.stdout.write(self.style.ERROR(f'Hash divergente: {item["path"]} ({", ".join(item["records"])})'))
+        if verbosity >= 2:
+            for item in report['orphans']:
+                self.stdout.write(f'Órfão: {item["path"]} ({item["size"]} bytes)')
+
+        summary = (
+            f'{report["total_files"]} arquivos ({report["total_bytes"]} bytes) em {report["seconds"]}s: '
+            f'{report["referenced_files"]} referenciados, {report["orphan_count"]} órfãos '
+            f'({report["orphan_bytes"]} bytes), {report["missing_count"]} ausentes, {report["empty_count"]} vazios'
+        )
+        if report['hash_mismatch_count'] is not None:
+            summary += f', {report["hash_mismatch_count"]} com hash divergente'
+        problems = report['missing_count'] or report['empty_count'] or report['hash_mismatch_count']
+        self.stdout.write((self.style.WARNING if problems else self.style.SUCCESS)(summary + '.'))
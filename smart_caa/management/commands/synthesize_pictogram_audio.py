@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from smart_caa.models import Pictogram
+from smart_caa.services.speech import (
+    SpeechSynthesisError,
+    get_pictogram_speech_text,
+    get_speech_audio,
+    get_speech_settings,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera em lote o áudio sintetizado dos pictogramas, preenchendo o cache de fala. '
+        'Textos já presentes no cache não são sintetizados novamente.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Inclui também os pictogramas que já possuem áudio gravado'
+        )
+        parser.add_argument(
+            '--source',
+            choices=['name', 'description', 'name_description'],
+            default='name',
+            help='Texto falado (padrão: name)'
+        )
+        parser.add_argument('--voice', help='Voz do motor de síntese')
+        parser.add_argument('--rate', type=int, help='Velocidade em palavras por minuto')
+
+    def handle(self, *args, **options):
+        speech_settings = get_speech_settings()
+        voice = options['voice'] or speech_settings['VOICE']
+        rate = speech_settings['RATE'] if options['rate'] is None else options['rate']
+        if voice not in speech_settings['VOICES']:
+            raise CommandError(f'Voz não suportada. Use: {", ".join(speech_settings["VOICES"])}.')
+        if not speech_settings['MIN_RATE'] <= rate <= speech_settings['MAX_RATE']:
+            raise CommandError(
+                f'A velocidade deve estar entre {speech_settings["MIN_RATE"]} e {speech_settings["MAX_RATE"]}.'
+            )
+
+        pictograms = Pictogram.objects.filter(is_active=True).only('id', 'name', 'description', 'audio')
+        if not options['all']:
+            pictograms = pictograms.filter(audio__isnull=True) | pictograms.filter(audio='')
+
+        generated = cached = failed = 0
+        for pictogram in pictograms.iterator():
+            try:
+                _, _, _, created = get_speech_audio(
+                    get_pictogram_speech_text(pictogram, options['source']), voice, rate
+                )
+            except SpeechSynthesisError as e:
+                failed += 1
+                self.stderr.write(f'Pictograma {pictogram.id} ({pictogram.name}): {e}')
+                continue
+
+            if created:
+                generated += 1
+            else:
+                cached += 1
+
+        self.stdout.write(f'{cached} áudios já estavam em cache.')
+        if failed:
+            self.stdout.write(self.style.WARNING(f'{failed} pictogramas não puderam ser sintetizados.'))
+        self.stdout.write(self.style.SUCCESS(f'{generated} áudios sintetizados.'))
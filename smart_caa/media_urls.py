@@ -0,0 +1,93 @@
+"""
+URLs absolutas de mídia para os serializers.
+
+request.build_absolute_uri(campo.url) por campo e por linha relê os
+cabeçalhos de host e passa pela lógica de URL do storage a cada chamada.
+O MediaURLBuilder calcula o prefixo (esquema, host e MEDIA_URL, ou a base
+do CDN) uma vez por requisição e, para o storage de arquivos local, só
+concatena o nome do arquivo já codificado, com o mesmo resultado.
+"""
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.utils.encoding import filepath_to_uri
+
+
+def get_cdn_settings():
+    """
+    Retorna as configurações do CDN de mídia com valores padrão
+    """
+    defaults = {
+        'ENABLED': False,
+        'BASE_URL': '',  # Substitui MEDIA_URL nas URLs (ex.: https://cdn.exemplo.com/media/)
+        'HASHED_NAMES': True,  # Hash do conteúdo no nome dos uploads (smart_caa.storage)
+        'CACHE_CONTROL': 'public, max-age=31536000, immutable',  # Arquivos com hash no nome
+        'UNHASHED_CACHE_CONTROL': 'public, max-age=3600',  # Arquivos antigos, sem hash
+    }
+    defaults.update(getattr(settings, 'CDN_SETTINGS', {}))
+    return defaults
+
+
+def _is_local(storage):
+    # isinstance funciona com o DefaultStorage (LazyObject repassa __class__)
+    return isinstance(storage, FileSystemStorage) and storage.base_url == settings.MEDIA_URL
+
+
+class MediaURLBuilder:
+    """
+    Monta as URLs de mídia de uma requisição (ou sem requisição, com URLs
+    relativas, a menos que o CDN esteja ligado).
+
+    `absolute` indica se as URLs são absolutas (há requisição ou CDN).
+    """
+
+    def __init__(self, request=None):
+        self.request = request
+        cdn = get_cdn_settings()
+        if cdn['ENABLED'] and cdn['BASE_URL']:
+            self.prefix = cdn['BASE_URL'].rstrip('/') + '/'
+            self.cdn = True
+        else:
+            self.prefix = request.build_absolute_uri(settings.MEDIA_URL) if request is not None else settings.MEDIA_URL
+            self.cdn = False
+        self.absolute = self.cdn or request is not None
+        self._local = {}  # storage -> é o FileSystemStorage de MEDIA_URL
+
+    @classmethod
+    def for_request(cls, request):
+        """
+        Builder da requisição, criado no primeiro uso e guardado nela
+        """
+        if request is None:
+            return cls()
+        builder = getattr(request, '_media_url_builder', None)
+        if builder is None:
+            builder = request._media_url_builder = cls(request)
+        return builder
+
+    @classmethod
+    def for_context(cls, context):
+        return cls.for_request(context.get('request'))
+
+    def url(self, name, storage=default_storage):
+        """
+        URL do arquivo `name` no `storage`; None sem arquivo
+        """
+        if not name:
+            return None
+        local = self._local.get(storage)
+        if local is None:
+            local = self._local[storage] = _is_local(storage)
+        if local:
+            return self.prefix + filepath_to_uri(name).lstrip('/')
+        url = storage.url(name)
+        if self.cdn and url.startswith(settings.MEDIA_URL):
+            return self.prefix + url[len(settings.MEDIA_URL):]
+        return self.request.build_absolute_uri(url) if self.request is not None else url
+
+    def file_url(self, file):
+        """
+        URL de um FieldFile (campo de arquivo do modelo); None se vazio
+        """
+        if not file:
+            return None
+        return self.url(file.name, file.storage)
@@ -0,0 +1,217 @@
+"""
+Métricas de desempenho por rota, em memória do processo, exportadas no
+formato texto do Prometheus em /metrics.
+
+Cada processo (worker do gunicorn, por exemplo) mantém os próprios
+histogramas; o Prometheus deve coletar cada processo ou agregar por
+instância. A observação de uma requisição custa alguns bisect e um lock.
+"""
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.conf import settings
+
+
+def get_metrics_settings():
+    """
+    Retorna as configurações das métricas de requisição com valores padrão
+    """
+    defaults = {
+        'ENABLED': True,
+        'AUTH_TOKEN': '',  # /metrics exige "Authorization: Bearer <token>" (ou equipe); vazio: só com DEBUG
+        'INSTRUMENT_SERIALIZERS': True,  # Mede o tempo em Serializer.data
+        'DURATION_BUCKETS': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+        'QUERY_BUCKETS': (0, 1, 2, 5, 10, 20, 50, 100),
+        'SIZE_BUCKETS': (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+    }
+    defaults.update(getattr(settings, 'METRICS_SETTINGS', {}))
+    return defaults
+
+
+class Histogram:
+    """
+    Histograma com limites fixos e séries por rótulos (route, method)
+    """
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self._series = {}  # rótulos -> [contagens por faixa..., +Inf, soma]
+
+    def observe(self, labels, value):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self, lines):
+        lines.append(f'# HELP {self.name} {self.help_text}')
+        lines.append(f'# TYPE {self.name} histogram')
+        for labels, series in sorted(self._series.items()):
+            label_text = _labels(labels)
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {series[-1]}')
+            lines.append(f'{self.name}_count{{{label_text}}} {cumulative}')
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in labels)
+
+
+class RequestStats:
+    """
+    Medidas de uma requisição, preenchidas pelo middleware e pelos wrappers
+    de banco e de serializer
+    """
+    __slots__ = ('queries', 'db_seconds', 'serializer_seconds', 'serializer_depth')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.serializer_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # Usado como connection.execute_wrapper
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_seconds += perf_counter() - started
+
+
+current_request = ContextVar('smart_caa_request_stats', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        metrics_settings = get_metrics_settings()
+        durations = metrics_settings['DURATION_BUCKETS']
+        self.requests = {}  # (route, method, status) -> total
+        self.duration = Histogram(
+            'smart_caa_request_duration_seconds', 'Tempo total da requisição no Django', durations
+        )
+        self.db_duration = Histogram(
+            'smart_caa_request_db_duration_seconds', 'Tempo das consultas ao banco na requisição', durations
+        )
+        self.db_queries = Histogram(
+            'smart_caa_request_db_queries', 'Consultas ao banco por requisição', metrics_settings['QUERY_BUCKETS']
+        )
+        self.serializer_duration = Histogram(
+            'smart_caa_request_serializer_duration_seconds', 'Tempo em Serializer.data na requisição', durations
+        )
+        self.response_size = Histogram(
+            'smart_caa_response_size_bytes', 'Tamanho do corpo da resposta', metrics_settings['SIZE_BUCKETS']
+        )
+
+    def observe(self, route, method, status, seconds, stats, size):
+        labels = (('route', route), ('method', method))
+        with self._lock:
+            key = (route, method, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.duration.observe(labels, seconds)
+            self.db_duration.observe(labels, stats.db_seconds)
+            self.db_queries.observe(labels, stats.queries)
+            self.serializer_duration.observe(labels, stats.serializer_seconds)
+            if size is not None:
+                self.response_size.observe(labels, size)
+
+    def observe_size(self, route, method, size):
+        with self._lock:
+            self.response_size.observe((('route', route), ('method', method)), size)
+
+    def render(self, lines):
+        with self._lock:
+            lines.append('# HELP smart_caa_requests_total Requisições atendidas')
+            lines.append('# TYPE smart_caa_requests_total counter')
+            for (route, method, status), total in sorted(self.requests.items()):
+                label_text = _labels((('route', route), ('method', method), ('status', status)))
+                lines.append(f'smart_caa_requests_total{{{label_text}}} {total}')
+            for histogram in (self.duration, self.db_duration, self.db_queries, self.serializer_duration,
+                              self.response_size):
+                histogram.render(lines)
+
+
+request_metrics = RequestMetrics()
+
+
+def _render_password_hashing(lines):
+    from .password_hashing import pool
+
+    snapshot = pool.metrics.snapshot()
+    lines.append('# HELP smart_caa_password_hashing_operations_total Operações do pool de hash de senhas')
+    lines.append('# TYPE smart_caa_password_hashing_operations_total counter')
+    for operation in ('hash', 'verify', 'rejected', 'pool_failures'):
+        lines.append(f'smart_caa_password_hashing_operations_total{{operation="{operation}"}} {snapshot[operation]}')
+    lines.append('# TYPE smart_caa_password_hashing_in_flight gauge')
+    lines.append(f'smart_caa_password_hashing_in_flight {snapshot["in_flight"]}')
+    lines.append('# HELP smart_caa_password_hashing_seconds Percentis recentes de fila e cálculo')
+    lines.append('# TYPE smart_caa_password_hashing_seconds gauge')
+    for stage in ('queue', 'compute'):
+        for quantile in ('p50', 'p99'):
+            value = snapshot[f'{stage}_seconds'][quantile]
+            if value is not None:
+                lines.append(f'smart_caa_password_hashing_seconds{{stage="{stage}",quantile="{quantile}"}} {value}')
+
+
+def _render_throttling(lines):
+    from .throttling import metrics
+
+    lines.append('# HELP smart_caa_throttle_requests_total Requisições verificadas pelo limite, por escopo')
+    lines.append('# TYPE smart_caa_throttle_requests_total counter')
+    for scope, counters in sorted(metrics.snapshot().items()):
+        for result in ('allowed', 'throttled'):
+            lines.append(f'smart_caa_throttle_requests_total{{scope="{scope}",result="{result}"}} {counters[result]}')
+
+
+def render_prometheus():
+    lines = []
+    request_metrics.render(lines)
+    _render_password_hashing(lines)
+    _render_throttling(lines)
+    return '\n'.join(lines) + '\n'
+
+
+def _timed_data(data_property):
+    fget = data_property.fget
+
+    def data(self):
+        stats = current_request.get()
+        if stats is None or stats.serializer_depth:
+            # Fora de requisição ou serializer aninhado (já contado pelo externo)
+            return fget(self)
+        stats.serializer_depth += 1
+        started = perf_counter()
+        try:
+            return fget(self)
+        finally:
+            stats.serializer_depth -= 1
+            stats.serializer_seconds += perf_counter() - started
+
+    data._smart_caa_timed = True
+    return property(data)
+
+
+def instrument_serializers():
+    """
+    Envolve Serializer.data e ListSerializer.data para somar, na requisição
+    atual, o tempo gasto em to_representation. Chamado em SmartCaaConfig.ready().
+    """
+    from rest_framework.serializers import ListSerializer, Serializer
+
+    for cls in (Serializer, ListSerializer):
+        if not getattr(cls.data.fget, '_smart_caa_timed', False):
+            cls.data = _timed_data(cls.data)
@@ -0,0 +1,157 @@
+from contextlib import ExitStack
+from time import perf_counter
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import FileResponse
+from django.utils.cache import patch_vary_headers
+
+from .compression import available_encodings, compress, compress_stream, get_compression_settings, negotiate
+from .metrics import RequestStats, current_request, get_metrics_settings, request_metrics
+from .query_inspector import QueryInspector, capture_request, get_query_inspector_settings, listeners
+
+
+UNMATCHED_ROUTE = '<unmatched>'
+
+
+class RequestMetricsMiddleware:
+    """
+    Registra, por nome de URL, o tempo total, as consultas e o tempo de
+    banco, o tempo em serializers e o tamanho da resposta (ver metrics.py).
+
+    Deve ser o primeiro da lista MIDDLEWARE para incluir o tempo dos demais.
+    Rotas sem nome (ou 404) são agrupadas em "<unmatched>" para não criar
+    uma série por URL.
+    """
+
+    def __init__(self, get_response):
+        if not get_metrics_settings()['ENABLED']:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = RequestStats()
+        token = current_request.set(stats)
+        started = perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats))
+                response = self.get_response(request)
+        finally:
+            current_request.reset(token)
+        seconds = perf_counter() - started
+
+        match = getattr(request, 'resolver_match', None)
+        route = (match.view_name if match and match.url_name else None) or UNMATCHED_ROUTE
+        method = request.method
+        size = self._size(response, route, method)
+        request_metrics.observe(route, method, str(response.status_code), seconds, stats, size)
+        return response
+
+    def _size(self, response, route, method):
+        if not response.streaming:
+            return len(response.content)
+        if response.has_header('Content-Length'):
+            return int(response['Content-Length'])
+        if isinstance(response, FileResponse) or response.is_async:
+            return None
+        # Streaming sem tamanho conhecido: conta os bytes ao final do envio
+        response.streaming_content = self._counting(response.streaming_content, route, method)
+        return None
+
+    def _counting(self, chunks, route, method):
+        size = 0
+        for chunk in chunks:
+            size += len(chunk)
+            yield chunk
+        request_metrics.observe_size(route, method, size)
+
+
+class QueryInspectorMiddleware:
+    """
+    Registra consultas lentas e possíveis N+1 de cada requisição (ver
+    query_inspector.py) e, com CAPTURE_FILE, grava as requisições para o
+    comando replay_requests. Desligado fora do DEBUG, a menos que
+    QUERY_INSPECTOR_SETTINGS['ENABLED'] seja definido.
+    """
+
+    def __init__(self, get_response):
+        if not get_query_inspector_settings()['ENABLED']:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        inspector_settings = get_query_inspector_settings()
+        capture_file = inspector_settings['CAPTURE_FILE']
+        raw_body = request.body if capture_file and request.content_type == 'application/json' else None
+
+        inspector = QueryInspector(inspector_settings)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(inspector))
+            response = self.get_response(request)
+
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match and match.url_name else request.path
+        inspector.log(f'{request.method} {view}')
+        for listener in listeners:
+            listener(request, view, response, inspector)
+        if capture_file:
+            capture_request(request, raw_body, capture_file)
+        return response
+
+
+class ResponseCompressionMiddleware:
+    """
+    Comprime com brotli ou gzip, conforme o Accept-Encoding, as respostas
+    dos tipos em COMPRESSION_SETTINGS['CONTENT_TYPES'] (JSON da API e
+    exportações). Respostas comuns só a partir de MIN_SIZE; streams são
+    comprimidos bloco a bloco (ver compression.py).
+
+    Fica depois do RequestMetricsMiddleware, que assim mede o tamanho
+    efetivamente enviado.
+    """
+
+    def __init__(self, get_response):
+        compression = get_compression_settings()
+        if not compression['ENABLED']:
+            raise MiddlewareNotUsed()
+        self.min_size = compression['MIN_SIZE']
+        self.content_types = set(compression['CONTENT_TYPES'])
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type not in self.content_types or response.has_header('Content-Encoding'):
+            return response
+        if 'no-transform' in response.get('Cache-Control', ''):
+            return response
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING'), available_encodings())
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                return response
+            response.streaming_content = compress_stream(response.streaming_content, encoding)
+            if response.has_header('Content-Length'):
+                del response['Content-Length']
+        else:
+            compressed = compress(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        # Como no GZipMiddleware: o ETag do conteúdo original vira fraco
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
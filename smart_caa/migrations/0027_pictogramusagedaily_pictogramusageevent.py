@@ -0,0 +1,46 @@
+# Generated by Django 5.2.3 on 2026-10-19 02:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('smart_caa', '0026_person_birth_date_person_gender'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PictogramUsageDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='Dia (no fuso do sistema) em que os toques ocorreram', verbose_name='Data')),
+                ('count', models.PositiveIntegerField(default=0, help_text='Quantidade de toques do paciente no pictograma neste dia', verbose_name='Quantidade de toques')),
+                ('patient', models.ForeignKey(db_index=False, help_text='Paciente ao qual a contagem pertence', on_delete=django.db.models.deletion.CASCADE, related_name='pictogram_usage_daily', to='smart_caa.person', verbose_name='Paciente')),
+                ('pictogram', models.ForeignKey(help_text='Pictograma contabilizado', on_delete=django.db.models.deletion.CASCADE, related_name='usage_daily', to='smart_caa.pictogram', verbose_name='Pictograma')),
+            ],
+            options={
+                'verbose_name': 'Uso Diário de Pictograma',
+                'verbose_name_plural': 'Uso Diário de Pictogramas',
+                'ordering': ['-date', '-count'],
+                'constraints': [models.UniqueConstraint(fields=('patient', 'date', 'pictogram'), name='unique_pictogram_usage_daily')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PictogramUsageEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('occurred_at', models.DateTimeField(help_text='Data e hora em que o toque ocorreu no dispositivo', verbose_name='Momento do toque')),
+                ('sequence', models.PositiveIntegerField(help_text='Número sequencial do toque informado pelo dispositivo', verbose_name='Sequência')),
+                ('received_at', models.DateTimeField(auto_now_add=True, help_text='Data e hora em que o evento chegou ao servidor', verbose_name='Recebido em')),
+                ('patient', models.ForeignKey(db_index=False, help_text='Paciente que tocou no pictograma', on_delete=django.db.models.deletion.CASCADE, related_name='pictogram_usage_events', to='smart_caa.person', verbose_name='Paciente')),
+                ('pictogram', models.ForeignKey(help_text='Pictograma tocado na prancha', on_delete=django.db.models.deletion.CASCADE, related_name='usage_events', to='smart_caa.pictogram', verbose_name='Pictograma')),
+            ],
+            options={
+                'verbose_name': 'Evento de Uso de Pictograma',
+                'verbose_name_plural': 'Eventos de Uso de Pictogramas',
+                'indexes': [models.Index(fields=['patient', 'occurred_at', 'sequence'], name='smart_caa_p_patient_5a48de_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.3 on 2026-10-19 02:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('smart_caa', '0027_pictogramusagedaily_pictogramusageevent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patientpictogram',
+            name='daypart_rank_scores',
+            field=models.JSONField(blank=True, default=dict, help_text='Pontuação de uso separada por período do dia (madrugada, manhã, tarde e noite)', verbose_name='Pontuação por período do dia'),
+        ),
+        migrations.AddField(
+            model_name='patientpictogram',
+            name='last_used_at',
+            field=models.DateTimeField(blank=True, help_text='Data e hora do último toque registrado neste pictograma', null=True, verbose_name='Último uso'),
+        ),
+        migrations.AddField(
+            model_name='patientpictogram',
+            name='rank_score',
+            field=models.FloatField(blank=True, help_text='Frequência de uso com decaimento exponencial, em escala log2 relativa a uma época fixa', null=True, verbose_name='Pontuação de uso'),
+        ),
+        migrations.AddIndex(
+            model_name='patientpictogram',
+            index=models.Index(fields=['patient', 'is_active', '-rank_score'], name='smart_caa_p_patient_ead066_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.3 on 2026-10-19 03:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('smart_caa', '0028_patientpictogram_ranking'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attachment',
+            name='preview',
+            field=models.ImageField(blank=True, editable=False, help_text='Miniatura JPEG gerada em segundo plano (imagens e primeira página de PDFs)', null=True, upload_to='anexos/previews/', verbose_name='Pré-visualização'),
+        ),
+        migrations.AddField(
+            model_name='attachment',
+            name='preview_source',
+            field=models.CharField(blank=True, default='', editable=False, help_text='Nome do arquivo a partir do qual a pré-visualização foi gerada', max_length=100, verbose_name='Origem da Pré-visualização'),
+        ),
+    ]
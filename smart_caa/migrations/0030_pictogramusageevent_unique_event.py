@@ -0,0 +1,46 @@
+# Generated by Django 5.2.3 on 2026-10-19 03:48
+
+import logging
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+logger = logging.getLogger('smart_caa.migrations')
+
+
+def remove_resent_events(apps, schema_editor):
+    # Só remove cópias exatas de um mesmo toque (paciente, sequência e
+    # momento iguais); toques com a mesma sequência em outro momento
+    # (reinstalação, outro tablet) são preservados. Cada linha removida fica
+    # registrada no log.
+    PictogramUsageEvent = apps.get_model('smart_caa', 'PictogramUsageEvent')
+    duplicates = (
+        PictogramUsageEvent.objects.values('patient_id', 'sequence', 'occurred_at')
+        .annotate(first_id=Min('id'), total=Count('id'))
+        .filter(total__gt=1)
+    )
+    for duplicate in duplicates.iterator():
+        copies = PictogramUsageEvent.objects.filter(
+            patient_id=duplicate['patient_id'],
+            sequence=duplicate['sequence'],
+            occurred_at=duplicate['occurred_at'],
+            id__gt=duplicate['first_id'],
+        )
+        for row in copies.values('id', 'patient_id', 'pictogram_id', 'occurred_at', 'sequence', 'received_at'):
+            logger.warning('Evento de uso reenviado removido (original %s): %s', duplicate['first_id'], row)
+        copies.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('smart_caa', '0029_attachment_preview'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_resent_events, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='pictogramusageevent',
+            constraint=models.UniqueConstraint(fields=('patient', 'sequence', 'occurred_at'), name='unique_pictogram_usage_event'),
+        ),
+    ]
@@ -7,3 +7,4 @@ from .patient_pictogram import PatientPictogram
 from .anamnesis import Anamnesis
 from .history import History
 from .attachment import Attachment
+from .pictogram_usage import PictogramUsageEvent, PictogramUsageDaily
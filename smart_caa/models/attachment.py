@@ -34,6 +34,22 @@ class Attachment(BaseModel):
         verbose_name="Histórico",
         help_text="Histórico ao qual o anexo pode estar vinculado"
     )
+    preview = models.ImageField(
+        upload_to="anexos/previews/",
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="Pré-visualização",
+        help_text="Miniatura JPEG gerada em segundo plano (imagens e primeira página de PDFs)"
+    )
+    preview_source = models.CharField(
+        max_length=100,
+        blank=True,
+        default='',
+        editable=False,
+        verbose_name="Origem da Pré-visualização",
+        help_text="Nome do arquivo a partir do qual a pré-visualização foi gerada"
+    )
     
     class Meta:
         verbose_name = "Anexo"
@@ -25,6 +25,28 @@ class PatientPictogram(BaseModel):
         help_text="Pictograma vinculado ao paciente"
     )
     
+    # Ranking de uso (mantido incrementalmente a partir da telemetria)
+    rank_score = models.FloatField(
+        blank=True,
+        null=True,
+        verbose_name="Pontuação de uso",
+        help_text="Frequência de uso com decaimento exponencial, em escala log2 relativa a uma época fixa"
+    )
+    
+    daypart_rank_scores = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name="Pontuação por período do dia",
+        help_text="Pontuação de uso separada por período do dia (madrugada, manhã, tarde e noite)"
+    )
+    
+    last_used_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name="Último uso",
+        help_text="Data e hora do último toque registrado neste pictograma"
+    )
+    
     class Meta:
         verbose_name = "Pictograma do Paciente"
         verbose_name_plural = "Pictogramas dos Pacientes"
@@ -33,6 +55,7 @@ class PatientPictogram(BaseModel):
             models.Index(fields=['patient', 'is_active']),
             models.Index(fields=['pictogram', 'is_active']),
             models.Index(fields=['patient', 'pictogram', 'is_active']),
+            models.Index(fields=['patient', 'is_active', '-rank_score']),
         ]
         constraints = [
             models.UniqueConstraint(
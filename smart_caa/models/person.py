@@ -206,7 +206,16 @@ class Person(BaseModel):
                 "A pessoa deve ser marcada como Paciente, Cuidador ou ambos."
             )
     
-    def save(self, *args, **kwargs):
-        """Override do save para executar validações"""
-        self.full_clean()
+    def save(self, *args, prevalidated=False, **kwargs):
+        """
+        Override do save para executar validações.
+
+        `prevalidated=True` indica que o chamador já verificou a unicidade e
+        as referências a usuários na mesma transação (cadastro via
+        PersonRegistrationMixin); o full_clean então não repete essas consultas.
+        """
+        if prevalidated:
+            self.full_clean(exclude=['user', 'created_by', 'inactivated_by'], validate_unique=False)
+        else:
+            self.full_clean()
         super().save(*args, **kwargs)
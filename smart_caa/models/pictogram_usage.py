@@ -0,0 +1,113 @@
+from django.db import models
+
+from .person import Person
+from .pictogram import Pictogram
+
+
+class PictogramUsageEvent(models.Model):
+    """
+    Evento de toque em um pictograma enviado pelas pranchas (telemetria).
+
+    Tabela compacta e de apenas inserção: não herda BaseModel para não
+    carregar colunas de auditoria em um volume alto de linhas.
+    """
+
+    patient = models.ForeignKey(
+        Person,
+        on_delete=models.CASCADE,
+        related_name='pictogram_usage_events',
+        db_index=False,  # Coberto pelo índice (patient, occurred_at, sequence)
+        verbose_name="Paciente",
+        help_text="Paciente que tocou no pictograma"
+    )
+
+    pictogram = models.ForeignKey(
+        Pictogram,
+        on_delete=models.CASCADE,
+        related_name='usage_events',
+        verbose_name="Pictograma",
+        help_text="Pictograma tocado na prancha"
+    )
+
+    occurred_at = models.DateTimeField(
+        verbose_name="Momento do toque",
+        help_text="Data e hora em que o toque ocorreu no dispositivo"
+    )
+
+    sequence = models.PositiveIntegerField(
+        verbose_name="Sequência",
+        help_text="Número sequencial do toque informado pelo dispositivo"
+    )
+
+    received_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Recebido em",
+        help_text="Data e hora em que o evento chegou ao servidor"
+    )
+
+    class Meta:
+        verbose_name = "Evento de Uso de Pictograma"
+        verbose_name_plural = "Eventos de Uso de Pictogramas"
+        indexes = [
+            models.Index(fields=['patient', 'occurred_at', 'sequence']),
+        ]
+        constraints = [
+            # Reenvios do mesmo lote (rede instável) não duplicam os toques.
+            # A sequência é do dispositivo e pode recomeçar (reinstalação,
+            # outro tablet), por isso o momento do toque entra na chave.
+            models.UniqueConstraint(
+                fields=['patient', 'sequence', 'occurred_at'],
+                name='unique_pictogram_usage_event'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.patient_id} - {self.pictogram_id} ({self.occurred_at})"
+
+
+class PictogramUsageDaily(models.Model):
+    """
+    Consolidação diária de toques por paciente e pictograma.
+    """
+
+    patient = models.ForeignKey(
+        Person,
+        on_delete=models.CASCADE,
+        related_name='pictogram_usage_daily',
+        db_index=False,  # Coberto pela restrição única (patient, date, pictogram)
+        verbose_name="Paciente",
+        help_text="Paciente ao qual a contagem pertence"
+    )
+
+    pictogram = models.ForeignKey(
+        Pictogram,
+        on_delete=models.CASCADE,
+        related_name='usage_daily',
+        verbose_name="Pictograma",
+        help_text="Pictograma contabilizado"
+    )
+
+    date = models.DateField(
+        verbose_name="Data",
+        help_text="Dia (no fuso do sistema) em que os toques ocorreram"
+    )
+
+    count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Quantidade de toques",
+        help_text="Quantidade de toques do paciente no pictograma neste dia"
+    )
+
+    class Meta:
+        verbose_name = "Uso Diário de Pictograma"
+        verbose_name_plural = "Uso Diário de Pictogramas"
+        ordering = ['-date', '-count']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['patient', 'date', 'pictogram'],
+                name='unique_pictogram_usage_daily'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.patient_id} - {self.pictogram_id} em {self.date}: {self.count}"
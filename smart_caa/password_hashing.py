@@ -0,0 +1,296 @@
+"""
+Hash e verificação de senhas fora da thread da requisição.
+
+Fica fora de `services/` de propósito: os processos do pool importam este
+módulo sem inicializar o Django (services/__init__ importa os models), e o
+hash em si só precisa da classe do hasher e dos seus parâmetros.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher, identify_hasher
+from django.utils.module_loading import import_string
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_password_hashing_settings():
+    """
+    Retorna as configurações do pool de hash de senhas com valores padrão
+    """
+    workers = min(4, os.cpu_count() or 1)
+    defaults = {
+        'WORKERS': workers,  # Processos do pool (1 = hash na própria thread)
+        'START_METHOD': 'spawn',  # Processos novos, sem herdar conexões e threads do servidor
+        'MIN_BATCH': 2,  # Lotes menores que isso são calculados sem o pool
+        'MAX_PENDING': workers * 2,  # Hashes simultâneos (em execução + na fila do pool)
+        'QUEUE_TIMEOUT': 5,  # Segundos esperando vaga antes de responder 503
+        'SLOW_QUEUE_SECONDS': 0.5,  # Espera na fila registrada como aviso no log
+        'METRICS_SAMPLES': 1024,  # Amostras mantidas para os percentis
+        # Parâmetros dos hashers de smart_caa.hashers (None = padrão do Django)
+        'PBKDF2_ITERATIONS': None,
+        'SCRYPT_WORK_FACTOR': 2 ** 15,
+        'SCRYPT_BLOCK_SIZE': 8,
+        'SCRYPT_PARALLELISM': 3,
+        'ARGON2_TIME_COST': 2,
+        'ARGON2_MEMORY_COST': 19 * 1024,  # KiB
+        'ARGON2_PARALLELISM': 1,
+    }
+    defaults.update(getattr(settings, 'PASSWORD_HASHING_SETTINGS', {}))
+    return defaults
+
+
+class PasswordHashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Servidor ocupado processando senhas. Tente novamente em instantes.'
+    default_code = 'password_hashing_busy'
+    wait = 1  # Vira o cabeçalho Retry-After
+
+
+def _percentile(samples, fraction):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class HashingMetrics:
+    """
+    Contadores e amostras recentes de tempo na fila e de cálculo, por processo
+    """
+
+    def __init__(self, samples=1024):
+        self._lock = threading.Lock()
+        self.counters = {'hash': 0, 'verify': 0, 'rejected': 0, 'pool_failures': 0}
+        self.in_flight = 0
+        self._queue = deque(maxlen=samples)
+        self._compute = deque(maxlen=samples)
+
+    def started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def finished(self, operation, queue_seconds, compute_seconds):
+        with self._lock:
+            self.in_flight -= 1
+            self.counters[operation] += 1
+            self._queue.append(queue_seconds)
+            self._compute.append(compute_seconds)
+
+    def increment(self, counter):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def snapshot(self):
+        with self._lock:
+            queue, compute = list(self._queue), list(self._compute)
+            return {
+                **self.counters,
+                'in_flight': self.in_flight,
+                'queue_seconds': {
+                    'p50': _percentile(queue, 0.5),
+                    'p99': _percentile(queue, 0.99),
+                    'max': max(queue, default=None),
+                },
+                'compute_seconds': {
+                    'p50': _percentile(compute, 0.5),
+                    'p99': _percentile(compute, 0.99),
+                    'max': max(compute, default=None),
+                },
+            }
+
+
+def _hasher_spec(hasher):
+    """
+    Caminho da classe e parâmetros do hasher, para recriá-lo nos processos
+    do pool (que não enxergam override_settings)
+    """
+    cls = type(hasher)
+    parameters = hasher.get_parameters() if hasattr(hasher, 'get_parameters') else {}
+    return f'{cls.__module__}.{cls.__qualname__}', parameters
+
+
+def _load_hasher(spec):
+    path, parameters = spec
+    return import_string(path)(**parameters)
+
+
+def _encode(spec, password):
+    started_at = time.time()
+    hasher = _load_hasher(spec)
+    encoded = hasher.encode(password, hasher.salt())
+    return encoded, started_at, time.time() - started_at
+
+
+def _verify(spec, password, encoded, harden):
+    started_at = time.time()
+    hasher = _load_hasher(spec)
+    is_correct = hasher.verify(password, encoded)
+    if not is_correct and harden:
+        # Mesmo custo de uma senha correta, como faz o check_password do Django
+        hasher.harden_runtime(password, encoded)
+    return is_correct, started_at, time.time() - started_at
+
+
+class PasswordHashingPool:
+    """
+    Pool de processos para o hash e a verificação de senhas.
+
+    Um semáforo limita quantas operações ficam pendentes ao mesmo tempo
+    (MAX_PENDING); quem não consegue vaga em QUEUE_TIMEOUT segundos recebe
+    PasswordHashingBusy (503), em vez de acumular requisições presas. Com
+    WORKERS=1 o cálculo acontece na própria thread, com o mesmo limite.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._semaphore = None
+        self._semaphore_size = None
+        self.metrics = HashingMetrics(get_password_hashing_settings()['METRICS_SAMPLES'])
+
+    def _get_semaphore(self, size):
+        with self._lock:
+            if self._semaphore is None or self._semaphore_size != size:
+                self._semaphore = threading.BoundedSemaphore(size)
+                self._semaphore_size = size
+            return self._semaphore
+
+    def _get_executor(self, workers, start_method):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context(start_method),
+                )
+            return self._executor
+
+    def _reset_executor(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def shutdown(self):
+        self._reset_executor()
+
+    def _call(self, function, *args):
+        """
+        Executa `function` no pool (ou na thread, com WORKERS=1) e devolve
+        (resultado, início do cálculo, duração do cálculo)
+        """
+        hashing_settings = get_password_hashing_settings()
+        if hashing_settings['WORKERS'] <= 1:
+            return function(*args)
+        executor = self._get_executor(hashing_settings['WORKERS'], hashing_settings['START_METHOD'])
+        try:
+            return executor.submit(function, *args).result()
+        except BrokenProcessPool:
+            # Processo do pool morto: refaz aqui e recria o pool na próxima vez
+            self._reset_executor()
+            self.metrics.increment('pool_failures')
+            return function(*args)
+
+    def _run(self, operation, call):
+        hashing_settings = get_password_hashing_settings()
+        semaphore = self._get_semaphore(hashing_settings['MAX_PENDING'])
+        submitted_at = time.time()
+        if not semaphore.acquire(timeout=hashing_settings['QUEUE_TIMEOUT']):
+            self.metrics.increment('rejected')
+            logger.warning('Pool de senhas sem vaga após %ss (%s).', hashing_settings['QUEUE_TIMEOUT'], operation)
+            raise PasswordHashingBusy()
+
+        self.metrics.started()
+        queue_seconds = compute_seconds = 0.0
+        try:
+            result, started_at, compute_seconds = call()
+            queue_seconds = max(0.0, started_at - submitted_at)
+        finally:
+            self.metrics.finished(operation, queue_seconds, compute_seconds)
+            semaphore.release()
+
+        if queue_seconds >= hashing_settings['SLOW_QUEUE_SECONDS']:
+            logger.warning('Senha aguardou %.2fs na fila do pool (%s).', queue_seconds, operation)
+        return result
+
+    def make_password(self, password):
+        """
+        Equivalente a django.contrib.auth.hashers.make_password(password)
+        """
+        spec = _hasher_spec(get_hasher())
+        return self._run('hash', lambda: self._call(_encode, spec, password))
+
+    def check_password(self, password, encoded, setter=None):
+        """
+        Equivalente a django.contrib.auth.hashers.check_password, com a
+        verificação no pool. Se o hash estiver desatualizado (outro hasher
+        ou parâmetros antigos), `setter(password)` é chamado para regravá-lo.
+        """
+        if password is None or not encoded or encoded.startswith('!'):
+            return False
+        try:
+            hasher = identify_hasher(encoded)
+        except ValueError:
+            return False
+
+        preferred = get_hasher()
+        hasher_changed = hasher.algorithm != preferred.algorithm
+        must_update = hasher_changed or preferred.must_update(encoded)
+        harden = not hasher_changed and must_update
+        spec = _hasher_spec(hasher)
+        is_correct = self._run('verify', lambda: self._call(_verify, spec, password, encoded, harden))
+        if setter and is_correct and must_update:
+            setter(password)
+        return is_correct
+
+    def make_passwords(self, passwords):
+        """
+        Hashes de várias senhas, na mesma ordem (cadastro em lote).
+
+        Lotes a partir de MIN_BATCH senhas são distribuídos entre os
+        processos do pool, ocupando uma única vaga do semáforo.
+        """
+        passwords = list(passwords)
+        hashing_settings = get_password_hashing_settings()
+        if hashing_settings['WORKERS'] <= 1 or len(passwords) < hashing_settings['MIN_BATCH']:
+            return [self.make_password(password) for password in passwords]
+        spec = _hasher_spec(get_hasher())
+
+        def run_batch():
+            executor = self._get_executor(hashing_settings['WORKERS'], hashing_settings['START_METHOD'])
+            try:
+                futures = [executor.submit(_encode, spec, password) for password in passwords]
+                results = [future.result() for future in futures]
+            except BrokenProcessPool:
+                self._reset_executor()
+                self.metrics.increment('pool_failures')
+                results = [_encode(spec, password) for password in passwords]
+            started_at = min(started for _, started, _ in results)
+            return [encoded for encoded, _, _ in results], started_at, sum(seconds for _, _, seconds in results)
+
+        return self._run('hash', run_batch)
+
+
+pool = PasswordHashingPool()
+
+
+def make_password(password):
+    return pool.make_password(password)
+
+
+def check_password(password, encoded, setter=None):
+    return pool.check_password(password, encoded, setter)
+
+
+def hash_passwords(passwords):
+    return pool.make_passwords(passwords)
@@ -0,0 +1,189 @@
+"""
+Log de consultas lentas e detector de N+1 por requisição.
+
+O QueryInspector é instalado como connection.execute_wrapper pelo
+QueryInspectorMiddleware (e pelo comando replay_requests). Para cada
+consulta ele soma uma contagem pelo formato do SQL (os parâmetros já vêm
+separados; listas de IN são normalizadas). Só quando uma consulta passa do
+limite de tempo, ou um mesmo formato se repete N_PLUS_ONE_THRESHOLD vezes,
+a pilha é inspecionada para registrar o trecho do código e o campo do
+serializer que disparou a consulta. Barato o suficiente para homologação.
+"""
+import json
+import logging
+import os
+import re
+import sys
+import threading
+from time import perf_counter
+
+from django.conf import settings
+
+
+logger = logging.getLogger('smart_caa.queries')
+
+IN_LIST = re.compile(r'\((?:%s, )+%s\)')
+
+# Campos do corpo que não são gravados na captura, em qualquer nível
+REDACTED_FIELDS = re.compile(r'password|token|refresh|access|secret', re.IGNORECASE)
+
+
+def get_query_inspector_settings():
+    """
+    Retorna as configurações do log de consultas com valores padrão
+    """
+    defaults = {
+        'ENABLED': settings.DEBUG,  # Desenvolvimento; em homologação, ligar pela variável de ambiente
+        'SLOW_QUERY_MS': 100,  # Consultas acima disso são registradas
+        'N_PLUS_ONE_THRESHOLD': 5,  # Repetições do mesmo formato de consulta em uma requisição
+        'STACK_DEPTH': 6,  # Linhas do código do projeto no trecho da pilha
+        'CAPTURE_FILE': '',  # JSONL com as requisições atendidas, para o comando replay_requests
+    }
+    defaults.update(getattr(settings, 'QUERY_INSPECTOR_SETTINGS', {}))
+    return defaults
+
+
+def query_shape(sql):
+    if '%s, %s' in sql:
+        return IN_LIST.sub('(%s...)', sql)
+    return sql
+
+
+def _project_frames(frame, depth):
+    """
+    Linhas da pilha dentro do projeto (fora de site-packages e da biblioteca
+    padrão), da mais interna para a mais externa
+    """
+    base_dir = str(settings.BASE_DIR)
+    excerpt = []
+    while frame is not None and len(excerpt) < depth:
+        filename = frame.f_code.co_filename
+        if filename.startswith(base_dir) and 'site-packages' not in filename and filename != __file__:
+            excerpt.append(f'{os.path.relpath(filename, base_dir)}:{frame.f_lineno} in {frame.f_code.co_name}')
+        frame = frame.f_back
+    return excerpt
+
+
+def _serializer_path(frame):
+    """
+    Caminho do campo de serializer em serialização quando a consulta ocorreu,
+    do mais externo para o mais interno (ex.: PatientPictogramSerializer.created_by_username
+    (source=created_by.username))
+    """
+    path = []
+    while frame is not None:
+        if frame.f_code.co_name == 'to_representation' and 'rest_framework' in frame.f_code.co_filename:
+            serializer = frame.f_locals.get('self')
+            field = frame.f_locals.get('field')
+            if serializer is not None and field is not None and getattr(field, 'field_name', None):
+                step = f'{type(serializer).__name__}.{field.field_name}'
+                if field.source != field.field_name:
+                    step += f' (source={field.source})'
+                path.append(step)
+        frame = frame.f_back
+    return ' > '.join(reversed(path)) or None
+
+
+class QueryInspector:
+    def __init__(self, inspector_settings=None):
+        inspector_settings = inspector_settings or get_query_inspector_settings()
+        self.slow_seconds = inspector_settings['SLOW_QUERY_MS'] / 1000
+        self.threshold = inspector_settings['N_PLUS_ONE_THRESHOLD']
+        self.depth = inspector_settings['STACK_DEPTH']
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.shapes = {}  # formato -> repetições
+        self.slow = []  # [{sql, ms, stack, serializer}]
+        self.repeated = {}  # formato -> {sql, stack, serializer}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = perf_counter() - started
+            self.queries += 1
+            self.db_seconds += elapsed
+            shape = query_shape(sql)
+            count = self.shapes[shape] = self.shapes.get(shape, 0) + 1
+            if elapsed >= self.slow_seconds:
+                self.slow.append(self._finding(sql, ms=round(elapsed * 1000, 1)))
+            if count == self.threshold:
+                self.repeated[shape] = self._finding(sql)
+
+    def _finding(self, sql, **extra):
+        frame = sys._getframe(2)
+        return {
+            'sql': sql,
+            **extra,
+            'serializer': _serializer_path(frame),
+            'stack': _project_frames(frame, self.depth),
+        }
+
+    def n_plus_one(self):
+        return [
+            {**finding, 'count': self.shapes[shape]}
+            for shape, finding in self.repeated.items()
+        ]
+
+    def log(self, view):
+        for finding in self.slow:
+            logger.warning(
+                'Consulta lenta (%sms) em %s: %s\n  serializer: %s\n  %s',
+                finding['ms'], view, finding['sql'], finding['serializer'], '\n  '.join(finding['stack'])
+            )
+        for finding in self.n_plus_one():
+            logger.warning(
+                'Possível N+1 em %s: %s consultas iguais: %s\n  serializer: %s\n  %s',
+                view, finding['count'], finding['sql'], finding['serializer'], '\n  '.join(finding['stack'])
+            )
+
+
+# Funções chamadas com (request, view, response, inspector) ao fim de cada
+# requisição inspecionada; usado pelo comando replay_requests para o resumo
+listeners = []
+
+_capture_lock = threading.Lock()
+
+
+def redact(value):
+    """
+    Cópia do corpo JSON com os campos de senha e token trocados por '***',
+    inclusive dentro de objetos e listas aninhados ({"people": [{"password": ...}]})
+    """
+    if isinstance(value, dict):
+        return {
+            key: ('***' if REDACTED_FIELDS.search(str(key)) else redact(item))
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [redact(item) for item in value]
+    return value
+
+
+def capture_request(request, raw_body, path):
+    """
+    Acrescenta a requisição ao arquivo de captura (JSONL), sem campos de senha
+    ou token, no formato lido por replay_requests. `raw_body` é lido antes da
+    view, que consome o corpo.
+
+    Os demais campos são gravados como vieram, então a captura contém dados
+    pessoais (nomes, CPF, e-mail, telefone, anamneses): trate o arquivo como
+    o próprio banco de produção e apague-o depois do uso.
+    """
+    body = None
+    if request.content_type == 'application/json' and raw_body:
+        try:
+            body = redact(json.loads(raw_body))
+        except ValueError:
+            body = None
+    user = getattr(request, 'user', None)
+    line = json.dumps({
+        'method': request.method,
+        'path': request.path,
+        'query': request.META.get('QUERY_STRING', ''),
+        'body': body,
+        'user_id': user.pk if user is not None and user.is_authenticated else None,
+    }, ensure_ascii=False, default=str)
+    with _capture_lock, open(path, 'a', encoding='utf-8') as capture:
+        capture.write(line + '\n')
@@ -15,6 +15,7 @@ from .patient_pictogram import (
     PatientPictogramDestroySerializer,
     PictogramForPatientSerializer
 )
+from .projection import PatientPictogramProjection, PictogramForPatientProjection
 from .anamnesis import (
     AnamnesisSerializer,
     AnamnesisListSerializer,
@@ -22,3 +23,4 @@ from .anamnesis import (
 )
 from .history import HistorySerializer
 from .attachment import AttachmentSerializer
+from .pictogram_usage import PictogramUsageBatchSerializer, PictogramUsageDailySerializer
@@ -1,16 +1,20 @@
 from rest_framework import serializers
 
+from ..media_urls import MediaURLBuilder
 from ..models.attachment import Attachment
 
 
 class AttachmentSerializer(serializers.ModelSerializer):
     file_url = serializers.SerializerMethodField()
+    preview_url = serializers.SerializerMethodField(
+        help_text='Miniatura JPEG do anexo (imagens e PDFs); null até ser gerada ou para outros formatos'
+    )
 
     def get_file_url(self, obj) -> str:
-        request = self.context.get('request')
-        if request is not None:
-            return request.build_absolute_uri(obj.file.url)
-        return obj.file.url
+        return MediaURLBuilder.for_context(self.context).file_url(obj.file)
+
+    def get_preview_url(self, obj) -> str:
+        return MediaURLBuilder.for_context(self.context).file_url(obj.preview)
 
     def validate(self, attrs):
         patient = attrs.get('patient', getattr(self.instance, 'patient', None))
@@ -25,7 +29,7 @@ class AttachmentSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Attachment
-        fields = ['id', 'name', 'file', 'file_url', 'patient', 'history', 'created_at', 'updated_at']
+        fields = ['id', 'name', 'file', 'file_url', 'preview_url', 'patient', 'history', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
         extra_kwargs = {
             'history': {
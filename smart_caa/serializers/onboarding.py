@@ -0,0 +1,130 @@
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError as DjangoValidationError
+from drf_spectacular.utils import extend_schema_field
+from rest_framework import serializers
+
+from ..models import PatientCaregiverRelationship, Person
+from .person import UNIQUE_PERSON_FIELDS, format_cpf, validate_cpf
+
+
+class OnboardingPersonSerializer(serializers.ModelSerializer):
+    """
+    Valida uma linha de pessoa do cadastro em lote.
+
+    Só valida os campos: a unicidade de CPF, e-mail e telefone é verificada
+    para o lote inteiro de uma vez, no serviço de onboarding.
+    """
+    ref = serializers.CharField(
+        required=False,
+        max_length=50,
+        help_text="Identificador da pessoa dentro do lote, usado nos relacionamentos"
+    )
+
+    password = serializers.CharField(
+        write_only=True,
+        min_length=8,
+        style={'input_type': 'password'},
+        help_text="Senha para o usuário do sistema (mínimo 8 caracteres)"
+    )
+
+    class Meta:
+        model = Person
+        fields = [
+            'ref',
+            'name',
+            'cpf',
+            'email',
+            'phone',
+            'birth_date',
+            'gender',
+            'cid',
+            'profession',
+            'postal_code',
+            'state',
+            'city',
+            'district',
+            'street',
+            'number',
+            'complement',
+            'colors',
+            'sounds',
+            'smells',
+            'hobbies',
+            'is_patient',
+            'is_caregiver',
+            'password',
+        ]
+        extra_kwargs = {field: {'validators': []} for field in UNIQUE_PERSON_FIELDS}
+
+    def validate_cpf(self, value):
+        return format_cpf(validate_cpf(value))
+
+    def validate_password(self, value):
+        """Validação de senha usando validadores do Django"""
+        try:
+            validate_password(value)
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.messages)
+        return value
+
+    def validate(self, data):
+        if not data.get('is_patient') and not data.get('is_caregiver'):
+            raise serializers.ValidationError(
+                'A pessoa deve ser marcada como Paciente, Cuidador ou ambos.'
+            )
+        return data
+
+
+@extend_schema_field({'oneOf': [{'type': 'string'}, {'type': 'integer'}]})
+class PersonReferenceField(serializers.Field):
+    """
+    Referência a uma pessoa: texto = `ref` de uma pessoa do lote,
+    número = ID de uma pessoa já cadastrada.
+
+    Retorna ('ref', valor) ou ('id', valor).
+    """
+    default_error_messages = {
+        'invalid': 'Informe o ref de uma pessoa do lote (texto) ou o ID de uma pessoa cadastrada (número).',
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, int) and not isinstance(data, bool) and data > 0:
+            return ('id', data)
+        if isinstance(data, str) and data.strip():
+            return ('ref', data.strip())
+        self.fail('invalid')
+
+    def to_representation(self, value):
+        return value[1]
+
+
+class OnboardingRelationshipSerializer(serializers.Serializer):
+    """
+    Valida uma linha de relacionamento paciente-cuidador do cadastro em lote
+    """
+    patient = PersonReferenceField(help_text="ref do paciente no lote ou ID de paciente cadastrado")
+    caregiver = PersonReferenceField(help_text="ref do cuidador no lote ou ID de cuidador cadastrado")
+    relationship_type = serializers.ChoiceField(
+        choices=PatientCaregiverRelationship.RELATIONSHIP_TYPES,
+        help_text="Tipo de relacionamento (FAMILY, PROFESSIONAL, FRIEND, VOLUNTEER, OTHER)"
+    )
+    start_date = serializers.DateField(help_text="Data de início do relacionamento")
+    notes = serializers.CharField(
+        required=False,
+        allow_blank=True,
+        allow_null=True,
+        help_text="Observações sobre o relacionamento"
+    )
+
+
+class OnboardingRequestSerializer(serializers.Serializer):
+    """
+    Corpo do cadastro em lote (usado na documentação da API)
+    """
+    people = OnboardingPersonSerializer(many=True)
+    relationships = OnboardingRelationshipSerializer(many=True, required=False)
+    dry_run = serializers.BooleanField(
+        required=False,
+        default=False,
+        help_text="Só valida, sem gravar nada"
+    )
@@ -1,6 +1,7 @@
 from django.utils import timezone
 from rest_framework import serializers
 from drf_spectacular.utils import extend_schema_field
+from ..media_urls import MediaURLBuilder
 from ..models import EverydayCategory, PatientPictogram, Person, Pictogram
 
 
@@ -55,20 +56,14 @@ class PatientPictogramSerializer(serializers.ModelSerializer):
     @extend_schema_field(serializers.URLField(allow_null=True))
     def get_pictogram_image_url(self, obj):
         """Retorna URL completa da imagem do pictograma"""
-        if obj.pictogram.image:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.pictogram.image.url)
-        return None
+        urls = MediaURLBuilder.for_context(self.context)
+        return urls.file_url(obj.pictogram.image) if urls.absolute else None
     
     @extend_schema_field(serializers.URLField(allow_null=True))
     def get_pictogram_audio_url(self, obj):
         """Retorna URL completa do áudio do pictograma"""
-        if obj.pictogram.audio:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.pictogram.audio.url)
-        return None
+        urls = MediaURLBuilder.for_context(self.context)
+        return urls.file_url(obj.pictogram.audio) if urls.absolute else None
 
 
 class PatientPictogramCreateSerializer(serializers.ModelSerializer):
@@ -366,17 +361,11 @@ class PictogramForPatientSerializer(serializers.ModelSerializer):
     @extend_schema_field(serializers.URLField(allow_null=True))
     def get_image_url(self, obj):
         """Retorna URL completa da imagem"""
-        if obj.image:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.image.url)
-        return None
+        urls = MediaURLBuilder.for_context(self.context)
+        return urls.file_url(obj.image) if urls.absolute else None
     
     @extend_schema_field(serializers.URLField(allow_null=True))
     def get_audio_url(self, obj):
         """Retorna URL completa do áudio"""
-        if obj.audio:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.audio.url)
-        return None
+        urls = MediaURLBuilder.for_context(self.context)
+        return urls.file_url(obj.audio) if urls.absolute else None
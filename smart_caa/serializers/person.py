@@ -1,9 +1,15 @@
 from rest_framework import serializers
 from drf_spectacular.utils import extend_schema_field
 from django.contrib.auth.models import User
+from django.db.models import Q
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, transaction
+from rest_framework.utils.field_mapping import get_unique_error_message
 from ..models import Person
+from ..password_hashing import make_password
+from ..services.default_pictograms import link_default_pictograms
+from ..services.registration import cpf_variants, probe_registration
 
 
 def validate_cpf(cpf):
@@ -57,37 +63,215 @@ def format_cpf(cpf_numbers):
     return f"{cpf_numbers[:3]}.{cpf_numbers[3:6]}.{cpf_numbers[6:9]}-{cpf_numbers[9:]}"
 
 
-def create_user_for_person(cpf, email, name, password):
+def create_user_for_person(cpf, email, name, password, existing_users=None, password_hash=None):
     """
     Função utilitária para criar usuário para uma pessoa
+
+    `existing_users` aceita os usuários já trazidos por `probe_registration`,
+    evitando nova consulta. `password_hash` aceita a senha já processada no
+    pool de hash (ver PersonRegistrationMixin.create); sem ele, o hash é
+    calculado aqui, também pelo pool.
     """
     # Remove caracteres não numéricos do CPF para usar como username
     username = ''.join(filter(str.isdigit, cpf))
     
-    # Verifica se já existe usuário com esse username (CPF)
-    if User.objects.filter(username=username).exists():
+    # Busca de uma vez usuários com esse username (CPF) ou esse email
+    if existing_users is None:
+        existing_users = User.objects.filter(
+            Q(username=username) | Q(email=email)
+        ).values('username', 'email')
+    existing_users = list(existing_users)
+    
+    if any(user['username'] == username for user in existing_users):
         raise serializers.ValidationError({
             'cpf': 'Já existe um usuário cadastrado com este CPF.'
         })
     
-    # Verifica se já existe usuário com esse email
-    if User.objects.filter(email=email).exists():
+    if any(user['email'] == email for user in existing_users):
         raise serializers.ValidationError({
             'email': 'Já existe um usuário cadastrado com este e-mail.'
         })
     
     # Cria o usuário
-    user = User.objects.create_user(
-        username=username,
-        email=email,
-        password=password,
+    user = User(
+        username=User.normalize_username(username),
+        email=User.objects.normalize_email(email),
+        password=password_hash or make_password(password),
         first_name=name.split()[0] if name.split() else '',
         last_name=' '.join(name.split()[1:]) if len(name.split()) > 1 else ''
     )
+    user.save()
     
     return user
 
 
+UNIQUE_PERSON_FIELDS = ('cpf', 'email', 'phone')
+
+
+class PersonRegistrationMixin:
+    """
+    Cadastro de pessoas com usuário do sistema (pacientes e cuidadores).
+
+    A unicidade de CPF, e-mail e telefone e os usuários existentes são
+    verificados por uma única consulta (`probe_registration`) na validação,
+    no lugar dos UniqueValidators, da busca por CPF e das checagens de
+    usuário; o cadastro roda em uma transação e o `full_clean` do novo
+    registro não repete as consultas de unicidade.
+    """
+    # Campo booleano marcado na pessoa (is_patient ou is_caregiver)
+    person_type_field = None
+
+    def get_extra_kwargs(self):
+        extra_kwargs = super().get_extra_kwargs()
+        # A unicidade é verificada em validate() pela sonda única
+        for field in UNIQUE_PERSON_FIELDS:
+            extra_kwargs.setdefault(field, {})['validators'] = []
+        return extra_kwargs
+
+    def validate(self, data):
+        """Verifica unicidade e se a senha é necessária"""
+        cpf = data.get('cpf')
+        email = data.get('email')
+        phone = data.get('phone')
+        password = data.get('password')
+        self._registration_probe = None
+
+        if not (cpf or email or phone):
+            return data
+
+        # CPF como digitado, para manter a checagem de unicidade exata
+        raw_cpf = str(self.initial_data.get('cpf', '')).strip() if cpf else None
+        variants = cpf_variants(cpf) if cpf else ()
+        probe = probe_registration(
+            [raw_cpf, *variants],
+            emails=[email],
+            phones=[phone],
+            usernames=[variants[0]] if variants and self.instance is None else (),
+        )
+
+        others = [
+            person for person in probe['people']
+            if self.instance is None or person['id'] != self.instance.pk
+        ]
+        errors = {}
+        for field, value in (('cpf', raw_cpf), ('email', email), ('phone', phone)):
+            if value and any(person[field] == value for person in others):
+                errors[field] = [get_unique_error_message(Person._meta.get_field(field))]
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        if cpf:
+            # Pessoa já cadastrada com o mesmo CPF (com ou sem formatação)
+            person = next((person for person in probe['people'] if person['cpf'] in variants), None)
+            
+            # Se pessoa não existe OU existe mas não tem usuário, senha é obrigatória
+            if not person or not person['user_id']:
+                if not password or not password.strip():
+                    raise serializers.ValidationError({
+                        'password': 'É obrigatório informar uma senha para criar o usuário.'
+                    })
+            probe['person'] = person
+            self._registration_probe = probe
+        
+        return data
+
+    def create(self, validated_data):
+        # Remove a senha dos dados validados (pode estar vazia ou não existir)
+        password = validated_data.pop('password', None)
+        probe = getattr(self, '_registration_probe', None)
+        if probe is None:
+            # create() chamado sem passar por validate() com CPF
+            self.validate(dict(validated_data, password=password))
+            probe = self._registration_probe
+
+        # Hash da senha antes da transação: é a etapa mais lenta e não toca o banco
+        password_hash = None
+        if password and (probe['person'] is None or probe['person']['user_id'] is None):
+            password_hash = make_password(password)
+
+        try:
+            with transaction.atomic():
+                person = self._register(validated_data, password, probe, password_hash)
+                self.after_registration(person)
+        except IntegrityError:
+            # Cadastro concorrente com os mesmos dados entre a sonda e a gravação
+            raise serializers.ValidationError(
+                'Já existe um cadastro com este CPF, e-mail ou telefone.'
+            )
+        return person
+
+    def _register(self, validated_data, password, probe, password_hash=None):
+        existing = probe['person']
+        person = None
+        user = None
+
+        if existing is not None:
+            person = Person.objects.select_related('user').get(pk=existing['id'])
+        
+        if existing is None or existing['user_id'] is None:
+            if person is not None:
+                # Se não tem usuário, valida consistência antes de criar o usuário
+                self._validate_existing_person(person, validated_data)
+            # Cria o usuário (senha já foi validada no método validate)
+            user = create_user_for_person(
+                validated_data.get('cpf'),
+                validated_data.get('email'),
+                validated_data.get('name'),
+                password,
+                existing_users=probe['users'],
+                password_hash=password_hash,
+            )
+
+        if person is None:
+            # Pessoa nova: unicidade e referências já verificadas nesta transação
+            person = Person(**validated_data, user=user, **{self.person_type_field: True})
+            person.save(prevalidated=True)
+            return person
+
+        # Atualiza dados da pessoa existente e marca o tipo
+        for field, value in validated_data.items():
+            setattr(person, field, value)
+        setattr(person, self.person_type_field, True)
+        if user is not None:
+            person.user = user
+        person.save()
+        return person
+
+    def after_registration(self, person):
+        """Ponto de extensão executado na mesma transação do cadastro"""
+
+    def _validate_existing_person(self, person, validated_data):
+        """Valida se dados básicos são consistentes com pessoa existente"""
+        inconsistencies = []
+        
+        if person.name != validated_data.get('name'):
+            inconsistencies.append(f"Nome atual: '{person.name}', nome fornecido: '{validated_data.get('name')}'")
+            
+        if person.email != validated_data.get('email'):
+            inconsistencies.append(f"E-mail atual: '{person.email}', e-mail fornecido: '{validated_data.get('email')}'")
+            
+        if inconsistencies:
+            raise serializers.ValidationError({
+                'cpf': f"CPF já cadastrado com dados diferentes: {'; '.join(inconsistencies)}"
+            })
+    
+    def validate_cpf(self, value):
+        """Validação completa de CPF"""
+        # Usa a função de validação de CPF
+        cpf_numbers = validate_cpf(value)
+        
+        # Retorna o CPF formatado
+        return format_cpf(cpf_numbers)
+
+    def validate_password(self, value):
+        """Validação de senha usando validadores do Django"""
+        try:
+            validate_password(value)
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.messages)
+        return value
+
+
 class PersonSerializer(serializers.ModelSerializer):
     """
     Serializer completo para Person (usado para consultas gerais)
@@ -165,10 +349,12 @@ class PersonSerializer(serializers.ModelSerializer):
         return types
 
 
-class PatientSerializer(serializers.ModelSerializer):
+class PatientSerializer(PersonRegistrationMixin, serializers.ModelSerializer):
     """
     Serializer para Paciente
     """
+    person_type_field = 'is_patient'
+    
     created_by_username = serializers.CharField(
         source='created_by.username', 
         read_only=True,
@@ -274,167 +460,30 @@ class PatientSerializer(serializers.ModelSerializer):
             }
         }
     
-    def validate(self, data):
-        """Validação customizada para verificar se senha é necessária"""
-        cpf = data.get('cpf')
-        password = data.get('password')
-        
-        if cpf:
-            # Remove formatação do CPF para busca
-            cpf_numbers = ''.join(filter(str.isdigit, cpf))
-            
-            # Verifica se pessoa já existe
-            person = Person.objects.filter(
-                cpf__regex=r'[^0-9]*' + ''.join(f'[^0-9]*{d}' for d in cpf_numbers) + '[^0-9]*'
-            ).first()
-            
-            # Se pessoa não existe OU existe mas não tem usuário, senha é obrigatória
-            if not person or not person.user:
-                if not password or not password.strip():
-                    raise serializers.ValidationError({
-                        'password': 'É obrigatório informar uma senha para criar o usuário.'
-                    })
-        
-        return data
-
-    def create(self, validated_data):
-        # Remove a senha dos dados validados (pode estar vazia ou não existir)
-        password = validated_data.pop('password', None)
-        cpf = validated_data.get('cpf')
-        email = validated_data.get('email')
-        name = validated_data.get('name')
-        
-        # Remove formatação do CPF para busca
-        cpf_numbers = ''.join(filter(str.isdigit, cpf))
-        
-        # Verifica se pessoa já existe com esse CPF (busca por números apenas)
-        try:
-            # Busca flexível por CPF (com ou sem formatação)
-            person = Person.objects.filter(
-                cpf__regex=r'[^0-9]*' + ''.join(f'[^0-9]*{d}' for d in cpf_numbers) + '[^0-9]*'
-            ).first()
-            
-            if person:
-                # Se a pessoa já tem um usuário associado, não cria novo usuário
-                if person.user:
-                    # Apenas marca como paciente e atualiza dados
-                    for field, value in validated_data.items():
-                        setattr(person, field, value)
-                    
-                    person.is_patient = True
-                    person.save()
-                    
-                    # Vincula pictogramas padrão automaticamente
-                    self._link_default_pictograms(person)
-                    
-                    return person
-                
-                # Se não tem usuário, valida consistência e cria usuário
-                self._validate_existing_person(person, validated_data)
-                
-                # Cria o usuário (senha já foi validada no método validate)
-                user = create_user_for_person(cpf, email, name, password)
-                
-                # Atualiza dados da pessoa
-                for field, value in validated_data.items():
-                    setattr(person, field, value)
-                    
-                # Marca como paciente e associa o usuário
-                person.is_patient = True
-                person.user = user
-                person.save()
-                
-                # Vincula pictogramas padrão automaticamente
-                self._link_default_pictograms(person)
-                
-                return person
-            else:
-                # Pessoa não existe, cria nova
-                raise Person.DoesNotExist()
-            
-        except Person.DoesNotExist:
-            # Cria o usuário (senha já foi validada no método validate)
-            user = create_user_for_person(cpf, email, name, password)
-            
-            # Cria nova pessoa como paciente
-            validated_data['is_patient'] = True
-            validated_data['user'] = user
-            person = super().create(validated_data)
-            
-            # Vincula pictogramas padrão automaticamente
-            self._link_default_pictograms(person)
-            
-            return person
+    def after_registration(self, person):
+        # Vincula pictogramas padrão automaticamente
+        self._link_default_pictograms(person)
     
     def _link_default_pictograms(self, patient):
         """
         Vincula automaticamente os pictogramas marcados como padrão ao novo paciente
         """
-        from ..models import Pictogram, PatientPictogram
-        
-        # Busca pictogramas marcados como padrão
-        default_pictograms = Pictogram.objects.filter(
-            is_default=True,
-            is_active=True
-        )
-        
         # Verifica se há um usuário autenticado
         request = self.context.get('request')
-        created_by = None
+        created_by_id = None
         if request and hasattr(request, 'user') and request.user.is_authenticated:
-            created_by = request.user
-        
-        # Cria as vinculações
-        patient_pictograms = []
-        for pictogram in default_pictograms:
-            patient_pictograms.append(
-                PatientPictogram(
-                    patient=patient,
-                    pictogram=pictogram,
-                    created_by=created_by
-                )
-            )
-        
-        # Insere todos de uma vez (bulk_create para performance)
-        if patient_pictograms:
-            PatientPictogram.objects.bulk_create(patient_pictograms)
-    
-    def _validate_existing_person(self, person, validated_data):
-        """Valida se dados básicos são consistentes com pessoa existente"""
-        inconsistencies = []
+            created_by_id = request.user.id
         
-        if person.name != validated_data.get('name'):
-            inconsistencies.append(f"Nome atual: '{person.name}', nome fornecido: '{validated_data.get('name')}'")
-            
-        if person.email != validated_data.get('email'):
-            inconsistencies.append(f"E-mail atual: '{person.email}', e-mail fornecido: '{validated_data.get('email')}'")
-            
-        if inconsistencies:
-            raise serializers.ValidationError({
-                'cpf': f"CPF já cadastrado com dados diferentes: {'; '.join(inconsistencies)}"
-            })
-    
-    def validate_cpf(self, value):
-        """Validação completa de CPF"""
-        # Usa a função de validação de CPF
-        cpf_numbers = validate_cpf(value)
-        
-        # Retorna o CPF formatado
-        return format_cpf(cpf_numbers)
-
-    def validate_password(self, value):
-        """Validação de senha usando validadores do Django"""
-        try:
-            validate_password(value)
-        except DjangoValidationError as e:
-            raise serializers.ValidationError(e.messages)
-        return value
+        # Insere todos de uma vez no banco (INSERT ... SELECT do conjunto em cache)
+        link_default_pictograms(patient.id, created_by_id)
 
 
-class CaregiverSerializer(serializers.ModelSerializer):
+class CaregiverSerializer(PersonRegistrationMixin, serializers.ModelSerializer):
     """
     Serializer para Cuidador
     """
+    person_type_field = 'is_caregiver'
+    
     created_by_username = serializers.CharField(
         source='created_by.username', 
         read_only=True,
@@ -523,118 +572,6 @@ class CaregiverSerializer(serializers.ModelSerializer):
                 'help_text': 'Indica se o cuidador está ativo no sistema'
             }
         }
-    
-    def validate(self, data):
-        """Validação customizada para verificar se senha é necessária"""
-        cpf = data.get('cpf')
-        password = data.get('password')
-        
-        if cpf:
-            # Remove formatação do CPF para busca
-            cpf_numbers = ''.join(filter(str.isdigit, cpf))
-            
-            # Verifica se pessoa já existe
-            person = Person.objects.filter(
-                cpf__regex=r'[^0-9]*' + ''.join(f'[^0-9]*{d}' for d in cpf_numbers) + '[^0-9]*'
-            ).first()
-            
-            # Se pessoa não existe OU existe mas não tem usuário, senha é obrigatória
-            if not person or not person.user:
-                if not password or not password.strip():
-                    raise serializers.ValidationError({
-                        'password': 'É obrigatório informar uma senha para criar o usuário.'
-                    })
-        
-        return data
-
-    def create(self, validated_data):
-        # Remove a senha dos dados validados (pode estar vazia ou não existir)
-        password = validated_data.pop('password', None)
-        cpf = validated_data.get('cpf')
-        email = validated_data.get('email')
-        name = validated_data.get('name')
-        
-        # Remove formatação do CPF para busca
-        cpf_numbers = ''.join(filter(str.isdigit, cpf))
-        
-        # Verifica se pessoa já existe com esse CPF (busca por números apenas)
-        try:
-            # Busca flexível por CPF (com ou sem formatação)
-            person = Person.objects.filter(
-                cpf__regex=r'[^0-9]*' + ''.join(f'[^0-9]*{d}' for d in cpf_numbers) + '[^0-9]*'
-            ).first()
-            
-            if person:
-                # Se a pessoa já tem um usuário associado, não cria novo usuário
-                if person.user:
-                    # Apenas marca como cuidador e atualiza dados
-                    for field, value in validated_data.items():
-                        setattr(person, field, value)
-                    
-                    person.is_caregiver = True
-                    person.save()
-                    
-                    return person
-                
-                # Se não tem usuário, valida consistência e cria usuário
-                self._validate_existing_person(person, validated_data)
-                
-                # Cria o usuário (senha já foi validada no método validate)
-                user = create_user_for_person(cpf, email, name, password)
-                
-                # Atualiza dados da pessoa
-                for field, value in validated_data.items():
-                    setattr(person, field, value)
-                    
-                # Marca como cuidador e associa o usuário
-                person.is_caregiver = True
-                person.user = user
-                person.save()
-                
-                return person
-            else:
-                # Pessoa não existe, cria nova
-                raise Person.DoesNotExist()
-            
-        except Person.DoesNotExist:
-            # Cria o usuário (senha já foi validada no método validate)
-            user = create_user_for_person(cpf, email, name, password)
-            
-            # Cria nova pessoa como cuidador
-            validated_data['is_caregiver'] = True
-            validated_data['user'] = user
-            return super().create(validated_data)
-    
-    def _validate_existing_person(self, person, validated_data):
-        """Valida se dados básicos são consistentes com pessoa existente"""
-        inconsistencies = []
-        
-        if person.name != validated_data.get('name'):
-            inconsistencies.append(f"Nome atual: '{person.name}', nome fornecido: '{validated_data.get('name')}'")
-            
-        if person.email != validated_data.get('email'):
-            inconsistencies.append(f"E-mail atual: '{person.email}', e-mail fornecido: '{validated_data.get('email')}'")
-            
-        if inconsistencies:
-            raise serializers.ValidationError({
-                'cpf': f"CPF já cadastrado com dados diferentes: {'; '.join(inconsistencies)}"
-            })
-    
-    def validate_cpf(self, value):
-        """Validação completa de CPF"""
-        # Usa a função de validação de CPF
-        cpf_numbers = validate_cpf(value)
-        
-        # Retorna o CPF formatado
-        return format_cpf(cpf_numbers)
-
-    def validate_password(self, value):
-        """Validação de senha usando validadores do Django"""
-        try:
-            validate_password(value)
-        except DjangoValidationError as e:
-            raise serializers.ValidationError(e.messages)
-        return value
 
 
 class PersonListSerializer(serializers.ModelSerializer):
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from drf_spectacular.utils import extend_schema_field
+from ..media_urls import MediaURLBuilder
 from ..models import Pictogram, EverydayCategory
 
 
@@ -84,22 +85,12 @@ class PictogramSerializer(serializers.ModelSerializer):
     @extend_schema_field(serializers.CharField)
     def get_image_url(self, obj):
         """Retorna a URL completa da imagem"""
-        if obj.image:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.image.url)
-            return obj.image.url
-        return None
+        return MediaURLBuilder.for_context(self.context).file_url(obj.image)
     
     @extend_schema_field(serializers.CharField)
     def get_audio_url(self, obj):
         """Retorna a URL completa do áudio"""
-        if obj.audio:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.audio.url)
-            return obj.audio.url
-        return None
+        return MediaURLBuilder.for_context(self.context).file_url(obj.audio)
     
     def create(self, validated_data):
         # O created_by será definido na view
@@ -0,0 +1,99 @@
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import serializers
+
+from ..models import Person, Pictogram, PictogramUsageDaily
+from ..services.pictogram_usage import get_usage_settings, record_pictogram_usage
+
+
+class PictogramUsageBatchSerializer(serializers.Serializer):
+    """
+    Serializer para receber um lote de toques em pictogramas enviado pela prancha.
+
+    Os eventos são validados manualmente (sem um serializer aninhado por item)
+    para manter o custo baixo em lotes com milhares de eventos.
+    """
+    events = serializers.ListField(
+        allow_empty=False,
+        help_text=(
+            "Lista de eventos de toque. Cada evento deve conter `pictogram` (ID), "
+            "`occurred_at` (data/hora ISO 8601) e `sequence` (inteiro sequencial do dispositivo)"
+        )
+    )
+
+    def validate_events(self, value):
+        max_batch_size = get_usage_settings()['MAX_BATCH_SIZE']
+        if len(value) > max_batch_size:
+            raise serializers.ValidationError(
+                f"O lote excede o limite de {max_batch_size} eventos."
+            )
+
+        default_timezone = timezone.get_current_timezone()
+        events = []
+        errors = {}
+        for index, item in enumerate(value):
+            try:
+                pictogram_id = int(item['pictogram'])
+                sequence = int(item['sequence'])
+                occurred_at = parse_datetime(str(item['occurred_at']))
+            except (KeyError, TypeError, ValueError):
+                errors[index] = 'Evento inválido: informe `pictogram`, `occurred_at` e `sequence`.'
+                continue
+
+            if occurred_at is None:
+                errors[index] = 'Data/hora do evento em formato inválido.'
+                continue
+            if sequence < 0:
+                errors[index] = 'A sequência do evento não pode ser negativa.'
+                continue
+            if timezone.is_naive(occurred_at):
+                occurred_at = timezone.make_aware(occurred_at, default_timezone)
+
+            events.append({
+                'pictogram_id': pictogram_id,
+                'occurred_at': occurred_at,
+                'sequence': sequence,
+            })
+
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        pictogram_ids = {event['pictogram_id'] for event in events}
+        existing_ids = set(
+            Pictogram.objects.filter(id__in=pictogram_ids).values_list('id', flat=True)
+        )
+        invalid_ids = sorted(pictogram_ids - existing_ids)
+        if invalid_ids:
+            raise serializers.ValidationError(
+                f"Os seguintes IDs de pictogramas são inválidos: {invalid_ids}"
+            )
+
+        return events
+
+    def validate(self, attrs):
+        patient_id = self.context.get('patient_id')
+        if not patient_id:
+            raise serializers.ValidationError("ID do paciente não fornecido.")
+
+        if not Person.objects.filter(id=patient_id, is_patient=True, is_active=True).exists():
+            raise serializers.ValidationError("Paciente não encontrado.")
+
+        attrs['patient_id'] = patient_id
+        return attrs
+
+    def create(self, validated_data):
+        return record_pictogram_usage(
+            validated_data['patient_id'],
+            validated_data['events'],
+        )
+
+
+class PictogramUsageDailySerializer(serializers.ModelSerializer):
+    """
+    Serializer para as contagens diárias de uso de pictogramas do paciente
+    """
+    pictogram_name = serializers.CharField(source='pictogram.name', read_only=True)
+
+    class Meta:
+        model = PictogramUsageDaily
+        fields = ['pictogram', 'pictogram_name', 'date', 'count']
@@ -0,0 +1,163 @@
+"""
+Caminho rápido de leitura para as listas grandes e sem paginação.
+
+Uma projeção lê só as colunas usadas com values() e converte cada linha com
+funções preparadas uma única vez a partir dos campos do serializer DRF
+correspondente, sem instanciar modelos nem passar pelo to_representation
+campo a campo. O JSON gerado é idêntico ao do serializer (mesmas chaves, na
+mesma ordem, e mesmas conversões de data e de URL).
+"""
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+
+from ..media_urls import MediaURLBuilder
+from ..metrics import current_request
+from .patient_pictogram import PatientPictogramSerializer, PictogramForPatientSerializer
+
+
+def get_serialization_settings():
+    """
+    Retorna as configurações de serialização com valores padrão
+    """
+    defaults = {
+        'FAST_READ_PATH': True,  # Projeções com values() nas listas de pictogramas
+    }
+    defaults.update(getattr(settings, 'SERIALIZATION_SETTINGS', {}))
+    return defaults
+
+
+# Campos cujo to_representation devolve o próprio valor lido do banco
+IDENTITY_FIELDS = (
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.BooleanField,
+    serializers.ReadOnlyField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+
+class ReadOnlyProjection:
+    """
+    Projeção somente leitura de um serializer DRF.
+
+    `serializer_class` define os campos e a ordem; `file_fields` mapeia os
+    SerializerMethodField de URL para o campo de arquivo lido
+    (ex.: {'image_url': 'image'}), que vira URL absoluta como no serializer.
+    Outros SerializerMethodField e serializers aninhados não são suportados.
+    """
+    serializer_class = None
+    file_fields = {}
+
+    _compiled = None
+
+    def __init__(self, context=None):
+        self.context = context or {}
+
+    @classmethod
+    def compile(cls):
+        """
+        Lista de (nome, lookup do values(), conversão ou None, lookups das
+        relações anuláveis no caminho), em cache na classe
+        """
+        if cls.__dict__.get('_compiled') is not None:
+            return cls._compiled
+        model = cls.serializer_class.Meta.model
+        compiled = []
+        for name, field in cls.serializer_class().fields.items():
+            if name in cls.file_fields:
+                source = cls.file_fields[name]
+                storage = _resolve_path(model, source)[-1].storage
+                compiled.append((name, source.replace('.', '__'), ('file', storage), ()))
+            elif isinstance(field, (serializers.SerializerMethodField, serializers.BaseSerializer)):
+                raise ImproperlyConfigured(f'{cls.__name__}: campo "{name}" não suportado na projeção.')
+            else:
+                parts = field.source.split('.')
+                # Como no DRF, com uma relação nula no caminho (ex.: created_by
+                # em created_by.username) o campo não aparece na resposta
+                nullable = tuple(
+                    '__'.join(parts[:position + 1])
+                    for position, model_field in enumerate(_resolve_path(model, field.source)[:-1])
+                    if model_field.null and not field.allow_null
+                )
+                converter = None if isinstance(field, IDENTITY_FIELDS) else field.to_representation
+                compiled.append((name, '__'.join(parts), converter, nullable))
+        cls._compiled = compiled
+        return compiled
+
+    def serialize(self, queryset):
+        started = perf_counter()
+        compiled = self.compile()
+        urls = MediaURLBuilder.for_context(self.context)
+        lookups = list(dict.fromkeys(
+            lookup
+            for _, field_lookup, _, nullable in compiled
+            for lookup in (field_lookup, *nullable)
+        ))
+        index = {lookup: position for position, lookup in enumerate(lookups)}
+
+        mappers = []
+        for name, lookup, converter, nullable in compiled:
+            if isinstance(converter, tuple):
+                converter = _file_url(converter[1], urls)
+            mappers.append((name, index[lookup], converter, tuple(index[related] for related in nullable)))
+
+        data = []
+        for row in queryset.values_list(*lookups):
+            item = {}
+            for name, position, converter, nullable in mappers:
+                if nullable and any(row[related] is None for related in nullable):
+                    continue
+                value = row[position]
+                item[name] = value if converter is None or value is None else converter(value)
+            data.append(item)
+
+        stats = current_request.get()
+        if stats is not None:
+            # Contado como tempo de serializer nas métricas da rota, como Serializer.data
+            stats.serializer_seconds += perf_counter() - started
+        return data
+
+
+def _resolve_path(model, source):
+    """
+    Campos do modelo em cada passo de um source do DRF ('pictogram.category.name')
+    """
+    path = []
+    for part in source.split('.'):
+        field = model._meta.get_field(part)
+        path.append(field)
+        model = field.related_model
+    return path
+
+
+def _file_url(storage, urls):
+    """
+    Conversão de um nome de arquivo em URL, como os get_*_url dos
+    serializers (None sem arquivo ou sem URL absoluta)
+    """
+    if not urls.absolute:
+        return lambda name: None
+
+    def url(name):
+        return urls.url(name, storage)
+
+    return url
+
+
+class PatientPictogramProjection(ReadOnlyProjection):
+    serializer_class = PatientPictogramSerializer
+    file_fields = {
+        'pictogram_image_url': 'pictogram.image',
+        'pictogram_audio_url': 'pictogram.audio',
+    }
+
+
+class PictogramForPatientProjection(ReadOnlyProjection):
+    serializer_class = PictogramForPatientSerializer
+    file_fields = {
+        'image_url': 'image',
+        'audio_url': 'audio',
+    }
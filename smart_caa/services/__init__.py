@@ -0,0 +1,2 @@
+from .pictogram_usage import record_pictogram_usage
+from .pictogram_prediction import predictor as pictogram_predictor
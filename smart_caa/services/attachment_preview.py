@@ -0,0 +1,249 @@
+"""
+Pré-visualizações dos anexos, para as listas e a linha do tempo dos
+históricos não precisarem baixar o documento inteiro.
+
+Imagens viram uma miniatura JPEG com o Pillow; PDFs têm a primeira página
+rasterizada por um renderizador local (pdftoppm, do Poppler, ou mutool, do
+MuPDF), quando algum estiver instalado. Outros formatos ficam sem
+pré-visualização.
+
+A geração roda depois do commit, em uma thread de fundo, e grava a
+miniatura em Attachment.preview junto com o nome do arquivo de origem
+(preview_source), de modo que só é refeita quando o arquivo muda.
+"""
+import io
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.utils.module_loading import import_string
+from PIL import Image, ImageOps
+
+from ..models.attachment import Attachment
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_attachment_preview_settings():
+    """
+    Retorna as configurações de pré-visualização dos anexos com valores padrão
+    """
+    defaults = {
+        'ENABLED': True,
+        'BACKGROUND': True,  # False: gera no próprio on_commit (testes, scripts)
+        'WORKERS': 1,  # Threads de geração por processo
+        'SIZE': 320,  # Maior lado da miniatura, em pixels
+        'JPEG_QUALITY': 80,
+        'MAX_SOURCE_SIZE': 50 * 1024 * 1024,  # Arquivos maiores ficam sem pré-visualização
+        'PDF_RENDERERS': [
+            'smart_caa.services.attachment_preview.PopplerRenderer',
+            'smart_caa.services.attachment_preview.MuPDFRenderer',
+        ],
+        'TIMEOUT': 20,  # Segundos para renderizar a primeira página de um PDF
+    }
+    defaults.update(getattr(settings, 'ATTACHMENT_PREVIEW_SETTINGS', {}))
+    return defaults
+
+
+class PreviewError(Exception):
+    """
+    Falha ao gerar a pré-visualização (renderizador com erro ou tempo esgotado)
+    """
+
+
+class PdfRenderer:
+    """
+    Interface dos renderizadores de PDF.
+
+    Subclasses definem `executable` e implementam `render`, que grava a
+    primeira página de `source` como imagem em `directory` e retorna o
+    caminho gravado.
+    """
+    executable = None
+
+    def available(self):
+        return shutil.which(self.executable) is not None
+
+    def render(self, source, directory, size):
+        raise NotImplementedError
+
+    def _run(self, command):
+        try:
+            subprocess.run(
+                command,
+                capture_output=True,
+                timeout=get_attachment_preview_settings()['TIMEOUT'],
+                check=True,
+            )
+        except subprocess.TimeoutExpired:
+            raise PreviewError('Tempo esgotado ao renderizar o PDF.')
+        except subprocess.CalledProcessError as e:
+            raise PreviewError(f'Erro do {self.executable}: {e.stderr.decode(errors="replace").strip()}')
+
+
+class PopplerRenderer(PdfRenderer):
+    executable = 'pdftoppm'
+
+    def render(self, source, directory, size):
+        prefix = os.path.join(directory, 'page')
+        self._run([
+            shutil.which(self.executable), '-jpeg', '-f', '1', '-l', '1', '-singlefile',
+            '-scale-to', str(size), source, prefix,
+        ])
+        return prefix + '.jpg'
+
+
+class MuPDFRenderer(PdfRenderer):
+    executable = 'mutool'
+
+    def render(self, source, directory, size):
+        target = os.path.join(directory, 'page.png')
+        self._run([
+            shutil.which(self.executable), 'draw', '-F', 'png', '-o', target,
+            '-w', str(size), '-h', str(size), source, '1',
+        ])
+        return target
+
+
+@lru_cache(maxsize=None)
+def _load_renderer(path):
+    return import_string(path)()
+
+
+def get_pdf_renderer():
+    """
+    Primeiro renderizador de PDF_RENDERERS disponível no servidor, ou None
+    """
+    for path in get_attachment_preview_settings()['PDF_RENDERERS']:
+        renderer = _load_renderer(path)
+        if renderer.available():
+            return renderer
+    return None
+
+
+def thumbnail(source):
+    """
+    Miniatura JPEG (bytes) de uma imagem (caminho ou arquivo aberto)
+    """
+    preview_settings = get_attachment_preview_settings()
+    size = preview_settings['SIZE']
+    with Image.open(source) as image:
+        image.draft('RGB', (size, size))  # JPEG: decodifica já reduzido
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((size, size))
+        if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, 'white')
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        else:
+            image = image.convert('RGB')
+        buffer = io.BytesIO()
+        image.save(buffer, format='JPEG', quality=preview_settings['JPEG_QUALITY'], optimize=True)
+        return buffer.getvalue()
+
+
+def render_preview(file):
+    """
+    JPEG da pré-visualização de um FieldFile, ou None quando o formato não
+    tem pré-visualização (ou não há renderizador de PDF)
+    """
+    preview_settings = get_attachment_preview_settings()
+    if file.size > preview_settings['MAX_SOURCE_SIZE']:
+        return None
+    with file.open('rb') as source:
+        header = source.read(5)
+        source.seek(0)
+        if header != b'%PDF-':
+            try:
+                return thumbnail(source)
+            except (OSError, ValueError, Image.DecompressionBombError):
+                return None  # Não é uma imagem que o Pillow saiba ler
+
+        renderer = get_pdf_renderer()
+        if renderer is None:
+            return None
+        with tempfile.TemporaryDirectory() as directory:
+            pdf_path = os.path.join(directory, 'source.pdf')
+            with open(pdf_path, 'wb') as pdf:
+                shutil.copyfileobj(source, pdf)
+            return thumbnail(renderer.render(pdf_path, directory, preview_settings['SIZE']))
+
+
+def generate_preview(attachment_id, force=False):
+    """
+    Gera e grava a pré-visualização do anexo. Retorna True se gravou.
+    """
+    attachment = Attachment.objects.filter(pk=attachment_id).first()
+    if attachment is None or not attachment.file:
+        return False
+    source = attachment.file.name
+    if not force and attachment.preview and attachment.preview_source == source:
+        return False
+
+    try:
+        content = render_preview(attachment.file)
+    except (OSError, PreviewError) as e:
+        logger.warning('Pré-visualização do anexo %s não gerada: %s', attachment_id, e)
+        return False
+    if content is None:
+        return False
+
+    field = Attachment._meta.get_field('preview')
+    stem = os.path.splitext(os.path.basename(source))[0]
+    name = field.storage.save(field.generate_filename(attachment, f'{stem}-preview.jpg'), ContentFile(content))
+    # Só grava se o anexo ainda aponta para o mesmo arquivo
+    updated = Attachment.objects.filter(pk=attachment_id, file=source).update(preview=name, preview_source=source)
+    if not updated:
+        field.storage.delete(name)
+        return False
+    if attachment.preview and attachment.preview.name != name:
+        attachment.preview.delete(save=False)
+    return True
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=get_attachment_preview_settings()['WORKERS'],
+                thread_name_prefix='attachment-preview',
+            )
+        return _executor
+
+
+def _generate_in_background(attachment_id):
+    close_old_connections()
+    try:
+        generate_preview(attachment_id)
+    except Exception:
+        logger.exception('Erro ao gerar a pré-visualização do anexo %s', attachment_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_preview(attachment_id):
+    """
+    Agenda a geração para depois do commit da transação atual
+    """
+    preview_settings = get_attachment_preview_settings()
+    if not preview_settings['ENABLED']:
+        return
+    if preview_settings['BACKGROUND']:
+        transaction.on_commit(lambda: _get_executor().submit(_generate_in_background, attachment_id))
+    else:
+        transaction.on_commit(lambda: generate_preview(attachment_id))
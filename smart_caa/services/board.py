@@ -0,0 +1,230 @@
+import hashlib
+import io
+import json
+import os
+import tempfile
+import zipfile
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from ..models import PatientPictogram
+
+
+# Incrementar ao mudar a estrutura do pacote exportado, invalidando o cache
+BOARD_EXPORT_FORMAT = 1
+
+BOARD_ENTRY_FIELDS = (
+    'pictogram_id',
+    'pictogram__name',
+    'pictogram__description',
+    'pictogram__image',
+    'pictogram__audio',
+    'pictogram__private',
+    'pictogram__updated_at',
+    'pictogram__category_id',
+    'pictogram__category__name',
+)
+
+
+def get_board_export_settings():
+    """
+    Retorna as configurações de exportação da prancha com valores padrão
+    """
+    defaults = {
+        'CACHE_DIR': os.path.join(settings.BASE_DIR, 'cache', 'boards'),
+        'CHUNK_SIZE': 64 * 1024,  # Bytes lidos e enviados por vez
+        'PDF_IMAGE_DPI': 150,  # Resolução das imagens na folha impressa
+        'PDF_JPEG_QUALITY': 85,
+        'PDF_MAX_COLUMNS': 10,
+    }
+    defaults.update(getattr(settings, 'BOARD_EXPORT_SETTINGS', {}))
+    return defaults
+
+
+def get_board_entries(patient_id):
+    """
+    Pictogramas ativos da prancha do paciente, agrupados por categoria e em
+    ordem alfabética, como dicts com os campos de BOARD_ENTRY_FIELDS
+    """
+    return list(
+        PatientPictogram.objects.filter(
+            patient_id=patient_id,
+            is_active=True,
+        ).order_by(
+            'pictogram__category__name', 'pictogram__name', 'pictogram_id'
+        ).values(*BOARD_ENTRY_FIELDS)
+    )
+
+
+def get_board_version(patient, entries):
+    """
+    Versão da prancha: hash de tudo o que aparece no pacote exportado.
+
+    Muda quando um pictograma é vinculado, desvinculado ou editado (nome,
+    descrição, arquivos ou categoria) e quando o nome do paciente, impresso
+    no manifesto e na folha, muda; o uso diário não altera a versão.
+    """
+    raw = json.dumps([BOARD_EXPORT_FORMAT, patient.name, entries], default=str, sort_keys=True)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32]
+
+
+def board_cache_path(patient_id, version, extension):
+    return os.path.join(
+        get_board_export_settings()['CACHE_DIR'],
+        str(patient_id),
+        f'{version}{extension}',
+    )
+
+
+def iter_file(path, chunk_size=None):
+    """
+    Lê um arquivo em blocos, para respostas com memória constante
+    """
+    chunk_size = chunk_size or get_board_export_settings()['CHUNK_SIZE']
+    with open(path, 'rb') as source:
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def iter_and_cache(chunks, path):
+    """
+    Repassa os blocos gerados e grava uma cópia no cache ao mesmo tempo.
+
+    O arquivo só aparece em `path` quando a geração termina por completo
+    (arquivo temporário + os.replace); arquivos de versões anteriores da
+    prancha (nome iniciado por outra versão) são removidos. Se o cliente desconectar no meio, o temporário é apagado.
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    completed = False
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            for chunk in chunks:
+                tmp.write(chunk)
+                yield chunk
+        os.replace(tmp_path, path)
+        completed = True
+    finally:
+        if not completed and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    version, extension = os.path.splitext(os.path.basename(path))
+    version = version.split('-')[0]
+    for name in os.listdir(directory):
+        if name.endswith(extension) and not name.startswith(version):
+            stale = os.path.join(directory, name)
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+
+
+class _ChunkWriter(io.RawIOBase):
+    """
+    Destino não posicionável para o ZipFile: acumula o que foi escrito até
+    o gerador repassar adiante. Sem seek o ZipFile grava os tamanhos em
+    descritores de dados, sem voltar no arquivo.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_board_zip(patient, entries, version):
+    """
+    Gera o pacote ZIP da prancha em blocos: imagens em `images/`, áudios em
+    `audio/` e um `manifest.json` com categorias, ordem e arquivos.
+    """
+    chunk_size = get_board_export_settings()['CHUNK_SIZE']
+    writer = _ChunkWriter()
+    categories = {}
+    pictograms = []
+
+    with zipfile.ZipFile(writer, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for order, entry in enumerate(entries):
+            pictogram_id = entry['pictogram_id']
+            files = {}
+            for kind, folder in (('image', 'images'), ('audio', 'audio')):
+                name = entry[f'pictogram__{kind}']
+                if not name or not default_storage.exists(name):
+                    continue
+                arcname = f'{folder}/{pictogram_id}{os.path.splitext(name)[1].lower()}'
+                # Imagens e áudios já são comprimidos: são armazenados sem compressão
+                with default_storage.open(name, 'rb') as source, archive.open(arcname, 'w') as target:
+                    while True:
+                        chunk = source.read(chunk_size)
+                        if not chunk:
+                            break
+                        target.write(chunk)
+                        data = writer.drain()
+                        if data:
+                            yield data
+                files[kind] = arcname
+
+            category_id = entry['pictogram__category_id']
+            category = categories.setdefault(category_id, {
+                'id': category_id,
+                'name': entry['pictogram__category__name'],
+                'order': len(categories),
+                'pictograms': [],
+            })
+            category['pictograms'].append(pictogram_id)
+            pictograms.append({
+                'id': pictogram_id,
+                'name': entry['pictogram__name'],
+                'description': entry['pictogram__description'],
+                'category': category_id,
+                'order': order,
+                'private': entry['pictogram__private'],
+                'image': files.get('image'),
+                'audio': files.get('audio'),
+            })
+
+        manifest = {
+            'format': BOARD_EXPORT_FORMAT,
+            'version': version,
+            'generated_at': timezone.now().isoformat(),
+            'patient': {'id': patient.id, 'name': patient.name},
+            'categories': list(categories.values()),
+            'pictograms': pictograms,
+        }
+        archive.writestr(
+            'manifest.json',
+            json.dumps(manifest, ensure_ascii=False, indent=2),
+            compress_type=zipfile.ZIP_DEFLATED,
+        )
+
+    yield writer.drain()
+
+
+def get_board_zip(patient):
+    """
+    Retorna (versão, blocos) do pacote da prancha do paciente.
+
+    Se a versão atual já estiver no cache, os blocos vêm do arquivo; caso
+    contrário o pacote é gerado sob demanda e gravado no cache.
+    """
+    entries = get_board_entries(patient.id)
+    version = get_board_version(patient, entries)
+    path = board_cache_path(patient.id, version, '.zip')
+    if os.path.exists(path):
+        return version, iter_file(path)
+    return version, iter_and_cache(iter_board_zip(patient, entries, version), path)
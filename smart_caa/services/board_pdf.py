@@ -0,0 +1,330 @@
+import hashlib
+import io
+import os
+import unicodedata
+import zlib
+
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from .board import (
+    board_cache_path,
+    get_board_entries,
+    get_board_export_settings,
+    get_board_version,
+    iter_and_cache,
+    iter_file,
+)
+
+
+# Incrementar ao mudar o desenho da folha, invalidando os PDFs em cache
+BOARD_PDF_FORMAT = 1
+
+PAGE_SIZES = {
+    'A4': (595.28, 841.89),
+    'A3': (841.89, 1190.55),
+    'letter': (612.0, 792.0),
+}
+ORIENTATIONS = ('portrait', 'landscape')
+
+MARGIN = 36.0
+CELL_PADDING = 6.0
+CATEGORY_HEADER_HEIGHT = 24.0
+TITLE_HEIGHT = 30.0
+FOOTER_HEIGHT = 18.0
+
+# Larguras da Helvetica (unidades de 1/1000 do corpo) para os caracteres ASCII
+# imprimíveis, a partir do espaço. Letras acentuadas usam a largura da base.
+_HELVETICA_WIDTHS = [
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+]
+
+
+class BoardLayout:
+    """
+    Parâmetros de diagramação da folha impressa
+    """
+
+    def __init__(self, columns=4, page_size='A4', orientation='portrait'):
+        if page_size not in PAGE_SIZES:
+            raise ValueError(f'Tamanho de página inválido. Use: {", ".join(PAGE_SIZES)}.')
+        if orientation not in ORIENTATIONS:
+            raise ValueError(f'Orientação inválida. Use: {", ".join(ORIENTATIONS)}.')
+        max_columns = get_board_export_settings()['PDF_MAX_COLUMNS']
+        if not 1 <= columns <= max_columns:
+            raise ValueError(f'O número de colunas deve estar entre 1 e {max_columns}.')
+
+        self.columns = columns
+        self.page_size = page_size
+        self.orientation = orientation
+
+        width, height = PAGE_SIZES[page_size]
+        if orientation == 'landscape':
+            width, height = height, width
+        self.width = width
+        self.height = height
+        self.cell_width = (width - 2 * MARGIN) / columns
+        self.label_size = max(7.0, min(14.0, self.cell_width / 9))
+        # Uma célula sempre cabe na página junto com os títulos
+        available_height = (
+            height - 2 * MARGIN - TITLE_HEIGHT - FOOTER_HEIGHT - CATEGORY_HEADER_HEIGHT - self.label_size * 1.6
+        )
+        self.image_size = min(self.cell_width, available_height) - 2 * CELL_PADDING
+        self.cell_height = self.image_size + 2 * CELL_PADDING + self.label_size * 1.6
+
+    @property
+    def key(self):
+        """
+        Identificação dos parâmetros no nome do arquivo em cache
+        """
+        export_settings = get_board_export_settings()
+        raw = '|'.join(str(value) for value in (
+            BOARD_PDF_FORMAT,
+            self.columns,
+            self.page_size,
+            self.orientation,
+            export_settings['PDF_IMAGE_DPI'],
+            export_settings['PDF_JPEG_QUALITY'],
+        ))
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:12]
+
+
+def _text_width(text, size):
+    total = 0
+    for char in text:
+        base = unicodedata.normalize('NFD', char)[0]
+        code = ord(base) - 32
+        total += _HELVETICA_WIDTHS[code] if 0 <= code < len(_HELVETICA_WIDTHS) else 556
+    return total * size / 1000
+
+
+def _fit_text(text, size, max_width):
+    """
+    Trunca o texto com reticências para caber na largura informada
+    """
+    text = ' '.join(text.split())
+    if _text_width(text, size) <= max_width:
+        return text
+    while text and _text_width(text + '...', size) > max_width:
+        text = text[:-1]
+    return text.rstrip() + '...'
+
+
+def _pdf_string(text):
+    encoded = text.encode('cp1252', errors='replace')
+    return b'(' + encoded.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+def _text(x, y, size, text, font=b'/F1'):
+    return b'BT %s %.2f Tf %.2f %.2f Td %s Tj ET\n' % (font, size, x, y, _pdf_string(text))
+
+
+def _load_image(name, size_points):
+    """
+    Lê a imagem do pictograma e a converte em JPEG na resolução de impressão.
+
+    Retorna (bytes, largura, altura) ou None se o arquivo não puder ser lido.
+    """
+    export_settings = get_board_export_settings()
+    max_pixels = max(1, int(size_points / 72 * export_settings['PDF_IMAGE_DPI']))
+    try:
+        with default_storage.open(name, 'rb') as source, Image.open(source) as image:
+            image.thumbnail((max_pixels, max_pixels))
+            if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+                image = image.convert('RGBA')
+                background = Image.new('RGB', image.size, 'white')
+                background.paste(image, mask=image.getchannel('A'))
+                image = background
+            else:
+                image = image.convert('RGB')
+            buffer = io.BytesIO()
+            image.save(buffer, format='JPEG', quality=export_settings['PDF_JPEG_QUALITY'])
+            return buffer.getvalue(), image.width, image.height
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+
+
+class _PDFWriter:
+    """
+    Escreve objetos PDF em sequência, guardando os deslocamentos para a
+    tabela xref final. Nada é mantido em memória além dos deslocamentos.
+    """
+
+    def __init__(self):
+        self.offset = 0
+        self.offsets = {}
+        self.last_id = 0
+
+    def reserve(self):
+        self.last_id += 1
+        return self.last_id
+
+    def raw(self, data):
+        self.offset += len(data)
+        return data
+
+    def object(self, obj_id, body, stream=None):
+        self.offsets[obj_id] = self.offset
+        data = b'%d 0 obj\n' % obj_id
+        if stream is None:
+            data += body + b'\nendobj\n'
+        else:
+            data += body + b'\nstream\n' + stream + b'\nendstream\nendobj\n'
+        return self.raw(data)
+
+    def trailer(self, root_id):
+        xref_offset = self.offset
+        lines = [b'xref\n0 %d\n' % (self.last_id + 1), b'0000000000 65535 f \n']
+        lines.extend(b'%010d 00000 n \n' % self.offsets[obj_id] for obj_id in range(1, self.last_id + 1))
+        lines.append(b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (
+            self.last_id + 1, root_id, xref_offset
+        ))
+        return self.raw(b''.join(lines))
+
+
+def _paginate(entries, layout):
+    """
+    Distribui os pictogramas nas páginas, agrupados por categoria.
+
+    Retorna uma lista de páginas; cada página é uma lista de itens
+    ('category', nome, y) ou ('cell', entrada, x, y), com y a partir do topo.
+    """
+    pages = [[]]
+    top = MARGIN + TITLE_HEIGHT
+    bottom = layout.height - MARGIN - FOOTER_HEIGHT
+    y = top
+    current_category = None
+    column = 0
+
+    for entry in entries:
+        if entry['pictogram__category_id'] != current_category:
+            current_category = entry['pictogram__category_id']
+            if column:
+                y += layout.cell_height
+                column = 0
+            # O título da categoria nunca fica sozinho no pé da página
+            if y + CATEGORY_HEADER_HEIGHT + layout.cell_height > bottom:
+                pages.append([])
+                y = MARGIN
+            pages[-1].append(('category', entry['pictogram__category__name'], y))
+            y += CATEGORY_HEADER_HEIGHT
+
+        if column == 0 and y + layout.cell_height > bottom:
+            pages.append([])
+            y = MARGIN
+        pages[-1].append(('cell', entry, MARGIN + column * layout.cell_width, y))
+        column += 1
+        if column == layout.columns:
+            column = 0
+            y += layout.cell_height
+
+    return pages
+
+
+def iter_board_pdf(patient, entries, layout):
+    """
+    Gera o PDF da prancha página por página: cada página tem suas imagens
+    lidas, convertidas e escritas antes de a próxima ser processada.
+    """
+    writer = _PDFWriter()
+    catalog_id = writer.reserve()
+    pages_id = writer.reserve()
+    font_id = writer.reserve()
+    bold_font_id = writer.reserve()
+
+    yield writer.raw(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+    yield writer.object(catalog_id, b'<< /Type /Catalog /Pages %d 0 R >>' % pages_id)
+    yield writer.object(font_id, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>')
+    yield writer.object(bold_font_id, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>')
+
+    page_ids = []
+    height = layout.height
+    for number, items in enumerate(_paginate(entries, layout), start=1):
+        chunks = []
+        images = []
+        content = [b'0.75 G 0.5 w\n']
+
+        if number == 1:
+            title = _fit_text(f'Prancha de {patient.name}', 16, layout.width - 2 * MARGIN)
+            content.append(_text(MARGIN, height - MARGIN - 16, 16, title, b'/F2'))
+
+        for item in items:
+            if item[0] == 'category':
+                _, name, y = item
+                baseline = height - y - CATEGORY_HEADER_HEIGHT + 8
+                content.append(_text(MARGIN, baseline, 12, _fit_text(name, 12, layout.width - 2 * MARGIN), b'/F2'))
+                content.append(b'%.2f %.2f m %.2f %.2f l S\n' % (
+                    MARGIN, baseline - 4, layout.width - MARGIN, baseline - 4
+                ))
+                continue
+
+            _, entry, x, y = item
+            cell_bottom = height - y - layout.cell_height
+            content.append(b'%.2f %.2f %.2f %.2f re S\n' % (
+                x + 2, cell_bottom + 2, layout.cell_width - 4, layout.cell_height - 4
+            ))
+
+            image = _load_image(entry['pictogram__image'], layout.image_size) if entry['pictogram__image'] else None
+            if image is not None:
+                data, pixel_width, pixel_height = image
+                image_id = writer.reserve()
+                images.append(image_id)
+                chunks.append(writer.object(
+                    image_id,
+                    b'<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceRGB '
+                    b'/BitsPerComponent 8 /Filter /DCTDecode /Length %d >>' % (pixel_width, pixel_height, len(data)),
+                    data,
+                ))
+                scale = layout.image_size / max(pixel_width, pixel_height)
+                draw_width, draw_height = pixel_width * scale, pixel_height * scale
+                image_x = x + CELL_PADDING + (layout.image_size - draw_width) / 2
+                image_y = height - y - CELL_PADDING - layout.image_size + (layout.image_size - draw_height) / 2
+                content.append(b'q %.2f 0 0 %.2f %.2f %.2f cm /Im%d Do Q\n' % (
+                    draw_width, draw_height, image_x, image_y, image_id
+                ))
+
+            label = _fit_text(entry['pictogram__name'], layout.label_size, layout.cell_width - 2 * CELL_PADDING)
+            label_x = x + (layout.cell_width - _text_width(label, layout.label_size)) / 2
+            content.append(_text(label_x, cell_bottom + layout.label_size * 0.7, layout.label_size, label))
+
+        footer = f'Página {number}'
+        content.append(_text(layout.width - MARGIN - _text_width(footer, 8), MARGIN / 2, 8, footer))
+
+        stream = zlib.compress(b''.join(content))
+        content_id = writer.reserve()
+        chunks.append(writer.object(content_id, b'<< /Length %d /Filter /FlateDecode >>' % len(stream), stream))
+
+        page_id = writer.reserve()
+        page_ids.append(page_id)
+        xobjects = b' '.join(b'/Im%d %d 0 R' % (image_id, image_id) for image_id in images)
+        chunks.append(writer.object(
+            page_id,
+            b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %.2f %.2f] /Contents %d 0 R '
+            b'/Resources << /Font << /F1 %d 0 R /F2 %d 0 R >> /XObject << %s >> >> >>' % (
+                pages_id, layout.width, layout.height, content_id, font_id, bold_font_id, xobjects
+            ),
+        ))
+        yield b''.join(chunks)
+
+    kids = b' '.join(b'%d 0 R' % page_id for page_id in page_ids)
+    yield writer.object(pages_id, b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(page_ids)))
+    yield writer.trailer(catalog_id)
+
+
+def get_board_pdf(patient, layout):
+    """
+    Retorna (versão, blocos) da folha impressa da prancha do paciente.
+
+    O cache é separado por versão da prancha e parâmetros de diagramação.
+    """
+    entries = get_board_entries(patient.id)
+    version = get_board_version(patient, entries)
+    path = board_cache_path(patient.id, f'{version}-{layout.key}', '.pdf')
+    if os.path.exists(path):
+        return version, iter_file(path)
+    return version, iter_and_cache(iter_board_pdf(patient, entries, layout), path)
@@ -0,0 +1,171 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models.constants import OnConflict
+from django.utils import timezone
+
+from ..models import PatientPictogram, Person, Pictogram
+
+
+VERSION_KEY = 'smart_caa:default-pictograms:version'
+IDS_KEY = 'smart_caa:default-pictograms:ids:{version}'
+
+
+def get_default_pictogram_settings():
+    """
+    Retorna as configurações do conjunto de pictogramas padrão com valores padrão
+    """
+    defaults = {
+        'CACHE_TIMEOUT': 3600,  # Segundos que a lista de IDs fica no cache compartilhado
+        'PROPAGATION_CHUNK_SIZE': 500,  # Pacientes por transação ao propagar padrões
+    }
+    defaults.update(getattr(settings, 'DEFAULT_PICTOGRAM_SETTINGS', {}))
+    return defaults
+
+
+class DefaultPictogramSet:
+    """
+    IDs dos pictogramas padrão ativos, em cache versionado.
+
+    A versão atual fica no cache do Django (compartilhado entre processos
+    quando CACHES aponta para Redis/Memcached) e a lista de IDs é guardada
+    sob uma chave com a versão. Cada processo mantém ainda uma cópia local,
+    válida enquanto a versão compartilhada não mudar. Salvar ou excluir um
+    pictograma troca a versão (ver signals.py), descartando todas as cópias.
+    """
+
+    def __init__(self):
+        self._local = None  # (versão, ids)
+
+    def _version(self):
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            # add() não sobrescreve a versão criada por outro processo
+            cache.add(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+            version = cache.get(VERSION_KEY)
+        return version
+
+    def ids(self):
+        version = self._version()
+        local = self._local
+        if local is not None and local[0] == version:
+            return local[1]
+
+        key = IDS_KEY.format(version=version)
+        ids = cache.get(key)
+        if ids is None:
+            ids = tuple(
+                Pictogram.objects.filter(is_default=True, is_active=True).order_by('id').values_list('id', flat=True)
+            )
+            cache.set(key, ids, timeout=get_default_pictogram_settings()['CACHE_TIMEOUT'])
+        self._local = (version, ids)
+        return ids
+
+    def invalidate(self):
+        self._local = None
+        cache.set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+    def invalidate_on_commit(self):
+        # Invalida já e de novo após o commit: quem recalcular a lista antes
+        # do commit (com os dados antigos) não deixa uma versão obsoleta
+        self.invalidate()
+        transaction.on_commit(self.invalidate)
+
+
+default_pictograms = DefaultPictogramSet()
+
+
+def _insert_links(patient_ids, pictogram_ids, created_by_id):
+    """
+    Cria, com um único INSERT ... SELECT, os vínculos ativos entre cada
+    paciente e cada pictograma informados que ainda sejam padrão e ativos.
+
+    Vínculos já ativos são ignorados (NOT EXISTS e, onde o banco permite,
+    ON CONFLICT DO NOTHING contra o índice único parcial). Retorna a
+    quantidade de vínculos criados.
+    """
+    if not patient_ids or not pictogram_ids:
+        return 0
+
+    qn = connection.ops.quote_name
+    link = PatientPictogram._meta.get_field
+    pictogram = Pictogram._meta.get_field
+    now = link('created_at').get_db_prep_value(timezone.now(), connection)
+    scores = link('daypart_rank_scores').get_db_prep_value({}, connection)
+    columns = ', '.join(
+        qn(link(name).column)
+        for name in ('patient', 'pictogram', 'created_by', 'created_at', 'updated_at', 'is_active', 'daypart_rank_scores')
+    )
+    patient_placeholders = ', '.join(['%s'] * len(patient_ids))
+    pictogram_placeholders = ', '.join(['%s'] * len(pictogram_ids))
+    pictogram_id = f'p.{qn(pictogram("id").column)}'
+    person_id = f'pe.{qn(Person._meta.pk.column)}'
+
+    sql = (
+        f'{connection.ops.insert_statement(on_conflict=OnConflict.IGNORE)} '
+        f'{qn(PatientPictogram._meta.db_table)} ({columns}) '
+        f'SELECT {person_id}, {pictogram_id}, %s, %s, %s, %s, %s '
+        f'FROM {qn(Person._meta.db_table)} pe CROSS JOIN {qn(Pictogram._meta.db_table)} p '
+        f'WHERE {person_id} IN ({patient_placeholders}) '
+        f'AND {pictogram_id} IN ({pictogram_placeholders}) '
+        f'AND p.{qn(pictogram("is_default").column)} = %s '
+        f'AND p.{qn(pictogram("is_active").column)} = %s '
+        f'AND NOT EXISTS ('
+        f'SELECT 1 FROM {qn(PatientPictogram._meta.db_table)} l '
+        f'WHERE l.{qn(link("patient").column)} = {person_id} '
+        f'AND l.{qn(link("pictogram").column)} = {pictogram_id} '
+        f'AND l.{qn(link("is_active").column)} = %s) '
+        f'{connection.ops.on_conflict_suffix_sql([], OnConflict.IGNORE, None, None)}'
+    )
+    params = [created_by_id, now, now, True, scores, *patient_ids, *pictogram_ids, True, True, True]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
+
+
+def link_default_pictograms(patient_id, created_by_id=None):
+    """
+    Vincula ao paciente os pictogramas padrão ativos, a partir do conjunto
+    em cache. Sem pictogramas padrão, nenhuma consulta é feita.
+    """
+    return _insert_links([patient_id], default_pictograms.ids(), created_by_id)
+
+
+def link_default_pictograms_to_patients(patient_ids, created_by_id=None):
+    """
+    Versão em lote de link_default_pictograms, com um único INSERT para
+    todos os pacientes informados
+    """
+    return _insert_links(list(patient_ids), default_pictograms.ids(), created_by_id)
+
+
+def propagate_default_pictograms(pictogram_ids=None, created_by_id=None, chunk_size=None):
+    """
+    Vincula pictogramas padrão (todos ou os informados) a todos os pacientes
+    que ainda não os têm.
+
+    Os pacientes são percorridos em blocos por ID, cada bloco em uma
+    transação curta, para não segurar a tabela de vínculos durante a
+    propagação inteira. Retorna a quantidade de vínculos criados.
+    """
+    chunk_size = chunk_size or get_default_pictogram_settings()['PROPAGATION_CHUNK_SIZE']
+    ids = list(default_pictograms.ids())
+    if pictogram_ids is not None:
+        requested = set(pictogram_ids)
+        ids = [pk for pk in ids if pk in requested]
+    if not ids:
+        return 0
+
+    created = 0
+    last_id = 0
+    while True:
+        patient_ids = list(
+            Person.objects.filter(is_patient=True, id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size]
+        )
+        if not patient_ids:
+            return created
+        with transaction.atomic():
+            created += _insert_links(patient_ids, ids, created_by_id)
+        last_id = patient_ids[-1]
@@ -0,0 +1,90 @@
+import csv
+import datetime
+import json
+
+from django.conf import settings
+from django.utils import timezone
+
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+
+def get_export_settings():
+    """
+    Retorna as configurações das exportações com valores padrão
+    """
+    defaults = {
+        'CHUNK_SIZE': 2000,  # Linhas buscadas do banco por vez
+        'ROWS_PER_WRITE': 500,  # Linhas agrupadas em cada bloco enviado
+    }
+    defaults.update(getattr(settings, 'EXPORT_SETTINGS', {}))
+    return defaults
+
+
+def _export_value(value):
+    if isinstance(value, datetime.datetime):
+        return timezone.localtime(value).isoformat() if timezone.is_aware(value) else value.isoformat()
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return value
+
+
+# Início de célula que o Excel/LibreOffice interpretam como fórmula
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _csv_value(value):
+    """
+    Valor de uma célula CSV; textos que seriam lidos como fórmula (injeção de
+    fórmulas em planilhas) ganham um apóstrofo na frente
+    """
+    if value is None:
+        return ''
+    value = _export_value(value)
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+class _Echo:
+    """
+    Destino do csv.writer que devolve a linha formatada em vez de guardá-la
+    """
+
+    def write(self, value):
+        return value
+
+
+def iter_export(rows, columns, output):
+    """
+    Converte as linhas de um `values()` em blocos CSV ou JSONL.
+
+    `columns` é uma lista de (nome da coluna, campo do values()). A memória
+    usada é a de um bloco de ROWS_PER_WRITE linhas, qualquer que seja o total.
+    """
+    rows_per_write = get_export_settings()['ROWS_PER_WRITE']
+    fields = [field for _, field in columns]
+    names = [name for name, _ in columns]
+
+    if output == 'csv':
+        writer = csv.writer(_Echo())
+        # BOM para que o Excel reconheça a acentuação
+        yield '﻿' + writer.writerow(names)
+        format_row = lambda row: writer.writerow([_csv_value(row[field]) for field in fields])
+    else:
+        format_row = lambda row: json.dumps(
+            {name: _export_value(row[field]) for name, field in columns},
+            ensure_ascii=False,
+        ) + '\n'
+
+    buffer = []
+    for row in rows:
+        buffer.append(format_row(row))
+        if len(buffer) >= rows_per_write:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
@@ -0,0 +1,324 @@
+import math
+import random
+from datetime import timedelta
+from itertools import islice
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from ..models import (
+    Anamnesis,
+    Attachment,
+    EverydayCategory,
+    History,
+    PatientCaregiverRelationship,
+    PatientPictogram,
+    Person,
+    Pictogram,
+)
+from .default_pictograms import default_pictograms
+
+
+FIRST_NAMES = (
+    'Ana', 'Bruno', 'Carla', 'Davi', 'Eduarda', 'Felipe', 'Gabriela', 'Heitor', 'Isabela', 'João',
+    'Laura', 'Miguel', 'Nicole', 'Otávio', 'Pedro', 'Rafaela', 'Samuel', 'Tatiane', 'Vitor', 'Yasmin',
+)
+LAST_NAMES = (
+    'Almeida', 'Barbosa', 'Cardoso', 'Costa', 'Ferreira', 'Gomes', 'Lima', 'Martins', 'Oliveira',
+    'Pereira', 'Ribeiro', 'Rocha', 'Santos', 'Silva', 'Souza',
+)
+CIDS = ('F84.0', 'F84.1', 'F84.5', 'F80.1', 'F80.2', 'F70', 'F71', 'G80.0', 'Q90.9')
+STATES = (('SP', 'São Paulo'), ('RJ', 'Rio de Janeiro'), ('MG', 'Belo Horizonte'), ('BA', 'Salvador'),
+          ('PR', 'Curitiba'), ('RS', 'Porto Alegre'), ('PE', 'Recife'), ('CE', 'Fortaleza'))
+RELATIONSHIP_TYPES = ('FAMILY', 'FAMILY', 'FAMILY', 'PROFESSIONAL', 'PROFESSIONAL', 'FRIEND', 'VOLUNTEER', 'OTHER')
+ATTACHMENT_EXTENSIONS = ('pdf', 'pdf', 'jpg', 'png')
+
+
+def make_cpf(seed):
+    """
+    Gera um CPF válido (somente números) a partir de um número sequencial
+    """
+    digits = [int(d) for d in f'{seed % 10 ** 9:09d}']
+    for length in (9, 10):
+        total = sum(d * (length + 1 - i) for i, d in enumerate(digits))
+        digit = 11 - total % 11
+        digits.append(0 if digit >= 10 else digit)
+    return ''.join(map(str, digits))
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class FixtureDataGenerator:
+    """
+    Gera dados sintéticos em volume para testes de escala, com bulk_create
+    em lotes de `chunk_size` linhas por transação.
+
+    As quantidades por paciente seguem distribuições assimétricas (poucos
+    pacientes com pranchas muito grandes, a maioria perto da média) e a
+    escolha de pictogramas segue uma lei de Zipf, como o uso real: os
+    pictogramas padrão estão em todas as pranchas e alguns outros aparecem
+    em muitas. Os arquivos de imagem e anexo apenas são referenciados (não
+    são criados no storage).
+
+    Os registros não passam por save() nem por signals; o cache de
+    pictogramas padrão é invalidado ao final. Os vínculos paciente-pictograma
+    são gravados com executemany (ver _insert_rows).
+    """
+
+    def __init__(self, patients=1000, caregivers=None, pictograms=2000, categories=20, defaults=40,
+                 links=100, histories=5, attachments=0.3, anamnesis=0.8, chunk_size=10000,
+                 user=None, seed=42):
+        self.patients = patients
+        self.caregivers = max(1, patients // 5) if caregivers is None else caregivers
+        self.pictograms = pictograms
+        self.categories = categories
+        self.defaults = min(defaults, pictograms)
+        self.links = links  # Média de pictogramas vinculados por paciente
+        self.histories = histories  # Média de históricos por paciente
+        self.attachments = attachments  # Fração dos históricos com anexo
+        self.anamnesis = anamnesis  # Fração dos pacientes com anamnese
+        self.chunk_size = chunk_size
+        self.user = user
+        self.random = random.Random(seed)
+        self.report = {}
+
+    def run(self, progress=None):
+        """
+        Cria todos os registros. `progress(tabela, criados)` é chamado a cada
+        lote. Retorna {tabela: linhas criadas}.
+        """
+        self._progress = progress or (lambda table, created: None)
+        # Nomes, e-mails e CPFs partem do próximo ID de Person, para não
+        # colidir com execuções anteriores
+        self.start = Person.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        self.prefix = f'f{self.start + 1}'
+        self.people = 0
+        self.today = timezone.localdate()
+
+        pictogram_ids = self._create_pictograms()
+        patient_ids = self._create_people('patients', self.patients, is_patient=True)
+        caregiver_ids = self._create_people('caregivers', self.caregivers, is_caregiver=True)
+        self._create_links(patient_ids, pictogram_ids)
+        if caregiver_ids:
+            pairs = self._create_relationships(patient_ids, caregiver_ids)
+            histories = self._create_histories(pairs)
+            self._create_attachments(histories)
+            self._create_anamneses(pairs)
+        default_pictograms.invalidate()
+
+        self.report['first_patient_id'] = patient_ids[0] if patient_ids else None
+        self.report['first_caregiver_id'] = caregiver_ids[0] if caregiver_ids else None
+        return self.report
+
+    def _bulk_create(self, table, model, rows):
+        """
+        Grava os objetos de `rows` (gerador) em lotes. Retorna os IDs criados.
+        """
+        ids = []
+        created = 0
+        for chunk in _chunks(rows, self.chunk_size):
+            with transaction.atomic():
+                objects = model.objects.bulk_create(chunk)
+            ids.extend(obj.pk for obj in objects)
+            created += len(objects)
+            self._progress(table, created)
+        self.report[table] = created
+        return ids
+
+    def _count(self, mean, minimum=0, maximum=None, sigma=0.6):
+        """
+        Quantidade com distribuição log-normal de média `mean`
+        """
+        if mean <= 0:
+            return minimum
+        value = round(self.random.lognormvariate(math.log(mean) - sigma ** 2 / 2, sigma))
+        value = max(minimum, value)
+        return value if maximum is None else min(maximum, value)
+
+    def _create_pictograms(self):
+        categories = self._bulk_create('categories', EverydayCategory, (
+            EverydayCategory(name=f'{self.prefix} categoria {number}', created_by=self.user)
+            for number in range(self.categories)
+        ))
+        return self._bulk_create('pictograms', Pictogram, (
+            Pictogram(
+                name=f'{self.prefix} pictograma {number}',
+                category_id=categories[number % len(categories)],
+                image=f'pictograms/images/{self.prefix}-{number}.png',
+                description=f'Pictograma sintético {number}' if number % 3 else None,
+                is_default=number < self.defaults,
+                created_by=self.user,
+            )
+            for number in range(self.pictograms)
+        ))
+
+    def _person(self, table, number, is_patient=False, is_caregiver=False):
+        state, city = STATES[self.random.randrange(len(STATES))]
+        age = self.random.randint(2, 17) if is_patient else self.random.randint(22, 70)
+        name = f'{self.random.choice(FIRST_NAMES)} {self.random.choice(LAST_NAMES)} {self.random.choice(LAST_NAMES)}'
+        key = f'{self.prefix}{table[0]}{number}'
+        self.people += 1
+        return Person(
+            name=name,
+            cpf=make_cpf(self.start + self.people),
+            email=f'{key}@example.com',
+            phone=key,
+            birth_date=self.today - timedelta(days=age * 365 + self.random.randrange(365)),
+            gender=self.random.choice(('Masculino', 'Feminino')),
+            cid=self.random.choice(CIDS) if is_patient else None,
+            state=state,
+            city=city,
+            is_patient=is_patient,
+            is_caregiver=is_caregiver,
+            created_by=self.user,
+        )
+
+    def _create_people(self, table, total, **flags):
+        return self._bulk_create(table, Person, (self._person(table, number, **flags) for number in range(total)))
+
+    def _insert_rows(self, table, model, fields, rows):
+        """
+        Grava tuplas já no formato do banco com executemany, em lotes. Usado
+        na tabela de vínculos (milhões de linhas), em que montar um objeto e
+        compilar o INSERT por linha no bulk_create custa mais que o banco.
+        """
+        columns = [model._meta.get_field(name).column for name in fields]
+        sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            connection.ops.quote_name(model._meta.db_table),
+            ', '.join(connection.ops.quote_name(column) for column in columns),
+            ', '.join(['%s'] * len(columns)),
+        )
+        created = 0
+        for chunk in _chunks(rows, self.chunk_size):
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, chunk)
+            created += len(chunk)
+            self._progress(table, created)
+        self.report[table] = created
+
+    def _create_links(self, patient_ids, pictogram_ids):
+        defaults = pictogram_ids[:self.defaults]
+        others = pictogram_ids[self.defaults:]
+        # Lei de Zipf: o pictograma de posição k é escolhido com peso 1/k
+        cumulative = []
+        total = 0.0
+        for rank in range(1, len(others) + 1):
+            total += 1 / rank
+            cumulative.append(total)
+
+        adapt = connection.ops.adapt_datetimefield_value
+        now = timezone.now()
+        created_at = adapt(now)
+        # Último uso nos últimos 90 dias, de uma lista já convertida para o banco
+        last_used = [adapt(now - timedelta(minutes=self.random.randrange(90 * 24 * 60))) for _ in range(4096)]
+        user_id = self.user.pk if self.user else None
+
+        def rows():
+            for patient_id in patient_ids:
+                chosen = set(defaults)
+                wanted = self._count(self.links, minimum=len(defaults), maximum=len(pictogram_ids))
+                extra = wanted - len(chosen)
+                if extra > 0 and others:
+                    sample = self.random.choices(others, cum_weights=cumulative, k=extra * 2)
+                    for pictogram_id in sample:
+                        if len(chosen) >= wanted:
+                            break
+                        chosen.add(pictogram_id)
+                    while len(chosen) < wanted:
+                        chosen.add(self.random.choice(others))
+                for pictogram_id in chosen:
+                    used = self.random.random() < 0.6
+                    yield (
+                        patient_id,
+                        pictogram_id,
+                        self.random.uniform(0, 20) if used else None,
+                        '{}',
+                        self.random.choice(last_used) if used else None,
+                        True,
+                        created_at,
+                        created_at,
+                        user_id,
+                    )
+
+        self._insert_rows('patient_pictograms', PatientPictogram, (
+            'patient', 'pictogram', 'rank_score', 'daypart_rank_scores', 'last_used_at',
+            'is_active', 'created_at', 'updated_at', 'created_by',
+        ), rows())
+
+    def _create_relationships(self, patient_ids, caregiver_ids):
+        pairs = []
+
+        def rows():
+            for patient_id in patient_ids:
+                for caregiver_id in set(self.random.choices(caregiver_ids, k=self.random.choice((1, 1, 1, 2, 2, 3)))):
+                    pairs.append((patient_id, caregiver_id))
+                    yield PatientCaregiverRelationship(
+                        patient_id=patient_id,
+                        caregiver_id=caregiver_id,
+                        relationship_type=self.random.choice(RELATIONSHIP_TYPES),
+                        start_date=self.today - timedelta(days=self.random.randrange(5 * 365)),
+                        created_by=self.user,
+                    )
+
+        self._bulk_create('relationships', PatientCaregiverRelationship, rows())
+        return pairs
+
+    def _create_histories(self, pairs):
+        by_patient = {}
+        for patient_id, caregiver_id in pairs:
+            by_patient.setdefault(patient_id, []).append(caregiver_id)
+        patients = []  # Paciente de cada histórico, na ordem de criação
+
+        def rows():
+            for patient_id, caregivers in by_patient.items():
+                for number in range(self._count(self.histories, sigma=0.9)):
+                    patients.append(patient_id)
+                    yield History(
+                        patient_id=patient_id,
+                        caregiver_id=self.random.choice(caregivers),
+                        description=f'Registro {number + 1}: atividade de comunicação com pranchas.',
+                        created_by=self.user,
+                    )
+
+        return list(zip(self._bulk_create('histories', History, rows()), patients))
+
+    def _create_attachments(self, histories):
+        def rows():
+            for history_id, patient_id in histories:
+                if self.random.random() >= self.attachments:
+                    continue
+                extension = self.random.choice(ATTACHMENT_EXTENSIONS)
+                yield Attachment(
+                    name=f'Anexo {history_id}.{extension}',
+                    file=f'anexos/{self.prefix}-{history_id}.{extension}',
+                    patient_id=patient_id,
+                    history_id=history_id,
+                    created_by=self.user,
+                )
+
+        self._bulk_create('attachments', Attachment, rows())
+
+    def _create_anamneses(self, pairs):
+        def rows():
+            seen = set()
+            for patient_id, caregiver_id in pairs:
+                if patient_id in seen or self.random.random() >= self.anamnesis:
+                    continue
+                seen.add(patient_id)
+                yield Anamnesis(
+                    patient_id=patient_id,
+                    caregiver_id=caregiver_id,
+                    main_diagnosis=self.random.choice(CIDS),
+                    uses_gestures=self.random.random() < 0.7,
+                    uses_images_or_symbols=self.random.random() < 0.8,
+                    created_by=self.user,
+                )
+
+        self._bulk_create('anamneses', Anamnesis, rows())
@@ -0,0 +1,183 @@
+"""
+Conferência dos arquivos de mídia com os campos de arquivo do banco.
+
+Uma única passada com os.scandir por MEDIA_ROOT (sem os.path.exists ou
+getsize por arquivo) é cruzada com os nomes gravados em Pictogram.image,
+Pictogram.audio, Attachment.file e Attachment.preview. O relatório aponta:
+
+- órfãos: arquivos que nenhum registro referencia;
+- ausentes: registros cujo arquivo não existe;
+- vazios: arquivos referenciados com 0 bytes (upload interrompido);
+- hash divergente (opcional, lê os arquivos): nomes com o hash do conteúdo
+  (smart_caa.storage) cujo conteúdo não bate mais com o nome.
+
+O último relatório é gravado em um arquivo JSON (REPORT_PATH), e não no
+cache: assim o relatório do `manage.py scan_media` continua disponível para
+o admin e o debug_media_files depois que o comando termina, em qualquer
+worker.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.utils import timezone
+
+from ..models import Attachment, Pictogram
+from ..storage import HASH_LENGTH, HASHED_NAME
+
+
+# modelo -> campos de arquivo conferidos
+FILE_FIELDS = (
+    (Pictogram, ('image', 'audio')),
+    (Attachment, ('file', 'preview')),
+)
+
+
+def get_media_scan_settings():
+    """
+    Retorna as configurações da conferência de mídia com valores padrão
+    """
+    defaults = {
+        'REPORT_PATH': os.path.join(settings.BASE_DIR, 'cache', 'media_scan.json'),  # Último relatório
+        'REPORT_LIMIT': 1000,  # Itens guardados por lista (os totais são sempre completos)
+        'IGNORED_DIRS': ['tts'],  # Caches gerados, sem registro no banco (relativos a MEDIA_ROOT)
+    }
+    defaults.update(getattr(settings, 'MEDIA_SCAN_SETTINGS', {}))
+    return defaults
+
+
+def scan_files(root, ignored_dirs=()):
+    """
+    {nome relativo com '/': tamanho} de todos os arquivos sob root
+    """
+    files = {}
+    ignored = {name.strip('/') for name in ignored_dirs}
+    pending = [('', root)]
+    while pending:
+        prefix, directory = pending.pop()
+        try:
+            entries = os.scandir(directory)
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                name = prefix + entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    if name not in ignored:
+                        pending.append((name + '/', entry.path))
+                elif entry.is_file():
+                    files[name] = entry.stat().st_size
+    return files
+
+
+def _content_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as content:
+        for chunk in iter(lambda: content.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+class MediaScanner:
+    """
+    Cruza os arquivos de MEDIA_ROOT com os campos de FILE_FIELDS.
+
+    `verify_hashes` relê os arquivos com hash no nome para conferir o
+    conteúdo (lento: lê todos eles).
+    """
+
+    def __init__(self, verify_hashes=False, storage=default_storage):
+        if not isinstance(storage, FileSystemStorage):
+            raise ImproperlyConfigured('A conferência de mídia só funciona com o storage de arquivos local.')
+        self.storage = storage
+        self.verify_hashes = verify_hashes
+        self.settings = get_media_scan_settings()
+
+    def references(self):
+        """
+        {nome do arquivo: [(modelo.campo, pk), ...]} de todos os registros
+        """
+        references = {}
+        for model, fields in FILE_FIELDS:
+            for field_name in fields:
+                label = f'{model.__name__}.{field_name}'
+                rows = model.objects.exclude(**{f'{field_name}__isnull': True}).exclude(**{field_name: ''})
+                for pk, name in rows.values_list('pk', field_name).iterator(chunk_size=5000):
+                    references.setdefault(name, []).append((label, pk))
+        return references
+
+    def run(self):
+        started = time.perf_counter()
+        files = scan_files(self.storage.location, self.settings['IGNORED_DIRS'])
+        references = self.references()
+        limit = self.settings['REPORT_LIMIT']
+
+        orphans = sorted(name for name in files if name not in references)
+        missing = sorted(name for name in references if name not in files)
+        empty = sorted(name for name in references if files.get(name) == 0)
+        hash_mismatches = []
+        if self.verify_hashes:
+            for name in sorted(references):
+                match = HASHED_NAME.search(name)
+                if match and files.get(name) and _content_hash(self.storage.path(name)) != match.group(1):
+                    hash_mismatches.append(name)
+
+        def referenced(names):
+            return [
+                {'path': name, 'records': [f'{label} #{pk}' for label, pk in references[name]]}
+                for name in names[:limit]
+            ]
+
+        return {
+            'scanned_at': timezone.now().isoformat(),
+            'seconds': round(time.perf_counter() - started, 3),
+            'media_root': str(self.storage.location),
+            'total_files': len(files),
+            'total_bytes': sum(files.values()),
+            'referenced_files': len(references),
+            'orphan_count': len(orphans),
+            'orphan_bytes': sum(files[name] for name in orphans),
+            'missing_count': len(missing),
+            'empty_count': len(empty),
+            'hash_mismatch_count': len(hash_mismatches) if self.verify_hashes else None,
+            'orphans': [{'path': name, 'size': files[name]} for name in orphans[:limit]],
+            'missing': referenced(missing),
+            'empty': referenced(empty),
+            'hash_mismatches': referenced(hash_mismatches),
+        }
+
+
+def scan_media(verify_hashes=False):
+    """
+    Executa a conferência e grava o relatório em REPORT_PATH
+    """
+    report = MediaScanner(verify_hashes=verify_hashes).run()
+    path = get_media_scan_settings()['REPORT_PATH']
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    # Temporário + os.replace: quem lê nunca vê um relatório pela metade
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as tmp:
+            json.dump(report, tmp, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return report
+
+
+def last_report():
+    """
+    Último relatório gravado pelo scan_media, ou None
+    """
+    try:
+        with open(get_media_scan_settings()['REPORT_PATH'], encoding='utf-8') as source:
+            return json.load(source)
+    except (FileNotFoundError, ValueError):
+        return None
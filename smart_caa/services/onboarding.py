@@ -0,0 +1,255 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from ..models import PatientCaregiverRelationship, Person
+from ..password_hashing import hash_passwords
+from .default_pictograms import link_default_pictograms_to_patients
+from .registration import cpf_variants, probe_registration
+
+
+def get_onboarding_settings():
+    """
+    Retorna os limites do cadastro em lote com valores padrão
+    """
+    defaults = {
+        'MAX_PEOPLE': 500,  # Pessoas por requisição
+        'MAX_RELATIONSHIPS': 1000,  # Relacionamentos por requisição
+    }
+    defaults.update(getattr(settings, 'ONBOARDING_SETTINGS', {}))
+    return defaults
+
+
+class BulkOnboarding:
+    """
+    Cadastro em lote de pacientes, cuidadores e seus relacionamentos.
+
+    Cada linha chega já validada campo a campo (dicts de validated_data ou
+    erros). A unicidade é verificada para o lote todo com uma consulta, as
+    senhas são processadas no pool de hash e tudo é gravado com bulk_create
+    em uma transação. Linhas com erro não impedem as demais; o resultado
+    traz o status de cada linha.
+    """
+
+    def __init__(self, people, relationships, created_by=None, dry_run=False):
+        # people/relationships: listas de (dados, erros); linhas com erro de
+        # campo chegam com os dados brutos (para o ref) e os erros do serializer
+        self.people = [
+            {'index': index, 'data': data, 'errors': errors, 'id': None}
+            for index, (data, errors) in enumerate(people)
+        ]
+        self.relationships = [
+            {'index': index, 'data': data, 'errors': errors, 'id': None}
+            for index, (data, errors) in enumerate(relationships)
+        ]
+        self.created_by = created_by
+        self.dry_run = dry_run
+        self.default_links = 0
+
+    def _valid(self, rows):
+        return [row for row in rows if not row['errors']]
+
+    def run(self):
+        self._check_people()
+        self._check_relationships()
+        if not self.dry_run:
+            self._create()
+        return self.report()
+
+    def _check_people(self):
+        rows = self._valid(self.people)
+        probe = probe_registration(
+            [cpf for row in rows for cpf in cpf_variants(row['data']['cpf'])],
+            emails=[row['data']['email'] for row in rows],
+            phones=[row['data']['phone'] for row in rows],
+            usernames=[cpf_variants(row['data']['cpf'])[0] for row in rows],
+        )
+        taken = {
+            'cpf': {cpf for person in probe['people'] for cpf in cpf_variants(person['cpf'])},
+            'email': {person['email'] for person in probe['people']} | {user['email'] for user in probe['users']},
+            'phone': {person['phone'] for person in probe['people']},
+            'username': {user['username'] for user in probe['users']},
+        }
+        seen = {'cpf': {}, 'email': {}, 'phone': {}, 'ref': {}}
+
+        for row in rows:
+            data = row['data']
+            errors = {}
+            if data['cpf'] in taken['cpf']:
+                errors['cpf'] = ['Já existe uma pessoa cadastrada com este CPF.']
+            elif cpf_variants(data['cpf'])[0] in taken['username']:
+                errors['cpf'] = ['Já existe um usuário cadastrado com este CPF.']
+            if data['email'] in taken['email']:
+                errors['email'] = ['Já existe uma pessoa ou usuário cadastrado com este e-mail.']
+            if data['phone'] in taken['phone']:
+                errors['phone'] = ['Já existe uma pessoa cadastrada com este telefone.']
+
+            for field in ('cpf', 'email', 'phone', 'ref'):
+                value = data.get(field)
+                if value is None or field in errors:
+                    continue
+                if value in seen[field]:
+                    errors[field] = [f'Valor repetido no lote (linha {seen[field][value]}).']
+                else:
+                    seen[field][value] = row['index']
+            row['errors'] = errors
+
+    def _check_relationships(self):
+        people_by_ref = {}
+        for row in self.people:
+            if row['data'].get('ref'):
+                # Com ref repetido vale a primeira linha; as demais já têm erro
+                people_by_ref.setdefault(row['data']['ref'], row)
+        rows = self._valid(self.relationships)
+        existing_ids = {
+            value for row in rows for kind, value in (row['data']['patient'], row['data']['caregiver']) if kind == 'id'
+        }
+        existing = {
+            person['id']: person
+            for person in Person.objects.filter(id__in=existing_ids).values('id', 'is_patient', 'is_caregiver')
+        }
+        active_pairs = set(
+            PatientCaregiverRelationship.objects.filter(
+                patient_id__in=existing_ids,
+                caregiver_id__in=existing_ids,
+                is_active=True,
+                inactivated_at__isnull=True,
+            ).values_list('patient_id', 'caregiver_id')
+        )
+        seen = {}
+
+        for row in rows:
+            errors = {}
+            ends = {}
+            for field, flag, label in (('patient', 'is_patient', 'paciente'), ('caregiver', 'is_caregiver', 'cuidador')):
+                kind, value = row['data'][field]
+                if kind == 'ref':
+                    person = people_by_ref.get(value)
+                    if person is None:
+                        errors[field] = [f'Nenhuma pessoa do lote com ref "{value}".']
+                    elif person['errors']:
+                        errors[field] = [f'A pessoa "{value}" (linha {person["index"]}) não pode ser cadastrada.']
+                    elif not person['data'].get(flag):
+                        errors[field] = [f'A pessoa "{value}" deve estar marcada como {label}.']
+                    else:
+                        ends[field] = ('ref', person['index'])
+                else:
+                    person = existing.get(value)
+                    if person is None:
+                        errors[field] = [f'Pessoa com ID {value} não encontrada.']
+                    elif not person[flag]:
+                        errors[field] = [f'A pessoa selecionada deve estar marcada como {label}.']
+                    else:
+                        ends[field] = ('id', value)
+
+            if not errors:
+                pair = (ends['patient'], ends['caregiver'])
+                if ends['patient'] == ends['caregiver']:
+                    errors['non_field_errors'] = ['Uma pessoa não pode ser paciente e cuidador de si mesma.']
+                elif ends['patient'][0] == ends['caregiver'][0] == 'id' and (
+                    (ends['patient'][1], ends['caregiver'][1]) in active_pairs
+                ):
+                    errors['non_field_errors'] = [
+                        'Já existe um vínculo ativo entre estas pessoas. Inative o vínculo anterior antes de criar um novo.'
+                    ]
+                elif pair in seen:
+                    errors['non_field_errors'] = [f'Relacionamento repetido no lote (linha {seen[pair]}).']
+                else:
+                    seen[pair] = row['index']
+                    row['ends'] = ends
+            row['errors'] = errors
+
+    def _create(self):
+        people = self._valid(self.people)
+        relationships = self._valid(self.relationships)
+        if not people and not relationships:
+            return
+        # Hash fora da transação: é a etapa mais lenta e não toca o banco
+        hashes = hash_passwords(row['data']['password'] for row in people)
+        with transaction.atomic():
+            if people:
+                self._insert_people(people, hashes)
+            self._insert_relationships(relationships)
+
+    def _insert_people(self, people, hashes):
+        users = []
+        for row, password in zip(people, hashes):
+            data = row['data']
+            names = data['name'].split()
+            users.append(User(
+                username=cpf_variants(data['cpf'])[0],
+                email=User.objects.normalize_email(data['email']),
+                password=password,
+                first_name=names[0] if names else '',
+                last_name=' '.join(names[1:]),
+            ))
+        User.objects.bulk_create(users)
+        if any(user.pk is None for user in users):
+            # Bancos sem RETURNING no INSERT em lote: busca os IDs pelo username
+            ids = dict(User.objects.filter(username__in=[user.username for user in users]).values_list('username', 'id'))
+            for user in users:
+                user.pk = ids[user.username]
+
+        persons = []
+        for row, user in zip(people, users):
+            data = {field: value for field, value in row['data'].items() if field not in ('ref', 'password')}
+            persons.append(Person(**data, user=user, created_by=self.created_by))
+        Person.objects.bulk_create(persons)
+        if any(person.pk is None for person in persons):
+            ids = dict(Person.objects.filter(user__in=users).values_list('user_id', 'id'))
+            for person in persons:
+                person.pk = ids[person.user_id]
+        for row, person in zip(people, persons):
+            row['id'] = person.pk
+
+        self.default_links = link_default_pictograms_to_patients(
+            [person.pk for person in persons if person.is_patient],
+            self.created_by.id if self.created_by else None,
+        )
+
+    def _insert_relationships(self, relationships):
+        def resolve(end):
+            kind, value = end
+            return self.people[value]['id'] if kind == 'ref' else value
+
+        links = [
+            PatientCaregiverRelationship(
+                patient_id=resolve(row['ends']['patient']),
+                caregiver_id=resolve(row['ends']['caregiver']),
+                relationship_type=row['data']['relationship_type'],
+                start_date=row['data']['start_date'],
+                notes=row['data'].get('notes'),
+                created_by=self.created_by,
+            )
+            for row in relationships
+        ]
+        PatientCaregiverRelationship.objects.bulk_create(links)
+        for row, link in zip(relationships, links):
+            row['id'] = link.pk
+
+    def report(self):
+        success = 'valid' if self.dry_run else 'created'
+
+        def rows(items, extra=lambda row: {}):
+            return [
+                {
+                    'index': row['index'],
+                    **extra(row),
+                    'status': 'error' if row['errors'] else success,
+                    'id': row['id'],
+                    'errors': row['errors'] or None,
+                }
+                for row in items
+            ]
+
+        return {
+            'dry_run': self.dry_run,
+            'people': rows(self.people, lambda row: {'ref': row['data'].get('ref')}),
+            'relationships': rows(self.relationships),
+            'summary': {
+                'people': len(self._valid(self.people)),
+                'relationships': len(self._valid(self.relationships)),
+                'errors': sum(1 for row in self.people + self.relationships if row['errors']),
+                'default_pictograms_linked': self.default_links,
+            },
+        }
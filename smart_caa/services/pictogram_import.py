@@ -0,0 +1,342 @@
+import csv
+import io
+import json
+import os
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from PIL import Image
+
+from ..models import EverydayCategory, Pictogram
+from .default_pictograms import default_pictograms
+
+
+METADATA_FILENAMES = ('pictograms.csv', 'pictograms.json', 'metadata.csv', 'metadata.json')
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp'}
+AUDIO_EXTENSIONS = {'.mp3', '.wav', '.m4a', '.ogg'}
+TRUE_VALUES = {'1', 'true', 'sim', 's', 'yes', 'y', 'x'}
+
+
+def get_import_settings():
+    """
+    Retorna as configurações da importação de pictogramas com valores padrão
+    """
+    defaults = {
+        'WORKERS': min(8, (os.cpu_count() or 1) * 2),  # Threads que validam e gravam os arquivos
+        'CHUNK_SIZE': 500,  # Pictogramas gravados por transação
+        'MAX_IMAGE_SIZE': 5 * 1024 * 1024,
+        'MAX_AUDIO_SIZE': 10 * 1024 * 1024,
+        'MAX_IMAGE_PIXELS': 4096 * 4096,
+    }
+    defaults.update(getattr(settings, 'PICTOGRAM_IMPORT_SETTINGS', {}))
+    return defaults
+
+
+class PictogramImportError(Exception):
+    """
+    Erro que impede a importação inteira (arquivo ou metadados ilegíveis)
+    """
+
+
+def _parse_bool(value):
+    return str(value or '').strip().lower() in TRUE_VALUES
+
+
+def read_import_metadata(archive, metadata=None):
+    """
+    Lê as linhas de metadados do CSV ou JSON informado ou, se não houver,
+    do arquivo de metadados dentro do ZIP.
+
+    Colunas: name, category, image, audio (opcional), description (opcional),
+    private e is_default (opcionais). Retorna uma lista de dicts com `row`.
+    """
+    if metadata:
+        with open(metadata, 'rb') as source:
+            raw, filename = source.read(), metadata
+    else:
+        names = {os.path.basename(name).lower(): name for name in archive.namelist()}
+        filename = next((names[name] for name in METADATA_FILENAMES if name in names), None)
+        if filename is None:
+            raise PictogramImportError(
+                f'Arquivo de metadados não encontrado no ZIP. Use um destes nomes: {", ".join(METADATA_FILENAMES)}.'
+            )
+        raw = archive.read(filename)
+
+    try:
+        text = raw.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        text = raw.decode('latin-1')
+
+    if filename.lower().endswith('.json'):
+        try:
+            data = json.loads(text)
+        except ValueError as e:
+            raise PictogramImportError(f'JSON de metadados inválido: {e}')
+        if isinstance(data, dict):
+            data = data.get('pictograms', [])
+        if not isinstance(data, list):
+            raise PictogramImportError('O JSON de metadados deve ser uma lista de pictogramas.')
+        rows = [item if isinstance(item, dict) else {} for item in data]
+        first_row = 1
+    else:
+        try:
+            dialect = csv.Sniffer().sniff(text[:4096], delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        rows = list(csv.DictReader(io.StringIO(text), dialect=dialect))
+        first_row = 2  # A linha 1 é o cabeçalho
+
+    return [
+        {
+            'row': number,
+            'name': str(item.get('name') or '').strip(),
+            'category': str(item.get('category') or '').strip(),
+            'image': str(item.get('image') or '').strip(),
+            'audio': str(item.get('audio') or '').strip(),
+            'description': str(item.get('description') or '').strip(),
+            'private': _parse_bool(item.get('private')),
+            'is_default': _parse_bool(item.get('is_default')),
+        }
+        for number, item in enumerate(rows, start=first_row)
+    ]
+
+
+class PictogramImporter:
+    """
+    Importa pictogramas em lote a partir de um ZIP com imagens, áudios e
+    metadados.
+
+    Categorias ausentes são criadas de uma vez; pictogramas cujo par
+    (nome, categoria) já existe são pulados, o que torna a importação
+    retomável: rodar de novo o mesmo arquivo continua de onde parou. Os
+    arquivos são validados e gravados por um pool de threads, e os
+    registros entram com bulk_create em blocos, cada um em sua transação.
+    """
+
+    def __init__(self, archive_path, metadata=None, user=None, workers=None, chunk_size=None, dry_run=False):
+        import_settings = get_import_settings()
+        self.archive_path = archive_path
+        self.metadata = metadata
+        self.user = user
+        self.workers = workers or import_settings['WORKERS']
+        self.chunk_size = chunk_size or import_settings['CHUNK_SIZE']
+        self.dry_run = dry_run
+        self.settings = import_settings
+        self._local = threading.local()
+        self._archives = []
+        self.report = {
+            'total': 0,
+            'created': 0,
+            'skipped': 0,
+            'categories_created': 0,
+            'errors': [],
+        }
+
+    def _error(self, row, message):
+        self.report['errors'].append({'row': row['row'], 'name': row['name'], 'error': message})
+
+    def _archive(self):
+        # ZipFile compartilhado entre threads disputa a mesma posição de leitura
+        archive = getattr(self._local, 'archive', None)
+        if archive is None:
+            archive = self._local.archive = zipfile.ZipFile(self.archive_path)
+            self._archives.append(archive)
+        return archive
+
+    def run(self, progress=None):
+        try:
+            with zipfile.ZipFile(self.archive_path) as archive:
+                rows = read_import_metadata(archive, self.metadata)
+                members = set(archive.namelist())
+        except (OSError, zipfile.BadZipFile) as e:
+            raise PictogramImportError(f'Não foi possível abrir o arquivo ZIP: {e}')
+
+        self.report['total'] = len(rows)
+        rows = self._validate_rows(rows, members)
+        categories = self._ensure_categories({row['category'] for row in rows})
+        rows = self._skip_existing(rows, categories)
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                for start in range(0, len(rows), self.chunk_size):
+                    chunk = rows[start:start + self.chunk_size]
+                    prepared = [
+                        (row, files)
+                        for row, files in zip(chunk, executor.map(self._prepare_files, chunk))
+                        if files is not None
+                    ]
+                    self._create_chunk(prepared, categories)
+                    if progress:
+                        progress(min(start + self.chunk_size, len(rows)), len(rows))
+        finally:
+            for archive in self._archives:
+                archive.close()
+
+        self.report['errors'].sort(key=lambda error: error['row'])
+        return self.report
+
+    def _validate_rows(self, rows, members):
+        valid = []
+        seen = set()
+        name_length = Pictogram._meta.get_field('name').max_length
+        category_length = EverydayCategory._meta.get_field('name').max_length
+
+        for row in rows:
+            if not row['name'] or not row['category'] or not row['image']:
+                self._error(row, 'Os campos name, category e image são obrigatórios.')
+            elif len(row['name']) > name_length:
+                self._error(row, f'O nome deve ter no máximo {name_length} caracteres.')
+            elif len(row['category']) > category_length:
+                self._error(row, f'A categoria deve ter no máximo {category_length} caracteres.')
+            elif row['image'] not in members:
+                self._error(row, f'Imagem "{row["image"]}" não encontrada no ZIP.')
+            elif row['audio'] and row['audio'] not in members:
+                self._error(row, f'Áudio "{row["audio"]}" não encontrado no ZIP.')
+            elif (row['name'].lower(), row['category'].lower()) in seen:
+                self._error(row, 'Pictograma repetido no arquivo (mesmo nome e categoria).')
+            else:
+                seen.add((row['name'].lower(), row['category'].lower()))
+                valid.append(row)
+        return valid
+
+    def _ensure_categories(self, names):
+        """
+        Retorna {nome em minúsculas: id} das categorias, criando as que faltam
+        de uma vez. "alimentos" e "Alimentos" são a mesma categoria
+        """
+        # Filtra no Python: o LOWER do SQLite ignora letras acentuadas
+        wanted = {}
+        for name in sorted(names):
+            wanted.setdefault(name.lower(), name)
+        categories = self._categories_by_lower(wanted)
+        missing = [name for key, name in wanted.items() if key not in categories]
+        if missing and not self.dry_run:
+            EverydayCategory.objects.bulk_create(
+                [EverydayCategory(name=name, created_by=self.user) for name in missing],
+                ignore_conflicts=True,
+            )
+            categories = self._categories_by_lower(wanted)
+        self.report['categories_created'] = len(missing)
+        return categories
+
+    def _categories_by_lower(self, wanted):
+        return {
+            name.lower(): category_id
+            for name, category_id in EverydayCategory.objects.values_list('name', 'id')
+            if name.lower() in wanted
+        }
+
+    def _skip_existing(self, rows, categories):
+        # Sem diferenciar maiúsculas, como na checagem de repetidos do arquivo.
+        # O lower() é o do Python: o LOWER do SQLite ignora letras acentuadas
+        existing = {
+            (name.lower(), category_id)
+            for name, category_id in Pictogram.objects.filter(
+                category_id__in=categories.values()
+            ).values_list('name', 'category_id')
+        }
+        pending = []
+        for row in rows:
+            if (row['name'].lower(), categories.get(row['category'].lower())) in existing:
+                self.report['skipped'] += 1
+            else:
+                pending.append(row)
+        return pending
+
+    def _read_member(self, name, max_size, kind):
+        info = self._archive().getinfo(name)
+        if info.file_size > max_size:
+            raise ValueError(f'{kind} maior que o limite de {max_size // (1024 * 1024)}MB.')
+        return self._archive().read(name)
+
+    def _prepare_files(self, row):
+        """
+        Valida e grava os arquivos de uma linha (executado no pool).
+
+        Retorna {'image': nome, 'audio': nome} no storage ou None em caso de erro.
+        """
+        stored = []
+        try:
+            extension = os.path.splitext(row['image'])[1].lower()
+            if extension not in IMAGE_EXTENSIONS:
+                raise ValueError(f'Formato de imagem não suportado: {extension or "sem extensão"}.')
+            content = self._read_member(row['image'], self.settings['MAX_IMAGE_SIZE'], 'Imagem')
+            with Image.open(io.BytesIO(content)) as image:
+                if image.width * image.height > self.settings['MAX_IMAGE_PIXELS']:
+                    raise ValueError('Imagem com resolução acima do limite.')
+                image.verify()
+
+            audio = None
+            if row['audio']:
+                audio_extension = os.path.splitext(row['audio'])[1].lower()
+                if audio_extension not in AUDIO_EXTENSIONS:
+                    raise ValueError(f'Formato de áudio não suportado: {audio_extension or "sem extensão"}.')
+                audio = self._read_member(row['audio'], self.settings['MAX_AUDIO_SIZE'], 'Áudio')
+
+            if self.dry_run:
+                return {'image': row['image'], 'audio': row['audio'] or None}
+
+            files = {'image': self._save(Pictogram._meta.get_field('image'), row['image'], content), 'audio': None}
+            stored.append(files['image'])
+            if audio is not None:
+                files['audio'] = self._save(Pictogram._meta.get_field('audio'), row['audio'], audio)
+                stored.append(files['audio'])
+            return files
+        except Exception as e:
+            for name in stored:
+                default_storage.delete(name)
+            message = str(e) if isinstance(e, ValueError) else f'Arquivo inválido ({e.__class__.__name__}).'
+            self._error(row, message)
+            return None
+
+    def _save(self, field, member, content):
+        name = field.generate_filename(None, os.path.basename(member))
+        return field.storage.save(name, ContentFile(content))
+
+    def _build(self, row, files, categories):
+        return Pictogram(
+            name=row['name'],
+            category_id=categories[row['category'].lower()],
+            description=row['description'] or None,
+            image=files['image'],
+            audio=files['audio'],
+            private=row['private'],
+            is_default=row['is_default'],
+            created_by=self.user,
+        )
+
+    def _create_chunk(self, prepared, categories):
+        if not prepared:
+            return
+        if self.dry_run:
+            self.report['created'] += len(prepared)
+            return
+        if any(row['is_default'] for row, _ in prepared):
+            # bulk_create não dispara os signals que invalidam o conjunto padrão
+            default_pictograms.invalidate_on_commit()
+
+        try:
+            with transaction.atomic():
+                Pictogram.objects.bulk_create([self._build(row, files, categories) for row, files in prepared])
+            self.report['created'] += len(prepared)
+            return
+        except IntegrityError:
+            pass
+
+        # Outro processo criou algum dos pictogramas no meio do caminho:
+        # grava linha a linha para isolar os conflitos
+        for row, files in prepared:
+            try:
+                with transaction.atomic():
+                    self._build(row, files, categories).save()
+                self.report['created'] += 1
+            except IntegrityError:
+                self.report['skipped'] += 1
+                for name in files.values():
+                    if name:
+                        default_storage.delete(name)
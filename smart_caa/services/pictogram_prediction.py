@@ -0,0 +1,327 @@
+import logging
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from ..models import PictogramUsageEvent
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_prediction_settings():
+    """
+    Retorna as configurações da predição de pictogramas com valores padrão
+    """
+    defaults = {
+        'ORDER': 2,  # Quantidade de pictogramas anteriores considerados no contexto
+        'SESSION_GAP_SECONDS': 120,  # Intervalo que separa uma frase da seguinte
+        'BACKOFF_FACTOR': 0.4,  # Peso aplicado a cada contexto mais curto
+        'GLOBAL_WEIGHT': 0.3,  # Peso do modelo global quando complementa o do paciente
+        'MAX_EVENTS_PER_PATIENT': 20000,  # Eventos usados para treinar o modelo do paciente
+        'GLOBAL_MAX_EVENTS': 200000,  # Eventos recentes usados para treinar o modelo global
+        'MAX_CACHED_PATIENTS': 1000,  # Modelos de pacientes mantidos em memória
+        'MODEL_TTL_SECONDS': 300,  # Após esse tempo o modelo busca no banco os eventos novos
+        'REBUILD_SECONDS': 3600,  # Após esse tempo o modelo é refeito com os eventos mais recentes
+        'BACKGROUND_REFRESH': True,  # False: atualiza na própria requisição (testes, scripts)
+    }
+    defaults.update(getattr(settings, 'PICTOGRAM_PREDICTION_SETTINGS', {}))
+    return defaults
+
+
+class NGramModel:
+    """
+    Modelo de Markov com backoff sobre sequências de pictogramas.
+
+    Guarda apenas contagens: para cada contexto (tupla com até `order` IDs
+    anteriores, incluindo o contexto vazio) um dict {próximo ID: contagem}.
+
+    `last_event_id` é o maior ID de evento lido do banco; `observed_ids`
+    guarda os eventos acima dele já recebidos no próprio processo, para não
+    contá-los de novo na próxima atualização.
+    """
+    __slots__ = (
+        'order', 'session_gap', 'transitions', 'totals', 'tail', 'last_seen',
+        'last_event_id', 'observed_ids', 'built_at', 'refreshed_at', 'refreshing',
+    )
+
+    def __init__(self, order, session_gap):
+        self.order = order
+        self.session_gap = session_gap
+        self.transitions = defaultdict(dict)
+        self.totals = defaultdict(int)
+        self.tail = ()
+        self.last_seen = None
+        self.last_event_id = 0
+        self.observed_ids = set()
+        self.built_at = self.refreshed_at = time.monotonic()
+        self.refreshing = False
+
+    def observe(self, pictogram_id, occurred_at):
+        """
+        Acrescenta um toque ao modelo, continuando a frase atual ou iniciando outra
+        """
+        if self.last_seen is None or (occurred_at - self.last_seen).total_seconds() > self.session_gap:
+            self.tail = ()
+        elif occurred_at < self.last_seen:
+            # Toque fora de ordem: não há como encaixá-lo na frase atual
+            return
+
+        for size in range(min(len(self.tail), self.order) + 1):
+            context = self.tail[len(self.tail) - size:]
+            counts = self.transitions[context]
+            counts[pictogram_id] = counts.get(pictogram_id, 0) + 1
+            self.totals[context] += 1
+
+        self.tail = (self.tail + (pictogram_id,))[-self.order:]
+        self.last_seen = occurred_at
+
+    def predict(self, after):
+        """
+        Retorna {ID: pontuação} para o próximo pictograma dado o histórico `after`
+        """
+        backoff = get_prediction_settings()['BACKOFF_FACTOR']
+        context = tuple(after)[-self.order:]
+        scores = {}
+        weight = 1.0
+        for size in range(len(context), -1, -1):
+            key = context[len(context) - size:]
+            counts = self.transitions.get(key)
+            if counts:
+                total = self.totals[key]
+                for pictogram_id, count in counts.items():
+                    score = weight * count / total
+                    if score > scores.get(pictogram_id, 0.0):
+                        scores[pictogram_id] = score
+            weight *= backoff
+        return scores
+
+
+class PictogramPredictor:
+    """
+    Mantém em memória os modelos por paciente e o modelo global.
+
+    Os modelos são carregados sob demanda a partir da telemetria e atualizados
+    incrementalmente a cada lote recebido neste processo. Depois de
+    MODEL_TTL_SECONDS o modelo continua respondendo enquanto busca, em uma
+    thread de fundo, só os eventos com ID maior que o último lido (gravados
+    por outros processos); depois de REBUILD_SECONDS é refeito do zero, para
+    voltar à janela de eventos mais recentes.
+
+    Toda leitura ou alteração das contagens acontece sob `_lock`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._patients = OrderedDict()
+        self._global = None
+        self._executor = None
+
+    def reset(self):
+        with self._lock:
+            self._patients.clear()
+            self._global = None
+
+    def _new_model(self):
+        prediction_settings = get_prediction_settings()
+        return NGramModel(prediction_settings['ORDER'], prediction_settings['SESSION_GAP_SECONDS'])
+
+    def _schedule_refresh(self, model, refresh):
+        """
+        Agenda a atualização de um modelo expirado (chamado sob `_lock`);
+        uma só por modelo de cada vez
+        """
+        prediction_settings = get_prediction_settings()
+        if model.refreshing or time.monotonic() - model.refreshed_at < prediction_settings['MODEL_TTL_SECONDS']:
+            return None
+        model.refreshing = True
+        if not prediction_settings['BACKGROUND_REFRESH']:
+            return refresh
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pictogram-prediction')
+        self._executor.submit(self._refresh_in_background, refresh)
+        return None
+
+    def _refresh_in_background(self, refresh):
+        close_old_connections()
+        try:
+            refresh()
+        except Exception:
+            logger.exception('Erro ao atualizar o modelo de predição de pictogramas')
+        finally:
+            close_old_connections()
+
+    def _is_expired(self, model):
+        return time.monotonic() - model.built_at >= get_prediction_settings()['REBUILD_SECONDS']
+
+    def _load_patient_model(self, patient_id):
+        limit = get_prediction_settings()['MAX_EVENTS_PER_PATIENT']
+        rows = list(
+            PictogramUsageEvent.objects.filter(patient_id=patient_id)
+            .order_by('-occurred_at', '-sequence')
+            .values_list('id', 'pictogram_id', 'occurred_at')[:limit]
+        )
+        model = self._new_model()
+        for event_id, pictogram_id, occurred_at in reversed(rows):
+            model.observe(pictogram_id, occurred_at)
+            model.last_event_id = max(model.last_event_id, event_id)
+        return model
+
+    def _store_patient_model(self, patient_id, model):
+        with self._lock:
+            self._patients[patient_id] = model
+            self._patients.move_to_end(patient_id)
+            while len(self._patients) > get_prediction_settings()['MAX_CACHED_PATIENTS']:
+                self._patients.popitem(last=False)
+
+    def _refresh_patient_model(self, patient_id, model):
+        try:
+            if self._is_expired(model):
+                self._store_patient_model(patient_id, self._load_patient_model(patient_id))
+                return
+
+            rows = list(
+                PictogramUsageEvent.objects.filter(patient_id=patient_id, id__gt=model.last_event_id)
+                .order_by('occurred_at', 'sequence')
+                .values_list('id', 'pictogram_id', 'occurred_at')
+            )
+            with self._lock:
+                for event_id, pictogram_id, occurred_at in rows:
+                    if event_id not in model.observed_ids:
+                        model.observe(pictogram_id, occurred_at)
+                    model.last_event_id = max(model.last_event_id, event_id)
+                model.observed_ids = {event_id for event_id in model.observed_ids if event_id > model.last_event_id}
+                model.refreshed_at = time.monotonic()
+        finally:
+            model.refreshing = False
+
+    def get_patient_model(self, patient_id):
+        with self._lock:
+            model = self._patients.get(patient_id)
+            if model is not None:
+                self._patients.move_to_end(patient_id)
+                refresh = self._schedule_refresh(model, lambda: self._refresh_patient_model(patient_id, model))
+        if model is None:
+            model = self._load_patient_model(patient_id)
+            self._store_patient_model(patient_id, model)
+        elif refresh is not None:
+            refresh()
+            with self._lock:
+                model = self._patients.get(patient_id, model)
+        return model
+
+    def _load_global_model(self):
+        limit = get_prediction_settings()['GLOBAL_MAX_EVENTS']
+        rows = list(
+            PictogramUsageEvent.objects.order_by('-id')
+            .values_list('id', 'patient_id', 'occurred_at', 'sequence', 'pictogram_id')[:limit]
+        )
+        model = self._new_model()
+        self._observe_global_rows(model, rows)
+        return model
+
+    def _observe_global_rows(self, model, rows):
+        """
+        Acrescenta eventos (id, paciente, momento, sequência, pictograma) ao
+        modelo global, frase a frase dentro de cada paciente
+        """
+        previous_patient = None
+        for event_id, patient_id, occurred_at, _sequence, pictogram_id in sorted(rows, key=lambda row: row[1:]):
+            if patient_id != previous_patient:
+                # Frases nunca atravessam pacientes diferentes
+                model.last_seen = None
+                previous_patient = patient_id
+            if event_id not in model.observed_ids:
+                model.observe(pictogram_id, occurred_at)
+            model.last_event_id = max(model.last_event_id, event_id)
+        # O contexto final não pertence a uma frase em andamento do modelo global
+        model.tail = ()
+        model.last_seen = None
+        model.observed_ids = {event_id for event_id in model.observed_ids if event_id > model.last_event_id}
+
+    def _refresh_global_model(self, model):
+        try:
+            if self._is_expired(model):
+                fresh = self._load_global_model()
+                with self._lock:
+                    self._global = fresh
+                return
+
+            rows = list(
+                PictogramUsageEvent.objects.filter(id__gt=model.last_event_id)
+                .values_list('id', 'patient_id', 'occurred_at', 'sequence', 'pictogram_id')
+            )
+            with self._lock:
+                self._observe_global_rows(model, rows)
+                model.refreshed_at = time.monotonic()
+        finally:
+            model.refreshing = False
+
+    def get_global_model(self):
+        with self._lock:
+            model = self._global
+            if model is not None:
+                refresh = self._schedule_refresh(model, lambda: self._refresh_global_model(model))
+        if model is None:
+            model = self._load_global_model()
+            with self._lock:
+                self._global = model
+        elif refresh is not None:
+            refresh()
+            with self._lock:
+                model = self._global or model
+        return model
+
+    def observe(self, patient_id, events):
+        """
+        Atualiza os modelos já carregados com um lote de toques recém-gravado.
+
+        Cada evento traz o `id` gravado; eventos sem ID ficam para a próxima
+        atualização pelo banco.
+        """
+        ordered = sorted(
+            (event for event in events if event.get('id') is not None),
+            key=lambda event: (event['occurred_at'], event['sequence']),
+        )
+        with self._lock:
+            models = [self._patients.get(patient_id), self._global]
+            for model in models:
+                if model is None:
+                    continue
+                if model is self._global:
+                    # Cada lote é tratado como uma frase própria no modelo global
+                    model.last_seen = None
+                for event in ordered:
+                    if event['id'] > model.last_event_id and event['id'] not in model.observed_ids:
+                        model.observe(event['pictogram_id'], event['occurred_at'])
+                        model.observed_ids.add(event['id'])
+                if model is self._global:
+                    model.last_seen = None
+
+    def predict(self, patient_id, after):
+        """
+        Combina o modelo do paciente com o modelo global.
+
+        Retorna {ID: (pontuação, origem)} sem filtrar pelos pictogramas da prancha.
+        """
+        global_weight = get_prediction_settings()['GLOBAL_WEIGHT']
+        patient_model = self.get_patient_model(patient_id)
+        global_model = self.get_global_model()
+        # As contagens mudam em outras threads (lotes recebidos, atualizações)
+        with self._lock:
+            patient_scores = patient_model.predict(after)
+            global_scores = global_model.predict(after)
+
+        results = {pictogram_id: (score, 'patient') for pictogram_id, score in patient_scores.items()}
+        for pictogram_id, score in global_scores.items():
+            score *= global_weight
+            if score > results.get(pictogram_id, (0.0, None))[0]:
+                results[pictogram_id] = (score, 'global')
+        return results
+
+
+predictor = PictogramPredictor()
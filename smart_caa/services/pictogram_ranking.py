@@ -0,0 +1,130 @@
+import math
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import F, FloatField
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from ..models import PatientPictogram
+
+
+# Época fixa usada como referência para as pontuações. Guardar a soma dos pesos
+# 2^((t - época) / meia-vida) em escala log2 faz com que a ordenação entre
+# pictogramas seja a mesma que a da frequência com decaimento em qualquer
+# instante, sem precisar reprocessar as linhas com o passar do tempo.
+RANKING_EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+
+DAYPARTS = ('night', 'morning', 'afternoon', 'evening')
+
+
+def get_ranking_settings():
+    """
+    Retorna as configurações do ranking com valores padrão
+    """
+    defaults = {
+        'HALF_LIFE_DAYS': 14,
+    }
+    defaults.update(getattr(settings, 'PICTOGRAM_RANKING_SETTINGS', {}))
+    return defaults
+
+
+def get_daypart(moment):
+    """
+    Período do dia (no fuso do sistema) em que o momento informado ocorreu
+    """
+    return DAYPARTS[timezone.localtime(moment).hour // 6]
+
+
+def log2_add(current, value):
+    """
+    Soma dois valores em escala log2: log2(2^current + 2^value)
+    """
+    if current is None:
+        return value
+    high, low = max(current, value), min(current, value)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def usage_weight(moment, half_life_seconds):
+    """
+    Peso (em escala log2) de um toque ocorrido no momento informado
+    """
+    return (moment - RANKING_EPOCH).total_seconds() / half_life_seconds
+
+
+def update_pictogram_ranking(patient_id, events):
+    """
+    Atualiza incrementalmente o ranking dos pictogramas ativos do paciente
+    a partir de um lote de toques (`pictogram_id` e `occurred_at`).
+
+    Deve ser chamada dentro da transação que grava os eventos.
+    """
+    half_life_seconds = get_ranking_settings()['HALF_LIFE_DAYS'] * 86400
+
+    overall = {}
+    dayparts = defaultdict(dict)
+    last_used = {}
+    for event in events:
+        pictogram_id = event['pictogram_id']
+        occurred_at = event['occurred_at']
+        weight = usage_weight(occurred_at, half_life_seconds)
+        daypart = get_daypart(occurred_at)
+
+        overall[pictogram_id] = log2_add(overall.get(pictogram_id), weight)
+        dayparts[pictogram_id][daypart] = log2_add(dayparts[pictogram_id].get(daypart), weight)
+        if pictogram_id not in last_used or occurred_at > last_used[pictogram_id]:
+            last_used[pictogram_id] = occurred_at
+
+    links = list(
+        PatientPictogram.objects.select_for_update().filter(
+            patient_id=patient_id,
+            pictogram_id__in=overall.keys(),
+            is_active=True,
+        ).only('id', 'pictogram_id', 'rank_score', 'daypart_rank_scores', 'last_used_at')
+    )
+
+    for link in links:
+        pictogram_id = link.pictogram_id
+        link.rank_score = log2_add(link.rank_score, overall[pictogram_id])
+
+        scores = dict(link.daypart_rank_scores or {})
+        for daypart, score in dayparts[pictogram_id].items():
+            scores[daypart] = log2_add(scores.get(daypart), score)
+        link.daypart_rank_scores = scores
+
+        if link.last_used_at is None or last_used[pictogram_id] > link.last_used_at:
+            link.last_used_at = last_used[pictogram_id]
+
+    if links:
+        PatientPictogram.objects.bulk_update(
+            links,
+            ['rank_score', 'daypart_rank_scores', 'last_used_at'],
+        )
+
+    return len(links)
+
+
+def order_by_ranking(queryset, daypart=None):
+    """
+    Ordena vínculos de pictogramas pelo ranking de uso.
+
+    Sem `daypart` usa a pontuação geral pré-calculada; com `daypart` prioriza
+    a afinidade com o período do dia e desempata pela pontuação geral.
+    Pictogramas nunca usados ficam no fim, em ordem alfabética.
+    """
+    ordering = []
+    if daypart is not None:
+        queryset = queryset.annotate(
+            daypart_score=Cast(KeyTextTransform(daypart, 'daypart_rank_scores'), FloatField())
+        )
+        ordering.append(F('daypart_score').desc(nulls_last=True))
+
+    ordering.extend([
+        F('rank_score').desc(nulls_last=True),
+        'pictogram__name',
+        '-created_at',
+    ])
+    return queryset.order_by(*ordering)
@@ -0,0 +1,135 @@
+from collections import Counter
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from ..models import Person, PictogramUsageDaily, PictogramUsageEvent
+from .pictogram_prediction import predictor
+from .pictogram_ranking import update_pictogram_ranking
+
+
+def get_usage_settings():
+    """
+    Retorna as configurações de telemetria com valores padrão
+    """
+    defaults = {
+        'MAX_BATCH_SIZE': 5000,
+        'INSERT_BATCH_SIZE': 1000,
+    }
+    defaults.update(getattr(settings, 'PICTOGRAM_USAGE_SETTINGS', {}))
+    return defaults
+
+
+def record_pictogram_usage(patient_id, events):
+    """
+    Registra um lote de toques de um paciente.
+
+    `events` é uma lista de dicts com `pictogram_id`, `occurred_at` e `sequence`,
+    já validados. Todo o lote é gravado em uma única transação: os eventos
+    entram por bulk insert, as contagens diárias são incrementadas de uma vez
+    e o ranking de uso dos vínculos do paciente é atualizado. Após o commit,
+    os modelos de predição já carregados em memória recebem o lote.
+
+    Sequência e momento identificam o toque: eventos com (paciente, sequência,
+    momento) já gravados (lote reenviado pela prancha) são ignorados e não
+    entram nas contagens, no ranking nem na predição. A mesma sequência em
+    outro momento (contador reiniciado no dispositivo) é um toque novo.
+    Retorna quantos eventos foram gravados.
+    """
+    if not events:
+        return 0
+
+    usage_settings = get_usage_settings()
+    rows = [
+        PictogramUsageEvent(
+            patient_id=patient_id,
+            pictogram_id=event['pictogram_id'],
+            occurred_at=event['occurred_at'],
+            sequence=event['sequence'],
+        )
+        for event in events
+    ]
+
+    with transaction.atomic():
+        # Bloqueia o paciente para serializar os lotes dele: assim os eventos
+        # do paciente com ID acima do maior existente são os gravados agora
+        list(Person.objects.select_for_update().filter(pk=patient_id).values_list('pk', flat=True))
+        last_id = PictogramUsageEvent.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+        PictogramUsageEvent.objects.bulk_create(
+            rows,
+            batch_size=usage_settings['INSERT_BATCH_SIZE'],
+            ignore_conflicts=True,
+        )
+        recorded = list(
+            PictogramUsageEvent.objects.filter(patient_id=patient_id, id__gt=last_id)
+            .values('id', 'pictogram_id', 'occurred_at', 'sequence')
+        )
+        if not recorded:
+            return 0
+
+        daily_counts = Counter(
+            (event['pictogram_id'], timezone.localdate(event['occurred_at']))
+            for event in recorded
+        )
+        _increment_daily_counts(patient_id, daily_counts)
+        update_pictogram_ranking(patient_id, recorded)
+        # Com o ID gravado, a atualização pelo banco não conta o lote de novo
+        transaction.on_commit(lambda: predictor.observe(patient_id, recorded))
+
+    return len(recorded)
+
+
+def _increment_daily_counts(patient_id, daily_counts):
+    """
+    Soma as contagens do lote na tabela diária.
+
+    Linhas existentes são bloqueadas e atualizadas com bulk_update; as novas
+    entram com bulk_create. Se outro lote criar a mesma linha ao mesmo tempo,
+    a operação é repetida uma vez, agora encontrando a linha existente.
+    """
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                _apply_daily_counts(patient_id, daily_counts)
+            return
+        except IntegrityError:
+            if attempt:
+                raise
+
+
+def _apply_daily_counts(patient_id, daily_counts):
+    pictogram_ids = {pictogram_id for pictogram_id, _ in daily_counts}
+    dates = {date for _, date in daily_counts}
+
+    existing = {
+        (row.pictogram_id, row.date): row
+        for row in PictogramUsageDaily.objects.select_for_update().filter(
+            patient_id=patient_id,
+            date__in=dates,
+            pictogram_id__in=pictogram_ids,
+        )
+    }
+
+    to_update = []
+    to_create = []
+    for (pictogram_id, date), count in daily_counts.items():
+        row = existing.get((pictogram_id, date))
+        if row is not None:
+            row.count += count
+            to_update.append(row)
+        else:
+            to_create.append(
+                PictogramUsageDaily(
+                    patient_id=patient_id,
+                    pictogram_id=pictogram_id,
+                    date=date,
+                    count=count,
+                )
+            )
+
+    if to_update:
+        PictogramUsageDaily.objects.bulk_update(to_update, ['count'])
+    if to_create:
+        PictogramUsageDaily.objects.bulk_create(to_create)
@@ -0,0 +1,50 @@
+from django.contrib.auth.models import User
+from django.db import models
+from django.db.models import Q, Value
+
+from ..models import Person
+
+
+def cpf_variants(cpf):
+    """
+    Formas em que um CPF pode estar gravado: somente números e formatado
+    """
+    digits = ''.join(filter(str.isdigit, cpf or ''))
+    return digits, f'{digits[:3]}.{digits[3:6]}.{digits[6:9]}-{digits[9:]}'
+
+
+def probe_registration(cpfs, emails=(), phones=(), usernames=()):
+    """
+    Sonda única de unicidade do cadastro: em uma só consulta traz as pessoas
+    com algum dos CPFs, e-mails ou telefones informados e os usuários com
+    algum dos usernames ou e-mails.
+
+    Serve tanto ao cadastro individual quanto ao em lote. Retorna
+    {'people': [...], 'users': [...]} com dicts dos campos relevantes; cabe
+    ao chamador decidir o que é conflito.
+    """
+    emails = [email for email in emails if email]
+    person_filter = (
+        Q(cpf__in=[cpf for cpf in cpfs if cpf])
+        | Q(email__in=emails)
+        | Q(phone__in=[phone for phone in phones if phone])
+    )
+    people = Person.objects.filter(person_filter).annotate(
+        source=Value('person', output_field=models.CharField()),
+    ).order_by().values_list('source', 'id', 'cpf', 'email', 'phone', 'user_id')
+
+    user_filter = Q(username__in=[username for username in usernames if username]) | Q(email__in=emails)
+    users = User.objects.filter(user_filter).annotate(
+        source=Value('user', output_field=models.CharField()),
+        phone=Value(None, output_field=models.CharField()),
+        user_id=Value(None, output_field=models.IntegerField()),
+    ).order_by().values_list('source', 'id', 'username', 'email', 'phone', 'user_id')
+
+    result = {'people': [], 'users': []}
+    for source, pk, key, row_email, row_phone, user_id in people.union(users, all=True):
+        if source == 'person':
+            result['people'].append({'id': pk, 'cpf': key, 'email': row_email, 'phone': row_phone, 'user_id': user_id})
+        else:
+            result['users'].append({'id': pk, 'username': key, 'email': row_email})
+    return result
+
@@ -0,0 +1,184 @@
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+try:
+    import fcntl
+except ImportError:  # Windows: o bloqueio entre processos fica desativado
+    fcntl = None
+
+
+def get_speech_settings():
+    """
+    Retorna as configurações de síntese de voz com valores padrão
+    """
+    defaults = {
+        'ENGINE': 'smart_caa.services.speech.EspeakEngine',
+        'VOICE': 'pt-br',
+        'VOICES': ['pt-br', 'pt'],  # Vozes aceitas via parâmetro
+        'RATE': 150,  # Palavras por minuto
+        'MIN_RATE': 80,
+        'MAX_RATE': 400,
+        'CACHE_DIR': os.path.join(settings.MEDIA_ROOT, 'tts'),
+        'TIMEOUT': 15,  # Segundos para o motor sintetizar um texto
+    }
+    defaults.update(getattr(settings, 'SPEECH_SETTINGS', {}))
+    return defaults
+
+
+class SpeechSynthesisError(Exception):
+    """
+    Falha do motor de síntese (motor ausente, texto vazio, tempo esgotado)
+    """
+
+
+class SpeechEngine:
+    """
+    Interface dos motores de síntese offline.
+
+    Subclasses definem `name`, `extension`, `content_type` e implementam
+    `synthesize`, retornando o áudio em bytes.
+    """
+    name = None
+    extension = None
+    content_type = None
+
+    def synthesize(self, text, voice, rate):
+        raise NotImplementedError
+
+
+class EspeakEngine(SpeechEngine):
+    """
+    Motor baseado no eSpeak NG (ou eSpeak), gerando WAV pela saída padrão
+    """
+    name = 'espeak'
+    extension = '.wav'
+    content_type = 'audio/wav'
+    executables = ('espeak-ng', 'espeak')
+
+    def synthesize(self, text, voice, rate):
+        executable = next((path for path in map(shutil.which, self.executables) if path), None)
+        if executable is None:
+            raise SpeechSynthesisError('Nenhum motor eSpeak encontrado no servidor.')
+
+        try:
+            # O texto vai pela entrada padrão, nunca como argumento: um nome
+            # começando com '-' seria lido como opção (ex.: -w grava um arquivo)
+            result = subprocess.run(
+                [executable, '-v', voice, '-s', str(rate), '-b', '1', '--stdout', '--stdin'],
+                input=text.encode('utf-8'),
+                capture_output=True,
+                timeout=get_speech_settings()['TIMEOUT'],
+                check=True,
+            )
+        except subprocess.TimeoutExpired:
+            raise SpeechSynthesisError('Tempo esgotado ao sintetizar o áudio.')
+        except subprocess.CalledProcessError as e:
+            raise SpeechSynthesisError(f'Erro do eSpeak: {e.stderr.decode(errors="replace").strip()}')
+
+        if not result.stdout:
+            raise SpeechSynthesisError('O eSpeak não gerou áudio.')
+        return result.stdout
+
+
+@lru_cache(maxsize=None)
+def _load_engine(path):
+    return import_string(path)()
+
+
+def get_speech_engine():
+    return _load_engine(get_speech_settings()['ENGINE'])
+
+
+# Locks fixos distribuídos por chave, para não acumular um lock por texto
+_key_locks = [threading.Lock() for _ in range(64)]
+
+
+def _lock_for(key):
+    return _key_locks[int(key[:4], 16) % len(_key_locks)]
+
+
+def speech_cache_key(text, voice, rate, engine):
+    """
+    Chave do áudio em cache: texto normalizado, voz, velocidade e motor
+    """
+    normalized = ' '.join(text.split())
+    raw = '\x1f'.join([engine.name, voice, str(rate), normalized])
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def speech_cache_path(key, engine):
+    return os.path.join(get_speech_settings()['CACHE_DIR'], key[:2], key + engine.extension)
+
+
+def get_speech_audio(text, voice=None, rate=None):
+    """
+    Retorna (caminho, content_type, chave, gerado) do áudio do texto.
+
+    O áudio é sintetizado apenas na primeira vez; depois é lido do cache em
+    disco. A escrita é atômica (arquivo temporário + os.replace) e a síntese
+    de uma mesma chave é serializada entre threads e, em POSIX, entre
+    processos (flock), de modo que requisições simultâneas não sintetizam de novo.
+    """
+    speech_settings = get_speech_settings()
+    text = (text or '').strip()
+    if not text:
+        raise SpeechSynthesisError('Não há texto para sintetizar.')
+
+    voice = voice or speech_settings['VOICE']
+    rate = int(rate or speech_settings['RATE'])
+    engine = get_speech_engine()
+    key = speech_cache_key(text, voice, rate, engine)
+    path = speech_cache_path(key, engine)
+
+    if os.path.exists(path):
+        return path, engine.content_type, key, False
+
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+
+    with _lock_for(key):
+        # Um arquivo de bloqueio por subdiretório: a síntese só ocorre em cache
+        # miss, então serializar o subdiretório entre processos é suficiente
+        lock_file = open(os.path.join(directory, '.lock'), 'a') if fcntl else None
+        try:
+            if lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+            # Outra thread ou processo pode ter gerado o áudio enquanto esperávamos
+            if os.path.exists(path):
+                return path, engine.content_type, key, False
+
+            audio = engine.synthesize(text, voice, rate)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as tmp:
+                    tmp.write(audio)
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        finally:
+            if lock_file:
+                lock_file.close()
+
+    return path, engine.content_type, key, True
+
+
+def get_pictogram_speech_text(pictogram, source='name'):
+    """
+    Texto a ser falado para o pictograma: nome, descrição ou ambos
+    """
+    if source == 'description':
+        return pictogram.description or pictogram.name
+    if source == 'name_description' and pictogram.description:
+        return f'{pictogram.name}. {pictogram.description}'
+    return pictogram.name
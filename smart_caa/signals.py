@@ -0,0 +1,36 @@
+from django.db.models.signals import post_delete, post_save
+from django.db import transaction
+from django.dispatch import receiver
+
+from .models import Pictogram
+from .models.attachment import Attachment
+from .services.attachment_preview import schedule_preview
+from .services.default_pictograms import default_pictograms
+
+
+@receiver(post_save, sender=Pictogram, dispatch_uid='default_pictograms_on_save')
+@receiver(post_delete, sender=Pictogram, dispatch_uid='default_pictograms_on_delete')
+def invalidate_default_pictograms(sender, **kwargs):
+    """
+    Descarta o conjunto de pictogramas padrão em cache quando um pictograma
+    muda (marcado/desmarcado como padrão, ativado, inativado ou excluído)
+    """
+    default_pictograms.invalidate_on_commit()
+
+
+@receiver(post_save, sender=Attachment, dispatch_uid='attachment_preview_on_save')
+def schedule_attachment_preview(sender, instance, **kwargs):
+    """
+    Agenda a pré-visualização de anexos novos ou com o arquivo trocado
+    """
+    if instance.file and (not instance.preview or instance.preview_source != instance.file.name):
+        schedule_preview(instance.pk)
+
+
+@receiver(post_delete, sender=Attachment, dispatch_uid='attachment_preview_on_delete')
+def delete_attachment_preview(sender, instance, **kwargs):
+    """
+    Remove a miniatura, que só existe em função do anexo
+    """
+    if instance.preview:
+        transaction.on_commit(lambda: instance.preview.delete(save=False))
@@ -0,0 +1,79 @@
+"""
+Storage de mídia com nomes de arquivo endereçados pelo conteúdo.
+
+Cada upload é gravado como 'pasta/nome.<hash>.ext', com os 12 primeiros
+dígitos do SHA-256 do conteúdo, como o ManifestStaticFilesStorage faz com os
+estáticos. O FileSystemStorage nunca sobrescreve um arquivo, então o
+conteúdo de um nome com hash não muda: a URL pode ser guardada pelo CDN e
+pelos navegadores como `immutable`, e trocar a imagem de um pictograma gera
+sempre uma URL nova.
+"""
+import hashlib
+import os
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+from .media_urls import get_cdn_settings
+
+
+HASH_LENGTH = 12
+
+# nome.<hash>.ext, com o sufixo aleatório do get_available_name quando o mesmo
+# arquivo é enviado duas vezes com o mesmo nome (nome.<hash>_AbC1234.ext)
+HASHED_NAME = re.compile(r'\.([0-9a-f]{%d})(?:_[A-Za-z0-9]{7})?\.[^./]+$' % HASH_LENGTH)
+
+
+def is_hashed_name(name):
+    return bool(HASHED_NAME.search(name))
+
+
+def content_hash(content):
+    """
+    Hash do conteúdo de um File, lido em blocos; a posição volta ao início
+    """
+    digest = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def hashed_name(name, digest, max_length=None):
+    """
+    'pictograms/images/casa.png' -> 'pictograms/images/casa.<hash>.png'.
+    Com max_length, encurta o nome original (e não o hash), deixando espaço
+    para o sufixo do get_available_name.
+    """
+    dir_name, file_name = os.path.split(name)
+    root, ext = os.path.splitext(file_name)
+    if max_length is not None:
+        reserved = len(os.path.join(dir_name, '')) + 1 + HASH_LENGTH + len(ext) + 8
+        root = root[:max(max_length - reserved, 1)]
+    return os.path.join(dir_name, f'{root}.{digest}{ext}')
+
+
+class HashedMediaStorage(FileSystemStorage):
+    """
+    FileSystemStorage que inclui o hash do conteúdo no nome dos arquivos
+    gravados (desligável por CDN_SETTINGS['HASHED_NAMES'])
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if get_cdn_settings()['HASHED_NAMES']:
+            if not hasattr(content, 'chunks'):
+                content = File(content, name)
+            digest = content_hash(content)
+            # Um nome que já parece ter hash (vindo do cliente, por exemplo) só
+            # é mantido se o hash for mesmo o do conteúdo; senão o mesmo nome
+            # 'imutável' poderia servir bytes diferentes
+            match = HASHED_NAME.search(name)
+            if match is None or match.group(1) != digest:
+                name = hashed_name(name, digest, max_length)
+        return super().save(name, content, max_length=max_length)
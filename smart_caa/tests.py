@@ -1,10 +1,57 @@
+import csv
+import gzip
+import json
+import math
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import zipfile
+import zlib
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
 from rest_framework import status
 from rest_framework.test import APITestCase
 
-from .models import Attachment, EverydayCategory, History, Person, PatientPictogram, Pictogram
+from app.views import SecureMediaView, SecureStaticView
+from authentication.models import RevokedToken
+
+from .models import (
+    Attachment,
+    EverydayCategory,
+    History,
+    Person,
+    PatientPictogram,
+    Pictogram,
+    PictogramUsageDaily,
+    PictogramUsageEvent,
+)
+from . import password_hashing
+from .hashers import PBKDF2PasswordHasher, ScryptPasswordHasher
+from .media_urls import MediaURLBuilder
+from .services import pictogram_predictor
+from .services.default_pictograms import default_pictograms, propagate_default_pictograms
+from .services.attachment_preview import PdfRenderer
+from .services.fixture_data import make_cpf
+from .services.media_scan import last_report
+from .services.speech import EspeakEngine, SpeechEngine
+from .storage import content_hash
+from .throttling import check_shared_cache, metrics as throttle_metrics
 
 
 class AttachmentHistoryLinkTests(APITestCase):
@@ -191,6 +238,912 @@ class PatientRegistrationOptionalFieldsTests(APITestCase):
         self.assertEqual(response.data['gender'], payload['gender'])
 
 
+class PatientRegistrationPipelineTests(APITestCase):
+    def setUp(self):
+        self.url = reverse('patient-list-create')
+        category = EverydayCategory.objects.create(name='Rotina')
+        self.default = Pictogram.objects.create(
+            name='Bom dia', category=category, image='pictograms/images/bom-dia.png', is_default=True
+        )
+        Pictogram.objects.create(
+            name='Inativo', category=category, image='pictograms/images/inativo.png',
+            is_default=True, is_active=False
+        )
+        Pictogram.objects.create(name='Comum', category=category, image='pictograms/images/comum.png')
+        self.payload = {
+            'name': 'Paciente Pipeline',
+            'cpf': '52998224725',
+            'email': 'paciente.pipeline@example.com',
+            'phone': '11999993333',
+            'password': 'SenhaForte@123'
+        }
+
+    def test_registration_links_only_active_default_pictograms(self):
+        response = self.client.post(self.url, self.payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        patient = Person.objects.get(pk=response.data['id'])
+        self.assertTrue(patient.is_patient)
+        self.assertEqual(patient.user.username, '52998224725')
+        links = PatientPictogram.objects.filter(patient=patient)
+        self.assertEqual([link.pictogram_id for link in links], [self.default.id])
+        self.assertEqual(links[0].daypart_rank_scores, {})
+
+    def test_duplicate_registration_is_rejected_without_side_effects(self):
+        self.client.post(self.url, self.payload, format='json')
+
+        response = self.client.post(
+            self.url, dict(self.payload, cpf='529.982.247-25', phone='11999992222'), format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('cpf', response.data)
+        self.assertIn('email', response.data)
+        self.assertEqual(User.objects.filter(username='52998224725').count(), 1)
+        self.assertEqual(PatientPictogram.objects.count(), 1)
+
+
+class DefaultPictogramSetTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='defaults-user', password='123456')
+        self.client.force_authenticate(user=self.user)
+        self.category = EverydayCategory.objects.create(name='Padrões')
+        self.default = Pictogram.objects.create(
+            name='Oi', category=self.category, image='pictograms/images/oi.png', is_default=True
+        )
+        self.other = Pictogram.objects.create(name='Tchau', category=self.category, image='pictograms/images/tchau.png')
+
+    def test_cached_set_follows_pictogram_changes(self):
+        self.assertEqual(default_pictograms.ids(), (self.default.id,))
+
+        self.other.is_default = True
+        self.other.save()
+        self.assertEqual(default_pictograms.ids(), (self.default.id, self.other.id))
+
+        self.default.delete()
+        self.assertEqual(default_pictograms.ids(), (self.other.id,))
+
+    def test_make_patient_and_propagation_link_defaults_once(self):
+        caregiver = Person.objects.create(
+            name='Cuidador Padrão', cpf='82345678901', email='cuidador.padrao@example.com',
+            phone='11999991111', is_caregiver=True,
+        )
+        response = self.client.patch(reverse('make-patient', kwargs={'person_id': caregiver.id}), {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['default_pictograms_linked'], 1)
+
+        patients = [
+            Person.objects.create(
+                name=f'Paciente Padrão {number}', cpf=f'9234567890{number}',
+                email=f'paciente.padrao{number}@example.com', phone=f'1199999000{number}', is_patient=True,
+            )
+            for number in range(3)
+        ]
+        self.other.is_default = True
+        self.other.save()
+
+        created = propagate_default_pictograms(chunk_size=2, created_by_id=self.user.id)
+
+        # 4 pacientes x 2 padrões, menos o vínculo já criado pelo make-patient
+        self.assertEqual(created, 7)
+        self.assertEqual(PatientPictogram.objects.filter(patient__in=patients).count(), 6)
+        self.assertEqual(propagate_default_pictograms(), 0)
+
+
+class BulkOnboardingTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='onboarding-user', password='123456')
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('person-onboarding')
+        category = EverydayCategory.objects.create(name='Acolhimento')
+        self.default = Pictogram.objects.create(
+            name='Olá', category=category, image='pictograms/images/ola.png', is_default=True
+        )
+        self.caregiver = Person.objects.create(
+            name='Cuidadora Existente', cpf='98765432100', email='cuidadora.existente@example.com',
+            phone='11988880000', is_caregiver=True,
+        )
+
+    def _person(self, ref, cpf, number, **extra):
+        return {
+            'ref': ref,
+            'name': f'Pessoa {ref}',
+            'cpf': cpf,
+            'email': f'{ref}@example.com',
+            'phone': f'1197777000{number}',
+            'password': 'SenhaForte@123',
+            **extra,
+        }
+
+    @override_settings(PASSWORD_HASHING_SETTINGS={'WORKERS': 2, 'MIN_BATCH': 2})
+    def test_bulk_onboarding_creates_valid_rows_and_reports_errors(self):
+        payload = {
+            'people': [
+                self._person('p1', '12345678909', 1, is_patient=True),
+                self._person('c1', '11122233396', 2, is_caregiver=True),
+                self._person('dup', '44455566619', 3, is_patient=True, email='p1@example.com'),
+                self._person('bad', '12345678900', 4, is_patient=True),
+            ],
+            'relationships': [
+                {'patient': 'p1', 'caregiver': 'c1', 'relationship_type': 'FAMILY', 'start_date': '2025-01-10'},
+                {'patient': 'p1', 'caregiver': self.caregiver.id, 'relationship_type': 'PROFESSIONAL', 'start_date': '2025-01-10'},
+                {'patient': 'dup', 'caregiver': 'c1', 'relationship_type': 'FAMILY', 'start_date': '2025-01-10'},
+            ],
+        }
+
+        response = self.client.post(self.url, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([row['status'] for row in response.data['people']], ['created', 'created', 'error', 'error'])
+        self.assertIn('email', response.data['people'][2]['errors'])
+        self.assertIn('cpf', response.data['people'][3]['errors'])
+        self.assertEqual([row['status'] for row in response.data['relationships']], ['created', 'created', 'error'])
+        self.assertEqual(response.data['summary']['default_pictograms_linked'], 1)
+
+        patient = Person.objects.get(pk=response.data['people'][0]['id'])
+        self.assertTrue(patient.is_patient)
+        self.assertEqual(patient.cpf, '123.456.789-09')
+        self.assertTrue(patient.user.check_password('SenhaForte@123'))
+        self.assertEqual(patient.created_by, self.user)
+        self.assertEqual(
+            set(patient.caregiver_relationships.values_list('caregiver__name', flat=True)),
+            {'Pessoa c1', 'Cuidadora Existente'}
+        )
+        self.assertTrue(PatientPictogram.objects.filter(patient=patient, pictogram=self.default).exists())
+
+    def test_dry_run_validates_without_writing(self):
+        payload = {'people': [self._person('p1', '12345678909', 1, is_patient=True)], 'dry_run': True}
+
+        response = self.client.post(self.url, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['people'][0]['status'], 'valid')
+        self.assertFalse(Person.objects.filter(cpf='123.456.789-09').exists())
+
+    def test_non_object_body_is_rejected(self):
+        for body in ([self._person('p1', '12345678909', 1, is_patient=True)], 'pessoas', 7):
+            response = self.client.post(self.url, body, format='json')
+
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Person.objects.count(), 1)
+
+
+class PasswordHashingPoolTests(APITestCase):
+    def setUp(self):
+        self.addCleanup(cache.clear)  # Baldes do limite de login
+        self.url = reverse('token_obtain_pair')
+
+    def test_login_rehashes_outdated_password_through_pool(self):
+        old_hash = PBKDF2PasswordHasher(iterations=1000).encode('SenhaForte@123', 'salt1234')
+        user = User.objects.create(username='pool-user', password=old_hash)
+        before = password_hashing.pool.metrics.snapshot()
+
+        response = self.client.post(self.url, {'username': 'pool-user', 'password': 'SenhaForte@123'}, format='json')
+        wrong = self.client.post(self.url, {'username': 'pool-user', 'password': 'errada'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('access', response.data)
+        self.assertEqual(wrong.status_code, status.HTTP_401_UNAUTHORIZED)
+        user.refresh_from_db()
+        self.assertNotEqual(user.password, old_hash)
+        self.assertTrue(user.check_password('SenhaForte@123'))
+        after = password_hashing.pool.metrics.snapshot()
+        self.assertEqual(after['verify'] - before['verify'], 2)
+        self.assertEqual(after['hash'] - before['hash'], 1)
+
+    @override_settings(PASSWORD_HASHING_SETTINGS={'WORKERS': 1, 'MAX_PENDING': 1, 'QUEUE_TIMEOUT': 0.01})
+    def test_saturated_pool_answers_503(self):
+        User.objects.create_user(username='busy-user', password='SenhaForte@123')
+        semaphore = password_hashing.pool._get_semaphore(1)
+        semaphore.acquire()
+        try:
+            response = self.client.post(self.url, {'username': 'busy-user', 'password': 'SenhaForte@123'}, format='json')
+        finally:
+            semaphore.release()
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], '1')
+
+    def test_configured_hasher_parameters_round_trip(self):
+        hasher = ScryptPasswordHasher(work_factor=2 ** 10, block_size=8, parallelism=1)
+        encoded = hasher.encode('SenhaForte@123', hasher.salt())
+
+        self.assertEqual(password_hashing._load_hasher(password_hashing._hasher_spec(hasher)).get_parameters(),
+                         hasher.get_parameters())
+        self.assertTrue(password_hashing.check_password('SenhaForte@123', encoded))
+        self.assertFalse(password_hashing.check_password('errada', encoded))
+
+
+class StatelessJWTAuthenticationTests(APITestCase):
+    def setUp(self):
+        # Cortes de revogação ficam no cache, e os IDs se repetem entre testes
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(username='12345678909', password='SenhaForte@123')
+        self.patient = Person.objects.create(
+            name='Paciente Token', cpf='123.456.789-09', email='token@example.com',
+            phone='11955550000', is_patient=True, user=self.user,
+        )
+        self.board_url = reverse('patient-pictograms-list', kwargs={'patient_id': self.patient.id})
+
+    def _login(self, password='SenhaForte@123'):
+        response = self.client.post(
+            reverse('token_obtain_pair'), {'username': '12345678909', 'password': password}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_board_read_uses_token_claims_without_user_query(self):
+        tokens = self._login()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens["access"]}')
+
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(self.board_url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse([query for query in captured.captured_queries if 'FROM "auth_user"' in query['sql']])
+        self.assertEqual(response.wsgi_request.user.person_id, self.patient.id)
+        self.assertTrue(response.wsgi_request.user.is_patient)
+
+    @mock.patch('rest_framework_simplejwt.tokens.aware_utcnow', return_value=timezone.now())
+    def test_password_change_and_deactivation_revoke_tokens(self, now):
+        # Todos os tokens do teste saem com o mesmo `iat`, como se a troca
+        # de senha e os logins ocorressem no mesmo segundo
+        tokens = self._login()
+        self.client.post(reverse('change_password'), {
+            'username': '12345678909', 'current_password': 'SenhaForte@123', 'new_password': 'OutraSenha@456',
+        }, format='json')
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens["access"]}')
+        self.assertEqual(self.client.get(self.board_url).status_code, status.HTTP_401_UNAUTHORIZED)
+        # Um worker que não viu a troca (cache vazio) confere a senha no banco
+        cache.clear()
+        self.assertEqual(self.client.get(self.board_url).status_code, status.HTTP_401_UNAUTHORIZED)
+        refresh = self.client.post(reverse('token_refresh'), {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(refresh.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self._login("OutraSenha@456")["access"]}')
+        self.assertEqual(self.client.get(self.board_url).status_code, status.HTTP_200_OK)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.board_url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        cache.clear()  # Sem o cache, o refresh confere a senha no banco
+        refresh = self.client.post(reverse('token_refresh'), {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(refresh.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class TokenRevocationTests(APITestCase):
+    def setUp(self):
+        self.addCleanup(cache.clear)
+        User.objects.create_user(username='revoke-user', password='SenhaForte@123')
+        response = self.client.post(
+            reverse('token_obtain_pair'), {'username': 'revoke-user', 'password': 'SenhaForte@123'}, format='json'
+        )
+        self.tokens = response.data
+
+    def test_rotated_refresh_token_cannot_be_reused(self):
+        first = self.client.post(reverse('token_refresh'), {'refresh': self.tokens['refresh']}, format='json')
+        reused = self.client.post(reverse('token_refresh'), {'refresh': self.tokens['refresh']}, format='json')
+        cache.clear()  # Mesmo sem o cache, a tabela recusa o reuso
+        reused_after_cache_loss = self.client.post(
+            reverse('token_refresh'), {'refresh': self.tokens['refresh']}, format='json'
+        )
+        rotated = self.client.post(reverse('token_refresh'), {'refresh': first.data['refresh']}, format='json')
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(reused.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(reused_after_cache_loss.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(rotated.status_code, status.HTTP_200_OK)
+        self.assertEqual(RevokedToken.objects.count(), 2)
+
+    def test_logout_revokes_tokens_until_purged(self):
+        response = self.client.post(
+            reverse('token_logout'), {'refresh': self.tokens['refresh'], 'access': self.tokens['access']}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.tokens["access"]}')
+        self.assertEqual(self.client.get(reverse('patient-list-create')).status_code, status.HTTP_401_UNAUTHORIZED)
+        # Outro worker, que não viu o logout no cache, consulta a tabela
+        cache.clear()
+        self.assertEqual(self.client.get(reverse('patient-list-create')).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.credentials()
+        verify = self.client.post(reverse('token_verify'), {'token': self.tokens['refresh']}, format='json')
+        self.assertEqual(verify.status_code, status.HTTP_400_BAD_REQUEST)
+
+        RevokedToken.objects.filter(jti__in=list(RevokedToken.objects.values_list('jti', flat=True))[:1]).update(
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        call_command('purge_revoked_tokens', stdout=StringIO())
+        self.assertEqual(RevokedToken.objects.count(), 1)
+
+
+class TokenBucketThrottleTests(APITestCase):
+    def setUp(self):
+        self.addCleanup(cache.clear)
+        throttle_metrics.reset()
+
+    @override_settings(THROTTLE_SETTINGS={'SCOPES': {'registration': {'RATE': '2/hour', 'BURST': 2, 'KEY': 'ip'}}})
+    def test_public_registration_is_limited_per_ip(self):
+        url = reverse('caregiver-list-create')
+        statuses = [self.client.post(url, {}, format='json').status_code for _ in range(3)]
+
+        self.assertEqual(statuses[:2], [status.HTTP_400_BAD_REQUEST] * 2)
+        self.assertEqual(statuses[2], status.HTTP_429_TOO_MANY_REQUESTS)
+        throttled = self.client.post(url, {}, format='json')
+        self.assertGreater(int(throttled['Retry-After']), 0)
+        # A listagem não usa o balde do cadastro
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(throttle_metrics.snapshot()['registration']['throttled'], 2)
+
+    @override_settings(THROTTLE_SETTINGS={'SCOPES': {'registration': {'RATE': '1/hour', 'BURST': 1, 'KEY': 'ip'}}})
+    def test_authenticated_staff_registration_is_not_limited(self):
+        self.client.force_authenticate(User.objects.create_user(username='equipe', password='123456', is_staff=True))
+        statuses = [self.client.post(reverse('patient-list-create'), {}, format='json').status_code for _ in range(3)]
+        self.assertEqual(statuses, [status.HTTP_400_BAD_REQUEST] * 3)
+        self.assertNotIn('registration', throttle_metrics.snapshot())
+
+    @override_settings(THROTTLE_SETTINGS={'SCOPES': {'login': {'RATE': '2/hour', 'BURST': 2, 'KEY': 'ip'}}})
+    def test_forwarded_for_header_does_not_reset_ip_bucket(self):
+        url = reverse('token_obtain_pair')
+        statuses = [
+            self.client.post(
+                url, {'username': 'ninguem', 'password': 'x'}, format='json', HTTP_X_FORWARDED_FOR=f'203.0.113.{index}'
+            ).status_code
+            for index in range(3)
+        ]
+        self.assertEqual(statuses[2], status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_deploy_check_rejects_per_process_cache(self):
+        with override_settings(DEBUG=False):
+            self.assertEqual([error.id for error in check_shared_cache()], ['smart_caa.E001'])
+        with override_settings(DEBUG=True):
+            self.assertEqual(check_shared_cache(), [])
+        shared = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': tempfile.mkdtemp()}
+        self.addCleanup(shutil.rmtree, shared['LOCATION'], ignore_errors=True)
+        with override_settings(DEBUG=False, CACHES={'default': shared}):
+            self.assertEqual(check_shared_cache(), [])
+
+    @override_settings(THROTTLE_SETTINGS={'SCOPES': {
+        'password_reset_account': {'RATE': '1/hour', 'BURST': 1, 'KEY': 'field:email'},
+    }})
+    def test_password_reset_is_limited_per_account(self):
+        url = reverse('forgot_password')
+        first = self.client.post(url, {'email': 'alvo@example.com'}, format='json')
+        same_account = self.client.post(url, {'email': 'ALVO@example.com'}, format='json')
+        other_account = self.client.post(url, {'email': 'outro@example.com'}, format='json')
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(same_account.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(other_account.status_code, status.HTTP_200_OK)
+
+
+class RequestMetricsMiddlewareTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='metrics-user', password='123456')
+        self.patient = Person.objects.create(
+            name='Paciente Métricas', cpf='123.456.789-09', email='metricas@example.com',
+            phone='11944440000', is_patient=True,
+        )
+
+    def _sample(self, body, name, labels):
+        match = re.search(rf'^{name}{{{re.escape(labels)}}} (\S+)$', body, re.MULTILINE)
+        return float(match.group(1)) if match else None
+
+    def test_metrics_are_recorded_per_route_name(self):
+        self.client.force_authenticate(user=self.user)
+        self.client.get(reverse('patient-pictograms-list', kwargs={'patient_id': self.patient.id}))
+        self.client.force_authenticate(user=None)
+
+        staff = User.objects.create_user(username='metrics-staff', password='123456', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(reverse('metrics'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        labels = 'route="patient-pictograms-list",method="GET"'
+        self.assertGreaterEqual(self._sample(body, 'smart_caa_request_duration_seconds_count', labels), 1)
+        self.assertGreater(self._sample(body, 'smart_caa_request_db_queries_sum', labels), 0)
+        self.assertGreater(self._sample(body, 'smart_caa_request_serializer_duration_seconds_sum', labels), 0)
+        self.assertGreater(self._sample(body, 'smart_caa_response_size_bytes_sum', labels), 0)
+        self.assertIn('smart_caa_password_hashing_operations_total{operation="hash"}', body)
+
+    @override_settings(METRICS_SETTINGS={'AUTH_TOKEN': 'segredo'})
+    def test_metrics_endpoint_requires_configured_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer segredo')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_metrics_endpoint_is_closed_without_token_outside_debug(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_403_FORBIDDEN)
+        with override_settings(DEBUG=True):
+            self.client.logout()
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_200_OK)
+
+
+class QueryInspectorTests(APITestCase):
+    def setUp(self):
+        self.capture_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.capture_dir, ignore_errors=True)
+        self.capture = os.path.join(self.capture_dir, 'requests.jsonl')
+        self.user = User.objects.create_user(username='inspector-user', password='SenhaForte@123')
+
+    def test_replay_reports_n_plus_one_with_serializer_field(self):
+        for number in range(6):
+            EverydayCategory.objects.create(name=f'Categoria {number}', created_by=self.user)
+        with open(self.capture, 'w', encoding='utf-8') as capture:
+            capture.write(json.dumps({'method': 'GET', 'path': reverse('everyday-category-list-create'),
+                                      'user_id': self.user.id}) + '\n')
+
+        out = StringIO()
+        with self.assertLogs('smart_caa.queries', level='WARNING') as logs:
+            call_command('replay_requests', self.capture, stdout=out)
+
+        output = out.getvalue()
+        self.assertIn('GET everyday-category-list-create', output)
+        self.assertIn('1 N+1', output)
+        self.assertIn('EverydayCategorySerializer.created_by_username (source=created_by.username)', output)
+        self.assertIn('Possível N+1 em GET everyday-category-list-create', logs.output[0])
+
+    def test_capture_file_redacts_credentials(self):
+        inspector_settings = {'ENABLED': True, 'CAPTURE_FILE': self.capture}
+        with override_settings(QUERY_INSPECTOR_SETTINGS=inspector_settings):
+            self.client.post(reverse('token_obtain_pair'), {
+                'username': 'inspector-user', 'password': 'SenhaForte@123',
+            }, format='json')
+
+            self.client.post(reverse('person-onboarding'), {
+                'dry_run': True,
+                'people': [{'ref': 'ana', 'name': 'Ana', 'password': 'SenhaForte@123', 'tokens': ['x']}],
+            }, format='json')
+
+        with open(self.capture, encoding='utf-8') as capture:
+            entry, nested = [json.loads(line) for line in capture]
+        self.assertEqual(entry['method'], 'POST')
+        self.assertEqual(entry['body'], {'username': 'inspector-user', 'password': '***'})
+        self.assertEqual(nested['body'], {
+            'dry_run': True,
+            'people': [{'ref': 'ana', 'name': 'Ana', 'password': '***', 'tokens': '***'}],
+        })
+        self.assertNotIn('SenhaForte@123', json.dumps(nested))
+
+
+class LoadTestCommandTests(APITestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.work_dir, ignore_errors=True)
+        self.output = os.path.join(self.work_dir, 'result.json')
+
+    def _load_test(self, *args):
+        call_command(
+            'load_test', *args, '--concurrency', '1', '--iterations', '3', '--output', self.output,
+            stdout=StringIO(),
+        )
+        with open(self.output, encoding='utf-8') as output:
+            return json.load(output)['routes']
+
+    def test_http_collection_resolves_variables_and_named_responses(self):
+        User.objects.create_user(username='loadtest', password='SenhaForte@123')
+        category = EverydayCategory.objects.create(name='Rotina')
+        collection = os.path.join(self.work_dir, 'category.http')
+        with open(collection, 'w', encoding='utf-8') as http_file:
+            http_file.write(
+                '@baseUrl = http://localhost:8000\n'
+                '@authToken = {{login.response.body.access}}\n\n'
+                '### Login\n# @name login\nPOST {{baseUrl}}/authentication/token\n'
+                'Content-Type: application/json\n\n{"username": "x", "password": "y"}\n\n'
+                '### Listar\n# @name listar\nGET {{baseUrl}}/api/everyday-categories/\n'
+                'Authorization: Bearer {{authToken}}\n\n'
+                '### Detalhar a primeira\nGET {{baseUrl}}/api/everyday-categories/{{listar.response.body.results.0.id}}/\n\n'
+                '### Criar (ignorada: só GET)\nPOST {{baseUrl}}/api/everyday-categories/\n'
+                'Content-Type: application/json\n\n{"name": "Nova"}\n'
+            )
+
+        routes = self._load_test(collection)
+
+        self.assertEqual(set(routes), {'GET everyday-category-list-create', 'GET everyday-category-detail'})
+        self.assertEqual(routes['GET everyday-category-detail']['statuses'], {'200': 3})
+        self.assertEqual(routes['GET everyday-category-list-create']['requests'], 3)
+        self.assertFalse(EverydayCategory.objects.exclude(pk=category.pk).exists())
+
+    def test_seed_and_capture_replay(self):
+        capture = os.path.join(self.work_dir, 'capture.jsonl')
+        with open(capture, 'w', encoding='utf-8') as capture_file:
+            capture_file.write(json.dumps({'method': 'GET', 'path': '/api/patients/', 'query': '', 'user_id': 1}) + '\n')
+            capture_file.write(json.dumps({'method': 'GET', 'path': '/api/patients/', 'query': '', 'user_id': None}) + '\n')
+
+        routes = self._load_test(capture, '--seed', '--patients', '5', '--pictograms', '10', '--links', '4')
+
+        self.assertEqual(Person.objects.filter(is_patient=True).count(), 5)
+        self.assertGreaterEqual(PatientPictogram.objects.count(), 20)
+        self.assertEqual(routes['GET patient-list-create']['statuses'], {'200': 3, '401': 3})
+
+
+class GenerateFixtureDataTests(APITestCase):
+    def test_generates_consistent_volumes(self):
+        out = StringIO()
+        call_command(
+            'generate_fixture_data', '--patients', '30', '--caregivers', '6', '--pictograms', '60',
+            '--defaults', '5', '--links', '20', '--chunk-size', '50', stdout=out,
+        )
+
+        patients = Person.objects.filter(is_patient=True)
+        self.assertEqual(patients.count(), 30)
+        self.assertEqual(Person.objects.filter(is_caregiver=True).count(), 6)
+        self.assertEqual(Pictogram.objects.filter(is_default=True).count(), 5)
+        links = PatientPictogram.objects.all()
+        self.assertIn(f'patient_pictograms: {links.count()}', out.getvalue())
+        self.assertGreater(links.count(), 30 * 10)
+        # Os padrões estão em todas as pranchas e os vínculos são lidos pelo ORM
+        self.assertEqual(links.filter(pictogram__is_default=True).count(), 30 * 5)
+        self.assertEqual(links.filter(is_active=True, daypart_rank_scores={}).count(), links.count())
+        for attachment in Attachment.objects.select_related('history'):
+            self.assertEqual(attachment.patient_id, attachment.history.patient_id)
+
+    def test_second_run_does_not_collide(self):
+        for _ in range(2):
+            call_command('generate_fixture_data', '--patients', '5', '--pictograms', '10', '--defaults', '2',
+                         '--links', '4', stdout=StringIO())
+
+        self.assertEqual(Person.objects.filter(is_patient=True).count(), 10)
+        self.assertEqual(Pictogram.objects.count(), 20)
+
+
+class ReadOnlyProjectionTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='projection-user', password='SenhaForte@123')
+        self.client.force_authenticate(self.user)
+        category = EverydayCategory.objects.create(name='Rotina')
+        self.patient = Person.objects.create(
+            name='Paciente Projeção', cpf='52998224725', email='projecao@example.com', phone='11911110000',
+            is_patient=True,
+        )
+        pictograms = [
+            Pictogram.objects.create(
+                name=f'Pictograma {number}', category=category, image=f'pictograms/images/p{number}.png',
+                audio=f'pictograms/audio/p{number}.mp3' if number % 2 else None,
+                description='Descrição' if number % 3 else None,
+            )
+            for number in range(6)
+        ]
+        for number, pictogram in enumerate(pictograms[:4]):
+            PatientPictogram.objects.create(
+                patient=self.patient, pictogram=pictogram, created_by=self.user if number % 2 else None,
+                rank_score=number or None,
+            )
+
+    def _both_paths(self, url):
+        responses = []
+        for fast in (False, True):
+            with override_settings(SERIALIZATION_SETTINGS={'FAST_READ_PATH': fast}):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            responses.append(response.content)
+        return responses
+
+    def test_patient_pictograms_json_is_byte_identical(self):
+        url = reverse('patient-pictograms-list', kwargs={'patient_id': self.patient.id})
+        for query in ('', '?order=ranked', '?order=ranked&daypart=morning', '?private=false'):
+            drf, projected = self._both_paths(url + query)
+            self.assertEqual(projected, drf)
+        self.assertEqual(len(json.loads(projected)), 4)
+
+    def test_available_pictograms_json_is_byte_identical(self):
+        url = reverse('patient-available-pictograms', kwargs={'patient_id': self.patient.id})
+        drf, projected = self._both_paths(url)
+
+        self.assertEqual(projected, drf)
+        self.assertEqual([item['name'] for item in json.loads(projected)], ['Pictograma 4', 'Pictograma 5'])
+
+    def test_benchmark_checks_identical_output(self):
+        out = StringIO()
+        call_command('benchmark_serializers', '--rows', '20', '--repeat', '1', stdout=out)
+
+        self.assertEqual(out.getvalue().count('JSON idêntico'), 2)
+        self.assertEqual(PatientPictogram.objects.count(), 4)
+
+
+class MediaURLBuilderTests(APITestCase):
+    @override_settings(ALLOWED_HOSTS=['*'])
+    def test_urls_match_build_absolute_uri(self):
+        names = ['pictograms/images/casa.png', 'pictograms/images/ação e café.png', 'anexos/laudo (1).pdf']
+        for request in (RequestFactory().get('/'), RequestFactory().get('/', HTTP_HOST='api.example.com:8443', secure=True)):
+            urls = MediaURLBuilder.for_request(request)
+            self.assertIs(MediaURLBuilder.for_request(request), urls)
+            for name in names:
+                self.assertEqual(urls.url(name), request.build_absolute_uri(default_storage.url(name)))
+        for name in names:
+            self.assertEqual(MediaURLBuilder().url(name), default_storage.url(name))
+
+    @override_settings(CDN_SETTINGS={'ENABLED': True, 'BASE_URL': 'https://cdn.example.com/media'})
+    def test_serializers_emit_cdn_urls(self):
+        user = User.objects.create_user(username='cdn-user', password='SenhaForte@123')
+        self.client.force_authenticate(user)
+        patient = Person.objects.create(
+            name='Paciente CDN', cpf='11144477735', email='cdn@example.com', phone='11922220000', is_patient=True,
+        )
+        pictogram = Pictogram.objects.create(
+            name='Casa', category=EverydayCategory.objects.create(name='Lugares'),
+            image='pictograms/images/casa.png', audio='pictograms/audio/casa.mp3',
+        )
+        PatientPictogram.objects.create(patient=patient, pictogram=pictogram)
+
+        board = self.client.get(reverse('patient-pictograms-list', kwargs={'patient_id': patient.id})).json()
+        detail = self.client.get(reverse('pictogram-detail', kwargs={'pk': pictogram.id})).json()
+
+        self.assertEqual(board[0]['pictogram_image_url'], 'https://cdn.example.com/media/pictograms/images/casa.png')
+        self.assertEqual(board[0]['pictogram_audio_url'], 'https://cdn.example.com/media/pictograms/audio/casa.mp3')
+        self.assertEqual(detail['image_url'], 'https://cdn.example.com/media/pictograms/images/casa.png')
+
+
+class HashedMediaTests(APITestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir, ignore_errors=True)
+        media_settings = override_settings(MEDIA_ROOT=self.tmp_dir)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        self.category = EverydayCategory.objects.create(name='Lugares')
+
+    def _serve(self, name):
+        return SecureMediaView.as_view()(RequestFactory().get(f'/media/{name}'), path=name)
+
+    def test_replaced_image_gets_new_immutable_url(self):
+        pictogram = Pictogram.objects.create(
+            name='Casa', category=self.category,
+            image=SimpleUploadedFile('casa.png', b'imagem 1', content_type='image/png'),
+        )
+        first = pictogram.image.name
+        pictogram.image = SimpleUploadedFile('casa.png', b'imagem 2', content_type='image/png')
+        pictogram.save()
+
+        self.assertRegex(first, r'^pictograms/images/casa\.[0-9a-f]{12}\.png$')
+        self.assertRegex(pictogram.image.name, r'^pictograms/images/casa\.[0-9a-f]{12}\.png$')
+        self.assertNotEqual(first, pictogram.image.name)
+        self.assertEqual(self._serve(first)['Cache-Control'], 'public, max-age=31536000, immutable')
+
+        with open(os.path.join(self.tmp_dir, 'antigo.png'), 'wb') as legacy:
+            legacy.write(b'imagem')
+        self.assertEqual(self._serve('antigo.png')['Cache-Control'], 'public, max-age=3600')
+
+    def test_client_supplied_hash_is_kept_only_when_it_matches_content(self):
+        digest = content_hash(ContentFile(b'imagem 1'))
+        forged = Pictogram.objects.create(
+            name='Forjado', category=self.category,
+            image=SimpleUploadedFile('casa.0123456789ab.png', b'imagem 1', content_type='image/png'),
+        )
+        self.assertEqual(forged.image.name, f'pictograms/images/casa.0123456789ab.{digest}.png')
+
+        matching = Pictogram.objects.create(
+            name='Correto', category=self.category,
+            image=SimpleUploadedFile(f'casa.{digest}.png', b'imagem 1', content_type='image/png'),
+        )
+        self.assertEqual(matching.image.name, f'pictograms/images/casa.{digest}.png')
+
+    def test_hash_media_files_renames_legacy_files(self):
+        os.makedirs(os.path.join(self.tmp_dir, 'pictograms', 'images'))
+        with open(os.path.join(self.tmp_dir, 'pictograms', 'images', 'antigo.png'), 'wb') as legacy:
+            legacy.write(b'imagem antiga')
+        pictograms = [
+            Pictogram.objects.create(name=name, category=self.category, image='pictograms/images/antigo.png')
+            for name in ('Antigo', 'Antigo 2')
+        ]
+        Pictogram.objects.create(name='Sem arquivo', category=self.category, image='pictograms/images/sumiu.png')
+
+        out, err = StringIO(), StringIO()
+        call_command('hash_media_files', stdout=out, stderr=err)
+
+        names = {Pictogram.objects.get(pk=pictogram.pk).image.name for pictogram in pictograms}
+        self.assertEqual(len(names), 1)
+        name = names.pop()
+        self.assertRegex(name, r'^pictograms/images/antigo\.[0-9a-f]{12}\.png$')
+        with default_storage.open(name) as renamed:
+            self.assertEqual(renamed.read(), b'imagem antiga')
+        self.assertFalse(default_storage.exists('pictograms/images/antigo.png'))
+        self.assertIn('1 arquivos, 2 registros atualizados, 1 não encontrados.', out.getvalue())
+        self.assertIn('pictograms/images/sumiu.png', err.getvalue())
+
+
+class CompressionTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='compression-user', password='SenhaForte@123')
+        self.client.force_authenticate(self.user)
+
+    def test_large_json_and_exports_are_compressed(self):
+        category = EverydayCategory.objects.create(name='Comida')
+        for number in range(30):
+            Pictogram.objects.create(name=f'Pictograma {number}', category=category, image=f'pictograms/images/p{number}.png')
+            Person.objects.create(
+                name=f'Paciente {number}', cpf=make_cpf(number), email=f'p{number}@example.com',
+                phone=f'119{number:08d}', is_patient=True,
+            )
+        url = reverse('pictogram-list-create')
+        plain = self.client.get(url)
+        compressed = self.client.get(url, HTTP_ACCEPT_ENCODING='br;q=0.5, gzip')
+
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', compressed['Vary'])
+        self.assertLess(len(compressed.content), len(plain.content) / 3)
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+
+        small = self.client.get(reverse('pictogram-detail', kwargs={'pk': 0}), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertNotIn('Content-Encoding', small)
+        refused = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip;q=0, identity')
+        self.assertEqual(refused.content, plain.content)
+
+        export_url = reverse('patient-export') + '?output=csv'
+        export_plain = b''.join(self.client.get(export_url).streaming_content)
+        export = self.client.get(export_url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(export['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(export.streaming_content)), export_plain)
+
+    def test_static_view_serves_precompressed_variant(self):
+        static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, static_root, ignore_errors=True)
+        content = b'body { color: #333; }\n' * 100
+        with open(os.path.join(static_root, 'app.css'), 'wb') as css:
+            css.write(content)
+
+        with override_settings(STATIC_ROOT=static_root):
+            call_command('compress_static', stdout=StringIO())
+            view = SecureStaticView.as_view()
+            gzipped = view(RequestFactory().get('/static/app.css', HTTP_ACCEPT_ENCODING='gzip, deflate'), path='app.css')
+            raw = view(RequestFactory().get('/static/app.css'), path='app.css')
+
+        self.assertEqual(gzipped['Content-Encoding'], 'gzip')
+        self.assertEqual(gzipped['Content-Type'], 'text/css')
+        self.assertEqual(gzip.decompress(gzipped.content), content)
+        self.assertEqual(int(gzipped['Content-Length']), len(gzipped.content))
+        self.assertNotIn('Content-Encoding', raw)
+        self.assertEqual(raw.content, content)
+        self.assertIn('Accept-Encoding', raw['Vary'])
+
+
+class MediaScanTests(APITestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir, ignore_errors=True)
+        report_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, report_dir, ignore_errors=True)
+        media_settings = override_settings(
+            MEDIA_ROOT=self.tmp_dir,
+            MEDIA_SCAN_SETTINGS={'REPORT_PATH': os.path.join(report_dir, 'media_scan.json')},
+        )
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        self.category = EverydayCategory.objects.create(name='Lugares')
+        self.ok = Pictogram.objects.create(
+            name='Casa', category=self.category,
+            image=SimpleUploadedFile('casa.png', b'imagem', content_type='image/png'),
+        )
+        self.broken = Pictogram.objects.create(
+            name='Escola', category=self.category,
+            image=SimpleUploadedFile('escola.png', b'original', content_type='image/png'),
+            audio='pictograms/audio/sumiu.mp3',
+        )
+        with open(os.path.join(self.tmp_dir, self.broken.image.name), 'wb') as changed:
+            changed.write(b'alterado')
+        self.empty = Pictogram.objects.create(name='Vazio', category=self.category, image='pictograms/images/vazio.png')
+        for name, content in (('pictograms/images/vazio.png', b''), ('anexos/solto.pdf', b'pdf'), ('tts/cache.mp3', b'mp3')):
+            os.makedirs(os.path.dirname(os.path.join(self.tmp_dir, name)), exist_ok=True)
+            with open(os.path.join(self.tmp_dir, name), 'wb') as media_file:
+                media_file.write(content)
+
+    def test_command_reports_orphans_missing_and_empty_files(self):
+        out = StringIO()
+        call_command('scan_media', '--verify-hashes', stdout=out)
+        cache.clear()  # O relatório não depende do cache do processo que o gerou
+        report = last_report()
+
+        self.assertEqual(report['total_files'], 4)
+        self.assertEqual([item['path'] for item in report['orphans']], ['anexos/solto.pdf'])
+        self.assertEqual(report['orphan_bytes'], 3)
+        self.assertEqual(report['missing'], [{'path': 'pictograms/audio/sumiu.mp3', 'records': [f'Pictogram.audio #{self.broken.pk}']}])
+        self.assertEqual([item['path'] for item in report['empty']], ['pictograms/images/vazio.png'])
+        self.assertEqual([item['path'] for item in report['hash_mismatches']], [self.broken.image.name])
+        self.assertIn('1 órfãos (3 bytes), 1 ausentes, 1 vazios, 1 com hash divergente.', out.getvalue())
+
+    def test_admin_report_and_debug_view_use_saved_scan(self):
+        admin_user = User.objects.create_superuser(username='media-admin', password='SenhaForte@123')
+        self.client.force_login(admin_user)
+        url = reverse('admin:smart_caa_pictogram_media_scan')
+
+        self.assertContains(self.client.get(url), 'Nenhuma conferência registrada')
+        self.assertRedirects(self.client.post(url), url)
+        self.assertContains(self.client.get(url), 'anexos/solto.pdf')
+        self.assertContains(self.client.get(reverse('admin:smart_caa_pictogram_changelist')), url)
+
+        with CaptureQueriesContext(connection) as queries:
+            debug = self.client.get(reverse('debug-media-files')).json()
+        self.assertEqual(debug['orphan_count'], 1)
+        self.assertFalse(any('smart_caa_pictogram' in query['sql'] for query in queries.captured_queries))
+
+
+class FakePdfRenderer(PdfRenderer):
+    """
+    Renderizador de teste: desenha uma "página" A4 cinza
+    """
+    def available(self):
+        return True
+
+    def render(self, source, directory, size):
+        target = os.path.join(directory, 'page.png')
+        Image.new('RGB', (595, 842), 'gray').save(target)
+        return target
+
+
+@override_settings(ATTACHMENT_PREVIEW_SETTINGS={
+    'BACKGROUND': False, 'SIZE': 100, 'PDF_RENDERERS': ['smart_caa.tests.FakePdfRenderer'],
+})
+class AttachmentPreviewTests(APITestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir, ignore_errors=True)
+        media_settings = override_settings(MEDIA_ROOT=self.tmp_dir)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        user = User.objects.create_user(username='preview-user', password='SenhaForte@123')
+        self.client.force_authenticate(user)
+        self.patient = Person.objects.create(
+            name='Paciente Anexo', cpf='52998224725', email='anexo@example.com', phone='11933330000', is_patient=True,
+        )
+
+    def _upload(self, name, content, content_type):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('attachment-list-create'), {
+                'name': name, 'patient': self.patient.id,
+                'file': SimpleUploadedFile(name, content, content_type=content_type),
+            }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return self.client.get(reverse('attachment-detail', kwargs={'pk': response.json()['id']})).json()
+
+    def _png(self, size, color):
+        buffer = BytesIO()
+        Image.new('RGBA', size, color).save(buffer, format='PNG')
+        return buffer.getvalue()
+
+    def test_image_and_pdf_attachments_get_previews(self):
+        photo = self._upload('foto.png', self._png((400, 200), 'red'), 'image/png')
+        pdf = self._upload('laudo.pdf', b'%PDF-1.4 laudo', 'application/pdf')
+        text = self._upload('notas.txt', b'apenas texto', 'text/plain')
+
+        self.assertRegex(photo['preview_url'], r'^http://testserver/media/anexos/previews/foto\.[0-9a-f]{12}-preview\.[0-9a-f]{12}\.jpg$')
+        attachment = Attachment.objects.get(pk=photo['id'])
+        with Image.open(attachment.preview.path) as preview:
+            self.assertEqual((preview.format, preview.size), ('JPEG', (100, 50)))
+        self.assertEqual(attachment.preview_source, attachment.file.name)
+
+        with Image.open(Attachment.objects.get(pk=pdf['id']).preview.path) as preview:
+            self.assertEqual(preview.size, (71, 100))
+        self.assertIsNone(text['preview_url'])
+
+    def test_replaced_file_gets_new_preview_and_command_backfills(self):
+        photo = self._upload('foto.png', self._png((50, 50), 'red'), 'image/png')
+        attachment = Attachment.objects.get(pk=photo['id'])
+        old_preview = attachment.preview.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('attachment-detail', kwargs={'pk': attachment.pk}), {
+                'file': SimpleUploadedFile('foto.png', self._png((50, 50), 'blue'), content_type='image/png'),
+            }, format='multipart')
+        attachment.refresh_from_db()
+        self.assertNotEqual(attachment.preview.name, old_preview)
+        self.assertEqual(attachment.preview_source, attachment.file.name)
+        self.assertFalse(default_storage.exists(old_preview))
+
+        Attachment.objects.filter(pk=attachment.pk).update(preview=None, preview_source='')
+        out = StringIO()
+        call_command('generate_attachment_previews', stdout=out)
+        self.assertIn('1 pré-visualizações geradas', out.getvalue())
+        self.assertTrue(Attachment.objects.get(pk=attachment.pk).preview)
+
+
 class AnamnesisSectionsStructureTests(APITestCase):
     def setUp(self):
         self.user = User.objects.create_user(username='anamnesis-user', password='123456')
@@ -585,3 +1538,741 @@ class PatientPictogramReactivationTests(APITestCase):
             ).count(),
             2,
         )
+
+
+class PatientPictogramUsageTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='usage-user', password='123456')
+        self.client.force_authenticate(user=self.user)
+
+        self.patient = Person.objects.create(
+            name='Paciente Telemetria',
+            cpf='12345678905',
+            email='paciente.telemetria@example.com',
+            phone='11999990004',
+            is_patient=True,
+        )
+        self.category = EverydayCategory.objects.create(
+            name='Telemetria',
+            created_by=self.user,
+        )
+        self.water = self._create_pictogram('Água')
+        self.food = self._create_pictogram('Comer')
+        self.url = reverse('patient-pictogram-usage', kwargs={'patient_id': self.patient.id})
+
+    def _create_pictogram(self, name):
+        return Pictogram.objects.create(
+            name=name,
+            category=self.category,
+            image=SimpleUploadedFile(
+                f'{name}.gif',
+                (
+                    b'GIF87a\x01\x00\x01\x00\x80\x01\x00\x00\x00\x00'
+                    b'\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00,\x00'
+                    b'\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;'
+                ),
+                content_type='image/gif',
+            ),
+            created_by=self.user,
+        )
+
+    def test_batch_is_stored_and_rolled_up_per_day(self):
+        events = [
+            {'pictogram': self.water.id, 'occurred_at': '2026-04-11T10:00:00-03:00', 'sequence': 1},
+            {'pictogram': self.food.id, 'occurred_at': '2026-04-11T10:00:02-03:00', 'sequence': 2},
+            {'pictogram': self.water.id, 'occurred_at': '2026-04-11T18:30:00-03:00', 'sequence': 3},
+            {'pictogram': self.water.id, 'occurred_at': '2026-04-12T08:00:00-03:00', 'sequence': 4},
+        ]
+
+        response = self.client.post(self.url, {'events': events}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['received'], 4)
+        self.assertEqual(PictogramUsageEvent.objects.filter(patient=self.patient).count(), 4)
+
+        counts = {
+            (row.pictogram_id, row.date.isoformat()): row.count
+            for row in PictogramUsageDaily.objects.filter(patient=self.patient)
+        }
+        self.assertEqual(counts, {
+            (self.water.id, '2026-04-11'): 2,
+            (self.food.id, '2026-04-11'): 1,
+            (self.water.id, '2026-04-12'): 1,
+        })
+
+        second = self.client.post(
+            self.url,
+            {'events': [{'pictogram': self.water.id, 'occurred_at': '2026-04-11T20:00:00-03:00', 'sequence': 5}]},
+            format='json',
+        )
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            PictogramUsageDaily.objects.get(patient=self.patient, pictogram=self.water, date='2026-04-11').count,
+            3,
+        )
+
+        list_response = self.client.get(self.url, {'date_from': '2026-04-12'})
+        self.assertEqual(list_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(list_response.data['results']), 1)
+
+    def test_resent_events_are_recorded_once(self):
+        PatientPictogram.objects.create(patient=self.patient, pictogram=self.water, created_by=self.user)
+        events = [
+            {'pictogram': self.water.id, 'occurred_at': '2026-04-11T10:00:00-03:00', 'sequence': 1},
+            {'pictogram': self.food.id, 'occurred_at': '2026-04-11T10:00:02-03:00', 'sequence': 2},
+        ]
+        self.client.post(self.url, {'events': events}, format='json')
+        link = PatientPictogram.objects.get(patient=self.patient, pictogram=self.water)
+
+        # Reenvio do lote (sem resposta na primeira vez) com um toque novo
+        events.append({'pictogram': self.water.id, 'occurred_at': '2026-04-11T10:00:05-03:00', 'sequence': 3})
+        response = self.client.post(self.url, {'events': events}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['received'], 1)
+        self.assertEqual(PictogramUsageEvent.objects.filter(patient=self.patient).count(), 3)
+        self.assertEqual(
+            PictogramUsageDaily.objects.get(patient=self.patient, pictogram=self.water, date='2026-04-11').count,
+            2,
+        )
+        self.assertEqual(PictogramUsageDaily.objects.get(patient=self.patient, pictogram=self.food).count, 1)
+        resent = PatientPictogram.objects.get(pk=link.pk)
+        self.assertAlmostEqual(
+            resent.rank_score, math.log2(2 ** link.rank_score + 2 ** (link.rank_score + 5 / (14 * 86400))),
+        )
+
+    def test_restarted_sequence_from_device_is_recorded(self):
+        self.client.post(
+            self.url,
+            {'events': [{'pictogram': self.water.id, 'occurred_at': '2026-04-11T10:00:00-03:00', 'sequence': 1}]},
+            format='json',
+        )
+
+        # Prancha reinstalada: o contador recomeça, mas o toque é outro
+        response = self.client.post(
+            self.url,
+            {'events': [{'pictogram': self.food.id, 'occurred_at': '2026-04-12T09:00:00-03:00', 'sequence': 1}]},
+            format='json',
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['received'], 1)
+        self.assertEqual(PictogramUsageEvent.objects.filter(patient=self.patient, sequence=1).count(), 2)
+        self.assertEqual(PictogramUsageDaily.objects.get(patient=self.patient, pictogram=self.food).count, 1)
+
+    def test_failed_ranking_rebuild_keeps_previous_scores(self):
+        link = PatientPictogram.objects.create(patient=self.patient, pictogram=self.water, created_by=self.user)
+        self.client.post(
+            self.url,
+            {'events': [{'pictogram': self.water.id, 'occurred_at': '2026-04-11T10:00:00-03:00', 'sequence': 1}]},
+            format='json',
+        )
+        link.refresh_from_db()
+
+        with mock.patch(
+            'smart_caa.management.commands.rebuild_pictogram_ranking.update_pictogram_ranking',
+            side_effect=RuntimeError,
+        ):
+            with self.assertRaises(RuntimeError):
+                call_command('rebuild_pictogram_ranking', stdout=StringIO())
+
+        rebuilt = PatientPictogram.objects.get(pk=link.pk)
+        self.assertIsNotNone(rebuilt.rank_score)
+        self.assertEqual(rebuilt.rank_score, link.rank_score)
+
+    def test_batch_with_unknown_pictogram_is_rejected_entirely(self):
+        response = self.client.post(
+            self.url,
+            {
+                'events': [
+                    {'pictogram': self.water.id, 'occurred_at': '2026-04-11T10:00:00-03:00', 'sequence': 1},
+                    {'pictogram': 999999, 'occurred_at': '2026-04-11T10:00:01-03:00', 'sequence': 2},
+                ]
+            },
+            format='json',
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(PictogramUsageEvent.objects.count(), 0)
+        self.assertEqual(PictogramUsageDaily.objects.count(), 0)
+
+
+class PatientPictogramRankingTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='ranking-user', password='123456')
+        self.client.force_authenticate(user=self.user)
+
+        self.patient = Person.objects.create(
+            name='Paciente Ranking',
+            cpf='12345678906',
+            email='paciente.ranking@example.com',
+            phone='11999990005',
+            is_patient=True,
+        )
+        self.category = EverydayCategory.objects.create(
+            name='Ranking',
+            created_by=self.user,
+        )
+        self.pictograms = {}
+        for name in ['Arroz', 'Banho', 'Comer']:
+            pictogram = Pictogram.objects.create(
+                name=name,
+                category=self.category,
+                image=SimpleUploadedFile(
+                    f'{name}.gif',
+                    (
+                        b'GIF87a\x01\x00\x01\x00\x80\x01\x00\x00\x00\x00'
+                        b'\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00,\x00'
+                        b'\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;'
+                    ),
+                    content_type='image/gif',
+                ),
+                created_by=self.user,
+            )
+            PatientPictogram.objects.create(patient=self.patient, pictogram=pictogram, created_by=self.user)
+            self.pictograms[name] = pictogram
+
+        self.list_url = reverse('patient-pictograms-list', kwargs={'patient_id': self.patient.id})
+        self.usage_url = reverse('patient-pictogram-usage', kwargs={'patient_id': self.patient.id})
+
+    def test_ranked_order_prefers_recent_and_frequent_use(self):
+        events = [
+            # "Banho" foi muito usado, mas há dois meses
+            {'pictogram': self.pictograms['Banho'].id, 'occurred_at': '2026-02-01T09:00:00-03:00', 'sequence': 1},
+            {'pictogram': self.pictograms['Banho'].id, 'occurred_at': '2026-02-01T09:01:00-03:00', 'sequence': 2},
+            {'pictogram': self.pictograms['Banho'].id, 'occurred_at': '2026-02-01T09:02:00-03:00', 'sequence': 3},
+            # "Comer" foi usado uma vez, recentemente e à noite
+            {'pictogram': self.pictograms['Comer'].id, 'occurred_at': '2026-04-01T20:00:00-03:00', 'sequence': 4},
+        ]
+        response = self.client.post(self.usage_url, {'events': events}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        alphabetical = self.client.get(self.list_url)
+        ranked = self.client.get(self.list_url, {'order': 'ranked'})
+        morning = self.client.get(self.list_url, {'order': 'ranked', 'daypart': 'morning'})
+
+        self.assertEqual([item['pictogram_name'] for item in alphabetical.data], ['Arroz', 'Banho', 'Comer'])
+        self.assertEqual([item['pictogram_name'] for item in ranked.data], ['Comer', 'Banho', 'Arroz'])
+        self.assertEqual([item['pictogram_name'] for item in morning.data], ['Banho', 'Comer', 'Arroz'])
+
+        link = PatientPictogram.objects.get(patient=self.patient, pictogram=self.pictograms['Comer'])
+        self.assertIsNotNone(link.rank_score)
+        self.assertIn('evening', link.daypart_rank_scores)
+
+
+class PatientPictogramPredictionTests(APITestCase):
+    def setUp(self):
+        pictogram_predictor.reset()
+        self.user = User.objects.create_user(username='prediction-user', password='123456')
+        self.client.force_authenticate(user=self.user)
+
+        self.patient = Person.objects.create(
+            name='Paciente Predição',
+            cpf='12345678907',
+            email='paciente.predicao@example.com',
+            phone='11999990006',
+            is_patient=True,
+        )
+        self.category = EverydayCategory.objects.create(
+            name='Predição',
+            created_by=self.user,
+        )
+        self.pictograms = {}
+        for name in ['Arroz', 'Banho', 'Comer', 'Dormir']:
+            pictogram = Pictogram.objects.create(
+                name=name,
+                category=self.category,
+                image=SimpleUploadedFile(
+                    f'{name}.gif',
+                    (
+                        b'GIF87a\x01\x00\x01\x00\x80\x01\x00\x00\x00\x00'
+                        b'\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00,\x00'
+                        b'\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;'
+                    ),
+                    content_type='image/gif',
+                ),
+                created_by=self.user,
+            )
+            PatientPictogram.objects.create(patient=self.patient, pictogram=pictogram, created_by=self.user)
+            self.pictograms[name] = pictogram
+
+        self.usage_url = reverse('patient-pictogram-usage', kwargs={'patient_id': self.patient.id})
+        self.predict_url = reverse('patient-pictogram-predict', kwargs={'patient_id': self.patient.id})
+
+    def _sentence(self, names, start, first_sequence):
+        return [
+            {
+                'pictogram': self.pictograms[name].id,
+                'occurred_at': f'2026-04-11T{start}:{index:02d}-03:00',
+                'sequence': first_sequence + index,
+            }
+            for index, name in enumerate(names)
+        ]
+
+    def test_prediction_follows_recorded_sentences_and_updates_incrementally(self):
+        events = (
+            self._sentence(['Comer', 'Arroz'], '10:00', 1)
+            + self._sentence(['Comer', 'Arroz'], '12:00', 3)
+            + self._sentence(['Comer', 'Banho'], '14:00', 5)
+        )
+        response = self.client.post(self.usage_url, {'events': events}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        prediction = self.client.get(self.predict_url, {'after': self.pictograms['Comer'].id, 'limit': 4})
+        self.assertEqual(prediction.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(item['pictogram_name'], item['source']) for item in prediction.data['predictions']],
+            [('Arroz', 'patient'), ('Banho', 'patient'), ('Comer', 'patient'), ('Dormir', 'ranking')],
+        )
+
+        # Novos lotes atualizam o modelo já carregado, sem recarregar o histórico
+        events = (
+            self._sentence(['Comer', 'Banho'], '16:00', 7)
+            + self._sentence(['Comer', 'Banho'], '18:00', 9)
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.usage_url, {'events': events}, format='json')
+
+        with self.assertNumQueries(1):
+            prediction = self.client.get(self.predict_url, {'after': self.pictograms['Comer'].id, 'limit': 1})
+        self.assertEqual(prediction.data['predictions'][0]['pictogram_name'], 'Banho')
+
+    @override_settings(PICTOGRAM_PREDICTION_SETTINGS={'MODEL_TTL_SECONDS': 0, 'BACKGROUND_REFRESH': False})
+    def test_expired_model_reads_only_new_events(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.usage_url, {'events': self._sentence(['Comer', 'Arroz'], '10:00', 1)}, format='json')
+        model = pictogram_predictor.get_patient_model(self.patient.id)
+        self.assertEqual(model.totals[()], 2)
+
+        # Lote recebido neste processo e lote gravado por outro processo
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.usage_url, {'events': self._sentence(['Comer', 'Banho'], '12:00', 3)}, format='json')
+        PictogramUsageEvent.objects.bulk_create(
+            PictogramUsageEvent(
+                patient=self.patient,
+                pictogram=self.pictograms[name],
+                occurred_at=f'2026-04-11T14:00:{index:02d}-03:00',
+                sequence=5 + index,
+            )
+            for index, name in enumerate(['Comer', 'Banho'])
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            model = pictogram_predictor.get_patient_model(self.patient.id)
+        self.assertEqual(model.totals[()], 6)
+        self.assertEqual(model.transitions[(self.pictograms['Comer'].id,)][self.pictograms['Banho'].id], 2)
+        self.assertIn('"id" >', queries[0]['sql'])
+
+    def test_invalid_after_is_rejected(self):
+        response = self.client.get(self.predict_url, {'after': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class FakeSpeechEngine(SpeechEngine):
+    name = 'fake'
+    extension = '.wav'
+    content_type = 'audio/wav'
+    calls = []
+
+    def synthesize(self, text, voice, rate):
+        self.calls.append((text, voice, rate))
+        return f'RIFF{text}|{voice}|{rate}'.encode('utf-8')
+
+
+class PictogramSpeechTests(APITestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+        speech_settings = override_settings(SPEECH_SETTINGS={
+            'ENGINE': 'smart_caa.tests.FakeSpeechEngine',
+            'CACHE_DIR': self.cache_dir,
+        })
+        speech_settings.enable()
+        self.addCleanup(speech_settings.disable)
+        FakeSpeechEngine.calls.clear()
+
+        self.user = User.objects.create_user(username='speech-user', password='123456')
+        self.client.force_authenticate(user=self.user)
+        category = EverydayCategory.objects.create(name='Fala', created_by=self.user)
+        self.pictogram = Pictogram.objects.create(
+            name='Beber água',
+            description='Quero beber água',
+            category=category,
+            image=SimpleUploadedFile(
+                'beber.gif',
+                (
+                    b'GIF87a\x01\x00\x01\x00\x80\x01\x00\x00\x00\x00'
+                    b'\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00,\x00'
+                    b'\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;'
+                ),
+                content_type='image/gif',
+            ),
+            created_by=self.user,
+        )
+        self.url = reverse('pictogram-speech', kwargs={'pk': self.pictogram.id})
+
+    def test_audio_is_synthesized_once_and_served_from_cache(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first['Content-Type'], 'audio/wav')
+        self.assertEqual(b''.join(first.streaming_content), 'RIFFBeber água|pt-br|150'.encode('utf-8'))
+
+        second = self.client.get(self.url)
+        self.assertEqual(b''.join(second.streaming_content), 'RIFFBeber água|pt-br|150'.encode('utf-8'))
+        not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Voz, velocidade e texto diferentes geram entradas próprias no cache
+        slower = self.client.get(self.url, {'rate': 100, 'source': 'description'})
+        self.assertEqual(b''.join(slower.streaming_content), 'RIFFQuero beber água|pt-br|100'.encode('utf-8'))
+
+        call_command('synthesize_pictogram_audio', stdout=StringIO())
+        self.assertEqual(
+            FakeSpeechEngine.calls,
+            [('Beber água', 'pt-br', 150), ('Quero beber água', 'pt-br', 100)],
+        )
+
+    def test_invalid_rate_is_rejected(self):
+        response = self.client.get(self.url, {'rate': 5})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(FakeSpeechEngine.calls, [])
+
+        for rate in ('0', '5000'):
+            with self.assertRaises(CommandError):
+                call_command('synthesize_pictogram_audio', '--rate', rate, stdout=StringIO())
+        self.assertEqual(FakeSpeechEngine.calls, [])
+
+    @mock.patch('smart_caa.services.speech.shutil.which', return_value='/usr/bin/espeak-ng')
+    @mock.patch('smart_caa.services.speech.subprocess.run')
+    def test_espeak_receives_text_on_stdin(self, run, which):
+        run.return_value = subprocess.CompletedProcess([], 0, stdout=b'RIFF', stderr=b'')
+        self.assertEqual(EspeakEngine().synthesize('-w/tmp/invadido.wav Olá', 'pt-br', 150), b'RIFF')
+
+        command = run.call_args.args[0]
+        self.assertNotIn('-w/tmp/invadido.wav Olá', command)
+        self.assertEqual(command[-1], '--stdin')
+        self.assertEqual(run.call_args.kwargs['input'], '-w/tmp/invadido.wav Olá'.encode('utf-8'))
+
+
+class PatientBoardExportTests(APITestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+        export_settings = override_settings(BOARD_EXPORT_SETTINGS={'CACHE_DIR': self.cache_dir})
+        export_settings.enable()
+        self.addCleanup(export_settings.disable)
+
+        self.user = User.objects.create_user(username='board-user', password='123456')
+        self.client.force_authenticate(user=self.user)
+        self.patient = Person.objects.create(
+            name='Paciente Prancha',
+            cpf='12345678908',
+            email='paciente.prancha@example.com',
+            phone='11999990007',
+            is_patient=True,
+        )
+        self.links = {}
+        for category_name, name in [('Comida', 'Arroz'), ('Higiene', 'Banho'), ('Comida', 'Feijão')]:
+            category, _ = EverydayCategory.objects.get_or_create(name=category_name, defaults={'created_by': self.user})
+            pictogram = Pictogram.objects.create(
+                name=name,
+                category=category,
+                image=SimpleUploadedFile(
+                    f'{name}.gif',
+                    (
+                        b'GIF87a\x01\x00\x01\x00\x80\x01\x00\x00\x00\x00'
+                        b'\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00,\x00'
+                        b'\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;'
+                    ),
+                    content_type='image/gif',
+                ),
+                created_by=self.user,
+            )
+            self.links[name] = PatientPictogram.objects.create(
+                patient=self.patient, pictogram=pictogram, created_by=self.user
+            )
+        self.url = reverse('patient-board-export', kwargs={'patient_id': self.patient.id})
+
+    def _download(self, **headers):
+        response = self.client.get(self.url, **headers)
+        if response.status_code != status.HTTP_200_OK:
+            return response, None
+        return response, zipfile.ZipFile(BytesIO(b''.join(response.streaming_content)))
+
+    def test_export_contains_manifest_and_files_and_is_cached_by_version(self):
+        response, archive = self._download()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(archive.testzip())
+
+        manifest = json.loads(archive.read('manifest.json'))
+        self.assertEqual([category['name'] for category in manifest['categories']], ['Comida', 'Higiene'])
+        self.assertEqual([item['name'] for item in manifest['pictograms']], ['Arroz', 'Feijão', 'Banho'])
+        for item in manifest['pictograms']:
+            self.assertTrue(archive.read(item['image']).startswith(b'GIF87a'))
+
+        cached_files = os.listdir(os.path.join(self.cache_dir, str(self.patient.id)))
+        self.assertEqual(cached_files, [f'{manifest["version"]}.zip'])
+
+        not_modified, _ = self._download(HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Desvincular um pictograma gera uma nova versão e descarta a anterior
+        self.links['Banho'].is_active = False
+        self.links['Banho'].save()
+        updated, archive = self._download(HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(updated.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(updated['ETag'], response['ETag'])
+        manifest = json.loads(archive.read('manifest.json'))
+        self.assertEqual([item['name'] for item in manifest['pictograms']], ['Arroz', 'Feijão'])
+        self.assertEqual(os.listdir(os.path.join(self.cache_dir, str(self.patient.id))), [f'{manifest["version"]}.zip'])
+
+        # O nome do paciente vai no manifesto: renomeá-lo também muda a versão
+        self.patient.name = 'Paciente Renomeado'
+        self.patient.save()
+        renamed, archive = self._download(HTTP_IF_NONE_MATCH=updated['ETag'])
+        self.assertEqual(renamed.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(archive.read('manifest.json'))['patient']['name'], 'Paciente Renomeado')
+
+    def test_pdf_sheet_is_cached_per_layout(self):
+        response = self.client.get(reverse('patient-board-pdf', kwargs={'patient_id': self.patient.id}), {'columns': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        content = b''.join(response.streaming_content)
+        self.assertTrue(content.startswith(b'%PDF-1.4'))
+        self.assertTrue(content.endswith(b'%%EOF\n'))
+        page_content = zlib.decompress(re.search(rb'/FlateDecode >>\nstream\n(.*?)\nendstream', content, re.S).group(1))
+        self.assertIn(b'(Comida)', page_content)
+        self.assertIn('(Feijão)'.encode('cp1252'), page_content)
+        self.assertEqual(content.count(b'/Subtype /Image'), 3)
+
+        # Cada objeto listado na tabela xref começa no deslocamento indicado
+        xref = content[content.rindex(b'xref\n'):].split(b'\n')
+        for number, line in enumerate(xref[3:], start=1):
+            if not line.endswith(b' n '):
+                break
+            offset = int(line.split()[0])
+            self.assertTrue(content[offset:].startswith(b'%d 0 obj' % number))
+
+        landscape = self.client.get(
+            reverse('patient-board-pdf', kwargs={'patient_id': self.patient.id}),
+            {'columns': 2, 'orientation': 'landscape'},
+        )
+        b''.join(landscape.streaming_content)
+        self.assertNotEqual(landscape['ETag'], response['ETag'])
+        self.assertEqual(len(os.listdir(os.path.join(self.cache_dir, str(self.patient.id)))), 2)
+
+        invalid = self.client.get(reverse('patient-board-pdf', kwargs={'patient_id': self.patient.id}), {'columns': 50})
+        self.assertEqual(invalid.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_pdf_sheet_skips_decompression_bomb_images(self):
+        # Qualquer imagem passa do limite: a folha sai só com os nomes
+        with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 0):
+            response = self.client.get(reverse('patient-board-pdf', kwargs={'patient_id': self.patient.id}))
+            content = b''.join(response.streaming_content)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(content.startswith(b'%PDF-1.4'))
+        self.assertEqual(content.count(b'/Subtype /Image'), 0)
+
+
+
+class PictogramImportTests(APITestCase):
+    GIF = (
+        b'GIF87a\x01\x00\x01\x00\x80\x01\x00\x00\x00\x00'
+        b'\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00,\x00'
+        b'\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;'
+    )
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir, ignore_errors=True)
+        media_settings = override_settings(MEDIA_ROOT=os.path.join(self.tmp_dir, 'media'))
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        self.user = User.objects.create_user(username='import-user', password='123456')
+        category = EverydayCategory.objects.create(name='Comida', created_by=self.user)
+        Pictogram.objects.create(
+            name='Arroz',
+            category=category,
+            image=SimpleUploadedFile('arroz.gif', self.GIF, content_type='image/gif'),
+            created_by=self.user,
+        )
+
+        self.archive = os.path.join(self.tmp_dir, 'catalogo.zip')
+        with zipfile.ZipFile(self.archive, 'w') as archive:
+            archive.writestr('imagens/arroz.gif', self.GIF)
+            archive.writestr('imagens/feijao.gif', self.GIF)
+            archive.writestr('imagens/banho.gif', self.GIF)
+            archive.writestr('imagens/quebrada.png', b'isto nao e uma imagem')
+            archive.writestr('pictograms.csv', '\n'.join([
+                'name;category;image;description;is_default',
+                'Arroz;Comida;imagens/arroz.gif;;',
+                'Feijão;Comida;imagens/feijao.gif;Feijão preto;sim',
+                'Banho;Higiene;imagens/banho.gif;;',
+                'Quebrada;Higiene;imagens/quebrada.png;;',
+                'Sem imagem;Higiene;imagens/nao-existe.gif;;',
+                'Banho;Higiene;imagens/banho.gif;;',
+            ]))
+
+    def _import(self):
+        output = StringIO()
+        report_path = os.path.join(self.tmp_dir, 'relatorio.json')
+        call_command(
+            'import_pictograms', self.archive, '--user', 'import-user', '--report', report_path,
+            '--chunk-size', '2', stdout=output, stderr=StringIO(),
+        )
+        with open(report_path, encoding='utf-8') as source:
+            return json.load(source)
+
+    def test_import_creates_rows_in_bulk_and_reports_errors_per_row(self):
+        report = self._import()
+
+        self.assertEqual(report['total'], 6)
+        self.assertEqual(report['created'], 2)
+        self.assertEqual(report['skipped'], 1)
+        self.assertEqual(report['categories_created'], 1)
+        self.assertEqual([error['row'] for error in report['errors']], [5, 6, 7])
+
+        feijao = Pictogram.objects.get(name='Feijão', category__name='Comida')
+        self.assertTrue(feijao.is_default)
+        self.assertEqual(feijao.description, 'Feijão preto')
+        self.assertEqual(feijao.created_by, self.user)
+        self.assertTrue(feijao.image.storage.exists(feijao.image.name))
+        self.assertTrue(Pictogram.objects.filter(name='Banho', category__name='Higiene').exists())
+
+        # Reexecutar não duplica nada: a importação continua de onde parou
+        report = self._import()
+        self.assertEqual(report['created'], 0)
+        self.assertEqual(report['skipped'], 3)
+        self.assertEqual(Pictogram.objects.count(), 3)
+
+    def test_existing_pictograms_are_matched_ignoring_case(self):
+        Pictogram.objects.create(
+            name='Água',
+            category=EverydayCategory.objects.get(name='Comida'),
+            image=SimpleUploadedFile('agua.gif', self.GIF, content_type='image/gif'),
+            created_by=self.user,
+        )
+        with zipfile.ZipFile(self.archive, 'w') as archive:
+            archive.writestr('imagens/arroz.gif', self.GIF)
+            archive.writestr('pictograms.csv', '\n'.join([
+                'name;category;image;description;is_default',
+                'ARROZ;Comida;imagens/arroz.gif;;',
+                'ÁGUA;Comida;imagens/arroz.gif;;',
+            ]))
+
+        report = self._import()
+        self.assertEqual(report['created'], 0)
+        self.assertEqual(report['skipped'], 2)
+        self.assertEqual(Pictogram.objects.count(), 2)
+
+    def test_categories_are_matched_ignoring_case(self):
+        with zipfile.ZipFile(self.archive, 'w') as archive:
+            archive.writestr('imagens/feijao.gif', self.GIF)
+            archive.writestr('imagens/banho.gif', self.GIF)
+            archive.writestr('pictograms.csv', '\n'.join([
+                'name;category;image;description;is_default',
+                'Feijão;comida;imagens/feijao.gif;;',
+                'Banho;HIGIENE;imagens/banho.gif;;',
+                'Toalha;higiene;imagens/banho.gif;;',
+            ]))
+
+        report = self._import()
+        self.assertEqual(report['created'], 3)
+        self.assertEqual(report['categories_created'], 1)
+        self.assertEqual(EverydayCategory.objects.count(), 2)
+        self.assertTrue(Pictogram.objects.filter(name='Feijão', category__name='Comida').exists())
+        self.assertEqual(
+            set(Pictogram.objects.filter(name__in=['Banho', 'Toalha']).values_list('category__name', flat=True)),
+            {'HIGIENE'},
+        )
+
+
+class StreamingExportTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='export-user', password='123456')
+        self.client.force_authenticate(user=self.user)
+
+        self.patient = Person.objects.create(
+            name='Paciente Exportação',
+            cpf='12345678909',
+            email='paciente.exportacao@example.com',
+            phone='11999990008',
+            is_patient=True,
+        )
+        self.other_patient = Person.objects.create(
+            name='Outro Paciente',
+            cpf='12345678910',
+            email='outro.paciente@example.com',
+            phone='11999990009',
+            is_patient=True,
+        )
+        self.caregiver = Person.objects.create(
+            name='Cuidadora Exportação',
+            cpf='12345678911',
+            email='cuidadora.exportacao@example.com',
+            phone='11999990010',
+            is_caregiver=True,
+        )
+        History.objects.create(patient=self.patient, caregiver=self.caregiver, description='Sessão, com "aspas"')
+        History.objects.create(patient=self.patient, caregiver=self.caregiver, description='Segunda sessão')
+        History.objects.create(patient=self.other_patient, caregiver=self.caregiver, description='Outro')
+        History.objects.create(
+            patient=self.patient, caregiver=self.caregiver, description='Inativo', is_active=False
+        )
+
+    def _content(self, response):
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_history_csv_export_applies_list_filters(self):
+        response = self.client.get(reverse('history-export'), {'patient_id': self.patient.id})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        rows = list(csv.DictReader(StringIO(self._content(response).lstrip('﻿'))))
+        self.assertEqual(
+            sorted(row['description'] for row in rows),
+            ['Segunda sessão', 'Sessão, com "aspas"'],
+        )
+        self.assertEqual({row['caregiver_name'] for row in rows}, {'Cuidadora Exportação'})
+
+        tomorrow = (timezone.localdate() + timedelta(days=1)).isoformat()
+        empty = self.client.get(reverse('history-export'), {'created_from': tomorrow})
+        self.assertEqual(len(self._content(empty).splitlines()), 1)
+
+    def test_csv_export_neutralizes_formulas(self):
+        History.objects.create(patient=self.patient, caregiver=self.caregiver, description='=HYPERLINK("http://x")')
+        History.objects.create(patient=self.patient, caregiver=self.caregiver, description='-2+3')
+
+        response = self.client.get(reverse('history-export'), {'patient_id': self.patient.id})
+        descriptions = {row['description'] for row in csv.DictReader(StringIO(self._content(response).lstrip('﻿')))}
+        self.assertIn('\'=HYPERLINK("http://x")', descriptions)
+        self.assertIn("'-2+3", descriptions)
+        self.assertIn('Segunda sessão', descriptions)
+
+        # O JSONL não é aberto como planilha e mantém o texto original
+        jsonl = self.client.get(reverse('history-export'), {'patient_id': self.patient.id, 'output': 'jsonl'})
+        self.assertIn('-2+3', {json.loads(line)['description'] for line in self._content(jsonl).splitlines()})
+
+    def test_jsonl_export_and_invalid_parameters(self):
+        response = self.client.get(reverse('patient-export'), {'output': 'jsonl'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        patients = [json.loads(line) for line in self._content(response).splitlines()]
+        self.assertEqual([patient['name'] for patient in patients], ['Outro Paciente', 'Paciente Exportação'])
+
+        anamnesis = self.client.get(reverse('anamnesis-export'), {'output': 'jsonl'})
+        self.assertEqual(anamnesis.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._content(anamnesis), '')
+
+        self.assertEqual(
+            self.client.get(reverse('history-export'), {'output': 'xlsx'}).status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+        self.assertEqual(
+            self.client.get(reverse('history-export'), {'created_to': '31/12/2026'}).status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+        self.assertEqual(
+            self.client.get(reverse('history-export'), {'patient_id': self.caregiver.id}).status_code,
+            status.HTTP_404_NOT_FOUND,
+        )
@@ -0,0 +1,218 @@
+"""
+Limite de requisições por balde de fichas (token bucket) para os endpoints
+abertos que fazem hash de senha ou enviam e-mail.
+
+Cada chave (escopo + IP, usuário ou conta) guarda um único número no cache
+do Django: o instante teórico em que o balde volta a ficar cheio (GCRA, a
+forma do token bucket que não precisa guardar fichas e horário separados).
+Verificar uma requisição custa uma leitura e uma escrita no cache. Com mais
+de um processo, o cache (THROTTLE_SETTINGS['CACHE_ALIAS']) deve ser
+compartilhado (arquivos, Redis ou Memcached; o `check --deploy` recusa o
+LocMemCache fora do DEBUG, em que N workers multiplicam o limite por N); a leitura e a escrita não são atômicas,
+então requisições simultâneas podem passar uma ou outra ficha a mais, como
+nos throttles do próprio DRF.
+
+O IP vem do get_ident do DRF, que só confia no X-Forwarded-For conforme
+REST_FRAMEWORK['NUM_PROXIES'] (0: REMOTE_ADDR).
+"""
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from rest_framework.throttling import BaseThrottle
+
+
+BUCKET_KEY = 'throttle:{scope}:{ident}'
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def get_throttle_settings():
+    """
+    Retorna as configurações do limite de requisições com valores padrão
+    """
+    defaults = {
+        'ENABLED': True,
+        'CACHE_ALIAS': 'default',
+        # RATE: fichas repostas por período (s, min, hour, day); BURST:
+        # tamanho do balde; KEY: ip, user (usuário logado ou IP) ou
+        # field:<campo> (valor do campo no corpo, ex.: a conta atacada)
+        'SCOPES': {
+            'login': {'RATE': '20/min', 'BURST': 10, 'KEY': 'ip'},
+            'login_account': {'RATE': '10/min', 'BURST': 5, 'KEY': 'field:username'},
+            'password_reset': {'RATE': '5/hour', 'BURST': 3, 'KEY': 'ip'},
+            'password_reset_account': {'RATE': '3/hour', 'BURST': 2, 'KEY': 'field:email'},
+            'change_password': {'RATE': '10/min', 'BURST': 5, 'KEY': 'ip'},
+            'change_password_account': {'RATE': '5/min', 'BURST': 5, 'KEY': 'field:username'},
+            'registration': {'RATE': '30/hour', 'BURST': 10, 'KEY': 'ip'},
+        },
+    }
+    custom = getattr(settings, 'THROTTLE_SETTINGS', {})
+    defaults.update({key: value for key, value in custom.items() if key != 'SCOPES'})
+    defaults['SCOPES'] = {**defaults['SCOPES'], **custom.get('SCOPES', {})}
+    return defaults
+
+
+def check_shared_cache(app_configs=None, **kwargs):
+    """
+    Check do Django (--deploy): fora do DEBUG, os baldes não podem ficar no
+    cache em memória de cada processo
+    """
+    throttle_settings = get_throttle_settings()
+    if settings.DEBUG or not throttle_settings['ENABLED']:
+        return []
+    if not isinstance(caches[throttle_settings['CACHE_ALIAS']], LocMemCache):
+        return []
+    return [checks.Error(
+        f"O cache '{throttle_settings['CACHE_ALIAS']}' dos limites de requisição é o LocMemCache, "
+        'separado por processo: com N workers o limite efetivo é N vezes o configurado.',
+        hint='Configure CACHES com um backend compartilhado (CACHE_BACKEND/CACHE_LOCATION).',
+        id='smart_caa.E001',
+    )]
+
+
+def parse_rate(rate):
+    """
+    '10/min' -> (10, 60). Aceita os mesmos períodos dos throttles do DRF.
+    """
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+class ThrottleMetrics:
+    """
+    Requisições liberadas e limitadas por escopo, e o custo da verificação,
+    por processo
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._scopes = {}
+
+    def record(self, scope, allowed, elapsed_ns):
+        with self._lock:
+            counters = self._scopes.setdefault(scope, {'allowed': 0, 'throttled': 0, 'check_ns': 0})
+            counters['allowed' if allowed else 'throttled'] += 1
+            counters['check_ns'] += elapsed_ns
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                scope: {
+                    'allowed': counters['allowed'],
+                    'throttled': counters['throttled'],
+                    'check_us_avg': counters['check_ns'] / 1000 / (counters['allowed'] + counters['throttled']),
+                }
+                for scope, counters in self._scopes.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._scopes = {}
+
+
+metrics = ThrottleMetrics()
+
+
+def consume(cache, scope, ident, rate, burst):
+    """
+    Retira uma ficha do balde. Retorna (liberada, segundos até a próxima ficha).
+    """
+    count, period = parse_rate(rate)
+    interval = period / count
+    tolerance = interval * (max(burst, 1) - 1)
+    key = BUCKET_KEY.format(scope=scope, ident=ident)
+
+    now = time.time()
+    full_at = max(cache.get(key, now), now)
+    if full_at - now > tolerance:
+        return False, full_at - now - tolerance
+    full_at += interval
+    cache.set(key, full_at, timeout=math.ceil(full_at - now))
+    return True, None
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Throttle do DRF com o escopo configurado em THROTTLE_SETTINGS['SCOPES'].
+    Escopo ausente ou sem valor para a chave (campo não enviado) não limita.
+    """
+    scope = None
+
+    def __init__(self):
+        self._wait = None
+
+    def get_ident_for(self, request, key):
+        if key == 'ip':
+            return self.get_ident(request)
+        if key == 'user':
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                return f'user-{user.pk}'
+            return self.get_ident(request)
+        if key.startswith('field:'):
+            value = request.data.get(key[len('field:'):]) if hasattr(request.data, 'get') else None
+            if not isinstance(value, str) or not value.strip():
+                return None
+            return hashlib.sha1(value.strip().lower().encode()).hexdigest()
+        raise ValueError(f'Chave de throttle desconhecida: {key}')
+
+    def allow_request(self, request, view):
+        throttle_settings = get_throttle_settings()
+        config = throttle_settings['SCOPES'].get(self.scope)
+        if not throttle_settings['ENABLED'] or not config:
+            return True
+        ident = self.get_ident_for(request, config['KEY'])
+        if ident is None:
+            return True
+
+        started = time.perf_counter_ns()
+        cache = caches[throttle_settings['CACHE_ALIAS']]
+        allowed, self._wait = consume(cache, self.scope, ident, config['RATE'], config['BURST'])
+        metrics.record(self.scope, allowed, time.perf_counter_ns() - started)
+        return allowed
+
+    def wait(self):
+        return self._wait
+
+
+class LoginThrottle(TokenBucketThrottle):
+    scope = 'login'
+
+
+class LoginAccountThrottle(TokenBucketThrottle):
+    scope = 'login_account'
+
+
+class PasswordResetThrottle(TokenBucketThrottle):
+    scope = 'password_reset'
+
+
+class PasswordResetAccountThrottle(TokenBucketThrottle):
+    scope = 'password_reset_account'
+
+
+class ChangePasswordThrottle(TokenBucketThrottle):
+    scope = 'change_password'
+
+
+class ChangePasswordAccountThrottle(TokenBucketThrottle):
+    scope = 'change_password_account'
+
+
+class RegistrationThrottle(TokenBucketThrottle):
+    """
+    Limita só o cadastro aberto (anônimo); a equipe autenticada cadastrando
+    pacientes e cuidadores não consome o balde
+    """
+    scope = 'registration'
+
+    def allow_request(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return True
+        return super().allow_request(request, view)
@@ -4,6 +4,7 @@ from .views import (
     EverydayCategoryRetrieveUpdateDestroyView,
     PictogramCreateListView,
     PictogramRetrieveUpdateDestroyView,
+    PictogramSpeechView,
     PatientCreateListView,
     PatientRetrieveUpdateDestroyView,
     PatientCaregiversListView,
@@ -34,7 +35,16 @@ from .views import (
     HistoryCreateListView,
     HistoryRetrieveUpdateDestroyView,
     AttachmentCreateListView,
-    AttachmentRetrieveUpdateDestroyView
+    AttachmentRetrieveUpdateDestroyView,
+    PatientPictogramUsageView,
+    PatientPictogramPredictView,
+    PatientBoardExportView,
+    PatientBoardPDFView,
+    HistoryExportView,
+    AnamnesisExportView,
+    PatientExportView,
+    BulkOnboardingView,
+    MetricsView
 )
 
 urlpatterns = [
@@ -45,9 +55,11 @@ urlpatterns = [
     # Pictogram endpoints
     path('api/pictograms/', PictogramCreateListView.as_view(), name='pictogram-list-create'),
     path('api/pictograms/<int:pk>/', PictogramRetrieveUpdateDestroyView.as_view(), name='pictogram-detail'),
+    path('api/pictograms/<int:pk>/speech/', PictogramSpeechView.as_view(), name='pictogram-speech'),
     
     # Patient endpoints
     path('api/patients/', PatientCreateListView.as_view(), name='patient-list-create'),
+    path('api/patients/export/', PatientExportView.as_view(), name='patient-export'),
     path('api/patients/<int:pk>/', PatientRetrieveUpdateDestroyView.as_view(), name='patient-detail'),
     
     # Patient-Caregiver relationship endpoints (specific to patient)
@@ -61,6 +73,10 @@ urlpatterns = [
     path('api/patients/<int:patient_id>/pictograms/custom/create/', PatientCustomPictogramCreateView.as_view(), name='patient-custom-pictogram-create'),
     path('api/patients/<int:patient_id>/pictograms/destroy/', PatientPictogramDestroyView.as_view(), name='patient-pictogram-destroy'),
     path('api/patients/<int:patient_id>/pictograms/available/', PatientAvailablePictogramsView.as_view(), name='patient-available-pictograms'),
+    path('api/patients/<int:patient_id>/pictograms/usage/', PatientPictogramUsageView.as_view(), name='patient-pictogram-usage'),
+    path('api/patients/<int:patient_id>/pictograms/predict/', PatientPictogramPredictView.as_view(), name='patient-pictogram-predict'),
+    path('api/patients/<int:patient_id>/board/export/', PatientBoardExportView.as_view(), name='patient-board-export'),
+    path('api/patients/<int:patient_id>/board/pdf/', PatientBoardPDFView.as_view(), name='patient-board-pdf'),
     
     # Caregiver endpoints
     path('api/caregivers/', CaregiverCreateListView.as_view(), name='caregiver-list-create'),
@@ -79,10 +95,12 @@ urlpatterns = [
     path('api/person/cpf/<str:cpf>/', GetPersonByCpfView.as_view(), name='get-person-by-cpf'),
     path('api/person/<int:person_id>/make-caregiver/', MakeCaregiverView.as_view(), name='make-caregiver'),
     path('api/person/<int:person_id>/make-patient/', MakePatientView.as_view(), name='make-patient'),
+    path('api/person/onboarding/', BulkOnboardingView.as_view(), name='person-onboarding'),
     
     # Anamnesis endpoints
     path('api/anamnesis/', AnamnesisCreateListView.as_view(), name='anamnesis-list-create'),
     path('api/anamnesis/<int:pk>/', AnamnesisRetrieveUpdateDestroyView.as_view(), name='anamnesis-detail'),
+    path('api/anamnesis/export/', AnamnesisExportView.as_view(), name='anamnesis-export'),
     path('api/anamnesis/get/', GetAnamnesisView.as_view(), name='anamnesis-get-by-ids'),
     
     # Caregiver-specific anamnesis endpoints
@@ -95,9 +113,13 @@ urlpatterns = [
 
     # History endpoints
     path('api/histories/', HistoryCreateListView.as_view(), name='history-list-create'),
+    path('api/histories/export/', HistoryExportView.as_view(), name='history-export'),
     path('api/histories/<int:pk>/', HistoryRetrieveUpdateDestroyView.as_view(), name='history-detail'),
     
     # Attachment endpoints
     path('api/attachments/', AttachmentCreateListView.as_view(), name='attachment-list-create'),
     path('api/attachments/<int:pk>/', AttachmentRetrieveUpdateDestroyView.as_view(), name='attachment-detail'),
+
+    # Métricas no formato do Prometheus
+    path('metrics', MetricsView.as_view(), name='metrics'),
 ]
@@ -1,5 +1,5 @@
 from .everyday_category import EverydayCategoryCreateListView, EverydayCategoryRetrieveUpdateDestroyView
-from .pictogram import PictogramCreateListView, PictogramRetrieveUpdateDestroyView
+from .pictogram import PictogramCreateListView, PictogramRetrieveUpdateDestroyView, PictogramSpeechView
 from .patient import (
     PatientCreateListView, 
     PatientRetrieveUpdateDestroyView,
@@ -42,3 +42,8 @@ from .history import (
     HistoryRetrieveUpdateDestroyView
 )
 from .attachment import AttachmentCreateListView, AttachmentRetrieveUpdateDestroyView
+from .export import AnamnesisExportView, HistoryExportView, PatientExportView
+from .board import PatientBoardExportView, PatientBoardPDFView
+from .pictogram_usage import PatientPictogramPredictView, PatientPictogramUsageView
+from .onboarding import BulkOnboardingView
+from .metrics import MetricsView
@@ -0,0 +1,117 @@
+from django.http import HttpResponseNotModified, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, OpenApiResponse, extend_schema
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from ..models import Person
+from ..services.board import get_board_zip
+from ..services.board_pdf import ORIENTATIONS, PAGE_SIZES, BoardLayout, get_board_pdf
+
+
+@extend_schema(tags=['Patient'])
+class PatientBoardExportView(APIView):
+    """
+    View para baixar a prancha do paciente como pacote offline (ZIP)
+    """
+    permission_classes = (IsAuthenticated,)
+
+    @extend_schema(
+        summary='Exportar Prancha do Paciente',
+        description='Gera um pacote ZIP com as imagens, os áudios e um `manifest.json` (categorias, ordem e arquivos) dos pictogramas ativos do paciente, para uso em dispositivos sem conexão. O pacote é transmitido em partes e mantido em cache pela versão da prancha; a versão é enviada no `ETag`, e `If-None-Match` com a versão atual retorna 304.',
+        responses={
+            200: OpenApiResponse(response=OpenApiTypes.BINARY, description='Pacote ZIP da prancha'),
+            304: OpenApiResponse(description='A prancha não mudou desde a versão informada'),
+            404: OpenApiResponse(description='Paciente não encontrado'),
+        }
+    )
+    def get(self, request, patient_id):
+        patient = get_object_or_404(Person.objects.only('id', 'name'), pk=patient_id, is_patient=True)
+        version, chunks = get_board_zip(patient)
+
+        etag = f'"{version}"'
+        if request.headers.get('If-None-Match') == etag:
+            response = HttpResponseNotModified()
+        else:
+            response = StreamingHttpResponse(chunks, content_type='application/zip')
+            response['Content-Disposition'] = f'attachment; filename="prancha-{patient.id}-{version[:8]}.zip"'
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+@extend_schema(tags=['Patient'])
+class PatientBoardPDFView(APIView):
+    """
+    View para baixar a prancha do paciente como folha para impressão (PDF)
+    """
+    permission_classes = (IsAuthenticated,)
+
+    @extend_schema(
+        summary='Imprimir Prancha do Paciente',
+        description='Gera um PDF com os pictogramas ativos do paciente em grade, agrupados por categoria. O PDF é gerado página por página e mantido em cache pela versão da prancha e pelos parâmetros de diagramação; reimpressões com os mesmos parâmetros são servidas do cache.',
+        parameters=[
+            OpenApiParameter(
+                name='columns',
+                type=OpenApiTypes.INT,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description='Quantidade de colunas da grade (padrão 4).'
+            ),
+            OpenApiParameter(
+                name='page_size',
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                enum=list(PAGE_SIZES),
+                description='Tamanho da página (padrão A4).'
+            ),
+            OpenApiParameter(
+                name='orientation',
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                enum=list(ORIENTATIONS),
+                description='Orientação da página (padrão portrait).'
+            ),
+        ],
+        responses={
+            200: OpenApiResponse(response=OpenApiTypes.BINARY, description='PDF da prancha'),
+            304: OpenApiResponse(description='A prancha não mudou desde a versão informada'),
+            400: OpenApiResponse(description='Parâmetros de diagramação inválidos'),
+            404: OpenApiResponse(description='Paciente não encontrado'),
+        }
+    )
+    def get(self, request, patient_id):
+        patient = get_object_or_404(Person.objects.only('id', 'name'), pk=patient_id, is_patient=True)
+        params = request.query_params
+        try:
+            columns = int(params.get('columns') or 4)
+        except ValueError:
+            return Response(
+                {'detail': 'O parâmetro "columns" deve ser um número inteiro.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            layout = BoardLayout(
+                columns=columns,
+                page_size=params.get('page_size') or 'A4',
+                orientation=params.get('orientation') or 'portrait',
+            )
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        version, chunks = get_board_pdf(patient, layout)
+
+        etag = f'"{version}-{layout.key}"'
+        if request.headers.get('If-None-Match') == etag:
+            response = HttpResponseNotModified()
+        else:
+            response = StreamingHttpResponse(chunks, content_type='application/pdf')
+            response['Content-Disposition'] = f'inline; filename="prancha-{patient.id}-{version[:8]}.pdf"'
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
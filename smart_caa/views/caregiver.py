@@ -3,6 +3,7 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from drf_spectacular.utils import extend_schema
 from ..models import Person, PatientCaregiverRelationship
 from ..serializers import CaregiverSerializer, PatientForCaregiverSerializer
+from ..throttling import RegistrationThrottle
 
 
 @extend_schema(tags=['Caregiver'])
@@ -22,6 +23,14 @@ class CaregiverCreateListView(generics.ListCreateAPIView):
         
         return [permission() for permission in permission_classes]
     
+    def get_throttles(self):
+        """
+        Limita o cadastro aberto, que faz o hash da senha; a listagem não é limitada
+        """
+        if self.request.method == 'POST':
+            return [RegistrationThrottle()]
+        return super().get_throttles()
+    
     def get_queryset(self):
         """Retorna apenas pessoas que são cuidadores"""
         return Person.objects.filter(is_caregiver=True)
@@ -0,0 +1,252 @@
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, OpenApiResponse, extend_schema
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from ..models import Anamnesis, History, Person
+from ..services.export import EXPORT_FORMATS, get_export_settings, iter_export
+
+
+EXPORT_OUTPUT_PARAMETER = OpenApiParameter(
+    name='output',
+    type=OpenApiTypes.STR,
+    location=OpenApiParameter.QUERY,
+    required=False,
+    enum=list(EXPORT_FORMATS),
+    description='Formato do arquivo: `csv` (padrão) ou `jsonl` (um objeto JSON por linha).'
+)
+EXPORT_DATE_PARAMETERS = [
+    OpenApiParameter(
+        name='created_from',
+        type=OpenApiTypes.DATE,
+        location=OpenApiParameter.QUERY,
+        required=False,
+        description='Data de criação inicial (inclusive, AAAA-MM-DD).'
+    ),
+    OpenApiParameter(
+        name='created_to',
+        type=OpenApiTypes.DATE,
+        location=OpenApiParameter.QUERY,
+        required=False,
+        description='Data de criação final (inclusive, AAAA-MM-DD).'
+    ),
+]
+EXPORT_PERSON_PARAMETERS = [
+    OpenApiParameter(
+        name='patient_id',
+        type=OpenApiTypes.INT,
+        location=OpenApiParameter.QUERY,
+        required=False,
+        description='Filtra pelo ID do paciente.'
+    ),
+    OpenApiParameter(
+        name='caregiver_id',
+        type=OpenApiTypes.INT,
+        location=OpenApiParameter.QUERY,
+        required=False,
+        description='Filtra pelo ID do cuidador.'
+    ),
+]
+EXPORT_RESPONSES = {
+    200: OpenApiResponse(response=OpenApiTypes.BINARY, description='Arquivo CSV ou JSONL'),
+    400: OpenApiResponse(description='Parâmetros inválidos'),
+}
+
+
+class StreamingExportView(APIView):
+    """
+    Base das exportações: projeta as colunas com `values()`, percorre o
+    resultado com `.iterator(chunk_size=...)` e transmite o arquivo em
+    partes, sem carregar todas as linhas em memória.
+    """
+    permission_classes = (IsAuthenticated,)
+    export_name = None
+    # Lista de (nome da coluna no arquivo, campo do values())
+    export_columns = ()
+
+    def get_queryset(self):
+        raise NotImplementedError
+
+    def filter_person(self, queryset, param, field, **person_filter):
+        person_id = self.request.query_params.get(param)
+        if person_id:
+            get_object_or_404(Person, id=person_id, **person_filter)
+            queryset = queryset.filter(**{field: person_id})
+        return queryset
+
+    def filter_created(self, queryset):
+        for param, lookup in (('created_from', 'gte'), ('created_to', 'lte')):
+            value = self.request.query_params.get(param)
+            if not value:
+                continue
+            date = parse_date(value)
+            if date is None:
+                raise ValueError(f'Parâmetro "{param}" inválido. Use o formato AAAA-MM-DD.')
+            queryset = queryset.filter(**{f'created_at__date__{lookup}': date})
+        return queryset
+
+    def export(self, request):
+        output = request.query_params.get('output', 'csv')
+        if output not in EXPORT_FORMATS:
+            return Response(
+                {'detail': f'Formato inválido. Use: {", ".join(EXPORT_FORMATS)}.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            queryset = self.filter_created(self.get_queryset())
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = queryset.values(*[field for _, field in self.export_columns]).iterator(
+            chunk_size=get_export_settings()['CHUNK_SIZE']
+        )
+        response = StreamingHttpResponse(
+            iter_export(rows, self.export_columns, output),
+            content_type=EXPORT_FORMATS[output],
+        )
+        filename = f'{self.export_name}-{timezone.localdate():%Y%m%d}.{output}'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+@extend_schema(tags=['History'])
+class HistoryExportView(StreamingExportView):
+    """
+    View para exportar os históricos ativos
+    """
+    export_name = 'historicos'
+    export_columns = (
+        ('id', 'id'),
+        ('patient_id', 'patient_id'),
+        ('patient_name', 'patient__name'),
+        ('caregiver_id', 'caregiver_id'),
+        ('caregiver_name', 'caregiver__name'),
+        ('description', 'description'),
+        ('created_by', 'created_by__username'),
+        ('created_at', 'created_at'),
+        ('updated_at', 'updated_at'),
+    )
+
+    def get_queryset(self):
+        queryset = History.objects.filter(is_active=True).order_by('-created_at', 'id')
+        queryset = self.filter_person(queryset, 'patient_id', 'patient_id', is_patient=True)
+        return self.filter_person(queryset, 'caregiver_id', 'caregiver_id', is_caregiver=True)
+
+    @extend_schema(
+        summary='Exportar Históricos',
+        description='Exporta os históricos ativos em CSV ou JSONL, transmitindo o arquivo em partes. Aceita os mesmos filtros da listagem (`patient_id`, `caregiver_id`) e o período de criação (`created_from`, `created_to`).',
+        parameters=[EXPORT_OUTPUT_PARAMETER, *EXPORT_PERSON_PARAMETERS, *EXPORT_DATE_PARAMETERS],
+        responses=EXPORT_RESPONSES,
+    )
+    def get(self, request, *args, **kwargs):
+        return self.export(request)
+
+
+@extend_schema(tags=['Anamnesis'])
+class AnamnesisExportView(StreamingExportView):
+    """
+    View para exportar as anamneses ativas
+    """
+    export_name = 'anamneses'
+    export_columns = (
+        ('id', 'id'),
+        ('patient_id', 'patient_id'),
+        ('patient_name', 'patient__name'),
+        ('caregiver_id', 'caregiver_id'),
+        ('caregiver_name', 'caregiver__name'),
+        ('main_diagnosis', 'main_diagnosis'),
+        ('associated_conditions', 'associated_conditions'),
+        ('responsible_contact', 'responsible_contact'),
+        ('reference_professional', 'reference_professional'),
+        ('cognitive_level', 'cognitive_level'),
+        ('auditory_comprehension', 'auditory_comprehension'),
+        ('memory_profile', 'memory_profile'),
+        ('attention_duration', 'attention_duration'),
+        ('learning_pace', 'learning_pace'),
+        ('language_style', 'language_style'),
+        ('functional_speech', 'functional_speech'),
+        ('speech_intelligibility', 'speech_intelligibility'),
+        ('uses_gestures', 'uses_gestures'),
+        ('uses_signs', 'uses_signs'),
+        ('uses_images_or_symbols', 'uses_images_or_symbols'),
+        ('preferred_symbol_systems', 'preferred_symbol_systems'),
+        ('symbol_comprehension', 'symbol_comprehension'),
+        ('communication_priorities', 'communication_priorities'),
+        ('created_at', 'created_at'),
+        ('updated_at', 'updated_at'),
+    )
+
+    def get_queryset(self):
+        queryset = Anamnesis.objects.filter(is_active=True).order_by('-created_at', 'id')
+        queryset = self.filter_person(queryset, 'patient_id', 'patient_id', is_patient=True)
+        return self.filter_person(queryset, 'caregiver_id', 'caregiver_id', is_caregiver=True)
+
+    @extend_schema(
+        summary='Exportar Anamneses',
+        description='Exporta as anamneses ativas em CSV ou JSONL, transmitindo o arquivo em partes. Permite filtrar por `patient_id`, `caregiver_id` e período de criação (`created_from`, `created_to`).',
+        parameters=[EXPORT_OUTPUT_PARAMETER, *EXPORT_PERSON_PARAMETERS, *EXPORT_DATE_PARAMETERS],
+        responses=EXPORT_RESPONSES,
+    )
+    def get(self, request, *args, **kwargs):
+        return self.export(request)
+
+
+@extend_schema(tags=['Patient'])
+class PatientExportView(StreamingExportView):
+    """
+    View para exportar a lista de pacientes
+    """
+    export_name = 'pacientes'
+    export_columns = (
+        ('id', 'id'),
+        ('name', 'name'),
+        ('cpf', 'cpf'),
+        ('email', 'email'),
+        ('phone', 'phone'),
+        ('birth_date', 'birth_date'),
+        ('gender', 'gender'),
+        ('cid', 'cid'),
+        ('postal_code', 'postal_code'),
+        ('state', 'state'),
+        ('city', 'city'),
+        ('district', 'district'),
+        ('street', 'street'),
+        ('number', 'number'),
+        ('complement', 'complement'),
+        ('is_active', 'is_active'),
+        ('created_at', 'created_at'),
+    )
+
+    def get_queryset(self):
+        queryset = Person.objects.filter(is_patient=True).order_by('name', 'id')
+
+        # Mesmo filtro de CPF da listagem de pacientes
+        cpf = self.request.query_params.get('cpf')
+        if cpf:
+            queryset = queryset.filter(cpf=''.join(filter(str.isdigit, cpf)))
+        return queryset
+
+    @extend_schema(
+        summary='Exportar Pacientes',
+        description='Exporta a lista de pacientes em CSV ou JSONL, transmitindo o arquivo em partes. Aceita o filtro `cpf` da listagem e o período de cadastro (`created_from`, `created_to`).',
+        parameters=[
+            EXPORT_OUTPUT_PARAMETER,
+            OpenApiParameter(
+                name='cpf',
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description='CPF do paciente (apenas números).'
+            ),
+            *EXPORT_DATE_PARAMETERS,
+        ],
+        responses=EXPORT_RESPONSES,
+    )
+    def get(self, request, *args, **kwargs):
+        return self.export(request)
@@ -0,0 +1,30 @@
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.views import View
+
+from ..metrics import get_metrics_settings, render_prometheus
+
+
+class MetricsView(View):
+    """
+    Métricas do processo no formato texto do Prometheus.
+
+    Acessível com o token de METRICS_SETTINGS['AUTH_TOKEN'] ou por usuários
+    da equipe (sessão do admin); sem token configurado, fica aberta apenas
+    com DEBUG ligado.
+    """
+
+    def has_access(self, request):
+        token = get_metrics_settings()['AUTH_TOKEN']
+        if token and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return True
+        if request.user.is_authenticated and request.user.is_staff:
+            return True
+        return not token and settings.DEBUG
+
+    def get(self, request):
+        if not self.has_access(request):
+            return HttpResponseForbidden()
+        return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,92 @@
+from django.db import IntegrityError
+from drf_spectacular.utils import OpenApiResponse, extend_schema
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from ..serializers.onboarding import (
+    OnboardingPersonSerializer,
+    OnboardingRelationshipSerializer,
+    OnboardingRequestSerializer,
+)
+from ..services.onboarding import BulkOnboarding, get_onboarding_settings
+
+
+@extend_schema(tags=['Person'])
+class BulkOnboardingView(APIView):
+    """
+    View para cadastrar em lote pacientes, cuidadores e seus relacionamentos
+    """
+    permission_classes = (IsAuthenticated,)
+
+    def _validate_rows(self, serializer_class, items):
+        rows = []
+        for item in items:
+            if not isinstance(item, dict):
+                rows.append(({}, {'non_field_errors': ['Cada item deve ser um objeto.']}))
+                continue
+            serializer = serializer_class(data=item)
+            if serializer.is_valid():
+                rows.append((dict(serializer.validated_data), {}))
+            else:
+                ref = item.get('ref')
+                rows.append(({'ref': str(ref) if ref is not None else None}, serializer.errors))
+        return rows
+
+    @extend_schema(
+        summary='Cadastrar Pessoas em Lote',
+        description=(
+            'Cadastra de uma vez pacientes e cuidadores (com usuário do sistema) e os relacionamentos entre eles. '
+            'Cada pessoa pode ter um `ref`, usado nos relacionamentos; um número nos relacionamentos se refere ao ID '
+            'de uma pessoa já cadastrada. A unicidade de CPF, e-mail e telefone é verificada para o lote todo, e '
+            'linhas com erro não impedem as demais: a resposta traz o status de cada linha. Com `dry_run` apenas '
+            'valida. **Requer autenticação.**'
+        ),
+        request=OnboardingRequestSerializer,
+        responses={
+            200: OpenApiResponse(description='Validação do lote (dry_run)'),
+            201: OpenApiResponse(description='Lote processado; status de cada linha em people/relationships'),
+            400: OpenApiResponse(description='Corpo inválido ou nenhuma linha válida'),
+            409: OpenApiResponse(description='Conflito com cadastros feitos ao mesmo tempo'),
+        },
+    )
+    def post(self, request, *args, **kwargs):
+        limits = get_onboarding_settings()
+        if not isinstance(request.data, dict):
+            return Response({'detail': 'O corpo da requisição deve ser um objeto.'}, status=status.HTTP_400_BAD_REQUEST)
+        people = request.data.get('people', [])
+        relationships = request.data.get('relationships', [])
+        if not isinstance(people, list) or not isinstance(relationships, list):
+            return Response(
+                {'detail': 'Os campos "people" e "relationships" devem ser listas.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not people and not relationships:
+            return Response({'detail': 'Informe ao menos uma pessoa ou relacionamento.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(people) > limits['MAX_PEOPLE'] or len(relationships) > limits['MAX_RELATIONSHIPS']:
+            return Response(
+                {'detail': f'Limite por lote: {limits["MAX_PEOPLE"]} pessoas e {limits["MAX_RELATIONSHIPS"]} relacionamentos.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true')
+        onboarding = BulkOnboarding(
+            self._validate_rows(OnboardingPersonSerializer, people),
+            self._validate_rows(OnboardingRelationshipSerializer, relationships),
+            created_by=request.user,
+            dry_run=dry_run,
+        )
+        try:
+            report = onboarding.run()
+        except IntegrityError:
+            return Response(
+                {'detail': 'Conflito com cadastros feitos ao mesmo tempo. Envie o lote novamente.'},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        if dry_run:
+            return Response(report, status=status.HTTP_200_OK)
+        summary = report['summary']
+        created = summary['people'] or summary['relationships']
+        return Response(report, status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST)
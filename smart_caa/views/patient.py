@@ -6,6 +6,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
 from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db import IntegrityError, transaction
+from django.utils import timezone
 from drf_spectacular.utils import (
     OpenApiExample,
     OpenApiParameter,
@@ -24,8 +25,13 @@ from ..serializers import (
     PatientCustomPictogramCreateSerializer,
     PatientPictogramBatchCreateSerializer,
     PatientPictogramDestroySerializer,
-    PictogramForPatientSerializer
+    PictogramForPatientSerializer,
+    PatientPictogramProjection,
+    PictogramForPatientProjection,
 )
+from ..serializers.projection import get_serialization_settings
+from ..services.pictogram_ranking import DAYPARTS, get_daypart, order_by_ranking
+from ..throttling import RegistrationThrottle
 
 
 PATIENT_SWAGGER_EXAMPLE = OpenApiExample(
@@ -99,6 +105,14 @@ class PatientCreateListView(generics.ListCreateAPIView):
         
         return [permission() for permission in permission_classes]
     
+    def get_throttles(self):
+        """
+        Limita o cadastro aberto, que faz o hash da senha; a listagem não é limitada
+        """
+        if self.request.method == 'POST':
+            return [RegistrationThrottle()]
+        return super().get_throttles()
+    
     def get_queryset(self):
         """Retorna apenas pessoas que são pacientes"""
         queryset = Person.objects.filter(is_patient=True)
@@ -304,11 +318,27 @@ class PatientPictogramsListView(generics.ListAPIView):
             elif private.lower() in ['false', '0']:
                 queryset = queryset.filter(pictogram__private=False)
 
-        return queryset
+        order = self.request.query_params.get('order', 'name')
+        if order == 'ranked':
+            daypart = self.request.query_params.get('daypart')
+            if daypart == 'current':
+                daypart = get_daypart(timezone.now())
+            elif daypart not in DAYPARTS:
+                daypart = None
+            return order_by_ranking(queryset, daypart=daypart)
+
+        # O paciente é fixo, então ordenar por patient__name só adicionaria um JOIN
+        return queryset.order_by('pictogram__name', '-created_at')
+
+    def list(self, request, *args, **kwargs):
+        if not get_serialization_settings()['FAST_READ_PATH']:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(PatientPictogramProjection(self.get_serializer_context()).serialize(queryset))
     
     @extend_schema(
         summary='Listar Pictogramas do Paciente',
-        description='Utilizado para listar todos os pictogramas vinculados a um paciente específico. Opcionalmente pode filtrar por pictogramas privados usando `?private=true` ou `?private=false`.',
+        description='Utilizado para listar todos os pictogramas vinculados a um paciente específico. Opcionalmente pode filtrar por pictogramas privados usando `?private=true` ou `?private=false`. Use `?order=ranked` para ordenar pelo uso recente e frequente do paciente e, opcionalmente, `&daypart=current` para priorizar os pictogramas mais usados no período do dia atual.',
         parameters=[
             OpenApiParameter(
                 name='private',
@@ -316,6 +346,22 @@ class PatientPictogramsListView(generics.ListAPIView):
                 location=OpenApiParameter.QUERY,
                 required=False,
                 description='Filtrar apenas pictogramas privados (`true`) ou públicos (`false`) do paciente.'
+            ),
+            OpenApiParameter(
+                name='order',
+                type=str,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                enum=['name', 'ranked'],
+                description='Ordenação da prancha: alfabética (`name`, padrão) ou pelo ranking de uso (`ranked`).'
+            ),
+            OpenApiParameter(
+                name='daypart',
+                type=str,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                enum=['current', *DAYPARTS],
+                description='Com `order=ranked`, prioriza o uso no período do dia informado (`current` usa o horário atual).'
             )
         ]
     )
@@ -716,6 +762,12 @@ class PatientAvailablePictogramsView(generics.ListAPIView):
         ).exclude(
             id__in=linked_pictograms
         ).select_related('category')
+
+    def list(self, request, *args, **kwargs):
+        if not get_serialization_settings()['FAST_READ_PATH']:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(PictogramForPatientProjection(self.get_serializer_context()).serialize(queryset))
     
     @extend_schema(
         summary='Listar Pictogramas Disponíveis',
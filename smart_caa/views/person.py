@@ -4,8 +4,10 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from drf_spectacular.utils import extend_schema
 from django.contrib.auth.models import User
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from ..models import Person
+from ..services.default_pictograms import link_default_pictograms
 from ..serializers.person import PersonSerializer
 
 
@@ -220,7 +222,7 @@ class MakePatientView(APIView):
     
     @extend_schema(
         summary='Tornar Pessoa em Paciente',
-        description='Atualiza uma pessoa existente para se tornar paciente. Marca o campo is_patient como True e permite atualizar campos específicos do paciente. **Requer autenticação.**',
+        description='Atualiza uma pessoa existente para se tornar paciente. Marca o campo is_patient como True, permite atualizar campos específicos do paciente e vincula os pictogramas padrão. **Requer autenticação.**',
         request={
             'application/json': {
                 'type': 'object',
@@ -275,7 +277,8 @@ class MakePatientView(APIView):
                         'properties': {
                             'message': {'type': 'string'},
                             'is_patient': {'type': 'boolean'},
-                            'updated_fields': {'type': 'object'}
+                            'updated_fields': {'type': 'object'},
+                            'default_pictograms_linked': {'type': 'integer'}
                         }
                     }
                 }
@@ -316,13 +319,17 @@ class MakePatientView(APIView):
             # Marca como paciente
             person.is_patient = True
             updated_fields['is_patient'] = True
-            person.save()
+            with transaction.atomic():
+                person.save()
+                # Vincula os pictogramas padrão, como no cadastro de paciente
+                linked = link_default_pictograms(person.id, request.user.id)
             
             return Response(
                 {
                     'message': 'Pessoa atualizada para paciente com sucesso.',
                     'is_patient': True,
-                    'updated_fields': updated_fields
+                    'updated_fields': updated_fields,
+                    'default_pictograms_linked': linked
                 },
                 status=status.HTTP_200_OK
             )
@@ -1,8 +1,17 @@
-from rest_framework import generics
+from django.http import FileResponse, HttpResponseNotModified
+from rest_framework import generics, status
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from drf_spectacular.utils import extend_schema, OpenApiParameter
+from rest_framework.response import Response
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
 from ..models import Pictogram
 from ..serializers import PictogramSerializer
+from ..services.speech import (
+    SpeechSynthesisError,
+    get_pictogram_speech_text,
+    get_speech_audio,
+    get_speech_settings,
+)
 
 
 @extend_schema(tags=['Pictogram'])
@@ -87,3 +96,94 @@ class PictogramRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     def get_queryset(self):
         """Otimiza as consultas incluindo a categoria relacionada"""
         return Pictogram.objects.select_related('category', 'created_by')
+
+
+@extend_schema(tags=['Pictogram'])
+class PictogramSpeechView(generics.GenericAPIView):
+    """
+    View para obter a fala do pictograma: o áudio gravado, quando existe,
+    ou o áudio sintetizado no servidor e mantido em cache.
+    """
+    queryset = Pictogram.objects.all()
+    permission_classes = (IsAuthenticated,)
+    speech_sources = ('name', 'description', 'name_description')
+
+    @extend_schema(
+        summary='Obter Áudio do Pictograma',
+        description='Retorna o áudio do pictograma. Se o pictograma tiver áudio gravado e nenhuma voz/velocidade for pedida, o arquivo gravado é retornado; caso contrário o texto é sintetizado no servidor na primeira requisição e reaproveitado do cache nas seguintes.',
+        parameters=[
+            OpenApiParameter(
+                name='source',
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                enum=['name', 'description', 'name_description'],
+                description='Texto falado: nome (padrão), descrição ou ambos.'
+            ),
+            OpenApiParameter(
+                name='voice',
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description='Voz do motor de síntese (ex.: pt-br).'
+            ),
+            OpenApiParameter(
+                name='rate',
+                type=OpenApiTypes.INT,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description='Velocidade da fala em palavras por minuto.'
+            ),
+        ],
+        responses={
+            200: OpenApiResponse(response=OpenApiTypes.BINARY, description='Arquivo de áudio'),
+            304: OpenApiResponse(description='Áudio não modificado (ETag)'),
+            400: OpenApiResponse(description='Parâmetros inválidos'),
+            503: OpenApiResponse(description='Motor de síntese indisponível'),
+        }
+    )
+    def get(self, request, *args, **kwargs):
+        pictogram = self.get_object()
+        speech_settings = get_speech_settings()
+        params = request.query_params
+
+        source = params.get('source', 'name')
+        voice = params.get('voice') or speech_settings['VOICE']
+        if source not in self.speech_sources:
+            return Response(
+                {'detail': f'Parâmetro "source" inválido. Use: {", ".join(self.speech_sources)}.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if voice not in speech_settings['VOICES']:
+            return Response(
+                {'detail': f'Voz não suportada. Use: {", ".join(speech_settings["VOICES"])}.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            rate = int(params.get('rate') or speech_settings['RATE'])
+        except ValueError:
+            rate = None
+        if rate is None or not speech_settings['MIN_RATE'] <= rate <= speech_settings['MAX_RATE']:
+            return Response(
+                {'detail': f'Parâmetro "rate" deve estar entre {speech_settings["MIN_RATE"]} e {speech_settings["MAX_RATE"]}.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if pictogram.audio and source == 'name' and not params.get('voice') and not params.get('rate'):
+            return FileResponse(pictogram.audio.open('rb'))
+
+        try:
+            path, content_type, key, _ = get_speech_audio(
+                get_pictogram_speech_text(pictogram, source), voice, rate
+            )
+        except SpeechSynthesisError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        etag = f'"{key}"'
+        if request.headers.get('If-None-Match') == etag:
+            response = HttpResponseNotModified()
+        else:
+            response = FileResponse(open(path, 'rb'), content_type=content_type)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, max-age=86400'
+        return response
@@ -0,0 +1,223 @@
+from django.utils.dateparse import parse_date
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiExample, OpenApiParameter, OpenApiResponse, extend_schema, inline_serializer
+from rest_framework import generics, serializers, status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from ..models import PatientPictogram, PictogramUsageDaily
+from ..serializers import PictogramUsageBatchSerializer, PictogramUsageDailySerializer
+from ..services.pictogram_prediction import predictor
+
+
+@extend_schema(tags=['Patient'])
+class PatientPictogramUsageView(generics.ListAPIView):
+    """
+    View para receber a telemetria de toques da prancha do paciente
+    e consultar as contagens diárias consolidadas.
+    """
+    serializer_class = PictogramUsageDailySerializer
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        queryset = PictogramUsageDaily.objects.filter(
+            patient_id=self.kwargs['patient_id']
+        ).select_related('pictogram')
+
+        date_from = parse_date(self.request.query_params.get('date_from') or '')
+        date_to = parse_date(self.request.query_params.get('date_to') or '')
+        if date_from:
+            queryset = queryset.filter(date__gte=date_from)
+        if date_to:
+            queryset = queryset.filter(date__lte=date_to)
+
+        return queryset
+
+    @extend_schema(
+        summary='Listar Uso Diário dos Pictogramas',
+        description='Lista as contagens diárias de toques por pictograma do paciente. Permite filtrar o período com `date_from` e `date_to` (AAAA-MM-DD).',
+        parameters=[
+            OpenApiParameter(
+                name='date_from',
+                type=OpenApiTypes.DATE,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description='Data inicial (inclusive).'
+            ),
+            OpenApiParameter(
+                name='date_to',
+                type=OpenApiTypes.DATE,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description='Data final (inclusive).'
+            ),
+        ]
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    @extend_schema(
+        summary='Registrar Toques nos Pictogramas',
+        description='Recebe um lote de eventos de toque enviados pela prancha do paciente. O lote é gravado de uma só vez e as contagens diárias por pictograma são atualizadas na mesma transação. Eventos com `sequence` e `occurred_at` já registrados para o paciente (lote reenviado) são ignorados; `received` informa quantos foram gravados.',
+        request=PictogramUsageBatchSerializer,
+        responses={
+            201: OpenApiResponse(
+                response=inline_serializer(
+                    name='PictogramUsageBatchResponse',
+                    fields={
+                        'message': serializers.CharField(),
+                        'received': serializers.IntegerField(),
+                    },
+                ),
+                description='Eventos registrados com sucesso.'
+            ),
+            400: OpenApiResponse(description='Dados inválidos')
+        },
+        examples=[
+            OpenApiExample(
+                'Lote de toques',
+                value={
+                    'events': [
+                        {'pictogram': 1, 'occurred_at': '2026-04-11T10:00:00-03:00', 'sequence': 41},
+                        {'pictogram': 7, 'occurred_at': '2026-04-11T10:00:02-03:00', 'sequence': 42},
+                    ]
+                },
+                request_only=True,
+            ),
+        ]
+    )
+    def post(self, request, *args, **kwargs):
+        serializer = PictogramUsageBatchSerializer(
+            data=request.data,
+            context={'request': request, 'patient_id': self.kwargs['patient_id']}
+        )
+        serializer.is_valid(raise_exception=True)
+        received = serializer.save()
+
+        return Response(
+            {
+                'message': f'{received} eventos registrados com sucesso.',
+                'received': received
+            },
+            status=status.HTTP_201_CREATED
+        )
+
+
+@extend_schema(tags=['Patient'])
+class PatientPictogramPredictView(generics.GenericAPIView):
+    """
+    View para sugerir os próximos pictogramas durante a montagem de uma frase.
+    """
+    permission_classes = (IsAuthenticated,)
+    default_limit = 5
+    max_limit = 50
+
+    @extend_schema(
+        summary='Prever Próximos Pictogramas',
+        description='Sugere os pictogramas mais prováveis de serem tocados em seguida, a partir dos pictogramas já escolhidos na frase (`after`). Usa o histórico de toques do paciente e, como complemento, o de todos os pacientes. Apenas pictogramas ativos na prancha do paciente são sugeridos; se faltarem sugestões, a lista é completada pelo ranking de uso.',
+        parameters=[
+            OpenApiParameter(
+                name='after',
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description='IDs dos pictogramas já escolhidos, em ordem e separados por vírgula (ex.: `12,7`).'
+            ),
+            OpenApiParameter(
+                name='limit',
+                type=OpenApiTypes.INT,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description='Quantidade máxima de sugestões (padrão 5, máximo 50).'
+            ),
+        ],
+        responses={
+            200: OpenApiResponse(
+                response=inline_serializer(
+                    name='PictogramPredictionResponse',
+                    fields={
+                        'after': serializers.ListField(child=serializers.IntegerField()),
+                        'predictions': serializers.ListField(
+                            child=inline_serializer(
+                                name='PictogramPrediction',
+                                fields={
+                                    'pictogram': serializers.IntegerField(),
+                                    'pictogram_name': serializers.CharField(),
+                                    'score': serializers.FloatField(),
+                                    'source': serializers.ChoiceField(choices=['patient', 'global', 'ranking']),
+                                },
+                            )
+                        ),
+                    },
+                ),
+                description='Sugestões ordenadas da mais provável para a menos provável.'
+            ),
+            400: OpenApiResponse(description='Parâmetros inválidos')
+        }
+    )
+    def get(self, request, *args, **kwargs):
+        patient_id = self.kwargs['patient_id']
+
+        try:
+            after = [int(value) for value in (request.query_params.get('after') or '').split(',') if value.strip()]
+            limit = int(request.query_params.get('limit') or self.default_limit)
+        except ValueError:
+            return Response(
+                {'detail': 'Os parâmetros "after" e "limit" devem conter apenas números inteiros.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if limit < 1:
+            return Response(
+                {'detail': 'O parâmetro "limit" deve ser maior que zero.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        limit = min(limit, self.max_limit)
+
+        board = {
+            pictogram_id: (name, rank_score)
+            for pictogram_id, name, rank_score in PatientPictogram.objects.filter(
+                patient_id=patient_id,
+                is_active=True,
+            ).values_list('pictogram_id', 'pictogram__name', 'rank_score')
+        }
+
+        scored = sorted(
+            (
+                (score, source, pictogram_id)
+                for pictogram_id, (score, source) in predictor.predict(patient_id, after).items()
+                if pictogram_id in board
+            ),
+            key=lambda item: (-item[0], board[item[2]][0]),
+        )
+        predictions = [
+            {
+                'pictogram': pictogram_id,
+                'pictogram_name': board[pictogram_id][0],
+                'score': round(score, 6),
+                'source': source,
+            }
+            for score, source, pictogram_id in scored[:limit]
+        ]
+
+        if len(predictions) < limit:
+            # Completa com os pictogramas mais usados da prancha
+            predicted = {prediction['pictogram'] for prediction in predictions}
+            remaining = sorted(
+                (pictogram_id for pictogram_id in board if pictogram_id not in predicted),
+                key=lambda pictogram_id: (
+                    board[pictogram_id][1] is None,
+                    -(board[pictogram_id][1] or 0),
+                    board[pictogram_id][0],
+                ),
+            )
+            predictions.extend(
+                {
+                    'pictogram': pictogram_id,
+                    'pictogram_name': board[pictogram_id][0],
+                    'score': 0.0,
+                    'source': 'ranking',
+                }
+                for pictogram_id in remaining[:limit - len(predictions)]
+            )
+
+        return Response({'after': after, 'predictions': predictions})